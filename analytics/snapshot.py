@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+
+"""
+Колоночный снимок таблиц для аналитики (массивы по колонкам и месяцам)
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import zlib
+from array import array
+from datetime import date
+from pathlib import Path
+from config import DB_PATH
+from models.base_model import attach_partitions
+
+
+# Снимок лежит рядом с БД, чтобы другая БД (cli.py --db) не смешивалась с ним
+SNAPSHOT_DIR = Path(f"{DB_PATH}-snapshot")
+MANIFEST_NAME = "manifest.json"
+
+# Строковые колонки хранятся кодами словаря месяца
+STRING_COLUMN = 'str'
+
+
+def column_path(snapshot_dir, table, month, gen, column):
+    """Файл одной колонки одного месяца (поколение в имени - для атомарной замены)"""
+    return Path(snapshot_dir) / table / f"{month}.{gen}.{column}.z"
+
+
+def write_column(path, values):
+    """Записать массив колонки, сжатый zlib"""
+    tmp = path.with_suffix('.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(zlib.compress(values.tobytes(), 1))
+    os.replace(tmp, path)
+
+
+def read_column(path, typecode, byteorder):
+    """Прочитать массив колонки (с переворотом байтов, если снимок с другой платформы)"""
+    with open(path, 'rb') as f:
+        values = array(typecode, zlib.decompress(f.read()))
+    if byteorder != sys.byteorder:
+        values.byteswap()
+    return values
+
+
+def load_manifest(snapshot_dir=SNAPSHOT_DIR):
+    """Оглавление снимка (пустое, если снимка еще нет)"""
+    path = Path(snapshot_dir) / MANIFEST_NAME
+    if not path.exists():
+        return {'seq': 0, 'byteorder': sys.byteorder, 'tables': {}}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _next_month(month):
+    """Первый день следующего месяца для 'ГГГГ-ММ'"""
+    year, number = int(month[:4]), int(month[5:7])
+    return date(year + number // 12, number % 12 + 1, 1).strftime("%Y-%m-%d")
+
+
+class SnapshotExporter:
+    """Выгрузка таблиц моделей в колоночный снимок
+    
+    Каждый месяц таблицы - отдельный набор массивов array: день месяца
+    (строки отсортированы по дате), колонки модели SNAPSHOT_COLUMNS и готовые
+    суммы по ключам SNAPSHOT_GROUPS. Повторная выгрузка переписывает только
+    месяцы, которые упоминаются в журнале изменений (changes) после прошлой
+    выгрузки. Чтения из БД короткие - по одному запросу на месяц, без общей
+    транзакции, поэтому ввод данных выгрузка не задерживает.
+    """
+    
+    def __init__(self, models, snapshot_dir=SNAPSHOT_DIR):
+        self.models = {model.table_name: model for model in models if model.SNAPSHOT_COLUMNS}
+        self.snapshot_dir = Path(snapshot_dir)
+    
+    def _connect(self):
+        """Соединение только для чтения"""
+        conn = sqlite3.connect(f"{Path(DB_PATH).resolve().as_uri()}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def refresh(self):
+        """Обновить снимок; возвращает число переписанных месяцев"""
+        manifest = load_manifest(self.snapshot_dir)
+        conn = self._connect()
+        try:
+            # Месяцы закрытых лет читаются из разделов (год мог перенести другой процесс)
+            if self.models:
+                next(iter(self.models.values())).reload_meta()
+            attach_partitions(conn, sorted({year for model in self.models.values() for year in model.partition_years()}))
+            
+            # Изменения после этой отметки попадут в следующую выгрузку
+            # (номер из sqlite_sequence: журнал может быть обрезан целиком)
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+            seq = row[0] if row else 0
+            # Синхронизация удалила из журнала записи, которые снимок еще не прочитал
+            pruned = conn.execute("SELECT value FROM sync_meta WHERE key = 'changes_pruned'").fetchone()
+            months = self._changed_months(conn, manifest, full=pruned is not None and manifest['seq'] < int(pruned[0]))
+            
+            obsolete = []
+            for table_name, month in sorted(months):
+                obsolete.extend(self._export_month(conn, manifest, table_name, month))
+        finally:
+            conn.close()
+        
+        manifest['seq'] = seq
+        manifest['byteorder'] = sys.byteorder
+        self._write_manifest(manifest)
+        
+        # Старые поколения удаляются после записи нового оглавления
+        for path in obsolete:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        return len(months)
+    
+    def _changed_months(self, conn, manifest, full=False):
+        """Месяцы (таблица, 'ГГГГ-ММ'), которые нужно выгрузить заново (full - все)"""
+        months = set()
+        for table_name in self.models:
+            if full:
+                # Выгруженные месяцы тоже: в БД их строк может уже не быть
+                months.update((table_name, month) for month in manifest['tables'].get(table_name, {}).get('months', {}))
+            if full or table_name not in manifest['tables']:
+                # Таблица выгружается впервые - целиком
+                source = self.models[table_name]._source()[0]
+                rows = conn.execute(f"SELECT DISTINCT substr(date, 1, 7) FROM {source}").fetchall()
+                months.update((table_name, row[0]) for row in rows if row[0])
+        
+        placeholders = ', '.join('?' for _ in self.models)
+        rows = conn.execute(
+            f"SELECT DISTINCT table_name, substr(date, 1, 7), substr(prev_date, 1, 7) FROM changes "
+            f"WHERE seq > ? AND table_name IN ({placeholders})",
+            [manifest['seq']] + list(self.models)
+        ).fetchall()
+        for table_name, month, prev_month in rows:
+            months.update((table_name, m) for m in (month, prev_month) if m)
+        return months
+    
+    def _export_month(self, conn, manifest, table_name, month):
+        """Выгрузить один месяц таблицы; возвращает файлы прошлого поколения"""
+        model = self.models[table_name]
+        columns = model.SNAPSHOT_COLUMNS
+        table = manifest['tables'].setdefault(table_name, {
+            'shop': getattr(model, 'shop_name', None),
+            'columns': columns,
+            'groups': list(model.SNAPSHOT_GROUPS),
+            'months': {}
+        })
+        
+        live = " AND deleted = 0" if model.SOFT_DELETE else ""
+        source = model._source(f"{month}-01", f"{month}-31")[0]
+        rows = conn.execute(
+            f"SELECT date, {', '.join(columns)} FROM {source} "
+            f"WHERE date >= ? AND date < ?{live} ORDER BY date, id",
+            (f"{month}-01", _next_month(month))
+        ).fetchall()
+        
+        previous = table['months'].pop(month, None)
+        obsolete = [
+            column_path(self.snapshot_dir, table_name, month, previous['gen'], name)
+            for name in previous['files']
+        ] if previous else []
+        if not rows:
+            return obsolete
+        
+        gen = previous['gen'] + 1 if previous else 1
+        (self.snapshot_dir / table_name).mkdir(parents=True, exist_ok=True)
+        
+        arrays = {'day': array('B', (int(row['date'][8:10]) for row in rows))}
+        dictionaries = {}
+        for name, typecode in columns.items():
+            if typecode == STRING_COLUMN:
+                codes = {}
+                arrays[name] = array('H', (codes.setdefault(row[name] or '', len(codes)) for row in rows))
+                dictionaries[name] = list(codes)
+            else:
+                arrays[name] = array(typecode, (row[name] or 0 for row in rows))
+        
+        # Готовые суммы месяца по ключам: целый месяц агрегируется без прохода по строкам
+        values = [name for name, typecode in columns.items() if typecode == 'd']
+        for key in model.SNAPSHOT_GROUPS:
+            sums = {}
+            for index, code in enumerate(arrays[key]):
+                group = sums.setdefault(code, [0.0] * len(values))
+                for position, name in enumerate(values):
+                    group[position] += arrays[name][index]
+            arrays[f"g.{key}"] = array('H' if key in dictionaries else columns[key], sums)
+            for position, name in enumerate(values):
+                arrays[f"g.{key}.{name}"] = array('d', (group[position] for group in sums.values()))
+        
+        for name, values_array in arrays.items():
+            write_column(column_path(self.snapshot_dir, table_name, month, gen, name), values_array)
+        
+        table['months'][month] = {
+            'gen': gen,
+            'rows': len(rows),
+            'files': {name: values_array.typecode for name, values_array in arrays.items()},
+            'dictionaries': dictionaries
+        }
+        return obsolete
+    
+    def _write_manifest(self, manifest):
+        """Атомарно заменить оглавление снимка"""
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        path = self.snapshot_dir / MANIFEST_NAME
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp, path)
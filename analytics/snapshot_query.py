@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+"""
+Запросы к колоночному снимку: фильтр по датам и суммы без обращения к БД
+"""
+
+import calendar
+from bisect import bisect_left, bisect_right
+from analytics.snapshot import SNAPSHOT_DIR, STRING_COLUMN, column_path, load_manifest, read_column
+
+
+class SnapshotQuery:
+    """Агрегаты по колоночному снимку (SnapshotExporter)
+    
+    Строки месяца отсортированы по дню, поэтому фильтр по датам - два
+    бинарных поиска по колонке day, а сумма - sum() по срезу массива
+    (цикл внутри C). Целые месяцы в группировках берутся из готовых сумм
+    снимка. Прочитанные месяцы держатся в памяти до смены их поколения.
+    """
+    
+    def __init__(self, snapshot_dir=SNAPSHOT_DIR):
+        self.snapshot_dir = snapshot_dir
+        self.manifest = load_manifest(snapshot_dir)
+        self._columns = {}  # (таблица, месяц, поколение, колонка) -> array
+    
+    def reload(self):
+        """Перечитать оглавление после обновления снимка"""
+        self.manifest = load_manifest(self.snapshot_dir)
+        current = {
+            (table_name, month, info['gen'])
+            for table_name, table in self.manifest['tables'].items()
+            for month, info in table['months'].items()
+        }
+        self._columns = {key: values for key, values in self._columns.items() if key[:3] in current}
+    
+    def tables(self):
+        """Таблицы снимка: {таблица: магазин (None для расходов)}"""
+        return {name: table['shop'] for name, table in self.manifest['tables'].items()}
+    
+    def _column(self, table_name, month, column):
+        """Массив колонки месяца (из памяти или с диска)"""
+        info = self.manifest['tables'][table_name]['months'][month]
+        key = (table_name, month, info['gen'], column)
+        if key not in self._columns:
+            path = column_path(self.snapshot_dir, table_name, month, info['gen'], column)
+            self._columns[key] = read_column(path, info['files'][column], self.manifest['byteorder'])
+        return self._columns[key]
+    
+    def _months(self, table_name, date_from=None, date_to=None):
+        """Месяцы периода: (месяц, начало среза, конец среза, месяц целиком)"""
+        table = self.manifest['tables'].get(table_name)
+        if table is None:
+            return
+        
+        for month in sorted(table['months']):
+            if (date_from and month < date_from[:7]) or (date_to and month > date_to[:7]):
+                continue
+            
+            month_end = calendar.monthrange(int(month[:4]), int(month[5:7]))[1]
+            first = int(date_from[8:10]) if date_from and month == date_from[:7] else 1
+            last = int(date_to[8:10]) if date_to and month == date_to[:7] else month_end
+            if first == 1 and last >= month_end:
+                yield month, 0, table['months'][month]['rows'], True
+                continue
+            
+            day = self._column(table_name, month, 'day')
+            yield month, bisect_left(day, first), bisect_right(day, last), False
+    
+    def total(self, table_name, column, date_from=None, date_to=None):
+        """Сумма колонки за период"""
+        return sum(
+            sum(self._column(table_name, month, column)[start:end])
+            for month, start, end, _ in self._months(table_name, date_from, date_to)
+        )
+    
+    def monthly_totals(self, table_name, column, date_from=None, date_to=None):
+        """Сумма колонки по месяцам: {'ГГГГ-ММ': сумма}"""
+        return {
+            month: sum(self._column(table_name, month, column)[start:end])
+            for month, start, end, _ in self._months(table_name, date_from, date_to)
+        }
+    
+    def daily_totals(self, table_name, column, date_from=None, date_to=None):
+        """Сумма колонки по дням: {'ГГГГ-ММ-ДД': сумма} (дни без строк пропускаются)"""
+        result = {}
+        for month, start, end, _ in self._months(table_name, date_from, date_to):
+            day = self._column(table_name, month, 'day')
+            values = self._column(table_name, month, column)
+            while start < end:
+                # Строки дня идут подряд: срез до первой строки следующего дня
+                stop = bisect_right(day, day[start], start, end)
+                result[f"{month}-{day[start]:02d}"] = sum(values[start:stop])
+                start = stop
+        return result
+    
+    def group_totals(self, table_name, key, date_from=None, date_to=None):
+        """Суммы числовых колонок по значениям ключа: {ключ: {колонка: сумма}}"""
+        table = self.manifest['tables'].get(table_name)
+        if table is None:
+            return {}
+        values = [name for name, typecode in table['columns'].items() if typecode == 'd']
+        decode = table['columns'][key] == STRING_COLUMN
+        
+        result = {}
+        for month, start, end, whole in self._months(table_name, date_from, date_to):
+            dictionary = table['months'][month]['dictionaries'].get(key) if decode else None
+            if whole:
+                keys = self._column(table_name, month, f"g.{key}")
+                columns = [self._column(table_name, month, f"g.{key}.{name}") for name in values]
+                start, end = 0, len(keys)
+            else:
+                keys = self._column(table_name, month, key)
+                columns = [self._column(table_name, month, name) for name in values]
+            
+            for index in range(start, end):
+                code = keys[index]
+                group = result.setdefault(dictionary[code] if decode else code, dict.fromkeys(values, 0.0))
+                for name, column in zip(values, columns):
+                    group[name] += column[index]
+        return result
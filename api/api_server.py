@@ -0,0 +1,477 @@
+# -*- coding: utf-8 -*-
+
+"""
+HTTP API (JSON) для быстрого ввода продаж и расходов с телефонов
+
+Запросы:
+    GET  /api/shops                                  - магазины, доступные пользователю
+    GET  /api/sales?shop=М1&from=&to=                - продажи магазина за период
+    GET  /api/sales/totals?shop=М1&from=&to=         - сумма и итоги по дням
+    POST /api/sales?shop=М1                          - продажа или список продаж
+    GET  /api/expenses?shop=&from=&to=               - расходы (только управляющему)
+    GET  /api/expenses/totals?shop=&from=&to=        - сумма, итоги по дням и магазинам
+    POST /api/expenses                               - расход или список расходов
+
+Даты - ГГГГ-ММ-ДД или ДД.ММ.ГГГГ, по умолчанию - сегодня.
+"""
+
+import asyncio
+import base64
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit, parse_qs
+from config import (
+    API_HOST, API_PORT, API_WORKERS, API_KEEPALIVE_S, API_MAX_BODY, API_MAX_BATCH,
+    API_AUTH_CACHE_S, DATE_FORMAT, DB_DATE_FORMAT
+)
+from models.base_model import use_connection_pool
+from models.sale_model import SaleModel
+from models.expense_model import ExpenseModel
+from models.settings_model import get_settings
+from models.user_model import get_users
+from controllers.access import Session
+
+
+STATUS_TEXT = {
+    200: "OK",
+    201: "Created",
+    304: "Not Modified",
+    400: "Bad Request",
+    401: "Unauthorized",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    411: "Length Required",
+    413: "Payload Too Large",
+    500: "Internal Server Error"
+}
+
+# Поля строк POST: все допустимые и обязательные
+SALE_FIELDS = ('date', 'item', 'seller_name', 'quantity', 'price', 'uuid')
+SALE_REQUIRED = ('item', 'quantity', 'price')
+EXPENSE_FIELDS = ('date', 'shop', 'item', 'descr', 'amount', 'uuid')
+EXPENSE_REQUIRED = ('item', 'amount')
+NUMBER_FIELDS = ('quantity', 'price', 'amount')
+
+
+class ApiError(Exception):
+    """Ответ с ошибкой: код HTTP и текст для клиента"""
+    
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ApiServer:
+    """HTTP/1.1-сервер на asyncio в своем потоке, запросы к БД - в пуле потоков
+    
+    Цикл событий только разбирает запросы и пишет ответы, поэтому сотни
+    соединений с keep-alive не занимают потоков; работа с моделями идет в
+    API_WORKERS потоках на соединениях из общего пула. Окно Tk сервер не
+    трогает: все, что он меняет, программа видит через БД.
+    
+    Списки и итоги отдаются с ETag по номеру последнего изменения журнала
+    changes: пока в БД ничего не записано, повторный запрос с If-None-Match
+    получает 304 без обращения к таблицам. Строки POST с uuid, который уже
+    есть в таблице, повторно не пишутся - телефон может безопасно повторить
+    запрос после обрыва связи.
+    """
+    
+    def __init__(self, host=API_HOST, port=API_PORT, workers=API_WORKERS):
+        self.host = host
+        self.port = port
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+        use_connection_pool(workers)
+        
+        self.sale_models = {
+            shop['name']: SaleModel(shop['name'], shop['table_suffix'])
+            for shop in get_settings().get_shops()
+        }
+        self.expense_model = ExpenseModel()
+        self.users = get_users()
+        
+        self._sessions = {}  # заголовок Authorization -> (Session, срок, версия пользователей)
+        self._seq = None  # Номер последнего изменения БД, при котором читались служебные значения
+        self._loop = None
+        self._server = None
+        self._thread = None
+        
+        self._routes = {
+            ('GET', '/api/shops'): self._list_shops,
+            ('GET', '/api/sales'): self._list_sales,
+            ('POST', '/api/sales'): self._add_sales,
+            ('GET', '/api/sales/totals'): self._sales_totals,
+            ('GET', '/api/expenses'): self._list_expenses,
+            ('POST', '/api/expenses'): self._add_expenses,
+            ('GET', '/api/expenses/totals'): self._expense_totals
+        }
+    
+    # --- Запуск и остановка ---
+    
+    def start(self):
+        """Запустить сервер в фоновом потоке; False - порт занят или недоступен"""
+        started = threading.Event()
+        
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._server = self._loop.run_until_complete(
+                    asyncio.start_server(self._handle_connection, self.host, self.port)
+                )
+            except OSError as e:
+                print(f"Ошибка запуска API на {self.host}:{self.port}: {e}")
+                self._loop.close()
+                started.set()
+                return
+            
+            self.port = self._server.sockets[0].getsockname()[1]
+            started.set()
+            self._loop.run_forever()
+            
+            # Остановка: закрыть прием и прервать открытые соединения
+            self._server.close()
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.close()
+        
+        self._thread = threading.Thread(target=run, name="api-server", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self._server is not None
+    
+    def is_running(self):
+        """Работает ли поток сервера"""
+        return self._thread is not None and self._thread.is_alive()
+    
+    def stop(self):
+        """Остановить сервер и дождаться его потока"""
+        if self.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+        self.executor.shutdown(wait=False)
+    
+    # --- Протокол HTTP ---
+    
+    async def _handle_connection(self, reader, writer):
+        """Запросы одного соединения по очереди, пока клиент не закроет его или не замолчит"""
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), API_KEEPALIVE_S)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except ApiError as e:
+                    # Запрос не разобран - продолжать соединение нельзя
+                    writer.write(self._format_response(e.status, {'error': str(e)}, keep_alive=False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                
+                status, payload, headers = await self._respond(request)
+                writer.write(self._format_response(status, payload, headers, request['keep_alive']))
+                await writer.drain()
+                if not request['keep_alive']:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            # Клиент оборвал соединение или сервер останавливается
+            pass
+        finally:
+            writer.close()
+    
+    async def _read_request(self, reader):
+        """Разобрать запрос: строка запроса, заголовки и тело (None - клиент закрыл соединение)"""
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode('latin-1').split()
+        except ValueError:
+            raise ApiError(400, "Неверная строка запроса")
+        
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        
+        if 'transfer-encoding' in headers:
+            raise ApiError(411, "Нужен заголовок Content-Length")
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            raise ApiError(400, "Неверный Content-Length")
+        if length > API_MAX_BODY:
+            raise ApiError(413, f"Тело запроса больше {API_MAX_BODY} байт")
+        body = await reader.readexactly(length) if length else b''
+        
+        connection = headers.get('connection', '').lower()
+        url = urlsplit(target)
+        return {
+            'method': method.upper(),
+            'path': url.path.rstrip('/'),
+            'query': {key: values[-1] for key, values in parse_qs(url.query).items()},
+            'headers': headers,
+            'body': body,
+            'keep_alive': connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+        }
+    
+    @staticmethod
+    def _format_response(status, payload, headers=None, keep_alive=True):
+        """Байты ответа: строка статуса, заголовки и тело JSON"""
+        body = b'' if payload is None else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        lines = [
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+            "Cache-Control: no-cache",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}"
+        ]
+        if status != 304:
+            lines.append("Content-Type: application/json; charset=utf-8")
+            lines.append(f"Content-Length: {len(body)}")
+        if keep_alive:
+            lines.append(f"Keep-Alive: timeout={API_KEEPALIVE_S}")
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body
+    
+    async def _respond(self, request):
+        """Выполнить запрос: (статус, данные ответа, дополнительные заголовки)"""
+        handler = self._routes.get((request['method'], request['path']))
+        if handler is None:
+            if any(path == request['path'] for _, path in self._routes):
+                return 405, {'error': "Метод не поддерживается"}, None
+            return 404, {'error': "Нет такого адреса"}, None
+        
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.executor, self._run_handler, handler, request)
+        except ApiError as e:
+            headers = {'WWW-Authenticate': 'Basic realm="finance", charset="UTF-8"'} if e.status == 401 else None
+            return e.status, {'error': str(e)}, headers
+        except PermissionError as e:
+            return 403, {'error': str(e)}, None
+        except Exception as e:
+            print(f"Ошибка запроса API {request['method']} {request['path']}: {e}")
+            return 500, {'error': "Внутренняя ошибка сервера"}, None
+    
+    # --- Вход ---
+    
+    def _run_handler(self, handler, request):
+        """Проверить вход и выполнить обработчик (в потоке запросов к БД)"""
+        header = request['headers'].get('authorization', '')
+        # Пользователей могли изменить в окне или другой программой - сессии
+        # прошлой версии не подходят, даже если их срок не вышел
+        version = self.users.version()
+        session = self._cached_session(header, version)
+        if session is None:
+            session = self._authenticate(header, version)
+        return handler(session, request)
+    
+    def _cached_session(self, header, version):
+        """Сессия недавно проверенного заголовка Authorization (None - нужно проверить)"""
+        cached = self._sessions.get(header)
+        if cached is not None and cached[1] > time.monotonic() and cached[2] == version:
+            return cached[0]
+        return None
+    
+    def _authenticate(self, header, version):
+        """Пользователь по HTTP Basic; без пользователей в БД API открыт, как и программа"""
+        if not self.users.has_users():
+            return Session()
+        if not header.startswith('Basic '):
+            raise ApiError(401, "Нужен вход")
+        try:
+            login, _, password = base64.b64decode(header[6:]).decode('utf-8').partition(':')
+        except ValueError:
+            raise ApiError(401, "Неверный заголовок Authorization")
+        
+        user = self.users.authenticate(login, password)
+        if user is None:
+            raise ApiError(401, "Неверный логин или пароль")
+        
+        session = Session()
+        session.login(user)
+        if len(self._sessions) >= 1000:
+            self._sessions.clear()
+        self._sessions[header] = (session, time.monotonic() + API_AUTH_CACHE_S, version)
+        return session
+    
+    # --- Разбор параметров ---
+    
+    @staticmethod
+    def _parse_date(value):
+        """Дата запроса (ГГГГ-ММ-ДД или ДД.ММ.ГГГГ) в формате БД"""
+        for fmt in (DB_DATE_FORMAT, DATE_FORMAT):
+            try:
+                return datetime.strptime(value, fmt).strftime(DB_DATE_FORMAT)
+            except (TypeError, ValueError):
+                continue
+        raise ApiError(400, f"Неверная дата: {value}")
+    
+    def _period(self, query):
+        """Период запроса from/to в формате БД (по умолчанию - сегодня)"""
+        today = datetime.now().strftime(DB_DATE_FORMAT)
+        date_from = self._parse_date(query['from']) if query.get('from') else None
+        date_to = self._parse_date(query['to']) if query.get('to') else None
+        return date_from or date_to or today, date_to or date_from or today
+    
+    def _sale_model(self, session, shop, action):
+        """Модель продаж магазина, если он есть и доступен пользователю"""
+        model = self.sale_models.get(shop)
+        if model is None:
+            raise ApiError(404, f"Нет магазина: {shop}")
+        session.require(session.can_view_shop(shop), action)
+        return model
+    
+    def _parse_rows(self, request, fields, required):
+        """Строки тела POST (объект или список объектов) в формате моделей"""
+        try:
+            data = json.loads(request['body'] or b'null')
+        except ValueError:
+            raise ApiError(400, "Тело запроса - не JSON")
+        
+        rows = data if isinstance(data, list) else [data]
+        if not rows or not all(isinstance(row, dict) for row in rows):
+            raise ApiError(400, "Ожидается объект или список объектов")
+        if len(rows) > API_MAX_BATCH:
+            raise ApiError(413, f"Больше {API_MAX_BATCH} строк в одном запросе")
+        
+        result = []
+        for number, row in enumerate(rows, 1):
+            missing = [field for field in required if row.get(field) in (None, '')]
+            if missing:
+                raise ApiError(400, f"Строка {number}: не заполнено {', '.join(missing)}")
+            
+            clean = {field: row[field] for field in fields if row.get(field) not in (None, '')}
+            for field in NUMBER_FIELDS:
+                if field in clean:
+                    try:
+                        clean[field] = float(clean[field])
+                    except (TypeError, ValueError):
+                        raise ApiError(400, f"Строка {number}: {field} - не число")
+            # Модели принимают дату в формате отображения (без даты - сегодня)
+            clean['date'] = self.expense_model.format_date_for_display(
+                self._parse_date(clean['date']) if 'date' in clean else None
+            )
+            clean['uuid'] = str(clean.get('uuid') or uuid.uuid4().hex)
+            result.append(clean)
+        return result
+    
+    # --- Кэширование ---
+    
+    def _etag(self):
+        """ETag ответа: номер последнего изменения в БД (адрес с параметрами различает сами данные)"""
+        row = self.expense_model._execute_query(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'changes'", fetchone=True
+        )
+        seq = row["seq"] if row else 0
+        if seq != self._seq:
+            # БД изменилась: другая программа могла перенести закрытый год в раздел
+            self._seq = seq
+            self.expense_model.reload_meta()
+        return f'"{seq}"'
+    
+    @staticmethod
+    def _not_modified(request, etag):
+        """Данные у клиента не устарели (If-None-Match совпал с ETag)"""
+        tags = [tag.strip() for tag in request['headers'].get('if-none-match', '').split(',')]
+        return etag in tags or '*' in tags
+    
+    def _cached_get(self, request, etag, build):
+        """Ответ GET с ETag: 304 без выборки, если у клиента актуальные данные"""
+        if self._not_modified(request, etag):
+            return 304, None, {'ETag': etag}
+        return 200, build(), {'ETag': etag}
+    
+    # --- Запись ---
+    
+    @staticmethod
+    def _add_rows(model, rows):
+        """Записать строки одной транзакцией, пропустив уже записанные uuid"""
+        existing = model.get_ids_by_uuid(row['uuid'] for row in rows)
+        new_rows = [row for row in rows if row['uuid'] not in existing]
+        try:
+            model.add_many(new_rows)
+        except sqlite3.IntegrityError:
+            # Тот же uuid пишет параллельный запрос (или повторяется внутри пакета)
+            raise ApiError(409, "Строки с этими uuid уже записываются")
+        
+        ids = model.get_ids_by_uuid(row['uuid'] for row in rows)
+        return 201, {
+            'added': len(new_rows),
+            'skipped': len(rows) - len(new_rows),
+            'rows': [{'uuid': row['uuid'], 'id': ids.get(row['uuid'])} for row in rows]
+        }, None
+    
+    # --- Обработчики ---
+    
+    def _list_shops(self, session, request):
+        """Магазины, продажи которых видит пользователь"""
+        return 200, {'shops': [shop for shop in self.sale_models if session.can_view_shop(shop)]}, None
+    
+    def _list_sales(self, session, request):
+        """Продажи магазина за период"""
+        shop = request['query'].get('shop')
+        model = self._sale_model(session, shop, f"просмотр продаж {shop}")
+        date_from, date_to = self._period(request['query'])
+        return self._cached_get(request, self._etag(), lambda: {
+            'shop': shop, 'from': date_from, 'to': date_to,
+            'records': model.get_all(date_from, date_to)
+        })
+    
+    def _sales_totals(self, session, request):
+        """Сумма продаж магазина и итоги по дням"""
+        shop = request['query'].get('shop')
+        model = self._sale_model(session, shop, f"просмотр продаж {shop}")
+        date_from, date_to = self._period(request['query'])
+        return self._cached_get(request, self._etag(), lambda: {
+            'shop': shop, 'from': date_from, 'to': date_to,
+            'total': model.get_total_sum(date_from, date_to),
+            'days': model.get_daily_totals(date_from, date_to)
+        })
+    
+    def _add_sales(self, session, request):
+        """Добавить продажи магазина (объект или список)"""
+        shop = request['query'].get('shop')
+        model = self.sale_models.get(shop)
+        if model is None:
+            raise ApiError(404, f"Нет магазина: {shop}")
+        session.require(session.can_add_sale(shop), f"добавление продаж {shop}")
+        return self._add_rows(model, self._parse_rows(request, SALE_FIELDS, SALE_REQUIRED))
+    
+    def _list_expenses(self, session, request):
+        """Расходы за период (по всем магазинам или одному)"""
+        session.require(session.can_view_expenses(), "просмотр расходов")
+        shop = request['query'].get('shop')
+        date_from, date_to = self._period(request['query'])
+        return self._cached_get(request, self._etag(), lambda: {
+            'shop': shop, 'from': date_from, 'to': date_to,
+            'records': self.expense_model.get_all(date_from, date_to, shop)
+        })
+    
+    def _expense_totals(self, session, request):
+        """Сумма расходов, итоги по дням и по магазинам"""
+        session.require(session.can_view_expenses(), "просмотр расходов")
+        shop = request['query'].get('shop')
+        date_from, date_to = self._period(request['query'])
+        return self._cached_get(request, self._etag(), lambda: {
+            'shop': shop, 'from': date_from, 'to': date_to,
+            'total': self.expense_model.get_total_sum(date_from, date_to, shop),
+            'days': self.expense_model.get_daily_totals(date_from, date_to, shop),
+            'shops': self.expense_model.get_shop_totals(date_from, date_to)
+        })
+    
+    def _add_expenses(self, session, request):
+        """Добавить расходы (объект или список)"""
+        session.require(session.can_edit(), "добавление расходов")
+        return self._add_rows(self.expense_model, self._parse_rows(request, EXPENSE_FIELDS, EXPENSE_REQUIRED))
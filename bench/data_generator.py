@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+"""
+Генератор синтетических данных для замеров производительности
+
+Заполняет БД, совместимую с finance.db (таблицы создаются самими моделями),
+детерминированно: одинаковые параметры и seed дают одинаковые данные.
+"""
+
+import json
+import random
+import sqlite3
+import time
+import uuid
+from datetime import date, timedelta
+
+
+# Ассортимент: (товар, базовая цена). Популярность убывает по закону Ципфа
+ITEMS = [
+    ("Хлеб", 35), ("Молоко", 80), ("Кефир", 75), ("Яйца", 120), ("Сахар", 90),
+    ("Масло", 210), ("Сыр", 450), ("Колбаса", 520), ("Чай", 160), ("Кофе", 640),
+    ("Рис", 110), ("Гречка", 130), ("Мука", 70), ("Макароны", 85), ("Соль", 25),
+    ("Вода", 40), ("Сок", 150), ("Печенье", 95), ("Конфеты", 380), ("Шоколад", 140),
+    ("Мыло", 60), ("Шампунь", 280), ("Порошок", 350), ("Салфетки", 45), ("Спички", 10),
+]
+
+SELLERS_PER_SHOP = 4
+
+EXPENSE_ITEMS = [("Аренда", 15000), ("Электричество", 2500), ("Транспорт", 800), ("Упаковка", 300), ("Прочее", 500)]
+
+PRESETS = {
+    'small': 10_000,
+    'medium': 1_000_000,
+    'large': 10_000_000,
+}
+
+
+def _zipf_weights(n, s=1.1):
+    """Веса популярности по закону Ципфа"""
+    return [1 / (rank ** s) for rank in range(1, n + 1)]
+
+
+def generate(db_path, rows, shops=None, days=365, seed=42, start=date(2023, 1, 1), chunk_size=50_000):
+    """Заполнить БД продажами (rows строк на все магазины) и расходами"""
+    import config
+    config.DB_PATH = db_path
+    
+    # Схема создается моделями, чтобы совпадать с рабочей БД
+    from models.sale_model import SaleModel
+    from models.expense_model import ExpenseModel
+    
+    shops = shops or config.SHOPS
+    sale_models = [SaleModel(shop) for shop in shops]
+    ExpenseModel()
+    
+    rng = random.Random(seed)
+    item_weights = _zipf_weights(len(ITEMS))
+    seller_weights = _zipf_weights(SELLERS_PER_SHOP, 0.7)
+    origin = sale_models[0].node_id
+    per_shop_day = max(1, rows // (len(shops) * days))
+    
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("PRAGMA synchronous = OFF")
+    started = time.perf_counter()
+    inserted = 0
+    
+    try:
+        for model in sale_models:
+            sellers = [model.sellers.id_for(f"{model.shop_name}-продавец-{i + 1}") for i in range(SELLERS_PER_SHOP)]
+            batch = []
+            for day_index in range(days):
+                day = (start + timedelta(days=day_index)).strftime("%Y-%m-%d")
+                # Объем продаж колеблется от дня к дню
+                count = max(1, int(per_shop_day * rng.uniform(0.7, 1.3)))
+                for _ in range(count):
+                    item, base_price = rng.choices(ITEMS, item_weights)[0]
+                    item_id = model.items.id_for(item)
+                    price = round(base_price * rng.uniform(0.9, 1.1), 2)
+                    quantity = rng.choices((1, 2, 3, 5, 10), (60, 20, 10, 7, 3))[0]
+                    batch.append((
+                        day, model.shop_name, rng.choices(sellers, seller_weights)[0], item_id,
+                        quantity, price, quantity * price,
+                        uuid.UUID(int=rng.getrandbits(128)).hex, origin, 0
+                    ))
+                    if len(batch) >= chunk_size:
+                        inserted += _insert_sales(conn, model.table_name, batch)
+                        batch = []
+            inserted += _insert_sales(conn, model.table_name, batch)
+        
+        expenses = []
+        for day_index in range(days):
+            day = (start + timedelta(days=day_index)).strftime("%Y-%m-%d")
+            for shop in shops:
+                if rng.random() < 0.3:
+                    item, amount = rng.choice(EXPENSE_ITEMS)
+                    expenses.append((
+                        day, shop, item, "", round(amount * rng.uniform(0.8, 1.2), 2),
+                        uuid.UUID(int=rng.getrandbits(128)).hex, origin, 0
+                    ))
+        conn.executemany(
+            "INSERT INTO expenses (date, shop, item, descr, amount, uuid, origin, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            expenses
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    
+    return {
+        'rows': inserted,
+        'expenses': len(expenses),
+        'shops': list(shops),
+        'days': days,
+        'seed': seed,
+        'start': start.strftime("%Y-%m-%d"),
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+
+
+def _insert_sales(conn, table_name, batch):
+    """Вставить пачку строк продаж одной транзакцией"""
+    if not batch:
+        return 0
+    conn.executemany(
+        f"INSERT INTO {table_name} (date, shop, seller_id, item_id, quantity, price, total, uuid, origin, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        batch
+    )
+    conn.commit()
+    return len(batch)
+
+
+def ensure_database(data_dir, size, shops=None, days=365, seed=42):
+    """Создать БД нужного размера или переиспользовать готовую с теми же параметрами"""
+    rows = PRESETS.get(size) or int(size)
+    db_path = data_dir / f"bench_{size}.db"
+    meta_path = data_dir / f"bench_{size}.json"
+    params = {'rows': rows, 'shops': shops, 'days': days, 'seed': seed}
+    
+    if db_path.exists() and meta_path.exists():
+        meta = json.loads(meta_path.read_text(encoding='utf-8'))
+        if meta.get('params') == params:
+            return db_path, meta
+    
+    data_dir.mkdir(parents=True, exist_ok=True)
+    if db_path.exists():
+        db_path.unlink()
+    
+    info = generate(db_path, rows, shops, days, seed)
+    meta = {'params': params, 'info': info}
+    meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding='utf-8')
+    return db_path, meta
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Замеры производительности основных операций
+
+Примеры:
+    python bench/run_bench.py --size small --output bench_small.json
+    python bench/run_bench.py --size small medium --output new.json
+    python bench/run_bench.py --compare old.json new.json --threshold 0.2
+
+Замеры интерфейса (MainView._load_initial_data, display_records) требуют
+дисплея; на сервере запускайте под виртуальным дисплеем:
+    xvfb-run python bench/run_bench.py --size small
+Без дисплея эти замеры помечаются как пропущенные.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(ROOT_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+from data_generator import ensure_database
+
+
+def measure(func, repeat=5, warmup=1):
+    """Время выполнения функции в миллисекундах (несколько повторов)"""
+    for _ in range(warmup):
+        func()
+    
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'runs': repeat,
+    }
+
+
+def run_size(size, data_dir, repeat):
+    """Замеры на одной БД (вызывается в отдельном процессе)"""
+    db_path, meta = ensure_database(data_dir, size)
+    
+    import config
+    config.DB_PATH = db_path
+    
+    from models.sale_model import SaleModel
+    from models.expense_model import ExpenseModel
+    from models.settings_model import get_settings
+    from controllers.sales_controller import SalesController
+    
+    shop = get_settings().get_shops()[0]
+    model = SaleModel(shop['name'], shop['table_suffix'])
+    expense_model = ExpenseModel()
+    
+    # Типичный день и месяц из середины сгенерированного периода
+    day = "2023-06-15"
+    month_from, month_to = "2023-06-01", "2023-06-30"
+    
+    results = {}
+    results['get_all_day'] = measure(lambda: model.get_all(day, day), repeat)
+    results['get_all_month'] = measure(lambda: model.get_all(month_from, month_to), repeat)
+    results['get_total_sum_day'] = measure(lambda: model.get_total_sum(day, day), repeat)
+    results['get_total_sum_month'] = measure(lambda: model.get_total_sum(month_from, month_to), repeat)
+    results['expense_get_all_day'] = measure(lambda: expense_model.get_all(day, day), repeat)
+    
+    new_ids = []
+    sample = {'date': "15.06.2023", 'seller_name': "bench", 'item': "Хлеб", 'quantity': 1, 'price': 35}
+    results['add'] = measure(lambda: new_ids.append(model.add(sample)), repeat)
+    results['update'] = measure(lambda: model.update(new_ids[-1], {'price': 40}), repeat)
+    for record_id in new_ids:
+        model.delete(record_id)
+    
+    from controllers.prefetcher import prefetcher
+    
+    controller = SalesController(shop['name'], table_suffix=shop['table_suffix'])
+    
+    def load_cold():
+        prefetcher.cache.clear()
+        controller.load_data(day, day)
+    
+    results['sales_controller_load_data'] = measure(load_cold, repeat)
+    results['sales_controller_load_data_cached'] = measure(lambda: controller.load_data(day, day), repeat)
+    
+    results.update(run_gui(day, repeat))
+    
+    return {'meta': meta, 'results': results}
+
+
+def run_gui(day, repeat):
+    """Замеры интерфейса; без дисплея или при ошибке интерфейса - пометка вместо результата"""
+    names = ('main_view_load_initial_data', 'display_records')
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:
+        skipped = {'skipped': f"нет дисплея: {e}"}
+        return {name: skipped for name in names}
+    
+    results = {}
+    try:
+        from views.main_view import MainView
+        
+        root.withdraw()
+        app = MainView(root)
+        root.update()
+        
+        def load_initial():
+            app._load_initial_data()
+            root.update()
+        
+        results['main_view_load_initial_data'] = measure(load_initial, repeat)
+        
+        shop = app.settings.get_shop_names()[0]
+        records = app.sales_controllers[shop].model.get_all(day, day)
+        view = app.get_shop_view(shop)
+        
+        def display():
+            view.display_records(records)
+            root.update()
+        
+        results['display_records'] = measure(display, repeat)
+        results['display_records']['rows'] = len(records)
+    except Exception as e:
+        # Ошибка интерфейса не отменяет замеры моделей и контроллеров
+        failed = {'failed': f"{type(e).__name__}: {e}"}
+        for name in names:
+            results.setdefault(name, failed)
+    finally:
+        try:
+            root.destroy()
+        except Exception:
+            pass
+    return results
+
+
+def compare(old_path, new_path, threshold, min_delta_ms=0.5):
+    """Сравнить два файла результатов; возвращает число регрессий"""
+    old = json.loads(Path(old_path).read_text(encoding='utf-8'))
+    new = json.loads(Path(new_path).read_text(encoding='utf-8'))
+    regressions = 0
+    
+    for size, new_run in new['sizes'].items():
+        old_run = old['sizes'].get(size)
+        if not old_run:
+            print(f"[{size}] нет в {old_path}, пропуск")
+            continue
+        if 'results' not in old_run or 'results' not in new_run:
+            print(f"[{size}] прогон завершился ошибкой, пропуск")
+            continue
+        
+        print(f"[{size}]")
+        for name, new_result in sorted(new_run['results'].items()):
+            old_result = old_run['results'].get(name, {})
+            if 'median_ms' not in new_result or 'median_ms' not in old_result:
+                print(f"  {name:32} пропущено")
+                continue
+            
+            ratio = new_result['median_ms'] / old_result['median_ms'] if old_result['median_ms'] else 1.0
+            delta = new_result['median_ms'] - old_result['median_ms']
+            status = "ok"
+            # Разница в доли миллисекунды - шум измерений, а не регрессия
+            if ratio > 1 + threshold and delta > min_delta_ms:
+                status = "РЕГРЕССИЯ"
+                regressions += 1
+            elif ratio < 1 - threshold:
+                status = "ускорение"
+            
+            print(f"  {name:32} {old_result['median_ms']:10.3f} -> {new_result['median_ms']:10.3f} мс "
+                  f"({ratio:5.2f}x) {status}")
+    
+    return regressions
+
+
+def main():
+    """Точка входа"""
+    parser = argparse.ArgumentParser(description="Замеры производительности")
+    parser.add_argument('--size', nargs='+', default=['small'], help="small, medium, large или число строк")
+    parser.add_argument('--data-dir', default=str(BENCH_DIR / "data"), help="Папка для сгенерированных БД")
+    parser.add_argument('--repeat', type=int, default=5, help="Повторов на замер")
+    parser.add_argument('--output', '-o', help="Файл JSON с результатами")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="Сравнить два файла результатов")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Допустимое замедление (0.2 = 20%%)")
+    parser.add_argument('--min-delta-ms', type=float, default=0.5, help="Минимальная разница, считающаяся регрессией")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.compare:
+        regressions = compare(args.compare[0], args.compare[1], args.threshold, args.min_delta_ms)
+        print(f"Регрессий: {regressions}")
+        return 1 if regressions else 0
+    
+    if args.worker:
+        # Дочерний процесс: одна БД, чистый кэш модулей и соединений
+        result = run_size(args.worker, Path(args.data_dir), args.repeat)
+        print(json.dumps(result, ensure_ascii=False))
+        return 0
+    
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+        },
+        'sizes': {}
+    }
+    
+    failures = 0
+    for size in args.size:
+        process = subprocess.run(
+            [sys.executable, __file__, '--worker', size, '--data-dir', args.data_dir, '--repeat', str(args.repeat)],
+            capture_output=True, text=True, encoding='utf-8', env=dict(os.environ)
+        )
+        lines = process.stdout.strip().splitlines()
+        if process.returncode != 0 or not lines:
+            # Упавший размер отмечается в отчете, остальные замеряются дальше
+            failures += 1
+            error = process.stderr.strip().splitlines()
+            report['sizes'][size] = {'failed': error[-1] if error else f"код выхода {process.returncode}"}
+            print(f"[{size}] ошибка:\n{process.stderr}", file=sys.stderr)
+            continue
+        report['sizes'][size] = json.loads(lines[-1])
+        print(f"[{size}] готово", file=sys.stderr)
+    
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding='utf-8')
+    else:
+        print(text)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,563 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Консольный запуск без графического интерфейса (для cron и скриптов)
+
+Примеры:
+    python cli.py totals --period month
+    python cli.py report --from 01.03.2024 --to 31.03.2024
+    python cli.py items --period month
+    python cli.py snapshot
+    python cli.py yoy --year 2024
+    python cli.py export --output sales.csv
+    python cli.py import --table М1 sales_m1.csv
+    python cli.py backup
+    python cli.py partition
+    python cli.py maintenance
+    python cli.py vacuum
+    python cli.py serve --host 0.0.0.0
+
+Модули моделей и контроллеров импортируются лениво внутри команд,
+tkinter не импортируется вовсе - это держит время запуска в пределах
+нескольких десятков миллисекунд.
+"""
+
+import argparse
+import os
+import sys
+
+# Добавляем путь к корневой папке проекта в sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import config
+
+
+SALES_EXPORT_FIELDS = ['date', 'shop', 'seller_name', 'item', 'quantity', 'price', 'total']
+EXPENSE_EXPORT_FIELDS = ['date', 'shop', 'item', 'descr', 'amount']
+
+
+def _to_db_date(value):
+    """Дата из аргумента (ДД.ММ.ГГГГ или ГГГГ-ММ-ДД) в формат БД"""
+    from datetime import datetime
+    
+    for fmt in (config.DATE_FORMAT, config.DB_DATE_FORMAT):
+        try:
+            return datetime.strptime(value, fmt).strftime(config.DB_DATE_FORMAT)
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"Неверная дата: {value}")
+
+
+def _period_range(period):
+    """Диапазон дат фильтра today/week/month (как в окне программы)
+    
+    Свой расчет вместо ExpenseController.get_date_range: импорт контроллера
+    тянет очередь записи, кэш и поток предзагрузки (~20 мс к запуску).
+    """
+    from datetime import date, timedelta
+    
+    today = date.today()
+    if period == 'week':
+        date_from = today - timedelta(days=today.weekday())
+    elif period == 'month':
+        date_from = today.replace(day=1)
+    else:
+        date_from = today
+    return date_from.strftime(config.DB_DATE_FORMAT), today.strftime(config.DB_DATE_FORMAT)
+
+
+def _resolve_range(args):
+    """Определить диапазон дат из аргументов команды"""
+    if args.period:
+        return _period_range(args.period)
+    
+    if args.date_from or args.date_to:
+        date_from = args.date_from or args.date_to
+        date_to = args.date_to or args.date_from
+        return date_from, date_to
+    
+    from datetime import datetime
+    today = datetime.now().strftime(config.DB_DATE_FORMAT)
+    return today, today
+
+
+def _sales_models():
+    """Модели продаж всех магазинов (список магазинов - из настроек в БД)"""
+    from models.sale_model import SaleModel
+    from models.settings_model import get_settings
+    return [SaleModel(shop['name'], shop['table_suffix']) for shop in get_settings().get_shops()]
+
+
+def cmd_totals(args):
+    """Итоги за период: продажи по магазинам, расходы и прибыль"""
+    from models.expense_model import ExpenseModel
+    
+    date_from, date_to = _resolve_range(args)
+    
+    from models.sale_model import get_shop_totals
+    
+    totals = get_shop_totals(_sales_models(), date_from, date_to)
+    for shop, shop_total in totals.items():
+        print(f"{shop}: {shop_total:.2f}")
+    total_sales = sum(totals.values())
+    
+    expense_total = ExpenseModel().get_total_sum(date_from, date_to)
+    print(f"Всего: {total_sales:.2f}")
+    print(f"Расходы: {expense_total:.2f}")
+    print(f"ИТОГО: {total_sales - expense_total:.2f}")
+    return 0
+
+
+def cmd_report(args):
+    """Отчет по дням за период"""
+    from models.expense_model import ExpenseModel
+    from reports.report_engine import ReportEngine
+    
+    date_from, date_to = _resolve_range(args)
+    
+    sales_models = _sales_models()
+    totals = ReportEngine(sales_models, ExpenseModel(), args.workers).compute(date_from, date_to)
+    days = {}
+    for index, model in enumerate(sales_models):
+        for day, total in totals['sales'][model.shop_name]['days'].items():
+            days.setdefault(day, [0] * (len(sales_models) + 1))[index] = total
+    for day, total in totals['expenses']['days'].items():
+        days.setdefault(day, [0] * (len(sales_models) + 1))[-1] = total
+    
+    header = ["Дата"] + [m.shop_name for m in sales_models] + ["Расходы", "Итого"]
+    print("\t".join(header))
+    
+    grand = [0] * (len(sales_models) + 1)
+    for day in sorted(days):
+        values = days[day]
+        grand = [a + b for a, b in zip(grand, values)]
+        profit = sum(values[:-1]) - values[-1]
+        cells = [f"{v:.2f}" for v in values] + [f"{profit:.2f}"]
+        print("\t".join([day] + cells))
+    
+    profit = sum(grand[:-1]) - grand[-1]
+    print("\t".join(["Всего"] + [f"{v:.2f}" for v in grand] + [f"{profit:.2f}"]))
+    return 0
+
+
+def cmd_items(args):
+    """Продажи по товарам за период (все магазины)"""
+    from models.catalog_model import get_items
+    from models.expense_model import ExpenseModel
+    from reports.report_engine import ReportEngine
+    
+    date_from, date_to = _resolve_range(args)
+    
+    # Справочник товаров общий, поэтому итоги магазинов складываются по item_id
+    sales_models = _sales_models()
+    report = ReportEngine(sales_models, ExpenseModel(), args.workers).compute(date_from, date_to)
+    totals = {}
+    for model in sales_models:
+        for item_id, (quantity, total) in report['sales'][model.shop_name]['items'].items():
+            quantity_sum, total_sum = totals.get(item_id, (0, 0))
+            totals[item_id] = (quantity_sum + quantity, total_sum + total)
+    
+    items = get_items()
+    print("\t".join(["Товар", "Кол-во", "Сумма"]))
+    for item_id, (quantity, total) in sorted(totals.items(), key=lambda pair: -pair[1][1]):
+        print(f"{items.name_for(item_id)}\t{quantity:g}\t{total:.2f}")
+    return 0
+
+
+def cmd_sellers(args):
+    """Итоги продавцов за период (все магазины): продажи, выручка, средний чек, комиссия"""
+    from models.seller_stats_model import get_seller_stats
+    from models.settings_model import get_settings
+    
+    date_from, date_to = _resolve_range(args)
+    percent = get_settings().commission_percent
+    
+    print("\t".join(["Продавец", "Продаж", "Кол-во", "Выручка", "Ср. чек", "Комиссия"]))
+    for row in get_seller_stats().get_totals(_sales_models(), date_from, date_to):
+        print(
+            f"{row['seller_name']}\t{row['sales']}\t{row['quantity']:g}\t{row['revenue']:.2f}\t"
+            f"{row['revenue'] / row['sales']:.2f}\t{row['revenue'] * percent / 100:.2f}"
+        )
+    return 0
+
+
+def _month_ranges(date_from, date_to):
+    """Периоды по календарным месяцам внутри диапазона дат"""
+    from datetime import datetime, timedelta
+    
+    start = datetime.strptime(date_from, config.DB_DATE_FORMAT).date()
+    end = datetime.strptime(date_to, config.DB_DATE_FORMAT).date()
+    ranges = []
+    while start <= end:
+        next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        month_end = min(next_month - timedelta(days=1), end)
+        ranges.append((start.strftime(config.DB_DATE_FORMAT), month_end.strftime(config.DB_DATE_FORMAT)))
+        start = next_month
+    return ranges
+
+
+def cmd_pnl(args):
+    """Прибыль магазинов за период (или по месяцам) с распределением общих расходов"""
+    from models.expense_model import ExpenseModel
+    from reports.pnl_engine import PnlEngine, ALLOCATION_RULES
+    
+    date_from, date_to = _resolve_range(args)
+    periods = _month_ranges(date_from, date_to) if args.by_month else [(date_from, date_to)]
+    engine = PnlEngine(_sales_models(), ExpenseModel())
+    
+    print(f"Общие расходы распределяются {ALLOCATION_RULES[config.PNL_ALLOCATION]}")
+    print("\t".join(["Период", "Магазин", "Выручка", "Свои расходы", "Общие расходы", "Прибыль"]))
+    for period_from, period_to in periods:
+        pnl = engine.compute(period_from, period_to)
+        period = f"{period_from}..{period_to}"
+        for shop, row in pnl['shops'].items():
+            print(
+                f"{period}\t{shop}\t{row['revenue']:.2f}\t{row['direct']:.2f}\t"
+                f"{row['shared']:.2f}\t{row['profit']:.2f}"
+            )
+        print(f"{period}\tИТОГО\t{pnl['revenue']:.2f}\t{pnl['expenses'] - pnl['shared']:.2f}\t"
+              f"{pnl['shared']:.2f}\t{pnl['profit']:.2f}")
+    return 0
+
+
+def cmd_snapshot(args):
+    """Обновить колоночный снимок для аналитики (только измененные месяцы)"""
+    from analytics.snapshot import SnapshotExporter, SNAPSHOT_DIR
+    from models.expense_model import ExpenseModel
+    
+    months = SnapshotExporter(_sales_models() + [ExpenseModel()]).refresh()
+    print(f"Снимок {SNAPSHOT_DIR}: обновлено месяцев: {months}")
+    return 0
+
+
+def cmd_yoy(args):
+    """Выручка и расходы по месяцам года против прошлого года (по колоночному снимку, без чтения БД)"""
+    from datetime import datetime
+    from analytics.snapshot_query import SnapshotQuery
+    
+    query = SnapshotQuery()
+    tables = query.tables()
+    if not tables:
+        print("Снимок пуст: выполните python cli.py snapshot", file=sys.stderr)
+        return 1
+    
+    year = args.year or datetime.now().year
+    date_from, date_to = f"{year - 1}-01-01", f"{year}-12-31"
+    
+    revenue, expense = {}, {}
+    for table_name, shop in tables.items():
+        target, column = (revenue, 'total') if shop is not None else (expense, 'amount')
+        for month, total in query.monthly_totals(table_name, column, date_from, date_to).items():
+            target[month] = target.get(month, 0) + total
+    
+    print("\t".join(["Месяц", f"Выручка {year - 1}", f"Выручка {year}", "Изменение", f"Расходы {year - 1}", f"Расходы {year}"]))
+    for number in range(1, 13):
+        previous, current = f"{year - 1}-{number:02d}", f"{year}-{number:02d}"
+        before, after = revenue.get(previous, 0), revenue.get(current, 0)
+        change = f"{(after - before) / before * 100:+.1f}%" if before else "-"
+        print("\t".join([
+            f"{number:02d}", f"{before:.2f}", f"{after:.2f}", change,
+            f"{expense.get(previous, 0):.2f}", f"{expense.get(current, 0):.2f}"
+        ]))
+    return 0
+
+
+def cmd_export(args):
+    """Экспорт записей в CSV"""
+    import csv
+    from models.expense_model import ExpenseModel
+    
+    date_from, date_to = _resolve_range(args) if (args.period or args.date_from or args.date_to) else (None, None)
+    
+    out = open(args.output, 'w', newline='', encoding='utf-8-sig') if args.output else sys.stdout
+    try:
+        if args.table == 'expenses':
+            writer = csv.DictWriter(out, fieldnames=EXPENSE_EXPORT_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(ExpenseModel().get_all(date_from, date_to))
+        else:
+            writer = csv.DictWriter(out, fieldnames=SALES_EXPORT_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            for model in _sales_models():
+                if args.table in ('sales', model.shop_name):
+                    writer.writerows(model.get_all(date_from, date_to))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+def cmd_import(args):
+    """Импорт записей из CSV одной транзакцией"""
+    import csv
+    
+    from datetime import datetime
+    
+    rows = []
+    errors = []
+    with open(args.file, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            # Модель молча заменила бы непонятную дату сегодняшней - такой файл
+            # не импортируется; принимаются ДД.ММ.ГГГГ (как в export) и ГГГГ-ММ-ДД
+            value = (row.get('date') or '').strip()
+            for fmt in (config.DATE_FORMAT, config.DB_DATE_FORMAT):
+                try:
+                    row['date'] = datetime.strptime(value, fmt).strftime(config.DATE_FORMAT)
+                    break
+                except ValueError:
+                    continue
+            else:
+                errors.append(f"строка {reader.line_num}: неверная дата '{value}'")
+            rows.append(dict(row))
+    
+    if errors:
+        print("Импорт отменен, исправьте файл:", file=sys.stderr)
+        for error in errors:
+            print(f"  {error}", file=sys.stderr)
+        return 2
+    
+    if args.table == 'expenses':
+        from models.expense_model import ExpenseModel
+        model = ExpenseModel()
+        fields = EXPENSE_EXPORT_FIELDS
+    else:
+        model = next((m for m in _sales_models() if m.shop_name == args.table), None)
+        if model is None:
+            print(f"Неизвестная таблица: {args.table}", file=sys.stderr)
+            return 2
+        # Магазин задается таблицей, сумма пересчитывается моделью
+        fields = [f for f in SALES_EXPORT_FIELDS if f not in ('shop', 'total')]
+    
+    data = [{k: row[k] for k in fields if row.get(k) not in (None, '')} for row in rows]
+    count = model.add_many(data)
+    print(f"Импортировано записей: {count}")
+    return 0
+
+
+def cmd_backup(args):
+    """Резервная копия БД через backup API SQLite (безопасно при работающем приложении)"""
+    import sqlite3
+    from datetime import datetime
+    
+    target = args.output
+    if not target:
+        backup_dir = config.BASE_DIR / "backups"
+        backup_dir.mkdir(exist_ok=True)
+        target = backup_dir / f"finance_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
+    
+    source = sqlite3.connect(str(config.DB_PATH))
+    dest = sqlite3.connect(str(target))
+    try:
+        source.backup(dest)
+    finally:
+        dest.close()
+        source.close()
+    
+    print(f"Резервная копия: {target}")
+    return 0
+
+
+def cmd_partition(args):
+    """Перенос закрытых лет в файлы разделов finance_ГГГГ.db"""
+    from models.expense_model import ExpenseModel
+    from models.partitions import YearPartitioner
+    
+    moved = YearPartitioner(_sales_models() + [ExpenseModel()]).close_years()
+    if not moved:
+        print("Закрытых лет для переноса нет")
+        return 0
+    
+    for year, count in sorted(moved.items()):
+        print(f"{year}: перенесено записей {count}")
+    print("Место в рабочей БД освобождает команда vacuum")
+    return 0
+
+
+def cmd_maintenance(args):
+    """Обслуживание БД без ограничения по времени: очистка, статистика, проверка"""
+    from models.maintenance import DatabaseMaintenance, TASK_TITLES
+    
+    maintenance = DatabaseMaintenance(slice_ms=None)
+    tasks = list(TASK_TITLES) if args.all else maintenance.due_tasks()
+    for task in tasks:
+        text = None
+        for text in maintenance.run(task):
+            pass
+        print(f"{TASK_TITLES[task]}: {text or 'нечего делать'}")
+    
+    status = maintenance.status()
+    print(f"Страниц: {status['pages']}, свободных: {status['free_pages']}, "
+          f"инкрементальная очистка: {'да' if status['auto_vacuum'] else 'нет (включается командой vacuum)'}")
+    return 0
+
+
+def cmd_vacuum(args):
+    """Сжатие файла БД (и перевод на инкрементальную очистку свободных страниц)"""
+    import sqlite3
+    
+    conn = sqlite3.connect(str(config.DB_PATH))
+    try:
+        # Режим auto_vacuum существующей БД меняется только полным VACUUM
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    
+    print("VACUUM выполнен")
+    return 0
+
+
+def cmd_user(args):
+    """Пользователи программы: список, добавление, смена пароля, удаление"""
+    from getpass import getpass
+    from models.user_model import get_users, ROLE_TITLES
+    
+    users = get_users()
+    try:
+        if args.action == 'list':
+            for user in users.get_users():
+                print(f"{user['login']}\t{user['name']}\t{ROLE_TITLES.get(user['role'], user['role'])}\t{user['shop'] or ''}")
+        elif args.action == 'add':
+            users.add_user(args.login, getpass("Пароль: "), args.role, name=args.name, shop=args.shop)
+            print(f"Пользователь {args.login} добавлен")
+        elif args.action == 'passwd':
+            if users.get_user(args.login) is None:
+                print(f"Нет пользователя {args.login}", file=sys.stderr)
+                return 2
+            users.set_password(args.login, getpass("Новый пароль: "))
+            print("Пароль изменен")
+        elif args.action == 'delete':
+            users.delete_user(args.login)
+            print(f"Пользователь {args.login} удален")
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    return 0
+
+
+def cmd_serve(args):
+    """HTTP API для ввода продаж и расходов с телефонов (до Ctrl+C)"""
+    import time
+    from api.api_server import ApiServer
+    
+    server = ApiServer(args.host or config.API_HOST, args.port or config.API_PORT)
+    if not server.start():
+        return 1
+    
+    print(f"API: http://{server.host}:{server.port}/api (Ctrl+C - остановить)")
+    try:
+        while server.is_running():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return 0
+
+
+def _add_range_arguments(parser):
+    """Общие аргументы выбора периода"""
+    parser.add_argument('--date', dest='date_from', type=_to_db_date, help="Дата (ДД.ММ.ГГГГ)")
+    parser.add_argument('--from', dest='date_from', type=_to_db_date, help="Начало периода")
+    parser.add_argument('--to', dest='date_to', type=_to_db_date, help="Конец периода")
+    parser.add_argument('--period', choices=['today', 'week', 'month'], help="Готовый период")
+
+
+def build_parser():
+    """Создание парсера аргументов"""
+    parser = argparse.ArgumentParser(description="Учет продаж и расходов (консольный режим)")
+    parser.add_argument('--db', help="Путь к файлу БД (по умолчанию finance.db)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    totals = subparsers.add_parser('totals', help="Итоги за период")
+    _add_range_arguments(totals)
+    totals.set_defaults(func=cmd_totals)
+    
+    report = subparsers.add_parser('report', help="Отчет по дням")
+    _add_range_arguments(report)
+    report.add_argument('--workers', type=int, help="Процессов расчета (по умолчанию по числу ядер)")
+    report.set_defaults(func=cmd_report)
+    
+    items = subparsers.add_parser('items', help="Продажи по товарам")
+    _add_range_arguments(items)
+    items.add_argument('--workers', type=int, help="Процессов расчета (по умолчанию по числу ядер)")
+    items.set_defaults(func=cmd_items)
+    
+    sellers = subparsers.add_parser('sellers', help="Итоги продавцов и комиссия")
+    _add_range_arguments(sellers)
+    sellers.set_defaults(func=cmd_sellers)
+    
+    pnl = subparsers.add_parser('pnl', help="Прибыль магазинов с долей общих расходов")
+    _add_range_arguments(pnl)
+    pnl.add_argument('--by-month', action='store_true', help="Отдельно по каждому месяцу периода")
+    pnl.set_defaults(func=cmd_pnl)
+    
+    snapshot = subparsers.add_parser('snapshot', help="Обновить колоночный снимок для аналитики")
+    snapshot.set_defaults(func=cmd_snapshot)
+    
+    yoy = subparsers.add_parser('yoy', help="Год к году по месяцам (по снимку)")
+    yoy.add_argument('--year', type=int, help="Год (по умолчанию текущий)")
+    yoy.set_defaults(func=cmd_yoy)
+    
+    export = subparsers.add_parser('export', help="Экспорт в CSV")
+    _add_range_arguments(export)
+    export.add_argument('--table', default='sales', help="sales, expenses или название магазина")
+    export.add_argument('--output', '-o', help="Файл CSV (по умолчанию stdout)")
+    export.set_defaults(func=cmd_export)
+    
+    import_ = subparsers.add_parser('import', help="Импорт из CSV")
+    import_.add_argument('--table', required=True, help="expenses или название магазина")
+    import_.add_argument('file', help="Файл CSV")
+    import_.set_defaults(func=cmd_import)
+    
+    backup = subparsers.add_parser('backup', help="Резервная копия БД")
+    backup.add_argument('--output', '-o', help="Файл копии")
+    backup.set_defaults(func=cmd_backup)
+    
+    partition = subparsers.add_parser('partition', help="Перенести закрытые годы в файлы разделов")
+    partition.set_defaults(func=cmd_partition)
+    
+    maintenance = subparsers.add_parser('maintenance', help="Обслуживание БД: очистка, статистика, проверка")
+    maintenance.add_argument('--all', action='store_true', help="Все задачи, даже если их срок не подошел")
+    maintenance.set_defaults(func=cmd_maintenance)
+    
+    user = subparsers.add_parser('user', help="Пользователи и роли")
+    user.add_argument('action', choices=['list', 'add', 'passwd', 'delete'])
+    user.add_argument('login', nargs='?', help="Логин (кроме list)")
+    user.add_argument('--name', help="Имя для заголовка окна")
+    user.add_argument('--role', choices=['manager', 'cashier'], default='cashier', help="Роль (по умолчанию кассир)")
+    user.add_argument('--shop', help="Магазин кассира")
+    user.set_defaults(func=cmd_user)
+    
+    vacuum = subparsers.add_parser('vacuum', help="Сжатие БД")
+    vacuum.set_defaults(func=cmd_vacuum)
+    
+    serve = subparsers.add_parser('serve', help="HTTP API для ввода с телефонов")
+    serve.add_argument('--host', help=f"Адрес (по умолчанию {config.API_HOST}; 0.0.0.0 - вся локальная сеть)")
+    serve.add_argument('--port', type=int, help=f"Порт (по умолчанию {config.API_PORT})")
+    serve.set_defaults(func=cmd_serve)
+    
+    return parser
+
+
+def main(argv=None):
+    """Точка входа консольного режима"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    
+    # Все действия с пользователями, кроме списка, требуют логина
+    if args.command == 'user' and args.action != 'list' and not args.login:
+        parser.error("нужен логин")
+    
+    # Путь к БД подменяется до первого импорта моделей
+    if args.db:
+        from pathlib import Path
+        config.DB_PATH = Path(args.db)
+    
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,13 +11,108 @@ from pathlib import Path
 BASE_DIR = Path(__file__).parent
 DB_PATH = BASE_DIR / "finance.db"
 
+# Одновременная работа нескольких программ (касс) с одной БД
+DB_JOURNAL_MODE = "WAL"  # Читатели не ждут писателя; для БД в сетевой папке - "DELETE" (WAL там не работает)
+DB_BUSY_TIMEOUT_MS = 5000  # Сколько соединение ждет, пока другая программа допишет свою транзакцию
+DB_BUSY_RETRIES = 4  # Повторов запроса, если БД все еще занята
+DB_BUSY_BACKOFF_MS = 100  # Пауза перед первым повтором (дальше удваивается)
+
 # Настройки таблиц
 DATE_FORMAT = "%d.%m.%Y"
 DB_DATE_FORMAT = "%Y-%m-%d"
 
-# Магазины
+# Магазины по умолчанию (при первом запуске заносятся в настройки БД,
+# дальше список меняется в окне "Настройки")
 SHOPS = ["М1", "М2"]
 
+# Валюта по умолчанию (меняется в окне "Настройки")
+DEFAULT_CURRENCY = "сом."
+
+# Профилирование запросов (окно диагностики: Ctrl+Shift+D)
+PROFILER_SLOW_MS = 50  # Порог медленного запроса, для него снимается EXPLAIN QUERY PLAN
+PROFILER_LOG_PATH = BASE_DIR / "query_profile.json"
+
+# Предзагрузка соседних дней
+PREFETCH_CACHE_SIZE = 32  # Сколько результатов выборок (период + фильтр) держать в памяти
+
+# Удаление записей и отмена действий (Ctrl+Z / Ctrl+Y)
+UNDO_LIMIT = 100  # Сколько действий каждой вкладки можно отменить
+DELETED_KEEP_HOURS = 24  # Сколько хранятся удаленные записи, прежде чем очистка уберет их из БД
+PURGE_INTERVAL_MS = 60 * 60 * 1000  # Как часто запускается очистка удаленных записей
+
+# Отложенная запись новых строк (ввод не ждет диска)
+WRITE_BEHIND_DELAY_MS = 300  # Через сколько после первой новой строки пачка пишется в БД
+WRITE_BEHIND_MAX_ROWS = 20  # Сколько строк накопить, чтобы записать пачку сразу
+
+# Обновление окна, когда в ту же БД пишет другая программа или окно
+CHANGE_WATCH_INTERVAL_MS = 1000  # Как часто проверяется PRAGMA data_version (пока БД не менялась - почти даром)
+CHANGE_WATCH_MAX_ROWS = 200  # Больше измененных строк в периоде вкладки - она перечитывается целиком
+
+# Колоночный снимок для аналитики (файлы рядом с БД: finance.db-snapshot/)
+SNAPSHOT_INTERVAL_MS = 15 * 60 * 1000  # Как часто приложение дописывает в снимок изменения
+
+# Разделы по годам: закрытые годы продаж и расходов переносятся в finance_ГГГГ.db
+PARTITION_CLOSE_AFTER_DAYS = 60  # Сколько дней после конца года в нем еще правят записи (год не переносится)
+PARTITION_INTERVAL_MS = 24 * 60 * 60 * 1000  # Как часто приложение проверяет, не пора ли перенести год
+
+# Обслуживание БД в паузах ввода (очистка свободных страниц, ANALYZE, quick_check)
+MAINTENANCE_IDLE_MS = 30 * 1000  # Сколько без нажатий и кликов считается паузой
+MAINTENANCE_TICK_MS = 5 * 1000  # Как часто проверяется, не началась ли пауза
+MAINTENANCE_SLICE_MS = 50  # Предел одной порции работы (запрос прерывается)
+MAINTENANCE_MAX_SLICE_MS = 800  # Предел порции для большой таблицы после повторов (удвоением от SLICE_MS)
+MAINTENANCE_VACUUM_PAGES = 256  # Страниц, возвращаемых ОС за одну порцию incremental_vacuum
+MAINTENANCE_ANALYSIS_LIMIT = 1000  # Строк индекса, которые ANALYZE просматривает для статистики
+MAINTENANCE_ANALYZE_HOURS = 24  # Как часто обновляется статистика планировщика
+MAINTENANCE_CHECK_HOURS = 7 * 24  # Как часто проверяется целостность файла
+
+# Архив прошлых лет (Файл -> Открыть архив: отдельное окно только для чтения)
+READ_ONLY = False  # Включается запуском main.py --archive <файл БД>
+ARCHIVE_MMAP_SIZE = 4 * 1024 ** 3  # Сколько байт архива читать через mmap (SQLite ограничит своим максимумом)
+ARCHIVE_READERS = 4  # Потоков предзагрузки, читающих архив параллельно
+
+# Пользователи и роли (пока в БД нет пользователей, вход не требуется)
+USER_PASSWORD_ITERATIONS = 200000  # Итераций PBKDF2 при хранении паролей
+
+# Склад
+LOW_STOCK_THRESHOLD = 5  # Остаток, при котором товар подсвечивается на вкладке продаж
+
+# Продавцы
+SELLER_COMMISSION_PERCENT = 0.0  # Комиссия продавца, % выручки (меняется в окне "Настройки")
+LEADERBOARD_SIZE = 5  # Сколько продавцов показывать в рейтинге вкладки продаж
+
+# Прибыль магазинов: общие расходы (магазин SHARED_EXPENSE_SHOP или любой не из списка
+# магазинов) делятся между магазинами по правилу PNL_ALLOCATION:
+# "revenue" - пропорционально выручке периода, "fixed" - по долям PNL_FIXED_SHARES
+SHARED_EXPENSE_SHOP = "Общие"
+PNL_ALLOCATION = "revenue"
+PNL_FIXED_SHARES = {}  # {магазин: доля}, например {"М1": 0.6, "М2": 0.4}; пусто - поровну
+
+# Синхронизация между компьютерами магазинов
+SYNC_DIR = BASE_DIR / "sync_exchange"  # Общая (например, сетевая) папка обмена
+SYNC_BATCH_SIZE = 500  # Изменений в одном пакете
+SYNC_JOURNAL_KEEP_DAYS = 90  # Сколько хранятся отправленные записи журнала changes (и отметки удалений)
+
+# HTTP API для быстрого ввода с телефонов (python cli.py serve или вместе с программой)
+API_ENABLED = False  # Запускать API вместе с окном программы
+API_HOST = "127.0.0.1"  # "0.0.0.0" - доступ из локальной сети (сначала заведите пользователей)
+API_PORT = 8765
+API_WORKERS = 4  # Потоков, выполняющих запросы к БД (и соединений в пуле)
+API_KEEPALIVE_S = 15  # Сколько держать открытым соединение без запросов
+API_MAX_BODY = 1024 * 1024  # Наибольший размер тела запроса, байт
+API_MAX_BATCH = 500  # Наибольшее число строк в одном POST
+API_AUTH_CACHE_S = 300  # Сколько помнить проверенный пароль (хэш PBKDF2 дорог для каждого запроса; изменение пользователей сбрасывает)
+
+# Печатные отчеты (PDF/HTML)
+REPORT_FETCH_SIZE = 500  # Строк, читаемых из БД за один запрос
+REPORT_WORKERS = None  # Процессов расчета итогов отчета (None - по числу ядер)
+REPORT_PARALLEL_MIN_PARTS = 8  # Частей (магазин x месяц), начиная с которых расчет идет в процессах
+REPORT_FONT_PATHS = [  # TrueType-шрифт с кириллицей для PDF (берется первый найденный)
+    "C:/Windows/Fonts/arial.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/Library/Fonts/Arial Unicode.ttf"
+]
+
 # Цвета
 COLORS = {
     'bg': '#f0f0f0',
@@ -27,7 +122,15 @@ COLORS = {
     'profit_negative': '#ff0000',
     'header_bg': '#e1e1e1',
     'table_bg': '#ffffff',
-    'table_alternate': '#f5f5f5'
+    'table_alternate': '#f5f5f5',
+    'calendar_sales': '#2e7d32',
+    'calendar_expense': '#c62828',
+    'chart_revenue': '#2e7d32',
+    'chart_expense': '#c62828',
+    'chart_profit': '#1565c0',
+    'chart_grid': '#e0e0e0',
+    'low_stock': '#c62828',
+    'pending': '#808080'
 }
 
 # Настройки таблицы
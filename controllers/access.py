@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+"""
+Текущий пользователь программы и проверка его прав
+"""
+
+from models.user_model import ROLE_MANAGER, ROLE_TITLES
+
+
+class Session:
+    """Вошедший пользователь и его права
+    
+    Пока в БД нет пользователей (и в архиве, и в консольном режиме),
+    вход не требуется и все действия доступны, как управляющему.
+    Контроллеры проверяют права через require(): запрещенное действие
+    заканчивается PermissionError до обращения к модели.
+    """
+    
+    def __init__(self):
+        self.user = None  # {'login', 'name', 'role', 'shop'} после входа
+    
+    def login(self, user):
+        """Начать работу пользователя (результат UserModel.authenticate)"""
+        self.user = dict(user)
+    
+    def logout(self):
+        """Завершить работу пользователя"""
+        self.user = None
+    
+    @property
+    def is_manager(self):
+        """Управляющий (или программа без пользователей)"""
+        return self.user is None or self.user['role'] == ROLE_MANAGER
+    
+    @property
+    def title(self):
+        """Имя и роль для заголовка окна (пустая строка без входа)"""
+        if self.user is None:
+            return ""
+        return f"{self.user['name']} ({ROLE_TITLES.get(self.user['role'], self.user['role'])})"
+    
+    def can_view_shop(self, shop):
+        """Видит ли пользователь продажи магазина (кассир - только своего)"""
+        return self.is_manager or self.user['shop'] == shop
+    
+    def can_add_sale(self, shop):
+        """Может ли пользователь добавлять продажи магазина"""
+        return self.can_view_shop(shop)
+    
+    def can_view_expenses(self):
+        """Видит ли пользователь расходы, отчеты и склад"""
+        return self.is_manager
+    
+    def can_edit(self):
+        """Может ли пользователь править и удалять записи, расходы, склад и настройки"""
+        return self.is_manager
+    
+    def require(self, allowed, action):
+        """Запретить действие, если прав нет"""
+        if not allowed:
+            who = self.user['login'] if self.user else ""
+            raise PermissionError(f"Нет прав ({who}): {action}")
+
+
+# Общий экземпляр процесса
+session = Session()
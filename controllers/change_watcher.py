@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+"""
+Уведомления об изменениях БД, сделанных другими программами и окнами
+"""
+
+import sqlite3
+import time
+from config import CHANGE_WATCH_INTERVAL_MS
+from models.base_model import BaseModel
+from controllers.event_bus import EventBus, DATA_CHANGED
+
+
+class ChangeWatcher:
+    """Сообщает, какие таблицы и даты изменил кто-то другой
+    
+    Раз в CHANGE_WATCH_INTERVAL_MS читается PRAGMA data_version своего
+    постоянного соединения: число меняется, только если БД записало другое
+    соединение, а сама проверка не читает ни одной таблицы. Новая версия -
+    повод прочитать строки журнала changes после последнего прочитанного seq
+    и разослать событие DATA_CHANGED с
+    tables = {таблица: {'dates': даты изменений, 'rows': {uuid: последняя операция}}}
+    (и 'partitioned': True, если другая программа перенесла закрытый год в раздел).
+    Записи потока окна (их метки updated_at запоминает BaseModel._stamp)
+    пропускаются: окно уже показало их само.
+    """
+    
+    def __init__(self, model, events=None, interval_ms=CHANGE_WATCH_INTERVAL_MS):
+        self.model = model  # Любая модель рабочей БД - для соединения
+        self.events = events or EventBus()
+        self.interval_ms = interval_ms
+        self._scheduler = None
+        self._conn = None
+        self._version = None
+        self._last_seq = 0
+        self._own_stamps = set()
+    
+    def start(self, scheduler):
+        """Начать проверки (scheduler - функция (задержка в мс, функция), например root.after)
+        
+        Вызывается из потока окна: запоминаются метки изменений именно этого потока.
+        """
+        self._scheduler = scheduler
+        self._own_stamps = BaseModel.track_own_stamps()
+        self._conn = self.model._connect()
+        self.skip()
+        self._scheduler(self.interval_ms, self._tick)
+    
+    def skip(self):
+        """Считать все сделанные до сих пор изменения уже показанными (например, после полной перезагрузки)"""
+        self._version = self._data_version()
+        row = self._conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+        self._last_seq = row[0] if row else 0
+        self._own_stamps.clear()
+    
+    def _data_version(self):
+        """Версия данных БД глазами этого соединения"""
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+    
+    def _tick(self):
+        """Одна проверка; следующая - через interval_ms"""
+        try:
+            tables = self.poll()
+        except sqlite3.Error as e:
+            # Например, БД занята перестройкой - проверка повторится
+            print(f"Ошибка проверки изменений БД: {e}")
+            tables = {}
+        
+        if tables:
+            self.events.emit(DATA_CHANGED, self, tables=tables)
+        self._scheduler(self.interval_ms, self._tick)
+    
+    def poll(self):
+        """Изменения других программ и окон с прошлой проверки: {таблица: {'dates', 'rows'}}"""
+        version = self._data_version()
+        if version == self._version:
+            return {}
+        self._version = version
+        
+        rows = self._conn.execute(
+            "SELECT seq, table_name, row_uuid, op, ts, date, prev_date FROM changes WHERE seq > ? ORDER BY seq",
+            (self._last_seq,)
+        ).fetchall()
+        
+        tables = {}
+        for seq, table_name, row_uuid, op, ts, date, prev_date in rows:
+            self._last_seq = seq
+            if ts in self._own_stamps:
+                continue
+            
+            change = tables.setdefault(table_name, {'dates': set(), 'rows': {}})
+            if op == 'partition':
+                # Строки закрытого года перенесены в раздел - список разделов читается заново
+                self.model.reload_meta()
+                change['partitioned'] = True
+            change['dates'].update(value for value in (date, prev_date) if value)
+            if row_uuid:
+                change['rows'][row_uuid] = op
+        
+        # Метки записей, не дошедших до журнала (ошибка записи), забываются через минуту
+        stale = time.time() - 60
+        self._own_stamps.difference_update([stamp for stamp in self._own_stamps if stamp < stale])
+        return tables
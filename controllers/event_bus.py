@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""
+Шина событий между контроллерами и представлениями
+"""
+
+
+# События контроллеров
+RECORDS_CHANGED = 'records_changed'  # Полный набор записей за период: records
+TOTALS_CHANGED = 'totals_changed'  # Итог за период: total
+ROW_ADDED = 'row_added'  # Добавлена одна запись: record
+ROW_CHANGED = 'row_changed'  # Изменена или удалена одна запись: record_id, record (None - убрать строку)
+ROW_CONFIRMED = 'row_confirmed'  # Ожидающая строка записана в БД: pending_id, record
+DATA_CHANGED = 'data_changed'  # БД записала другая программа или окно: tables
+
+# Полная перезагрузка записей делает ненужными накопленные изменения строк
+SUPERSEDES = {
+    RECORDS_CHANGED: (ROW_ADDED, ROW_CHANGED, ROW_CONFIRMED)
+}
+
+
+class Event:
+    """Событие, доставляемое подписчику (все накопленные данные за цикл)"""
+    
+    def __init__(self, name, source, payloads):
+        self.name = name
+        self.source = source
+        self.payloads = payloads
+    
+    @property
+    def payload(self):
+        """Последние данные события"""
+        return self.payloads[-1]
+
+
+class EventBus:
+    """Шина событий с объединением уведомлений
+    
+    Без планировщика события доставляются сразу (консольный режим, тесты).
+    С планировщиком (например, root.after_idle) события копятся и
+    доставляются один раз за цикл простоя Tk: подписчик получает одно
+    событие на пару (имя, источник) со всеми данными, накопленными за цикл.
+    """
+    
+    def __init__(self, scheduler=None):
+        self._subscribers = {}
+        self._pending = {}
+        self._scheduler = scheduler
+        self._flush_scheduled = False
+    
+    def set_scheduler(self, scheduler):
+        """Установить функцию отложенного вызова (None - доставка сразу)"""
+        self._scheduler = scheduler
+    
+    def subscribe(self, name, callback, source=None):
+        """Подписаться на событие (source=None - от любого источника)"""
+        self._subscribers.setdefault(name, []).append((source, callback))
+    
+    def unsubscribe(self, name, callback):
+        """Отписаться от события"""
+        self._subscribers[name] = [
+            (source, cb) for source, cb in self._subscribers.get(name, []) if cb != callback
+        ]
+    
+    def emit(self, name, source=None, **payload):
+        """Отправить событие"""
+        for superseded in SUPERSEDES.get(name, ()):
+            self._pending.pop((superseded, source), None)
+        
+        self._pending.setdefault((name, source), []).append(payload)
+        
+        if self._scheduler is None:
+            self.flush()
+        elif not self._flush_scheduled:
+            self._flush_scheduled = True
+            self._scheduler(self.flush)
+    
+    def flush(self):
+        """Доставить все накопленные события"""
+        self._flush_scheduled = False
+        pending, self._pending = self._pending, {}
+        
+        for (name, source), payloads in pending.items():
+            event = Event(name, source, payloads)
+            for subscriber_source, callback in list(self._subscribers.get(name, [])):
+                if subscriber_source is None or subscriber_source is source:
+                    callback(event)
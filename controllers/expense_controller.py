@@ -5,83 +5,239 @@
 """
 
 from models.expense_model import ExpenseModel
-from datetime import datetime, timedelta
+from controllers.event_bus import EventBus, RECORDS_CHANGED, TOTALS_CHANGED, ROW_ADDED, ROW_CHANGED, ROW_CONFIRMED
+from controllers.undo_stack import UndoStack
+from controllers.write_behind import WriteBehindQueue
+from controllers.prefetcher import prefetcher, neighbour_ranges
+from controllers.pnl_controller import PNL_SCOPE
+from controllers.access import session
+from config import CHANGE_WATCH_MAX_ROWS
+from datetime import datetime, timedelta, date
+import calendar
 
 
 class ExpenseController:
     """Контроллер для управления расходами"""
     
-    def __init__(self, view):
+    def __init__(self, events=None):
         self.model = ExpenseModel()
-        self.view = view
+        self.events = events or EventBus()
+        self.history = UndoStack()  # Отмена/повтор добавления, правки и удаления
         self.current_date_from = None
         self.current_date_to = None
         self.current_shop_filter = "Все"
+        self._month_cache = {}  # Активность по дням: (год, месяц, магазин) -> {дата: итоги}
+        
+        # Новые строки показываются сразу, а в БД пишутся пачками
+        self.pending = {}  # Строки, еще не записанные в БД: uuid -> запись
+        self.confirmed = {}  # uuid записанной строки -> id в БД
+        self.writes = WriteBehindQueue(self.model, on_flushed=self._on_writes_flushed)
     
     def load_data(self, date_from=None, date_to=None, shop=None):
         """Загрузить данные в представление"""
+        # Ожидающие строки попадают в БД до чтения периода
+        self.flush_writes()
+        
         self.current_date_from = date_from
         self.current_date_to = date_to
         if shop:
             self.current_shop_filter = shop
         
-        # Получаем данные из модели
-        records = self.model.get_all(date_from, date_to, self.current_shop_filter)
+        # Берем предзагруженный результат или читаем из модели
+        key = self._cache_key(date_from, date_to, self.current_shop_filter)
+        cached = prefetcher.cache.get(key)
+        if cached is None:
+            generation = prefetcher.cache.generation(key[0])
+            cached = self._fetch(date_from, date_to, self.current_shop_filter)
+            prefetcher.cache.put(key, cached, generation)
         
-        # Обновляем таблицу в представлении
-        self.view.display_records(records)
+        records = [dict(r) for r in cached['records']]
         
-        # Обновляем итоги
-        self.update_totals()
+        # Сообщаем подписчикам о новом наборе записей и итогах
+        self.events.emit(RECORDS_CHANGED, self, records=records)
+        self.events.emit(TOTALS_CHANGED, self, total=cached['total'])
         
         return records
     
+    def _fetch(self, date_from, date_to, shop):
+        """Прочитать записи и итог за период (может выполняться в фоновом потоке)"""
+        if not session.can_view_expenses():
+            # Расходы видит только управляющий
+            return {'records': [], 'total': 0}
+        
+        return {
+            'records': self.model.get_all(date_from, date_to, shop),
+            'total': self.model.get_total_sum(date_from, date_to, shop if shop != "Все" else None)
+        }
+    
+    def _cache_key(self, date_from, date_to, shop):
+        """Ключ кэша результатов: (таблица, период, фильтр)"""
+        return (self.model.table_name, date_from, date_to, shop)
+    
+    def prefetch_neighbours(self):
+        """Предзагрузить соседние периоды в фоне (для активной вкладки)"""
+        shop = self.current_shop_filter
+        for date_from, date_to in neighbour_ranges(self.current_date_from, self.current_date_to):
+            prefetcher.submit(
+                self._cache_key(date_from, date_to, shop),
+                lambda f=date_from, t=date_to: self._fetch(f, t, shop)
+            )
+    
     def add_record(self, data):
-        """Добавить новую запись"""
+        """Добавить новую запись: строка показывается сразу, в БД пишется пачкой"""
         try:
-            record_id = self.model.add(data)
-            self.load_data(self.current_date_from, self.current_date_to, self.current_shop_filter)
-            return record_id
+            session.require(session.can_edit(), "добавление расхода")
+            record = self.model.pending_record(data)
+            record_id = record['id']
+            self.pending[record_id] = record
+            self._invalidate_date(record['date'])
+            if self._in_current_filter(record):
+                self.events.emit(ROW_ADDED, self, record=record)
+            
+            try:
+                self.writes.push(dict(data, uuid=record['uuid']))
+            except Exception:
+                # Строка не попала даже в журнал - убираем ее из таблицы
+                self.pending.pop(record_id, None)
+                self.events.emit(ROW_CHANGED, self, record_id=record_id, record=None)
+                raise
+            
+            self.update_totals()
+            self.history.push(
+                "Добавление записи",
+                undo=lambda: self._set_deleted(record_id, True),
+                redo=lambda: self._set_deleted(record_id, False)
+            )
+            return self.confirmed.get(record_id, record_id)
         except Exception as e:
             print(f"Ошибка при добавлении расхода: {e}")
             return None
     
+    def flush_writes(self):
+        """Записать ожидающие строки в БД сейчас (перед чтением периода, при выходе)"""
+        try:
+            self.writes.flush()
+        except Exception as e:
+            print(f"Ошибка записи ожидающих строк: {e}")
+    
+    def _on_writes_flushed(self, ids):
+        """Пачка записана: ожидающие строки заменяются строками из БД"""
+        records = {record['uuid']: record for record in self.model.get_records(ids.values())}
+        for row_uuid, record_id in ids.items():
+            self.confirmed[row_uuid] = record_id
+            self.pending.pop(row_uuid, None)
+            
+            record = records.get(row_uuid)
+            if record is None:
+                continue
+            self._invalidate_date(record['date'])
+            if not record['deleted'] and self._in_current_filter(record):
+                self.events.emit(ROW_CONFIRMED, self, pending_id=row_uuid, record=record)
+        
+        self.update_totals()
+    
+    def _record_id(self, record_id):
+        """id записи в БД; ожидающая строка сначала записывается"""
+        if record_id in self.writes:
+            self.writes.flush()
+        return self.confirmed.get(record_id, record_id)
+    
     def update_record(self, record_id, data):
         """Обновить существующую запись"""
         try:
-            self.model.update(record_id, data)
-            self.load_data(self.current_date_from, self.current_date_to, self.current_shop_filter)
+            session.require(session.can_edit(), "изменение расхода")
+            record_id = self._record_id(record_id)
+            before = self.model.get_record(record_id)
+            if before is None or not self._apply_update(record_id, data):
+                return False
+            
+            previous = {key: before[key] for key in data if key in before}
+            self.history.push(
+                "Изменение записи",
+                undo=lambda: self._apply_update(record_id, previous),
+                redo=lambda: self._apply_update(record_id, data)
+            )
             return True
         except Exception as e:
             print(f"Ошибка при обновлении расхода: {e}")
             return False
     
     def delete_record(self, record_id):
-        """Удалить запись"""
+        """Удалить запись (мягко: удаление отменяется через undo)"""
         try:
-            self.model.delete(record_id)
-            self.load_data(self.current_date_from, self.current_date_to, self.current_shop_filter)
+            session.require(session.can_edit(), "удаление расхода")
+            record_id = self._record_id(record_id)
+            if not self._set_deleted(record_id, True):
+                return False
+            
+            self.history.push(
+                "Удаление записи",
+                undo=lambda: self._set_deleted(record_id, False),
+                redo=lambda: self._set_deleted(record_id, True)
+            )
             return True
         except Exception as e:
             print(f"Ошибка при удалении расхода: {e}")
             return False
     
+    def undo(self):
+        """Отменить последнее действие; описание действия или None"""
+        return self.history.undo()
+    
+    def redo(self):
+        """Повторить отмененное действие; описание действия или None"""
+        return self.history.redo()
+    
+    def _apply_update(self, record_id, data):
+        """Записать изменения и перерисовать одну строку; False, если записи уже нет"""
+        current = self.model.get_by_id(record_id)
+        if current is None:
+            return False
+        
+        # Кэш сбрасывается после записи: выборка соседнего потока, начатая
+        # до нее, уже не попадет в кэш со старыми данными
+        self.model.update(record_id, data)
+        self._invalidate_date(current['date'])
+        if data.get('date'):
+            self._invalidate_date(data['date'])
+        self._emit_row(record_id)
+        return True
+    
+    def _set_deleted(self, record_id, deleted):
+        """Пометить запись удаленной или вернуть ее; False, если записи уже нет в БД"""
+        record_id = self._record_id(record_id)
+        current = self.model.get_by_id(record_id)
+        if current is None:
+            return False
+        
+        if deleted:
+            self.model.soft_delete(record_id)
+        else:
+            self.model.restore(record_id)
+        self._invalidate_date(current['date'])
+        self._emit_row(record_id)
+        return True
+    
+    def _emit_row(self, record_id):
+        """Передать представлению одну строку вместо перезагрузки всего периода"""
+        record = self.model.get_record(record_id)
+        if record is not None and (record['deleted'] or not self._in_current_filter(record)):
+            record = None
+        self.events.emit(ROW_CHANGED, self, record_id=record_id, record=record)
+        self.update_totals()
+    
     def process_cell_edit(self, record_id, column, value):
         """Обработка редактирования отдельной ячейки"""
         try:
-            # Преобразуем значение для колонки amount
+            # Сумма с запятой или точкой; нечисловое значение не сохраняется
             if column == 'amount':
                 try:
-                    value = float(value) if value else 0
+                    value = float(str(value).replace(',', '.'))
                 except ValueError:
-                    value = 0
+                    return False
             
-            # Обновляем только одну колонку
-            self.model.update(record_id, {column: value})
-            
-            # Перезагружаем данные
-            self.load_data(self.current_date_from, self.current_date_to, self.current_shop_filter)
-            return True
+            # Обновляем только одну колонку и перерисовываем одну строку
+            return self.update_record(record_id, {column: value})
         except Exception as e:
             print(f"Ошибка при редактировании ячейки: {e}")
             return False
@@ -93,14 +249,117 @@ class ExpenseController:
     
     def update_totals(self):
         """Обновить отображение итогов"""
+        if not session.can_view_expenses():
+            # Расходы видит только управляющий
+            self.events.emit(TOTALS_CHANGED, self, total=0)
+            return
+        
         total_sum = self.model.get_total_sum(
             self.current_date_from, 
             self.current_date_to,
             self.current_shop_filter if self.current_shop_filter != "Все" else None
         )
-        self.view.update_totals(total_sum)
+        
+        # Ожидающие строки уже видны в таблице - итог учитывает и их
+        total_sum = (total_sum or 0) + sum(
+            record['amount'] for record in self.pending.values() if self._in_current_filter(record)
+        )
+        self.events.emit(TOTALS_CHANGED, self, total=total_sum)
+    
+    def rename_shop(self, old_name, new_name):
+        """Переименовать магазин в записях расходов"""
+        session.require(session.can_edit(), "переименование магазина")
+        self.flush_writes()
+        self.model.replace_value('shop', old_name, new_name)
+        if self.current_shop_filter == old_name:
+            self.current_shop_filter = new_name
+        self._month_cache.clear()
+        prefetcher.cache.clear()
+    
+    def get_month_activity(self, year, month):
+        """Число расходов и сумма по дням месяца с учетом фильтра по магазину (кэшируется)"""
+        key = (year, month, self.current_shop_filter)
+        if key not in self._month_cache:
+            last_day = calendar.monthrange(year, month)[1]
+            rows = self.model.get_daily_totals(
+                date(year, month, 1).strftime("%Y-%m-%d"),
+                date(year, month, last_day).strftime("%Y-%m-%d"),
+                self.current_shop_filter
+            )
+            self._month_cache[key] = {
+                datetime.strptime(row['date'], "%Y-%m-%d").date(): {'count': row['count'], 'total': row['total'] or 0}
+                for row in rows
+            }
+        return self._month_cache[key]
+    
+    def show_cached_totals(self, day):
+        """Сразу показать итог дня из кэша месяца; False, если месяц не загружен"""
+        activity = self._month_cache.get((day.year, day.month, self.current_shop_filter))
+        if activity is None:
+            return False
+        
+        info = activity.get(day)
+        self.events.emit(TOTALS_CHANGED, self, total=info['total'] if info else 0)
+        return True
+    
+    def invalidate_dates(self, dates):
+        """Сбросить кэши дат (формат БД); True, если хотя бы одна входит в текущий период"""
+        for date_str in dates:
+            self._invalidate_date(date_str)
+        return any(
+            (not self.current_date_from or date_str >= self.current_date_from)
+            and (not self.current_date_to or date_str <= self.current_date_to)
+            for date_str in dates
+        )
+    
+    def apply_external_changes(self, dates, rows):
+        """Показать записи другой программы или окна: перерисовать только измененные строки периода
+        
+        dates - даты изменений (формат БД), rows - {uuid: последняя операция}.
+        Изменения других дней стоят только сброса кэшей.
+        """
+        # Расходы видит только управляющий: строки и итог не читаются
+        if not self.invalidate_dates(dates) or not session.can_view_expenses():
+            return
+        
+        # Стертую из БД строку (удаление синхронизацией) по uuid уже не найти,
+        # а большой пакет дешевле прочитать одним запросом - период читается заново
+        if len(rows) > CHANGE_WATCH_MAX_ROWS or 'delete' in rows.values():
+            self.load_data(self.current_date_from, self.current_date_to)
+            return
+        
+        ids = self.model.get_ids_by_uuid(rows)
+        for record in self.model.get_records(ids.values()):
+            visible = not record['deleted'] and self._in_current_filter(record)
+            self.events.emit(ROW_CHANGED, self, record_id=record['id'], record=record if visible else None)
+        self.update_totals()
+    
+    def _invalidate_date(self, date_str):
+        """Сбросить кэши (активность месяца, результаты периодов), затронутые датой"""
+        for fmt in ("%d.%m.%Y", "%Y-%m-%d"):
+            try:
+                value = datetime.strptime(date_str, fmt)
+            except (TypeError, ValueError):
+                continue
+            for key in [k for k in self._month_cache if k[:2] == (value.year, value.month)]:
+                del self._month_cache[key]
+            prefetcher.cache.invalidate(self.model.table_name, value.strftime("%Y-%m-%d"))
+            prefetcher.cache.invalidate(PNL_SCOPE, value.strftime("%Y-%m-%d"))
+            return
+    
+    def _in_current_filter(self, record):
+        """Попадает ли запись в текущий период и фильтр по магазину"""
+        if self.current_shop_filter not in (None, "Все") and record['shop'] != self.current_shop_filter:
+            return False
+        date = self.model.format_date_for_db(record['date'])
+        if self.current_date_from and date < self.current_date_from:
+            return False
+        if self.current_date_to and date > self.current_date_to:
+            return False
+        return True
     
-    def get_date_range(self, filter_type):
+    @staticmethod
+    def get_date_range(filter_type):
         """Получить диапазон дат для фильтра"""
         today = datetime.now().date()
         
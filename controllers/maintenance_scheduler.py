@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+"""
+Запуск обслуживания БД в паузах ввода
+"""
+
+import sqlite3
+import time
+from config import MAINTENANCE_IDLE_MS, MAINTENANCE_TICK_MS
+from models.maintenance import DatabaseMaintenance, TASK_TITLES
+
+
+class MaintenanceScheduler:
+    """Выполняет задачи DatabaseMaintenance порциями, пока пользователь ничего не вводит
+    
+    Представление сообщает о каждом нажатии клавиши и клике (notify_input).
+    Порция запускается, только если ввода не было MAINTENANCE_IDLE_MS;
+    между порциями проходит цикл событий Tk, поэтому первое же нажатие
+    останавливает обслуживание до следующей паузы. Прерванная задача
+    продолжается с того же места.
+    """
+    
+    def __init__(self, scheduler, on_status=None, maintenance=None):
+        self.maintenance = maintenance or DatabaseMaintenance()
+        self.on_status = on_status  # (задача, текст) после каждой порции
+        self._scheduler = scheduler  # Функция (задержка в мс, функция), например root.after
+        self._last_input = time.monotonic()
+        self._task = None  # (имя, генератор) выполняемой задачи
+        self._queue = []  # Задачи, ожидающие своей очереди
+        self.results = {}  # Задача -> (время, последний текст)
+    
+    def start(self):
+        """Начать проверки пауз"""
+        self._scheduler(MAINTENANCE_TICK_MS, self._tick)
+    
+    def notify_input(self, event=None):
+        """Пользователь что-то ввел - обслуживание ждет следующей паузы"""
+        self._last_input = time.monotonic()
+    
+    def _idle(self):
+        """Нет ввода дольше MAINTENANCE_IDLE_MS"""
+        return (time.monotonic() - self._last_input) * 1000 >= MAINTENANCE_IDLE_MS
+    
+    def _tick(self):
+        """Одна порция работы в паузе; следующая - сразу после обработки событий"""
+        busy = False
+        if self._idle():
+            try:
+                busy = self._step()
+            except sqlite3.Error as e:
+                # Например, БД занята записью - порция повторится позже
+                print(f"Ошибка обслуживания БД: {e}")
+        
+        self._scheduler(1 if busy else MAINTENANCE_TICK_MS, self._tick)
+    
+    def _step(self):
+        """Выполнить порцию текущей задачи; True, если работа еще осталась"""
+        if self._task is None:
+            if not self._queue:
+                self._queue = self.maintenance.due_tasks()
+                if not self._queue:
+                    return False
+            name = self._queue.pop(0)
+            self._task = (name, self.maintenance.run(name))
+        
+        name, steps = self._task
+        try:
+            text = next(steps)
+        except StopIteration:
+            self._task = None
+            return bool(self._queue)
+        
+        self.results[name] = (time.time(), text)
+        if self.on_status:
+            self.on_status(name, text)
+        return True
+    
+    def summary(self):
+        """Строка состояния: последний результат каждой задачи"""
+        parts = []
+        for name, title in TASK_TITLES.items():
+            if name in self.results:
+                ts, text = self.results[name]
+                parts.append(f"{title} ({time.strftime('%H:%M', time.localtime(ts))}): {text}")
+        return "   ·   ".join(parts)
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+
+"""
+Контроллер прибыли магазинов (с кэшем результатов периодов)
+"""
+
+from reports.pnl_engine import PnlEngine
+from controllers.prefetcher import prefetcher
+from controllers.access import session
+
+# Область кэша результатов; ее сбрасывает запись в любую таблицу продаж или расходов
+PNL_SCOPE = 'pnl'
+
+
+class PnlController:
+    """Прибыль магазинов за период из общего кэша результатов выборок"""
+    
+    def __init__(self, sale_models, expense_model):
+        self.engine = PnlEngine(sale_models, expense_model)
+    
+    def get(self, date_from, date_to):
+        """Прибыль магазинов за период (повторный запрос того же периода - из кэша)"""
+        session.require(session.can_view_expenses(), "прибыль магазинов")
+        
+        # Набор магазинов входит в ключ: добавленный магазин не получит старый результат
+        tables = tuple(model.table_name for model in self.engine.sale_models)
+        key = (PNL_SCOPE, date_from, date_to, tables)
+        cached = prefetcher.cache.get(key)
+        if cached is None:
+            generation = prefetcher.cache.generation(PNL_SCOPE)
+            cached = self.engine.compute(date_from, date_to)
+            prefetcher.cache.put(key, cached, generation)
+        return cached
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+"""
+Предзагрузка соседних дней/периодов в фоновом потоке
+"""
+
+import queue
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from config import PREFETCH_CACHE_SIZE, READ_ONLY, ARCHIVE_READERS
+
+
+class ResultCache:
+    """Ограниченный LRU-кэш результатов выборок
+    
+    Ключ: (область, date_from, date_to, фильтр), где область - имя таблицы.
+    """
+    
+    def __init__(self, max_entries=PREFETCH_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Счетчик записей в область: результат, начатый до записи, не попадет в кэш
+        self._generations = {}
+    
+    def generation(self, scope):
+        """Текущее поколение данных области"""
+        with self._lock:
+            return self._generations.get(scope, 0)
+    
+    def get(self, key):
+        """Получить результат (None, если его нет)"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+    
+    def put(self, key, value, generation=None):
+        """Сохранить результат, если данные области не менялись с момента выборки"""
+        with self._lock:
+            if generation is not None and generation != self._generations.get(key[0], 0):
+                return False
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+    
+    def invalidate(self, scope, date):
+        """Удалить результаты области, в период которых входит дата (формат БД)"""
+        with self._lock:
+            self._generations[scope] = self._generations.get(scope, 0) + 1
+            stale = [
+                key for key in self._entries
+                if key[0] == scope and (key[1] or '') <= date <= (key[2] or '9999-12-31')
+            ]
+            for key in stale:
+                del self._entries[key]
+    
+    def clear(self):
+        """Очистить кэш"""
+        with self._lock:
+            self._entries.clear()
+            for scope in self._generations:
+                self._generations[scope] += 1
+
+
+class Prefetcher:
+    """Фоновые потоки, заполняющие кэш результатами для соседних периодов
+    
+    Обычно поток один - запись в БД не должна ждать читателей. Архив
+    только читается, поэтому его выборки идут в нескольких потоках.
+    """
+    
+    def __init__(self, cache=None, workers=1):
+        self.cache = cache or ResultCache()
+        self.workers = workers
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._threads = []
+    
+    def submit(self, key, fetch):
+        """Поставить выборку в очередь, если результата еще нет"""
+        if self.cache.get(key) is not None:
+            return
+        
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+            
+            # Новый поток - только если все запущенные заняты
+            if len(self._threads) < self.workers and len(self._pending) > len(self._threads):
+                thread = threading.Thread(target=self._run, name=f"prefetcher-{len(self._threads) + 1}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+        
+        self._queue.put((key, fetch, self.cache.generation(key[0])))
+    
+    def _run(self):
+        """Цикл фонового потока"""
+        while True:
+            key, fetch, generation = self._queue.get()
+            try:
+                self.cache.put(key, fetch(), generation)
+            except Exception as e:
+                print(f"Ошибка предзагрузки: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+
+def neighbour_ranges(date_from, date_to):
+    """Предыдущий и следующий периоды той же длины"""
+    if not date_from or not date_to:
+        return []
+    
+    start = datetime.strptime(date_from, "%Y-%m-%d").date()
+    end = datetime.strptime(date_to, "%Y-%m-%d").date()
+    length = (end - start).days + 1
+    
+    ranges = []
+    for shift in (length, -length):
+        step = timedelta(days=shift)
+        ranges.append(((start + step).strftime("%Y-%m-%d"), (end + step).strftime("%Y-%m-%d")))
+    return ranges
+
+
+# Общий предзагрузчик процесса
+prefetcher = Prefetcher(workers=ARCHIVE_READERS if READ_ONLY else 1)
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+"""
+Контроллер отчетов за период (данные для графиков)
+"""
+
+from models.sale_model import SaleModel
+from models.expense_model import ExpenseModel
+from models.settings_model import get_settings
+from reports.report_engine import ReportEngine
+from reports.pnl_engine import allocate_expenses
+from controllers.access import session
+from datetime import datetime, timedelta
+
+
+class ReportController:
+    """Подготовка рядов и итогов по магазинам из итогов ReportEngine"""
+    
+    def __init__(self, shops=None, workers=None):
+        session.require(session.can_view_expenses(), "отчеты")
+        self.shops = list(shops or get_settings().get_shops())
+        self.sale_models = {shop['name']: SaleModel(shop['name'], shop['table_suffix']) for shop in self.shops}
+        self.expense_model = ExpenseModel()
+        self.engine = ReportEngine(self.sale_models.values(), self.expense_model, workers)
+        self._computed = (None, None)  # (период, итоги) последнего расчета
+    
+    def open_pool(self):
+        """Один пул процессов на все расчеты контроллера (до close)"""
+        self.engine.open_pool()
+    
+    def close(self):
+        """Остановить пул процессов"""
+        self.engine.close()
+    
+    def compute(self, date_from, date_to):
+        """Пересчитать итоги периода (ряды и итоги по магазинам берутся из них)"""
+        totals = self.engine.compute(date_from, date_to)
+        self._computed = ((date_from, date_to), totals)
+        return totals
+    
+    def _totals(self, date_from, date_to):
+        """Итоги периода из последнего расчета (другой период - новый расчет)"""
+        period, totals = self._computed
+        if period != (date_from, date_to):
+            totals = self.compute(date_from, date_to)
+        return totals
+    
+    def get_series(self, date_from, date_to):
+        """Выручка, расходы и прибыль по дням периода (дни без операций - нули)
+        
+        Возвращает {'days': [date], 'revenue': [...], 'expense': [...], 'profit': [...]}
+        """
+        totals = self._totals(date_from, date_to)
+        revenue = {}
+        for shop_totals in totals['sales'].values():
+            for day, total in shop_totals['days'].items():
+                revenue[day] = revenue.get(day, 0) + total
+        expense = totals['expenses']['days']
+        
+        start = datetime.strptime(date_from, "%Y-%m-%d").date()
+        end = datetime.strptime(date_to, "%Y-%m-%d").date()
+        
+        series = {'days': [], 'revenue': [], 'expense': [], 'profit': []}
+        for offset in range((end - start).days + 1):
+            day = start + timedelta(days=offset)
+            key = day.strftime("%Y-%m-%d")
+            day_revenue = revenue.get(key, 0)
+            day_expense = expense.get(key, 0)
+            
+            series['days'].append(day)
+            series['revenue'].append(day_revenue)
+            series['expense'].append(day_expense)
+            series['profit'].append(day_revenue - day_expense)
+        
+        return series
+    
+    def get_shop_profit(self, date_from, date_to):
+        """Прибыль магазинов за период из тех же итогов (общие расходы распределены)
+        
+        Возвращает результат allocate_expenses: {'shops': {магазин: {'revenue', 'direct',
+        'shared', 'profit'}}, 'revenue', 'expenses', 'shared', 'profit'}.
+        """
+        totals = self._totals(date_from, date_to)
+        revenue = {shop: totals['sales'][shop]['total'] for shop in self.sale_models}
+        return allocate_expenses(revenue, dict(totals['expenses']['shops']))
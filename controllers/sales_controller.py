@@ -5,77 +5,364 @@
 """
 
 from models.sale_model import SaleModel
-from datetime import datetime, timedelta
+from controllers.event_bus import EventBus, RECORDS_CHANGED, TOTALS_CHANGED, ROW_ADDED, ROW_CHANGED, ROW_CONFIRMED
+from controllers.undo_stack import UndoStack
+from controllers.write_behind import WriteBehindQueue
+from controllers.prefetcher import prefetcher, neighbour_ranges
+from controllers.pnl_controller import PNL_SCOPE
+from controllers.access import session
+from config import LOW_STOCK_THRESHOLD, CHANGE_WATCH_MAX_ROWS
+from datetime import datetime, timedelta, date
+import calendar
 
 
 class SalesController:
     """Контроллер для управления продажами одного магазина"""
     
-    def __init__(self, shop_name, view):
+    def __init__(self, shop_name, events=None, table_suffix=None):
         self.shop_name = shop_name
-        self.model = SaleModel(shop_name)
-        self.view = view
+        self.model = SaleModel(shop_name, table_suffix)
+        self.events = events or EventBus()
+        self.history = UndoStack()  # Отмена/повтор добавления, правки и удаления
         self.current_date_from = None
         self.current_date_to = None
+        self.last_total = None  # Последний показанный итог (для общей панели итогов)
+        self._month_cache = {}  # Активность по дням: (год, месяц) -> {дата: итоги}
+        
+        # Новые строки показываются сразу, а в БД пишутся пачками
+        self.pending = {}  # Строки, еще не записанные в БД: uuid -> запись
+        self.confirmed = {}  # uuid записанной строки -> id в БД
+        self.writes = WriteBehindQueue(self.model, on_flushed=self._on_writes_flushed)
     
     def load_data(self, date_from=None, date_to=None):
         """Загрузить данные в представление"""
+        session.require(session.can_view_shop(self.shop_name), f"просмотр продаж магазина {self.shop_name}")
+        
+        # Ожидающие строки попадают в БД до чтения периода
+        self.flush_writes()
+        
         self.current_date_from = date_from
         self.current_date_to = date_to
         
-        # Получаем данные из модели
+        # Берем предзагруженный результат или читаем из модели
+        key = self._cache_key(date_from, date_to)
+        cached = prefetcher.cache.get(key)
+        if cached is None:
+            generation = prefetcher.cache.generation(key[0])
+            cached = self._fetch(date_from, date_to)
+            prefetcher.cache.put(key, cached, generation)
+        
+        shop_records = [dict(r) for r in cached['records']]
+        
+        # Сообщаем подписчикам о новом наборе записей и итогах
+        self.events.emit(RECORDS_CHANGED, self, records=shop_records)
+        self._emit_total(cached['total'])
+        
+        return shop_records
+    
+    def _fetch(self, date_from, date_to):
+        """Прочитать записи и итог за период (может выполняться в фоновом потоке)"""
         records = self.model.get_all(date_from, date_to)
         
         # Фильтруем записи только для текущего магазина
         shop_records = [r for r in records if r.get('shop') == self.shop_name]
         
-        # Обновляем таблицу в представлении
-        self.view.display_records(shop_records)
-        
-        # Обновляем итоги
-        self.update_totals()
-        
-        return shop_records
+        return {
+            'records': shop_records,
+            'total': self.model.get_total_sum(date_from, date_to)
+        }
+    
+    def _cache_key(self, date_from, date_to):
+        """Ключ кэша результатов: (таблица, период, фильтр)"""
+        return (self.model.table_name, date_from, date_to, None)
+    
+    def prefetch_neighbours(self):
+        """Предзагрузить соседние периоды в фоне (для активной вкладки)"""
+        for date_from, date_to in neighbour_ranges(self.current_date_from, self.current_date_to):
+            prefetcher.submit(
+                self._cache_key(date_from, date_to),
+                lambda f=date_from, t=date_to: self._fetch(f, t)
+            )
     
     def add_record(self, data):
-        """Добавить новую запись"""
+        """Добавить новую запись: строка показывается сразу, в БД пишется пачкой"""
         try:
-            record_id = self.model.add(data)
-            self.load_data(self.current_date_from, self.current_date_to)
-            return record_id
+            session.require(session.can_add_sale(self.shop_name), f"продажа в магазине {self.shop_name}")
+            record = self.model.pending_record(data)
+            record_id = record['id']
+            self.pending[record_id] = record
+            self._invalidate_date(record['date'])
+            if self._in_current_range(record):
+                self.events.emit(ROW_ADDED, self, record=record)
+            
+            try:
+                self.writes.push(dict(data, uuid=record['uuid']))
+            except Exception:
+                # Строка не попала даже в журнал - убираем ее из таблицы
+                self.pending.pop(record_id, None)
+                self.events.emit(ROW_CHANGED, self, record_id=record_id, record=None)
+                raise
+            
+            self.update_totals()
+            self.history.push(
+                "Добавление записи",
+                undo=lambda: self._set_deleted(record_id, True),
+                redo=lambda: self._set_deleted(record_id, False)
+            )
+            return self.confirmed.get(record_id, record_id)
         except Exception as e:
             print(f"Ошибка при добавлении записи: {e}")
             return None
     
+    def flush_writes(self):
+        """Записать ожидающие строки в БД сейчас (перед чтением периода, при выходе)"""
+        try:
+            self.writes.flush()
+        except Exception as e:
+            print(f"Ошибка записи ожидающих строк: {e}")
+    
+    def _on_writes_flushed(self, ids):
+        """Пачка записана: ожидающие строки заменяются строками из БД"""
+        records = {record['uuid']: record for record in self.model.get_records(ids.values())}
+        for row_uuid, record_id in ids.items():
+            self.confirmed[row_uuid] = record_id
+            self.pending.pop(row_uuid, None)
+            
+            record = records.get(row_uuid)
+            if record is None:
+                continue
+            self._invalidate_date(record['date'])
+            if not record['deleted'] and self._in_current_range(record):
+                self.events.emit(ROW_CONFIRMED, self, pending_id=row_uuid, record=record)
+        
+        self.update_totals()
+    
+    def _record_id(self, record_id):
+        """id записи в БД; ожидающая строка сначала записывается"""
+        if record_id in self.writes:
+            self.writes.flush()
+        return self.confirmed.get(record_id, record_id)
+    
     def update_record(self, record_id, data):
         """Обновить существующую запись"""
         try:
-            self.model.update(record_id, data)
-            self.load_data(self.current_date_from, self.current_date_to)
+            session.require(session.can_edit(), "изменение продажи")
+            record_id = self._record_id(record_id)
+            before = self.model.get_record(record_id)
+            if before is None or not self._apply_update(record_id, data):
+                return False
+            
+            previous = {key: before[key] for key in data if key in before}
+            self.history.push(
+                "Изменение записи",
+                undo=lambda: self._apply_update(record_id, previous),
+                redo=lambda: self._apply_update(record_id, data)
+            )
             return True
         except Exception as e:
             print(f"Ошибка при обновлении записи: {e}")
             return False
     
     def delete_record(self, record_id):
-        """Удалить запись"""
+        """Удалить запись (мягко: удаление отменяется через undo)"""
         try:
-            self.model.delete(record_id)
-            self.load_data(self.current_date_from, self.current_date_to)
+            session.require(session.can_edit(), "удаление продажи")
+            record_id = self._record_id(record_id)
+            if not self._set_deleted(record_id, True):
+                return False
+            
+            self.history.push(
+                "Удаление записи",
+                undo=lambda: self._set_deleted(record_id, False),
+                redo=lambda: self._set_deleted(record_id, True)
+            )
             return True
         except Exception as e:
             print(f"Ошибка при удалении записи: {e}")
             return False
     
+    def undo(self):
+        """Отменить последнее действие; описание действия или None"""
+        return self.history.undo()
+    
+    def redo(self):
+        """Повторить отмененное действие; описание действия или None"""
+        return self.history.redo()
+    
+    def _apply_update(self, record_id, data):
+        """Записать изменения и перерисовать одну строку; False, если записи уже нет"""
+        current = self.model.get_by_id(record_id)
+        if current is None:
+            return False
+        
+        # Кэш сбрасывается после записи: выборка соседнего потока, начатая
+        # до нее, уже не попадет в кэш со старыми данными
+        self.model.update(record_id, data)
+        self._invalidate_date(current['date'])
+        if data.get('date'):
+            self._invalidate_date(data['date'])
+        self._emit_row(record_id)
+        return True
+    
+    def _set_deleted(self, record_id, deleted):
+        """Пометить запись удаленной или вернуть ее; False, если записи уже нет в БД"""
+        record_id = self._record_id(record_id)
+        current = self.model.get_by_id(record_id)
+        if current is None:
+            return False
+        
+        if deleted:
+            self.model.soft_delete(record_id)
+        else:
+            self.model.restore(record_id)
+        self._invalidate_date(current['date'])
+        self._emit_row(record_id)
+        return True
+    
+    def _emit_row(self, record_id):
+        """Передать представлению одну строку вместо перезагрузки всего периода"""
+        record = self.model.get_record(record_id)
+        if record is not None and (record['deleted'] or not self._in_current_range(record)):
+            record = None
+        self.events.emit(ROW_CHANGED, self, record_id=record_id, record=record)
+        self.update_totals()
+    
+    def process_cell_edit(self, record_id, column, value):
+        """Обработка редактирования отдельной ячейки"""
+        try:
+            if column in ('quantity', 'price'):
+                try:
+                    value = float(str(value).replace(',', '.'))
+                except ValueError:
+                    return False
+            elif column == 'item' and not str(value).strip():
+                return False
+            
+            # Обновляем только одну колонку и перерисовываем одну строку
+            return self.update_record(record_id, {column: value})
+        except Exception as e:
+            print(f"Ошибка при редактировании ячейки: {e}")
+            return False
+    
     def update_totals(self):
         """Обновить отображение итогов"""
         total_sum = self.model.get_total_sum(
             self.current_date_from, 
             self.current_date_to
         )
-        self.view.update_totals(total_sum)
+        
+        # Ожидающие строки уже видны в таблице - итог учитывает и их
+        total_sum = (total_sum or 0) + sum(
+            record['total'] for record in self.pending.values() if self._in_current_range(record)
+        )
+        self._emit_total(total_sum)
+    
+    def _emit_total(self, total):
+        """Запомнить и разослать итог"""
+        self.last_total = total
+        self.events.emit(TOTALS_CHANGED, self, total=total)
+    
+    def rename(self, new_name):
+        """Переименовать магазин в записях продаж"""
+        session.require(session.can_edit(), "переименование магазина")
+        self.flush_writes()
+        old_name = self.shop_name
+        self.model.rename_shop(new_name)
+        self.model.stock.rename_shop(old_name, new_name)
+        self.shop_name = new_name
+        self._month_cache.clear()
+        prefetcher.cache.clear()
+    
+    def get_low_stock(self):
+        """id товаров магазина с остатком не выше порога"""
+        return self.model.stock.get_low_stock(self.shop_name, LOW_STOCK_THRESHOLD)
+    
+    def get_item_stock(self, item):
+        """Текущий остаток товара по названию (None, если такого товара еще нет)"""
+        item_id = self.model.items.find_id(item) if item else None
+        if item_id is None:
+            return None
+        return self.model.stock.get_balance(self.shop_name, item_id)
+    
+    def get_month_activity(self, year, month):
+        """Число продаж и сумма по дням месяца (кэшируется до записи в этот месяц)"""
+        key = (year, month)
+        if key not in self._month_cache:
+            last_day = calendar.monthrange(year, month)[1]
+            rows = self.model.get_daily_totals(
+                date(year, month, 1).strftime("%Y-%m-%d"),
+                date(year, month, last_day).strftime("%Y-%m-%d")
+            )
+            self._month_cache[key] = {
+                datetime.strptime(row['date'], "%Y-%m-%d").date(): {'count': row['count'], 'total': row['total'] or 0}
+                for row in rows
+            }
+        return self._month_cache[key]
+    
+    def show_cached_totals(self, day):
+        """Сразу показать итог дня из кэша месяца; False, если месяц не загружен"""
+        activity = self._month_cache.get((day.year, day.month))
+        if activity is None:
+            return False
+        
+        info = activity.get(day)
+        self._emit_total(info['total'] if info else 0)
+        return True
+    
+    def invalidate_dates(self, dates):
+        """Сбросить кэши дат (формат БД); True, если хотя бы одна входит в текущий период"""
+        for date_str in dates:
+            self._invalidate_date(date_str)
+        return any(
+            (not self.current_date_from or date_str >= self.current_date_from)
+            and (not self.current_date_to or date_str <= self.current_date_to)
+            for date_str in dates
+        )
+    
+    def apply_external_changes(self, dates, rows):
+        """Показать записи другой программы или окна: перерисовать только измененные строки периода
+        
+        dates - даты изменений (формат БД), rows - {uuid: последняя операция}.
+        Изменения других дней стоят только сброса кэшей.
+        """
+        if not self.invalidate_dates(dates):
+            return
+        
+        # Стертую из БД строку (удаление синхронизацией) по uuid уже не найти,
+        # а большой пакет дешевле прочитать одним запросом - период читается заново
+        if len(rows) > CHANGE_WATCH_MAX_ROWS or 'delete' in rows.values():
+            self.load_data(self.current_date_from, self.current_date_to)
+            return
+        
+        ids = self.model.get_ids_by_uuid(rows)
+        for record in self.model.get_records(ids.values()):
+            visible = not record['deleted'] and self._in_current_range(record)
+            self.events.emit(ROW_CHANGED, self, record_id=record['id'], record=record if visible else None)
+        self.update_totals()
+    
+    def _invalidate_date(self, date_str):
+        """Сбросить кэши (активность месяца, результаты периодов), затронутые датой"""
+        for fmt in ("%d.%m.%Y", "%Y-%m-%d"):
+            try:
+                value = datetime.strptime(date_str, fmt)
+            except (TypeError, ValueError):
+                continue
+            self._month_cache.pop((value.year, value.month), None)
+            prefetcher.cache.invalidate(self.model.table_name, value.strftime("%Y-%m-%d"))
+            prefetcher.cache.invalidate(PNL_SCOPE, value.strftime("%Y-%m-%d"))
+            return
+    
+    def _in_current_range(self, record):
+        """Попадает ли запись в текущий период отображения"""
+        date = self.model.format_date_for_db(record['date'])
+        if self.current_date_from and date < self.current_date_from:
+            return False
+        if self.current_date_to and date > self.current_date_to:
+            return False
+        return True
     
-    def get_date_range(self, filter_type):
+    @staticmethod
+    def get_date_range(filter_type):
         """Получить диапазон дат для фильтра"""
         today = datetime.now().date()
         
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+"""
+Контроллер аналитики продавцов: выручка, количество, средний чек и комиссия
+"""
+
+from datetime import date
+from models.seller_stats_model import get_seller_stats
+from models.settings_model import get_settings
+from controllers.access import session
+from config import LEADERBOARD_SIZE
+
+
+class SellerController:
+    """Итоги продавцов по магазинам за период (из дневных итогов seller_daily)"""
+    
+    def __init__(self, models):
+        self.models = list(models)  # Модели продаж магазинов
+        self.stats = get_seller_stats()
+        self.settings = get_settings()
+    
+    def get_stats(self, date_from, date_to):
+        """Итоги продавцов за период со средним чеком и комиссией, по убыванию выручки"""
+        for model in self.models:
+            session.require(session.can_view_shop(model.shop_name), f"просмотр продаж магазина {model.shop_name}")
+        
+        percent = self.settings.commission_percent
+        rows = self.stats.get_totals(self.models, date_from, date_to)
+        for row in rows:
+            row['avg_ticket'] = row['revenue'] / row['sales']
+            row['commission'] = row['revenue'] * percent / 100
+        return rows
+    
+    def get_month_to_date(self, day=None, limit=LEADERBOARD_SIZE):
+        """Рейтинг продавцов с начала месяца по день day включительно (по умолчанию сегодня)"""
+        day = day or date.today()
+        rows = self.get_stats(day.replace(day=1).strftime("%Y-%m-%d"), day.strftime("%Y-%m-%d"))
+        return rows[:limit] if limit else rows
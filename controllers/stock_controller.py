@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+"""
+Контроллер склада: приходы и остатки
+"""
+
+from models.stock_model import get_stock
+from controllers.access import session
+from config import LOW_STOCK_THRESHOLD
+
+
+class StockController:
+    """Контроллер приходов товара и остатков по магазинам"""
+    
+    def __init__(self):
+        self.model = get_stock()
+    
+    def add_receipt(self, data):
+        """Добавить приход товара"""
+        try:
+            session.require(session.can_edit(), "приход товара")
+            return self.model.add(data)
+        except Exception as e:
+            print(f"Ошибка при добавлении прихода: {e}")
+            return None
+    
+    def get_balances(self, shop):
+        """Остатки магазина с отметкой товаров, которые заканчиваются"""
+        session.require(session.can_view_expenses(), "просмотр склада")
+        balances = self.model.get_balances(shop)
+        for row in balances:
+            row['low'] = row['received'] > 0 and row['quantity'] <= LOW_STOCK_THRESHOLD
+        return balances
+    
+    def get_receipts(self, date_from=None, date_to=None, shop=None):
+        """Приходы за период"""
+        session.require(session.can_view_expenses(), "просмотр склада")
+        return self.model.get_all(date_from, date_to, shop)
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+"""
+Стек отмены и повтора действий с записями
+"""
+
+from config import UNDO_LIMIT
+
+
+class Command:
+    """Действие, которое можно отменить и повторить
+    
+    undo и redo возвращают False, если действие уже неприменимо
+    (например, запись окончательно удалена очисткой или синхронизацией).
+    """
+    
+    def __init__(self, description, undo, redo):
+        self.description = description
+        self.undo = undo
+        self.redo = redo
+
+
+class UndoStack:
+    """Стек отмены/повтора одного контроллера (хранится только в памяти)"""
+    
+    def __init__(self, limit=UNDO_LIMIT):
+        self.limit = limit
+        self._undo = []
+        self._redo = []
+    
+    def push(self, description, undo, redo):
+        """Запомнить выполненное действие (история повтора сбрасывается)"""
+        self._undo.append(Command(description, undo, redo))
+        if len(self._undo) > self.limit:
+            del self._undo[0]
+        self._redo.clear()
+    
+    def undo(self):
+        """Отменить последнее действие; описание отмененного или None"""
+        while self._undo:
+            command = self._undo.pop()
+            if command.undo() is not False:
+                self._redo.append(command)
+                return command.description
+        return None
+    
+    def redo(self):
+        """Повторить отмененное действие; описание повторенного или None"""
+        while self._redo:
+            command = self._redo.pop()
+            if command.redo() is not False:
+                self._undo.append(command)
+                return command.description
+        return None
+    
+    def clear(self):
+        """Забыть всю историю"""
+        self._undo.clear()
+        self._redo.clear()
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+
+"""
+Отложенная запись новых строк пачками (ввод не ждет записи на диск)
+"""
+
+import glob
+import json
+import os
+import sqlite3
+import uuid
+from pathlib import Path
+from config import DB_PATH, WRITE_BEHIND_DELAY_MS, WRITE_BEHIND_MAX_ROWS, READ_ONLY
+
+
+def lock_file(f):
+    """Исключительная блокировка открытого файла без ожидания; False, если ее держит другой процесс
+    
+    Блокировку снимает закрытие файла, в том числе при аварийном завершении программы.
+    """
+    try:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+class WriteBehindQueue:
+    """Очередь новых строк модели с журналом на диске
+    
+    Строка сразу дописывается в журнал рядом с БД (одна строка JSON, без fsync -
+    переживает падение программы) и попадает в SQLite вместе с соседними одной
+    транзакцией: через WRITE_BEHIND_DELAY_MS после первой строки пачки или по
+    накоплении WRITE_BEHIND_MAX_ROWS строк.
+    
+    С одной БД работают несколько касс, поэтому у каждой очереди свой журнал
+    <БД>-<таблица>.<метка>.pending, а пока он есть, очередь держит блокировку
+    файла <журнал>.lock. Журнал без блокировки остался от завершившейся аварийно
+    программы: следующая запущенная касса забирает его строки себе и дописывает
+    в БД; строки, которые уже успели попасть в БД, узнаются по uuid и второй раз
+    не вставляются. Журналы работающих касс не трогаются.
+    
+    Без планировщика строки пишутся сразу (консольный режим, тесты).
+    """
+    
+    def __init__(self, model, on_flushed=None, scheduler=None):
+        self.model = model
+        self.on_flushed = on_flushed  # {uuid: id} записанных строк
+        self._scheduler = scheduler  # Функция (задержка в мс, функция), например root.after
+        self._flush_scheduled = False
+        self.journal_path = Path(f"{DB_PATH}-{model.table_name}.{uuid.uuid4().hex[:12]}.pending")
+        self._lock = None  # Открытый заблокированный файл <журнал>.lock, пока журнал есть
+        # uuid -> данные строки, в порядке ввода (архив журнал не дописывает)
+        self.rows = {}
+        
+        if not READ_ONLY:
+            self._recover_journals()
+        if self.rows:
+            self._try_flush()
+    
+    def __contains__(self, row_uuid):
+        return row_uuid in self.rows
+    
+    def __len__(self):
+        return len(self.rows)
+    
+    def set_scheduler(self, scheduler):
+        """Установить функцию отложенного вызова (None - запись сразу)"""
+        self._scheduler = scheduler
+    
+    def _recover_journals(self):
+        """Забрать строки журналов завершившихся программ (и журнала прежних версий без метки)"""
+        prefix = glob.escape(f"{DB_PATH}-{self.model.table_name}")
+        for path in glob.glob(f"{prefix}.*.pending") + glob.glob(f"{prefix}.pending"):
+            lock = open(f"{path}.lock", 'a')
+            if not lock_file(lock):
+                # Журнал работающей кассы
+                lock.close()
+                continue
+            
+            try:
+                rows = self._read_journal(Path(path))
+                if rows:
+                    # Строки сначала попадают в свой журнал, потом исчезает чужой
+                    self._append(rows.values())
+                    self.rows.update(rows)
+                if os.path.exists(path):
+                    os.remove(path)
+            finally:
+                self._release(lock)
+    
+    @staticmethod
+    def _read_journal(path):
+        """Строки журнала: {uuid: данные}"""
+        rows = {}
+        if not path.exists():
+            return rows
+        
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    # Последняя строка могла оборваться при аварии
+                    continue
+                rows[data['uuid']] = data
+        return rows
+    
+    @staticmethod
+    def _release(lock):
+        """Снять блокировку журнала и убрать файл блокировки"""
+        lock.close()
+        try:
+            os.remove(lock.name)
+        except OSError:
+            # Файл уже открыт другой кассой, проверяющей журнал, - уберет она
+            pass
+    
+    def _append(self, rows):
+        """Дописать строки в свой журнал (блокировка берется при первой записи)"""
+        if self._lock is None:
+            lock = open(f"{self.journal_path}.lock", 'a')
+            if not lock_file(lock):
+                lock.close()
+                raise sqlite3.OperationalError(f"Журнал {self.journal_path} занят другой программой")
+            self._lock = lock
+        
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            for data in rows:
+                f.write(json.dumps(data, ensure_ascii=False) + "\n")
+    
+    def _rewrite_journal(self):
+        """Оставить в своем журнале только незаписанные строки (нет строк - нет журнала)"""
+        if self.rows:
+            tmp_path = self.journal_path.with_name(self.journal_path.name + ".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for data in self.rows.values():
+                    f.write(json.dumps(data, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.journal_path)
+            return
+        
+        if self.journal_path.exists():
+            self.journal_path.unlink()
+        if self._lock is not None:
+            self._release(self._lock)
+            self._lock = None
+    
+    def push(self, data):
+        """Поставить строку в очередь (в данных обязателен uuid)"""
+        if READ_ONLY:
+            # Журнал рядом с архивом не создается
+            raise sqlite3.OperationalError("Архив открыт только для чтения")
+        
+        self._append([data])
+        self.rows[data['uuid']] = dict(data)
+        
+        if self._scheduler is None or len(self.rows) >= WRITE_BEHIND_MAX_ROWS:
+            self._try_flush()
+        else:
+            self._schedule()
+    
+    def _schedule(self):
+        """Запланировать запись пачки, если она еще не запланирована"""
+        if self._scheduler is not None and not self._flush_scheduled:
+            self._flush_scheduled = True
+            self._scheduler(WRITE_BEHIND_DELAY_MS, self._scheduled_flush)
+    
+    def _scheduled_flush(self):
+        """Запись пачки по таймеру"""
+        self._flush_scheduled = False
+        self._try_flush()
+    
+    def _try_flush(self):
+        """Записать пачку; при ошибке строки остаются в журнале, попытка повторяется позже"""
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Ошибка отложенной записи в {self.model.table_name}: {e}")
+            self._schedule()
+    
+    def flush(self):
+        """Записать все ожидающие строки одной транзакцией; {uuid: id}"""
+        if not self.rows:
+            return {}
+        
+        rows, self.rows = self.rows, {}
+        try:
+            existing = self.model.get_ids_by_uuid(rows)
+            self.model.add_many([data for row_uuid, data in rows.items() if row_uuid not in existing])
+        except Exception:
+            # Строки остаются в очереди и в журнале до следующей попытки
+            self.rows = dict(rows, **self.rows)
+            raise
+        
+        ids = self.model.get_ids_by_uuid(rows)
+        self._rewrite_journal()
+        
+        if self.on_flushed:
+            self.on_flushed(ids)
+        return ids
@@ -5,21 +5,63 @@
 Главный файл запуска приложения учета продаж и расходов
 """
 
+import argparse
+import sqlite3
 import sys
 import os
+from pathlib import Path
 
 # Добавляем путь к корневой папке проекта в sys.path
 # Это позволит импортировать модули из корня проекта
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from views.main_view import MainView
+import config
 import tkinter as tk
+from tkinter import messagebox
+
+
+def login(root):
+    """Вход пользователя, если в БД заведены пользователи; False - вход отменен"""
+    from models.user_model import get_users
+    from controllers.access import session
+    from views.login_view import LoginDialog
+    
+    if not get_users().has_users():
+        return True
+    
+    root.withdraw()
+    dialog = LoginDialog(root)
+    root.wait_window(dialog)
+    if dialog.user is None:
+        return False
+    
+    session.login(dialog.user)
+    root.deiconify()
+    return True
 
 
 def main():
     """Главная функция запуска приложения"""
+    parser = argparse.ArgumentParser(description="Учет продаж и расходов")
+    parser.add_argument('--archive', metavar='ФАЙЛ', help="Открыть БД прошлых лет только для чтения")
+    args = parser.parse_args()
+    
+    # Путь и режим БД задаются до импорта моделей - они читают их из config при загрузке
+    if args.archive:
+        config.DB_PATH = Path(args.archive)
+        config.READ_ONLY = True
+    
+    from views.main_view import MainView
+    
     root = tk.Tk()
-    root.title("Учет продаж и расходов")
+    if config.READ_ONLY:
+        root.title(f"Архив (только чтение): {config.DB_PATH.name}")
+    else:
+        if not login(root):
+            root.destroy()
+            return
+        from controllers.access import session
+        root.title(" - ".join(filter(None, ["Учет продаж и расходов", session.title])))
     root.geometry("1200x700")
     
     # Устанавливаем иконку (если есть)
@@ -28,7 +70,13 @@ def main():
     except:
         pass
     
-    app = MainView(root)
+    try:
+        app = MainView(root)
+    except sqlite3.DatabaseError as e:
+        # Например, архив старой версии программы или файл не является БД
+        messagebox.showerror("Ошибка", f"Не удалось открыть БД: {e}")
+        root.destroy()
+        return
     
     # Обработка закрытия окна
     def on_closing():
@@ -5,29 +5,311 @@
 """
 
 import sqlite3
-from config import DB_PATH, DB_DATE_FORMAT
+import threading
+import time
+import uuid
+from pathlib import Path
+from config import (
+    DB_PATH, DB_DATE_FORMAT, REPORT_FETCH_SIZE, READ_ONLY, ARCHIVE_MMAP_SIZE,
+    DB_JOURNAL_MODE, DB_BUSY_TIMEOUT_MS, DB_BUSY_RETRIES, DB_BUSY_BACKOFF_MS
+)
+from models.query_profiler import profiler
 from datetime import datetime, timedelta
 
 
+# Служебные колонки синхронизации, которые добавляются в каждую таблицу данных
+SYNC_COLUMNS = {
+    'uuid': 'TEXT',
+    'origin': 'TEXT',
+    'updated_at': 'REAL NOT NULL DEFAULT 0'
+}
+
+
+def partition_path(year):
+    """Файл раздела закрытого года рядом с БД: finance.db -> finance_2023.db"""
+    path = Path(DB_PATH)
+    return path.with_name(f"{path.stem}_{year}{path.suffix}")
+
+
+def attach_partitions(conn, years):
+    """Подключить к соединению разделы лет под именами p<год>"""
+    for year in years:
+        conn.execute("ATTACH DATABASE ? AS ?", (str(partition_path(year)), f"p{year}"))
+
+
+def is_busy_error(error):
+    """Ошибка "БД занята": блокировку держит другое соединение или другая программа"""
+    return isinstance(error, sqlite3.OperationalError) and ('locked' in str(error) or 'busy' in str(error))
+
+
+def retry_busy(func):
+    """Выполнить функцию, повторяя ее с удваивающейся паузой, пока БД занята"""
+    for attempt in range(DB_BUSY_RETRIES + 1):
+        try:
+            return func()
+        except sqlite3.OperationalError as e:
+            if attempt == DB_BUSY_RETRIES or not is_busy_error(e):
+                raise
+            time.sleep(DB_BUSY_BACKOFF_MS / 1000 * 2 ** attempt)
+
+
+class ConnectionPool:
+    """Открытые соединения с рабочей БД, которые переиспользуются запросами
+    
+    Новое соединение заново читает схему БД и настраивается PRAGMA, поэтому
+    при сотнях коротких запросов в секунду (API-сервер) их выгоднее держать
+    открытыми. Соединение не привязано к потоку, но одновременно им пользуется
+    только тот, кто его взял; close() возвращает его в пул.
+    """
+    
+    def __init__(self, size):
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+    
+    def acquire(self, connect):
+        """Взять свободное соединение или открыть новое функцией connect"""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        return PooledConnection(self, conn or connect())
+    
+    def release(self, conn):
+        """Вернуть соединение: незавершенная транзакция откатывается, разделы отключаются"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            for row in conn.execute("PRAGMA database_list").fetchall():
+                if row[1] not in ('main', 'temp'):
+                    conn.execute(f"DETACH DATABASE {row[1]}")
+        except sqlite3.Error:
+            # Соединение в неясном состоянии (например, не дочитан курсор) - не переиспользуем
+            conn.close()
+            return
+        
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+    
+    def close(self):
+        """Закрыть все свободные соединения"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class PooledConnection:
+    """Соединение из пула: все как у sqlite3.Connection, но close() возвращает его в пул"""
+    
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+    
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+
 class BaseModel:
     """Базовый класс модели с общими методами для работы с БД"""
     
+    # Идентификатор узла (компьютера) для каждой БД, кэшируется на процесс
+    _node_ids = {}
+    
+    # Версия схемы таблицы; увеличивается при изменении _create_table/_ensure_sync_schema
+    SCHEMA_VERSION = 1
+    
+    # Содержимое sync_meta каждой БД, читается один раз на процесс
+    _meta_cache = {}
+    
+    # БД, режим журнала которых уже проверен этим процессом
+    _journal_ready = set()
+    
+    # Пул соединений с рабочей БД (None - каждое обращение открывает свое соединение)
+    _pool = None
+    
+    # Метки updated_at, поставленные потоком, который попросил их запоминать
+    # (окно программы: наблюдатель изменений не показывает ему его же записи)
+    _own_stamps = threading.local()
+    
+    # Мягкое удаление: запись получает в колонке deleted время удаления и остается
+    # в таблице (для отмены) до очистки purge_deleted; выборки ее не видят
+    SOFT_DELETE = False
+    
+    # Колонки колоночного снимка для аналитики: {колонка: typecode array или 'str'}
+    # и ключи, по которым снимок хранит готовые суммы месяца (None - не выгружается)
+    SNAPSHOT_COLUMNS = None
+    SNAPSHOT_GROUPS = ()
+    
+    # Закрытые годы переносятся в файлы разделов (models/partitions.py)
+    PARTITIONED = False
+    
     def __init__(self, table_name):
         self.table_name = table_name
+        
+        # Таблица уже подготовлена этой версией кода - схему не проверяем,
+        # чтобы десятки магазинов не давали десятков DDL-запросов при запуске
+        meta = self._load_meta()
+        if READ_ONLY:
+            # Архив не меняется: схема, триггеры и идентификатор узла не создаются
+            if meta.get(f"schema:{table_name}") != str(self.SCHEMA_VERSION):
+                raise sqlite3.DatabaseError(
+                    f"Таблица {table_name} архива записана старой версией программы - "
+                    f"откройте копию архива обычным запуском, чтобы обновить схему"
+                )
+            self.node_id = meta.get('node_id')
+            return
+        
+        if meta.get(f"schema:{table_name}") == str(self.SCHEMA_VERSION):
+            if meta.get('node_id'):
+                BaseModel._node_ids.setdefault(str(DB_PATH), meta['node_id'])
+            self.node_id = BaseModel._node_ids.get(str(DB_PATH))
+            self._prepare_journal()
+            return
+        
+        self._prepare_file()
+        self._prepare_journal()
         self._create_table()
+        self._ensure_sync_schema()
+        self._mark_schema_ready()
+    
+    def _load_meta(self):
+        """Служебные значения БД (идентификатор узла, версии схем таблиц)"""
+        key = str(DB_PATH)
+        if key not in BaseModel._meta_cache:
+            BaseModel._meta_cache[key] = self._read_meta()
+        return BaseModel._meta_cache[key]
+    
+    def reload_meta(self):
+        """Перечитать служебные значения, которые могла записать другая программа (разделы лет)
+        
+        Прочитанное дописывается поверх кэша: значение, которое этот процесс
+        поставил до фиксации своей транзакции (перенос года), не теряется.
+        """
+        meta = self._load_meta()
+        meta.update(self._read_meta())
+        return meta
+    
+    def _read_meta(self):
+        """Содержимое sync_meta из БД"""
+        conn = self._get_connection()
+        try:
+            rows = conn.execute("SELECT key, value FROM sync_meta").fetchall()
+        except sqlite3.OperationalError:
+            # Новая БД: служебной таблицы еще нет
+            rows = []
+        finally:
+            conn.close()
+        return {row['key']: row['value'] for row in rows}
+    
+    def _prepare_file(self):
+        """Новая (пустая) БД создается с инкрементальной очисткой свободных страниц"""
+        conn = self._get_connection()
+        try:
+            # Режим меняется только до создания первой таблицы (или полным VACUUM)
+            if conn.execute("PRAGMA page_count").fetchone()[0] == 0:
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        finally:
+            conn.close()
+    
+    def _prepare_journal(self):
+        """Перевести БД в режим журнала DB_JOURNAL_MODE (проверяется один раз на процесс)
+        
+        В режиме WAL читатели не ждут писателя и писатель не ждет читателей,
+        поэтому несколько программ работают с одним файлом одновременно.
+        Режим хранится в самом файле и действует для всех программ.
+        """
+        key = str(DB_PATH)
+        if key in BaseModel._journal_ready:
+            return
+        BaseModel._journal_ready.add(key)
+        
+        conn = self._get_connection()
+        try:
+            if conn.execute("PRAGMA journal_mode").fetchone()[0] != DB_JOURNAL_MODE.lower():
+                conn.execute(f"PRAGMA journal_mode = {DB_JOURNAL_MODE}")
+        except sqlite3.OperationalError as e:
+            # Другая программа держит БД - режим сменится при следующем запуске
+            print(f"Ошибка смены режима журнала БД: {e}")
+        finally:
+            conn.close()
+    
+    def _mark_schema_ready(self):
+        """Запомнить, что схема таблицы соответствует текущей версии"""
+        key = f"schema:{self.table_name}"
+        self._execute_batch([
+            ("CREATE TABLE IF NOT EXISTS sync_meta (key TEXT PRIMARY KEY, value TEXT)", ()),
+            ("INSERT OR REPLACE INTO sync_meta (key, value) VALUES (?, ?)", (key, str(self.SCHEMA_VERSION)))
+        ])
+        self._load_meta()[key] = str(self.SCHEMA_VERSION)
     
     def _get_connection(self):
-        """Получить соединение с БД"""
-        conn = sqlite3.connect(str(DB_PATH))
+        """Получить соединение с БД
+        
+        Занятая БД ожидается до DB_BUSY_TIMEOUT_MS. Транзакции записи начинаются
+        с BEGIN IMMEDIATE: блокировка записи берется сразу, а не при первом
+        изменении после чтения, когда SQLite уже не может подождать и сразу
+        отвечает "database is locked".
+        """
+        if READ_ONLY:
+            return self._get_archive_connection()
+        if BaseModel._pool is not None:
+            return BaseModel._pool.acquire(self._connect)
+        return self._connect()
+    
+    def _connect(self):
+        """Открыть новое соединение с рабочей БД"""
+        # Соединение из пула переходит между потоками API-сервера
+        conn = sqlite3.connect(
+            str(DB_PATH), timeout=DB_BUSY_TIMEOUT_MS / 1000, isolation_level='IMMEDIATE',
+            check_same_thread=BaseModel._pool is None
+        )
+        if DB_JOURNAL_MODE.upper() == 'WAL':
+            # В WAL этого достаточно для целостности: при сбое питания теряется только последняя транзакция
+            conn.execute("PRAGMA synchronous = NORMAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def _get_archive_connection(self):
+        """Соединение с архивом: только чтение, без блокировок, страницы через mmap
+        
+        immutable=1 обещает SQLite, что файл не меняется: нет блокировок и
+        проверок журнала на каждый запрос, поэтому соединения нескольких
+        потоков читают параллельно. Страницы mmap берутся прямо из кэша ОС
+        без копирования в кэш соединения - повторное открытие дешевое.
+        """
+        conn = sqlite3.connect(f"{Path(DB_PATH).resolve().as_uri()}?mode=ro&immutable=1", uri=True)
+        conn.execute(f"PRAGMA mmap_size = {ARCHIVE_MMAP_SIZE}")
+        conn.execute("PRAGMA query_only = 1")
         conn.row_factory = sqlite3.Row
         return conn
     
-    def _execute_query(self, query, params=(), fetchone=False, fetchall=False, commit=False):
-        """Выполнить запрос и вернуть результат"""
+    def _execute_query(self, query, params=(), fetchone=False, fetchall=False, commit=False, attach=()):
+        """Выполнить запрос и вернуть результат (attach - годы разделов из _source)
+        
+        Если БД занята другой программой дольше DB_BUSY_TIMEOUT_MS, запрос повторяется.
+        """
+        try:
+            return retry_busy(lambda: self._run_query(query, params, fetchone, fetchall, commit, attach))
+        except sqlite3.Error as e:
+            print(f"Ошибка базы данных: {e}")
+            raise e
+    
+    def _run_query(self, query, params, fetchone, fetchall, commit, attach):
+        """Одна попытка выполнить запрос в своем соединении"""
         conn = self._get_connection()
-        cursor = conn.cursor()
         
         try:
+            # Раздел может отсутствовать или быть занят - соединение закрывается и тогда
+            attach_partitions(conn, attach)
+            cursor = conn.cursor()
+            started = time.perf_counter() if profiler.enabled else None
             cursor.execute(query, params)
             
             if commit:
@@ -39,13 +321,49 @@ class BaseModel:
                 result = cursor.fetchall()
             else:
                 result = None
+            
+            if started is not None:
+                if fetchall:
+                    rows = len(result)
+                elif fetchone:
+                    rows = 1 if result is not None else 0
+                else:
+                    rows = max(cursor.rowcount, 0)
+                profiler.record(query, params, (time.perf_counter() - started) * 1000, rows, conn)
                 
             return result
-        except sqlite3.Error as e:
-            print(f"Ошибка базы данных: {e}")
+        except sqlite3.Error:
             if commit:
                 conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def _execute_batch(self, statements):
+        """Выполнить несколько запросов в одной транзакции (занятая БД - повтор всей транзакции)"""
+        statements = list(statements)
+        try:
+            return retry_busy(lambda: self._run_batch(statements))
+        except sqlite3.Error as e:
+            print(f"Ошибка базы данных: {e}")
             raise e
+    
+    def _run_batch(self, statements):
+        """Одна попытка выполнить запросы одной транзакцией"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            for query, params in statements:
+                started = time.perf_counter() if profiler.enabled else None
+                cursor.execute(query, params)
+                if started is not None:
+                    profiler.record(query, params, (time.perf_counter() - started) * 1000, max(cursor.rowcount, 0))
+            conn.commit()
+            return cursor.lastrowid
+        except sqlite3.Error:
+            conn.rollback()
+            raise
         finally:
             conn.close()
     
@@ -53,8 +371,97 @@ class BaseModel:
         """Создание таблицы (должен быть переопределен)"""
         raise NotImplementedError
     
+    def _ensure_sync_schema(self):
+        """Добавить колонки, журнал изменений и триггеры для синхронизации"""
+        conn = self._get_connection()
+        
+        try:
+            existing = {row['name'] for row in conn.execute(f"PRAGMA table_info({self.table_name})")}
+            for column, definition in SYNC_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {self.table_name} ADD COLUMN {column} {definition}")
+            
+            conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS sync_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_uuid TEXT,
+                op TEXT NOT NULL,
+                origin TEXT,
+                ts REAL NOT NULL DEFAULT 0,
+                date TEXT,
+                prev_date TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_changes_origin ON changes (origin, seq);
+            CREATE INDEX IF NOT EXISTS idx_changes_uuid ON changes (row_uuid);
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_{self.table_name}_uuid ON {self.table_name} (uuid);
+            CREATE TRIGGER IF NOT EXISTS {self.table_name}_log_insert AFTER INSERT ON {self.table_name}
+            BEGIN
+                INSERT INTO changes (table_name, row_uuid, op, origin, ts, date)
+                VALUES ('{self.table_name}', NEW.uuid, 'upsert', NEW.origin, NEW.updated_at, NEW.date);
+            END;
+            CREATE TRIGGER IF NOT EXISTS {self.table_name}_log_update AFTER UPDATE ON {self.table_name}
+            BEGIN
+                INSERT INTO changes (table_name, row_uuid, op, origin, ts, date, prev_date)
+                VALUES ('{self.table_name}', NEW.uuid, 'upsert', NEW.origin, NEW.updated_at, NEW.date, OLD.date);
+            END;
+            CREATE TRIGGER IF NOT EXISTS {self.table_name}_log_delete AFTER DELETE ON {self.table_name}
+            BEGIN
+                INSERT INTO changes (table_name, row_uuid, op, origin, ts, date)
+                VALUES ('{self.table_name}', OLD.uuid, 'delete', OLD.origin, OLD.updated_at, OLD.date);
+            END;
+            """)
+            
+            self.node_id = self._load_node_id(conn)
+            
+            # Старые записи без UUID получают его один раз; триггер обновления
+            # заносит их в журнал, поэтому при первой синхронизации они уйдут целиком
+            conn.execute(
+                f"UPDATE {self.table_name} SET uuid = lower(hex(randomblob(16))), origin = ? WHERE uuid IS NULL",
+                (self.node_id,)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def _load_node_id(self, conn):
+        """Получить (или создать) идентификатор этого узла"""
+        key = str(DB_PATH)
+        if key not in BaseModel._node_ids:
+            row = conn.execute("SELECT value FROM sync_meta WHERE key = 'node_id'").fetchone()
+            if row:
+                node_id = row['value']
+            else:
+                node_id = uuid.uuid4().hex
+                conn.execute("INSERT INTO sync_meta (key, value) VALUES ('node_id', ?)", (node_id,))
+            BaseModel._node_ids[key] = node_id
+        return BaseModel._node_ids[key]
+    
+    def _stamp(self, data):
+        """Проставить метку узла и времени изменения"""
+        data['origin'] = self.node_id
+        data['updated_at'] = time.time()
+        
+        stamps = getattr(BaseModel._own_stamps, 'stamps', None)
+        if stamps is not None:
+            stamps.add(data['updated_at'])
+        return data
+    
+    @staticmethod
+    def track_own_stamps():
+        """Запоминать метки изменений, которые ставит текущий поток; возвращает их множество"""
+        BaseModel._own_stamps.stamps = set()
+        return BaseModel._own_stamps.stamps
+    
     def add(self, data):
         """Добавление записи"""
+        data = self._stamp(dict(data))
+        data.setdefault('uuid', uuid.uuid4().hex)
+        
         placeholders = ', '.join(['?' for _ in data])
         columns = ', '.join(data.keys())
         values = list(data.values())
@@ -62,8 +469,27 @@ class BaseModel:
         query = f"INSERT INTO {self.table_name} ({columns}) VALUES ({placeholders})"
         return self._execute_query(query, values, commit=True)
     
+    def add_many(self, rows):
+        """Добавление нескольких записей одной транзакцией"""
+        statements = []
+        for data in rows:
+            data = self._stamp(dict(data))
+            data.setdefault('uuid', uuid.uuid4().hex)
+            
+            placeholders = ', '.join(['?' for _ in data])
+            columns = ', '.join(data.keys())
+            statements.append((
+                f"INSERT INTO {self.table_name} ({columns}) VALUES ({placeholders})",
+                list(data.values())
+            ))
+        
+        if statements:
+            self._execute_batch(statements)
+        return len(statements)
+    
     def update(self, id, data):
         """Обновление записи"""
+        data = self._stamp(dict(data))
         set_clause = ', '.join([f"{key}=?" for key in data.keys()])
         values = list(data.values()) + [id]
         
@@ -72,14 +498,241 @@ class BaseModel:
     
     def delete(self, id):
         """Удаление записи"""
-        query = f"DELETE FROM {self.table_name} WHERE id=?"
-        self._execute_query(query, (id,), commit=True)
+        # Сначала помечаем запись своим узлом, чтобы удаление попало в журнал
+        # как локальное изменение и ушло при синхронизации
+        stamp = self._stamp({})
+        self._execute_batch([
+            (f"UPDATE {self.table_name} SET origin=?, updated_at=? WHERE id=?",
+             (stamp['origin'], stamp['updated_at'], id)),
+            (f"DELETE FROM {self.table_name} WHERE id=?", (id,))
+        ])
+    
+    def _ensure_soft_delete(self):
+        """Добавить колонку deleted (0 - запись действует) в существующую таблицу"""
+        columns = {row['name'] for row in self._execute_query(f"PRAGMA table_info({self.table_name})", fetchall=True)}
+        if 'deleted' not in columns:
+            self._execute_query(
+                f"ALTER TABLE {self.table_name} ADD COLUMN deleted REAL NOT NULL DEFAULT 0",
+                commit=True
+            )
+        
+        # Удаленные записи в отдельном маленьком индексе - очистке не нужен полный просмотр
+        self._execute_query(
+            f"CREATE INDEX IF NOT EXISTS idx_{self.table_name}_tombstones ON {self.table_name} (deleted) WHERE deleted > 0",
+            commit=True
+        )
+    
+    def soft_delete(self, id):
+        """Пометить запись удаленной (отменяется restore)"""
+        stamp = self._stamp({})
+        self._execute_query(
+            f"UPDATE {self.table_name} SET deleted=?, origin=?, updated_at=? WHERE id=?",
+            (stamp['updated_at'], stamp['origin'], stamp['updated_at'], id),
+            commit=True
+        )
+    
+    def restore(self, id):
+        """Вернуть мягко удаленную запись"""
+        stamp = self._stamp({})
+        self._execute_query(
+            f"UPDATE {self.table_name} SET deleted=0, origin=?, updated_at=? WHERE id=?",
+            (stamp['origin'], stamp['updated_at'], id),
+            commit=True
+        )
+    
+    def purge_deleted(self, older_than):
+        """Окончательно удалить записи, помеченные удаленными раньше older_than (time.time())
+        
+        Метка узла у таких записей уже своя (ее ставит soft_delete), поэтому
+        триггер заносит удаление в журнал как локальное и синхронизация
+        отправляет его. Узлы, уже получившие мягкое удаление, отбросят
+        повтор по правилу "последняя запись побеждает", а узел, с которым
+        синхронизации еще не было, получит удаление только так.
+        """
+        self._execute_query(
+            f"DELETE FROM {self.table_name} WHERE deleted > 0 AND deleted < ?",
+            (older_than,),
+            commit=True
+        )
+    
+    def is_deleted(self, row):
+        """Помечена ли строка БД удаленной"""
+        return self.SOFT_DELETE and bool(row['deleted'])
+    
+    def replace_value(self, column, old_value, new_value):
+        """Заменить значение колонки во всех записях (с меткой изменения для синхронизации)"""
+        stamp = self._stamp({})
+        self._execute_query(
+            f"UPDATE {self.table_name} SET {column}=?, origin=?, updated_at=? WHERE {column}=?",
+            (new_value, stamp['origin'], stamp['updated_at'], old_value),
+            commit=True
+        )
+    
+    def sync_export_row(self, conn, row):
+        """Преобразовать строку БД в переносимый вид для синхронизации"""
+        data = dict(row)
+        data.pop('id', None)
+        # Удаление передается операцией delete, отметка остается местной
+        data.pop('deleted', None)
+        return data
+    
+    def sync_import_row(self, conn, data):
+        """Преобразовать переносимые данные обратно в колонки таблицы"""
+        data = dict(data)
+        if self.SOFT_DELETE:
+            # Пришедшая версия записи действующая, даже если здесь она была удалена раньше
+            data['deleted'] = 0
+        return data
+    
+    def track_partition_write(self, conn, old, new):
+        """Учесть в итогах запись синхронизации в раздел закрытого года
+        
+        У разделов нет триггеров, поэтому итоги, которые в рабочей таблице
+        ведут триггеры (остатки, итоги продавцов), меняются здесь в той же
+        транзакции: old - строка до записи, new - после (None - строки нет).
+        """
     
     def get_by_id(self, id):
         """Получить запись по ID"""
         query = f"SELECT * FROM {self.table_name} WHERE id=?"
         return self._execute_query(query, (id,), fetchone=True)
     
+    def get_record(self, id):
+        """Получить запись по ID в формате отображения"""
+        row = self.get_by_id(id)
+        if row is None:
+            return None
+        return self._to_record(row)
+    
+    def get_records(self, ids):
+        """Записи по списку ID в формате отображения (одним запросом)"""
+        ids = list(ids)
+        if not ids:
+            return []
+        
+        placeholders = ', '.join('?' for _ in ids)
+        query = f"SELECT * FROM {self.table_name} WHERE id IN ({placeholders})"
+        return [self._to_record(row) for row in self._execute_query(query, ids, fetchall=True)]
+    
+    def get_ids_by_uuid(self, uuids):
+        """id записей по uuid: {uuid: id} (только записи, которые есть в таблице)"""
+        uuids = list(uuids)
+        result = {}
+        
+        # Порциями, чтобы не упереться в лимит параметров SQLite
+        for start in range(0, len(uuids), 500):
+            chunk = uuids[start:start + 500]
+            placeholders = ', '.join('?' for _ in chunk)
+            rows = self._execute_query(
+                f"SELECT id, uuid FROM {self.table_name} WHERE uuid IN ({placeholders})",
+                chunk,
+                fetchall=True
+            )
+            result.update({row['uuid']: row['id'] for row in rows})
+        return result
+    
+    def _to_record(self, row):
+        """Строка БД в формате отображения"""
+        record = dict(row)
+        record['date'] = self.format_date_for_display(record['date'])
+        return record
+    
+    def partition_years(self):
+        """Закрытые годы таблицы, перенесенные в разделы"""
+        value = self._load_meta().get(f"partitions:{self.table_name}")
+        return [int(year) for year in value.split(',')] if value else []
+    
+    def is_closed(self, date):
+        """Дата (формат БД или отображения) в закрытом году: такие записи только просматриваются
+        
+        Строки года перенесены в раздел, а изменение и удаление работают
+        с рабочей таблицей (там же триггеры журнала синхронизации и склада).
+        """
+        year = str(date or '')
+        year = year[-4:] if '.' in year else year[:4]
+        return year.isdigit() and int(year) in self.partition_years()
+    
+    def _source(self, date_from=None, date_to=None):
+        """Источник строк периода для FROM и годы разделов, которые нужно подключить
+        
+        Подключаются только разделы, пересекающиеся с периодом. Текущая таблица
+        читается всегда: по индексу даты это дешево, а запись закрытого года,
+        пришедшая синхронизацией, лежит в ней до следующего переноса.
+        """
+        years = [
+            year for year in self.partition_years()
+            if (not date_from or date_from[:4] <= str(year)) and (not date_to or str(year) <= date_to[:4])
+        ]
+        if not years:
+            return self.table_name, ()
+        
+        parts = [f"SELECT * FROM p{year}.{self.table_name}" for year in years]
+        parts.append(f"SELECT * FROM main.{self.table_name}")
+        return f"({' UNION ALL '.join(parts)}) AS {self.table_name}", years
+    
+    def _period_conditions(self, date_from=None, date_to=None, filters=None):
+        """Условия WHERE для периода и фильтров по колонкам (без удаленных записей)"""
+        conditions = ["deleted = 0"] if self.SOFT_DELETE else []
+        params = []
+        
+        if date_from and date_to:
+            conditions.append("date BETWEEN ? AND ?")
+            params.extend([date_from, date_to])
+        elif date_from:
+            conditions.append("date >= ?")
+            params.append(date_from)
+        elif date_to:
+            conditions.append("date <= ?")
+            params.append(date_to)
+        
+        for column, value in (filters or {}).items():
+            conditions.append(f"{column} = ?")
+            params.append(value)
+        
+        return conditions, params
+    
+    @staticmethod
+    def _where(conditions):
+        """Предложение WHERE из списка условий (пустая строка без условий)"""
+        return " WHERE " + " AND ".join(conditions) if conditions else ""
+    
+    def count_rows(self, date_from=None, date_to=None, filters=None):
+        """Количество записей за период"""
+        conditions, params = self._period_conditions(date_from, date_to, filters)
+        source, years = self._source(date_from, date_to)
+        query = f"SELECT COUNT(*) as count FROM {source}" + self._where(conditions)
+        
+        result = self._execute_query(query, params, fetchone=True, attach=years)
+        return result['count'] if result else 0
+    
+    def iter_rows(self, date_from=None, date_to=None, filters=None, page_size=REPORT_FETCH_SIZE):
+        """Записи за период в порядке (date, id), страницами по ключу
+        
+        Каждая страница - отдельный запрос "после последней строки", поэтому
+        в памяти не больше page_size строк при любом объеме отчета.
+        """
+        conditions, params = self._period_conditions(date_from, date_to, filters)
+        source, years = self._source(date_from, date_to)
+        last = None
+        
+        while True:
+            page_conditions = list(conditions)
+            page_params = list(params)
+            if last:
+                page_conditions.append("(date, id) > (?, ?)")
+                page_params.extend(last)
+            
+            query = f"SELECT * FROM {source}" + self._where(page_conditions)
+            query += " ORDER BY date, id LIMIT ?"
+            
+            rows = self._execute_query(query, page_params + [page_size], fetchall=True, attach=years)
+            for row in rows:
+                yield self._to_record(row)
+            
+            if len(rows) < page_size:
+                return
+            last = (rows[-1]['date'], rows[-1]['id'])
+    
     @staticmethod
     def parse_date(date_str):
         """Преобразование строки в объект date"""
@@ -111,3 +764,10 @@ class BaseModel:
             return date_obj.strftime("%d.%m.%Y")
         except:
             return date_str
+
+
+def use_connection_pool(size):
+    """Переиспользовать соединения с рабочей БД (не больше size свободных); вызывается до запросов из потоков"""
+    if BaseModel._pool is None:
+        BaseModel._pool = ConnectionPool(size)
+    return BaseModel._pool
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+"""
+Справочники товаров и продавцов: название <-> целочисленный id
+"""
+
+from models.base_model import BaseModel
+
+
+class CatalogModel(BaseModel):
+    """Справочник названий с кэшем id <-> название на процесс
+    
+    Строки справочника не удаляются и не меняются, поэтому однажды
+    прочитанная пара id-название остается верной до конца работы программы.
+    """
+    
+    def __init__(self, table_name):
+        super().__init__(table_name)
+        self._ids = {}    # название -> id
+        self._names = {}  # id -> название
+        self._loaded = False
+    
+    def _create_table(self):
+        """Создание таблицы справочника"""
+        self._execute_query(f"""
+        CREATE TABLE IF NOT EXISTS {self.table_name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE
+        )
+        """, commit=True)
+    
+    def _ensure_sync_schema(self):
+        """Справочник локален: при синхронизации передаются названия, а не id"""
+    
+    def _load(self, conn=None):
+        """Прочитать справочник целиком в кэш"""
+        query = f"SELECT id, name FROM {self.table_name}"
+        rows = conn.execute(query).fetchall() if conn is not None else self._execute_query(query, fetchall=True)
+        self._ids = {row[1]: row[0] for row in rows}
+        self._names = {row[0]: row[1] for row in rows}
+        self._loaded = True
+    
+    def id_for(self, name, conn=None):
+        """id названия; новое название добавляется в справочник
+        
+        С переданным соединением (импорт при синхронизации) запись идет в его
+        транзакции, и новый id в кэш не попадает до следующего чтения справочника.
+        """
+        if name is None:
+            return None
+        name = str(name)
+        
+        if not self._loaded:
+            self._load(conn)
+        if name in self._ids:
+            return self._ids[name]
+        
+        if conn is not None:
+            row = conn.execute(f"SELECT id FROM {self.table_name} WHERE name = ?", (name,)).fetchone()
+            if row:
+                return row[0]
+            return conn.execute(f"INSERT INTO {self.table_name} (name) VALUES (?)", (name,)).lastrowid
+        
+        self._execute_query(f"INSERT OR IGNORE INTO {self.table_name} (name) VALUES (?)", (name,), commit=True)
+        row = self._execute_query(f"SELECT id FROM {self.table_name} WHERE name = ?", (name,), fetchone=True)
+        self._ids[name] = row['id']
+        self._names[row['id']] = name
+        return row['id']
+    
+    def find_id(self, name):
+        """id названия без добавления в справочник (None, если названия нет)"""
+        if not self._loaded or name not in self._ids:
+            self._load()
+        return self._ids.get(name)
+    
+    def name_for(self, id, conn=None):
+        """Название по id (пустая строка для NULL)"""
+        if id is None:
+            return ''
+        if id not in self._names:
+            # id мог добавить другой процесс или синхронизация
+            self._load(conn)
+        return self._names.get(id, '')
+
+
+_items = None
+_sellers = None
+
+
+def get_items():
+    """Общий справочник товаров процесса"""
+    global _items
+    if _items is None:
+        _items = CatalogModel("items")
+    return _items
+
+
+def get_sellers():
+    """Общий справочник продавцов процесса"""
+    global _sellers
+    if _sellers is None:
+        _sellers = CatalogModel("sellers")
+    return _sellers
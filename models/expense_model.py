@@ -4,12 +4,20 @@
 Модель для работы с расходами
 """
 
+import uuid
 from models.base_model import BaseModel
 
 
 class ExpenseModel(BaseModel):
     """Модель для работы с расходами"""
     
+    # 2: мягкое удаление (колонка deleted, частичные индексы)
+    SCHEMA_VERSION = 2
+    SOFT_DELETE = True
+    SNAPSHOT_COLUMNS = {'shop': 'str', 'amount': 'd'}
+    SNAPSHOT_GROUPS = ('shop',)
+    PARTITIONED = True
+    
     def __init__(self):
         super().__init__("expenses")
     
@@ -26,16 +34,51 @@ class ExpenseModel(BaseModel):
         )
         """
         self._execute_query(query, commit=True)
+        
+        self._ensure_soft_delete()
+        
+        # Все выборки фильтруют по дате и видят только действующие записи
+        self._execute_batch([
+            ("DROP INDEX IF EXISTS idx_expenses_date", ()),
+            ("CREATE INDEX IF NOT EXISTS idx_expenses_live ON expenses (date, shop) WHERE deleted = 0", ())
+        ])
     
-    def add(self, data):
-        """Добавление записи о расходе"""
+    def _prepare_new(self, data):
+        """Подготовка новой записи о расходе"""
         data_copy = dict(data)
         
         # Преобразуем дату
         if 'date' in data_copy:
             data_copy['date'] = self.format_date_for_db(data_copy['date'])
         
-        return super().add(data_copy)
+        # Колонка descr обязательна, а форма ввода её не заполняет
+        data_copy.setdefault('descr', '')
+        
+        return data_copy
+    
+    def pending_record(self, data):
+        """Новая запись в формате отображения до записи в БД (id - uuid будущей строки)"""
+        amount = float(data.get('amount', 0))
+        row_uuid = uuid.uuid4().hex
+        return {
+            'id': row_uuid,
+            'uuid': row_uuid,
+            'date': self.format_date_for_display(self.format_date_for_db(data.get('date'))),
+            'shop': data.get('shop', ''),
+            'item': data.get('item', ''),
+            'descr': data.get('descr', ''),
+            'amount': amount,
+            'deleted': 0,
+            'pending': True
+        }
+    
+    def add(self, data):
+        """Добавление записи о расходе"""
+        return super().add(self._prepare_new(data))
+    
+    def add_many(self, rows):
+        """Добавление нескольких записей о расходах"""
+        return super().add_many([self._prepare_new(data) for data in rows])
     
     def update(self, id, data):
         """Обновление записи"""
@@ -47,52 +90,46 @@ class ExpenseModel(BaseModel):
         
         super().update(id, data_copy)
     
+    def _shop_filter(self, shop):
+        """Фильтр по магазину ("Все" - без фильтра)"""
+        return {'shop': shop} if shop and shop != "Все" else None
+    
     def get_all(self, date_from=None, date_to=None, shop=None):
         """Получение всех записей с фильтрацией"""
-        query = "SELECT * FROM expenses"
-        conditions = []
-        params = []
-        
-        if date_from and date_to:
-            conditions.append("date BETWEEN ? AND ?")
-            params.extend([date_from, date_to])
-        
-        if shop and shop != "Все":
-            conditions.append("shop = ?")
-            params.append(shop)
+        conditions, params = self._period_conditions(date_from, date_to, self._shop_filter(shop))
+        source, years = self._source(date_from, date_to)
+        query = f"SELECT * FROM {source}" + self._where(conditions) + " ORDER BY date DESC, id ASC"
         
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-        
-        query += " ORDER BY date DESC, id ASC"
-        
-        rows = self._execute_query(query, params, fetchall=True)
+        rows = self._execute_query(query, params, fetchall=True, attach=years)
         
         # Преобразуем даты
-        result = []
-        for row in rows:
-            row_dict = dict(row)
-            row_dict['date'] = self.format_date_for_display(row_dict['date'])
-            result.append(row_dict)
-        
-        return result
+        return [self._to_record(row) for row in rows]
     
     def get_total_sum(self, date_from=None, date_to=None, shop=None):
         """Получение суммы расходов за период"""
-        query = "SELECT SUM(amount) as total FROM expenses"
-        conditions = []
-        params = []
+        conditions, params = self._period_conditions(date_from, date_to, self._shop_filter(shop))
+        source, years = self._source(date_from, date_to)
+        query = f"SELECT SUM(amount) as total FROM {source}" + self._where(conditions)
         
-        if date_from and date_to:
-            conditions.append("date BETWEEN ? AND ?")
-            params.extend([date_from, date_to])
-        
-        if shop and shop != "Все":
-            conditions.append("shop = ?")
-            params.append(shop)
+        result = self._execute_query(query, params, fetchone=True, attach=years)
+        return result['total'] if result and result['total'] else 0
+    
+    def get_daily_totals(self, date_from=None, date_to=None, shop=None):
+        """Количество расходов и сумма по дням за период (одним сгруппированным запросом)"""
+        conditions, params = self._period_conditions(date_from, date_to, self._shop_filter(shop))
+        source, years = self._source(date_from, date_to)
+        query = f"SELECT date, COUNT(*) as count, SUM(amount) as total FROM {source}"
+        query += self._where(conditions) + " GROUP BY date ORDER BY date"
         
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
+        rows = self._execute_query(query, params, fetchall=True, attach=years)
+        return [dict(row) for row in rows]
+    
+    def get_shop_totals(self, date_from=None, date_to=None):
+        """Сумма расходов по магазинам за период (одним сгруппированным запросом)"""
+        conditions, params = self._period_conditions(date_from, date_to)
+        source, years = self._source(date_from, date_to)
+        query = f"SELECT shop, COUNT(*) as count, SUM(amount) as total FROM {source}"
+        query += self._where(conditions) + " GROUP BY shop ORDER BY shop"
         
-        result = self._execute_query(query, params, fetchone=True)
-        return result['total'] if result and result['total'] else 0
+        rows = self._execute_query(query, params, fetchall=True, attach=years)
+        return [dict(row) for row in rows]
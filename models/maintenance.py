@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+"""
+Обслуживание рабочей БД: очистка свободных страниц, статистика планировщика, проверка целостности
+"""
+
+import sqlite3
+import time
+from config import (
+    DB_PATH, MAINTENANCE_SLICE_MS, MAINTENANCE_MAX_SLICE_MS, MAINTENANCE_VACUUM_PAGES,
+    MAINTENANCE_ANALYSIS_LIMIT, MAINTENANCE_ANALYZE_HOURS, MAINTENANCE_CHECK_HOURS
+)
+
+
+# Задачи обслуживания в порядке выполнения
+TASK_TITLES = {
+    'vacuum': "Очистка",
+    'analyze': "Статистика",
+    'check': "Проверка"
+}
+
+
+class SliceTimeout(Exception):
+    """Порция работы не уложилась в отведенное время и была прервана"""
+
+
+class DatabaseMaintenance:
+    """Задачи обслуживания, выполняемые короткими порциями
+    
+    Каждая задача - генератор: один шаг (next) - одна порция работы не
+    дольше slice_ms (обработчик прогресса SQLite прерывает запрос по
+    истечении времени), между порциями приложение обрабатывает ввод.
+    Генератор отдает строку состояния после каждой порции. Время последнего
+    полного прохода задачи хранится в sync_meta (maintenance:<задача>).
+    
+    Таблица, которую ANALYZE или quick_check не успели обработать за
+    порцию, повторяется в конце прохода с вдвое большим пределом, но не
+    дольше MAINTENANCE_MAX_SLICE_MS. Соединение не ждет блокировок: если
+    БД занята записью, порция пропускается и повторяется в следующую паузу.
+    """
+    
+    def __init__(self, slice_ms=MAINTENANCE_SLICE_MS):
+        self.slice_ms = slice_ms  # None - без ограничения (консольный режим)
+    
+    def _connect(self, slice_ms=None):
+        """Соединение без ожидания блокировок, прерываемое по времени порции"""
+        conn = sqlite3.connect(str(DB_PATH), timeout=0)
+        # ANALYZE читает выборку строк каждого индекса, а не весь индекс
+        conn.execute(f"PRAGMA analysis_limit = {MAINTENANCE_ANALYSIS_LIMIT}")
+        slice_ms = slice_ms or self.slice_ms
+        if slice_ms is not None:
+            deadline = time.perf_counter() + slice_ms / 1000
+            conn.set_progress_handler(lambda: time.perf_counter() > deadline, 1000)
+        return conn
+    
+    def _run(self, query, params=(), slice_ms=None, script=False):
+        """Выполнить запрос одной порцией; строки результата"""
+        conn = self._connect(slice_ms)
+        try:
+            if script:
+                # executescript выполняет PRAGMA до конца (execute - только первый шаг)
+                conn.executescript(query)
+                return []
+            rows = conn.execute(query, params).fetchall()
+            conn.commit()
+            return rows
+        except sqlite3.OperationalError as e:
+            if str(e) == 'interrupted':
+                raise SliceTimeout(query) from e
+            raise
+        finally:
+            conn.close()
+    
+    def _pragma(self, name):
+        """Значение PRAGMA рабочей БД"""
+        return self._run(f"PRAGMA {name}")[0][0]
+    
+    def _last_run(self, task):
+        """Время последнего полного прохода задачи (0 - еще не выполнялась)"""
+        rows = self._run(f"SELECT value FROM sync_meta WHERE key = 'maintenance:{task}'")
+        return float(rows[0][0]) if rows else 0
+    
+    def _mark_done(self, task):
+        """Запомнить время полного прохода задачи"""
+        self._run(
+            "INSERT OR REPLACE INTO sync_meta (key, value) VALUES (?, ?)",
+            (f"maintenance:{task}", str(time.time()))
+        )
+    
+    def _tables(self):
+        """Таблицы рабочей БД (без служебных таблиц SQLite)"""
+        rows = self._run("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")
+        return [row[0] for row in rows]
+    
+    def status(self):
+        """Состояние файла: режим очистки, страницы всего и свободные"""
+        return {
+            'auto_vacuum': self._pragma('auto_vacuum') == 2,
+            'pages': self._pragma('page_count'),
+            'free_pages': self._pragma('freelist_count')
+        }
+    
+    def due_tasks(self, now=None):
+        """Задачи, которым пора выполняться"""
+        now = now or time.time()
+        due = []
+        
+        # Свободные страницы возвращаются в ОС только в инкрементальном режиме
+        if self._pragma('auto_vacuum') == 2 and self._pragma('freelist_count') > 0:
+            due.append('vacuum')
+        if now - self._last_run('analyze') >= MAINTENANCE_ANALYZE_HOURS * 3600:
+            due.append('analyze')
+        if now - self._last_run('check') >= MAINTENANCE_CHECK_HOURS * 3600:
+            due.append('check')
+        return due
+    
+    def run(self, task):
+        """Генератор порций задачи"""
+        return getattr(self, f"_{task}")()
+    
+    def _vacuum(self):
+        """Вернуть свободные страницы файла порциями по MAINTENANCE_VACUUM_PAGES"""
+        freed = 0
+        while True:
+            before = self._pragma('freelist_count')
+            if before == 0:
+                break
+            try:
+                self._run(f"PRAGMA incremental_vacuum({MAINTENANCE_VACUUM_PAGES})", script=True)
+            except SliceTimeout:
+                yield f"освобождено страниц: {freed}, прервано по времени"
+                return
+            freed += before - self._pragma('freelist_count')
+            yield f"освобождено страниц: {freed}"
+    
+    def _per_table(self, query):
+        """Выполнить запрос для каждой таблицы; отдает (номер, всего, строки или None)
+        
+        Не уложившиеся таблицы повторяются с удвоенным пределом порции;
+        None - таблица не уложилась и в MAINTENANCE_MAX_SLICE_MS.
+        """
+        tables = self._tables()
+        pending = [(table, self.slice_ms) for table in tables]
+        done = 0
+        while pending:
+            table, slice_ms = pending.pop(0)
+            try:
+                rows = self._run(query.format(table=table), slice_ms=slice_ms)
+            except SliceTimeout:
+                if slice_ms is not None and slice_ms < MAINTENANCE_MAX_SLICE_MS:
+                    pending.append((table, min(slice_ms * 2, MAINTENANCE_MAX_SLICE_MS)))
+                    continue
+                rows = None
+            done += 1
+            yield table, f"таблиц {done} из {len(tables)}", rows
+    
+    def _analyze(self):
+        """Обновить статистику планировщика по таблицам (по таблице за порцию)"""
+        count = 0
+        skipped = []
+        for table, progress, rows in self._per_table('ANALYZE "{table}"'):
+            if rows is None:
+                skipped.append(table)
+            else:
+                count += 1
+            yield progress
+        
+        # Собранная статистика сразу попадает в планы (и пересчитывается, если устарела)
+        try:
+            self._run("PRAGMA optimize")
+        except SliceTimeout:
+            pass
+        self._mark_done('analyze')
+        result = f"обновлена, таблиц: {count}"
+        yield result + (f", не уложились по времени: {', '.join(skipped)}" if skipped else "")
+    
+    def _check(self):
+        """Быстрая проверка целостности (quick_check) по таблице за порцию"""
+        problems = []
+        skipped = []
+        for table, progress, rows in self._per_table('PRAGMA quick_check("{table}")'):
+            if rows is None:
+                skipped.append(table)
+            else:
+                problems.extend(row[0] for row in rows if row[0] != 'ok')
+            yield progress
+        
+        for problem in problems:
+            print(f"Ошибка целостности БД: {problem}")
+        self._mark_done('check')
+        result = f"найдены ошибки: {len(problems)}" if problems else "ошибок нет"
+        yield result + (f", не уложились по времени: {', '.join(skipped)}" if skipped else "")
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+"""
+Разделы по годам: закрытые годы продаж и расходов в отдельных файлах БД
+"""
+
+import re
+import sqlite3
+import time
+from datetime import date, timedelta
+from config import PARTITION_CLOSE_AFTER_DAYS
+from models.base_model import attach_partitions
+
+
+def last_closed_year(today=None):
+    """Последний год, который можно закрыть: прошло PARTITION_CLOSE_AFTER_DAYS после его конца"""
+    today = today or date.today()
+    return (today - timedelta(days=PARTITION_CLOSE_AFTER_DAYS)).year - 1
+
+
+class YearPartitioner:
+    """Перенос закрытых лет из рабочей БД в файлы finance_ГГГГ.db
+    
+    Строки года переносятся вместе с id и uuid одной транзакцией на обе БД;
+    триггеры таблицы на время переноса снимаются, поэтому перенос не попадает
+    в журнал синхронизации и не меняет остатки склада. Список разделов
+    таблицы хранится в sync_meta рабочей БД (partitions:<таблица>), модели
+    подключают из него только годы запрошенного периода. Другие программы
+    узнают о переносе по строке журнала changes с операцией 'partition'.
+    Записи закрытых лет в программе только просматриваются; изменения с
+    других узлов синхронизация пишет прямо в раздел. Остатки склада и итоги
+    продавцов при этом не пересчитываются сами (их триггеры есть только у
+    рабочих таблиц) - такую запись учитывает track_partition_write модели.
+    
+    Повторный перенос того же года дописывает в раздел поздние записи
+    (например, пришедшие синхронизацией) с заменой по uuid. В режиме WAL
+    фиксация в двух файлах не атомарна как целое: если программа упадет
+    между ними, строки останутся и в разделе, и в рабочей таблице до
+    следующего переноса, который уберет их из рабочей таблицы.
+    """
+    
+    def __init__(self, models):
+        self.models = [model for model in models if model.PARTITIONED]
+    
+    def close_years(self, today=None):
+        """Перенести все закрытые годы; {год: перенесено строк}"""
+        last_year = last_closed_year(today)
+        moved = {}
+        for model in self.models:
+            for year in self._years_to_move(model, last_year):
+                moved[year] = moved.get(year, 0) + self.close_year(model, year)
+        return moved
+    
+    def _years_to_move(self, model, last_year):
+        """Годы закрытого периода, строки которых еще лежат в рабочей таблице"""
+        # Действующие и удаленные строки - по своим частичным индексам, без полного просмотра
+        parts = ["deleted = 0", "deleted > 0"] if model.SOFT_DELETE else ["1"]
+        query = " UNION ".join(
+            f"SELECT DISTINCT substr(date, 1, 4) as year FROM {model.table_name} WHERE {part} AND date < ?"
+            for part in parts
+        )
+        rows = model._execute_query(query, [f"{last_year + 1}-01-01"] * len(parts), fetchall=True)
+        return [int(row['year']) for row in rows if row['year'] and row['year'].isdigit()]
+    
+    def close_year(self, model, year):
+        """Перенести строки одного года таблицы в раздел; число перенесенных строк"""
+        table = model.table_name
+        alias = f"p{year}"
+        self._prepare_partition(model, year)
+        
+        # Читатели видят раздел до переноса: пока строки не перенесены,
+        # они есть только в рабочей таблице, после - только в разделе
+        years = sorted(set(model.partition_years()) | {year})
+        value = ','.join(str(y) for y in years)
+        model._load_meta()[f"partitions:{table}"] = value
+        
+        conn = model._get_connection()
+        try:
+            attach_partitions(conn, [year])
+            conn.execute("BEGIN IMMEDIATE")
+            triggers = conn.execute(
+                "SELECT name, sql FROM main.sqlite_master WHERE type = 'trigger' AND tbl_name = ?",
+                (table,)
+            ).fetchall()
+            for trigger in triggers:
+                conn.execute(f"DROP TRIGGER main.{trigger['name']}")
+            
+            period = (f"{year}-01-01", f"{year}-12-31")
+            cursor = conn.execute(
+                f"INSERT OR REPLACE INTO {alias}.{table} SELECT * FROM main.{table} WHERE date BETWEEN ? AND ?",
+                period
+            )
+            moved = cursor.rowcount
+            conn.execute(f"DELETE FROM main.{table} WHERE date BETWEEN ? AND ?", period)
+            
+            for trigger in triggers:
+                conn.execute(trigger['sql'])
+            conn.execute(
+                "INSERT OR REPLACE INTO main.sync_meta (key, value) VALUES (?, ?)",
+                (f"partitions:{table}", value)
+            )
+            # Строка без uuid и дат: синхронизация и снимок ее пропускают,
+            # а наблюдатель изменений других программ перечитывает список разделов
+            conn.execute(
+                "INSERT INTO main.changes (table_name, op, origin, ts) VALUES (?, 'partition', ?, ?)",
+                (table, model.node_id, time.time())
+            )
+            conn.commit()
+            return moved
+        except sqlite3.Error as e:
+            print(f"Ошибка переноса {table} за {year} год: {e}")
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def _prepare_partition(self, model, year):
+        """Создать в разделе таблицу по образцу рабочей и добавить недостающие колонки"""
+        table = model.table_name
+        alias = f"p{year}"
+        conn = model._get_connection()
+        
+        try:
+            attach_partitions(conn, [year])
+            sql = conn.execute(
+                "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+            ).fetchone()['sql']
+            conn.execute(re.sub(
+                r'^CREATE TABLE\s+(IF NOT EXISTS\s+)?("[^"]+"|\S+?)\s*\(',
+                f'CREATE TABLE IF NOT EXISTS {alias}.{table} (',
+                sql
+            ))
+            
+            # Колонки, добавленные в рабочую таблицу после создания раздела
+            # (ALTER дописывает их в конец, поэтому порядок для SELECT * совпадает)
+            existing = {row['name'] for row in conn.execute(f"PRAGMA {alias}.table_info({table})")}
+            for column in conn.execute(f"PRAGMA main.table_info({table})").fetchall():
+                if column['name'] not in existing:
+                    default = f" DEFAULT {column['dflt_value']}" if column['dflt_value'] is not None else ""
+                    conn.execute(f"ALTER TABLE {alias}.{table} ADD COLUMN {column['name']} {column['type']}{default}")
+            
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {alias}.idx_{table}_date ON {table} (date)")
+            conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {alias}.idx_{table}_uuid ON {table} (uuid)")
+            conn.commit()
+        finally:
+            conn.close()
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+"""
+Профилирование запросов к БД
+"""
+
+import json
+import re
+import threading
+import time
+from collections import deque
+from config import PROFILER_SLOW_MS
+
+
+class QueryProfiler:
+    """Сбор статистики по запросам, сгруппированной по нормализованному SQL
+    
+    Пока профилировщик выключен, BaseModel проверяет только флаг enabled,
+    поэтому в обычной работе он почти ничего не стоит.
+    """
+    
+    _literal_re = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+    _in_list_re = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+    _space_re = re.compile(r"\s+")
+    
+    def __init__(self, slow_threshold_ms=PROFILER_SLOW_MS):
+        self.enabled = False
+        self.slow_threshold_ms = slow_threshold_ms
+        self.explain_slow = True
+        self._stats = {}
+        self._slow = deque(maxlen=100)
+        self._lock = threading.Lock()
+    
+    def enable(self, slow_threshold_ms=None, explain_slow=True):
+        """Включить сбор статистики"""
+        if slow_threshold_ms is not None:
+            self.slow_threshold_ms = slow_threshold_ms
+        self.explain_slow = explain_slow
+        self.enabled = True
+    
+    def disable(self):
+        """Выключить сбор статистики"""
+        self.enabled = False
+    
+    def reset(self):
+        """Очистить накопленную статистику"""
+        with self._lock:
+            self._stats = {}
+            self._slow.clear()
+    
+    @classmethod
+    def normalize(cls, query):
+        """Привести SQL к виду без литералов и лишних пробелов"""
+        query = cls._literal_re.sub('?', query)
+        query = cls._in_list_re.sub('(...)', query)
+        return cls._space_re.sub(' ', query).strip()
+    
+    def record(self, query, params, elapsed_ms, rows, conn=None):
+        """Учесть выполненный запрос"""
+        key = self.normalize(query)
+        plan = None
+        
+        # План снимается на том же соединении, пока оно открыто
+        if (elapsed_ms >= self.slow_threshold_ms and self.explain_slow and conn is not None
+                and key.upper().startswith(('SELECT', 'WITH'))):
+            try:
+                plan = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+            except Exception as e:
+                plan = [f"не удалось получить план: {e}"]
+        
+        with self._lock:
+            stat = self._stats.get(key)
+            if stat is None:
+                stat = self._stats[key] = {
+                    'query': key,
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'rows': 0,
+                    'slow': 0
+                }
+            stat['count'] += 1
+            stat['total_ms'] += elapsed_ms
+            stat['max_ms'] = max(stat['max_ms'], elapsed_ms)
+            stat['rows'] += rows or 0
+            
+            if elapsed_ms >= self.slow_threshold_ms:
+                stat['slow'] += 1
+                self._slow.append({
+                    'query': key,
+                    'elapsed_ms': round(elapsed_ms, 3),
+                    'rows': rows,
+                    'time': time.strftime("%H:%M:%S"),
+                    'plan': plan
+                })
+    
+    def snapshot(self):
+        """Статистика, отсортированная по суммарному времени"""
+        with self._lock:
+            stats = [dict(stat) for stat in self._stats.values()]
+            slow = list(self._slow)
+        
+        for stat in stats:
+            stat['avg_ms'] = stat['total_ms'] / stat['count']
+        stats.sort(key=lambda s: s['total_ms'], reverse=True)
+        return {'queries': stats, 'slow': slow}
+    
+    def dump_json(self, path):
+        """Сохранить статистику в JSON-файл"""
+        data = self.snapshot()
+        data['slow_threshold_ms'] = self.slow_threshold_ms
+        data['saved_at'] = time.strftime("%Y-%m-%d %H:%M:%S")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+# Общий профилировщик процесса
+profiler = QueryProfiler()
@@ -4,39 +4,146 @@
 Модель для работы с продажами
 """
 
-from models.base_model import BaseModel
+from models.base_model import BaseModel, SYNC_COLUMNS
+from models.catalog_model import get_items, get_sellers
+from models.stock_model import get_stock
+from models.seller_stats_model import get_seller_stats
+from models.settings_model import SettingsModel
 from config import DB_DATE_FORMAT
 import sqlite3
+import uuid
 
 
 class SaleModel(BaseModel):
     """Модель для работы с продажами конкретного магазина"""
     
-    def __init__(self, shop_name):
+    # 2: товар и продавец хранятся ссылками на справочники items/sellers
+    # 3: продажи списывают остатки склада (триггеры stock_balance)
+    # 4: мягкое удаление (колонка deleted, частичные индексы)
+    # 5: дневные итоги продавцов (триггеры seller_daily)
+    SCHEMA_VERSION = 5
+    SOFT_DELETE = True
+    SNAPSHOT_COLUMNS = {'item_id': 'i', 'seller_id': 'i', 'quantity': 'd', 'total': 'd'}
+    SNAPSHOT_GROUPS = ('item_id', 'seller_id')
+    PARTITIONED = True
+    
+    def __init__(self, shop_name, table_suffix=None):
         """Инициализация модели для конкретного магазина"""
-        # Заменяем пробелы на подчеркивания для имени таблицы
-        table_suffix = shop_name.lower().replace(' ', '_')
+        # Суффикс хранится в настройках и не меняется при переименовании магазина;
+        # по умолчанию - имя с подчеркиваниями вместо пробелов и знаков
+        if table_suffix is None:
+            table_suffix = SettingsModel.table_suffix_for(shop_name)
         self.shop_name = shop_name
+        self.items = get_items()
+        self.sellers = get_sellers()
+        self.stock = get_stock()
+        self.seller_stats = get_seller_stats()
         super().__init__(f"sales_{table_suffix}")
     
     def _create_table(self):
         """Создание таблицы продаж, если её нет"""
-        query = f"""
-        CREATE TABLE IF NOT EXISTS {self.table_name} (
+        self._execute_query(self._table_sql(self.table_name), commit=True)
+        
+        # Таблицы до справочников хранили товар и продавца текстом
+        self._migrate_to_catalog()
+        self._ensure_soft_delete()
+        
+        # Все выборки фильтруют по дате и видят только действующие записи -
+        # частичный индекс не содержит удаленных строк
+        self._execute_batch([
+            (f"DROP INDEX IF EXISTS idx_{self.table_name}_date", ()),
+            (f"CREATE INDEX IF NOT EXISTS idx_{self.table_name}_live ON {self.table_name} (date) WHERE deleted = 0", ())
+        ])
+        
+        # Остатки склада списываются триггерами при любой записи в таблицу
+        self.stock.track_sales_table(self.table_name)
+        
+        # Так же ведутся дневные итоги продавцов
+        self.seller_stats.track_sales(self)
+    
+    @staticmethod
+    def _table_sql(table_name):
+        """DDL таблицы продаж: товар и продавец - ссылки на справочники"""
+        return f"""
+        CREATE TABLE IF NOT EXISTS {table_name} (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             date TEXT NOT NULL,
             shop TEXT,
-            seller_name TEXT,
-            item TEXT NOT NULL,
+            seller_id INTEGER REFERENCES sellers(id),
+            item_id INTEGER NOT NULL REFERENCES items(id),
             quantity REAL NOT NULL DEFAULT 1,
             price REAL NOT NULL DEFAULT 0,
             total REAL NOT NULL DEFAULT 0
         )
         """
-        self._execute_query(query, commit=True)
     
-    def add(self, data):
-        """Добавление записи с автоматическим расчетом суммы"""
+    def _migrate_to_catalog(self):
+        """Перевести текстовые item/seller_name на id справочников (один раз)
+        
+        Таблица пересобирается целиком: id, uuid и метки изменений строк
+        сохраняются, а триггеры журнала создаются заново уже после переноса,
+        поэтому миграция не попадает в синхронизацию.
+        """
+        conn = self._get_connection()
+        
+        try:
+            columns = [row['name'] for row in conn.execute(f"PRAGMA table_info({self.table_name})")]
+            if 'item' not in columns:
+                return
+            
+            conn.execute(
+                f"INSERT OR IGNORE INTO {self.items.table_name} (name) "
+                f"SELECT DISTINCT item FROM {self.table_name} "
+                f"WHERE item NOT IN (SELECT name FROM {self.items.table_name})"
+            )
+            conn.execute(
+                f"INSERT OR IGNORE INTO {self.sellers.table_name} (name) "
+                f"SELECT DISTINCT seller_name FROM {self.table_name} "
+                f"WHERE seller_name IS NOT NULL AND seller_name NOT IN (SELECT name FROM {self.sellers.table_name})"
+            )
+            
+            new_table = f"{self.table_name}_new"
+            conn.execute(f"DROP TABLE IF EXISTS {new_table}")
+            conn.execute(self._table_sql(new_table))
+            kept = ['id', 'date', 'shop', 'quantity', 'price', 'total']
+            for column, definition in SYNC_COLUMNS.items():
+                if column in columns:
+                    conn.execute(f"ALTER TABLE {new_table} ADD COLUMN {column} {definition}")
+                    kept.append(column)
+            
+            conn.execute(f"""
+            INSERT INTO {new_table} ({', '.join(kept)}, seller_id, item_id)
+            SELECT {', '.join('s.' + column for column in kept)}, sellers.id, items.id
+            FROM {self.table_name} s
+            LEFT JOIN {self.sellers.table_name} sellers ON sellers.name = s.seller_name
+            JOIN {self.items.table_name} items ON items.name = s.item
+            """)
+            conn.execute(f"DROP TABLE {self.table_name}")
+            conn.execute(f"ALTER TABLE {new_table} RENAME TO {self.table_name}")
+            conn.commit()
+            
+            # Освобождаем место, которое занимали текстовые колонки
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+    
+    def _resolve_names(self, data, conn=None):
+        """Заменить названия товара и продавца на id справочников"""
+        if 'item' in data:
+            data['item_id'] = self.items.id_for(data.pop('item'), conn)
+        if 'seller_name' in data:
+            data['seller_id'] = self.sellers.id_for(data.pop('seller_name'), conn)
+        return data
+    
+    def _to_record(self, row):
+        """Строка БД в формате отображения: названия берутся из кэша справочников"""
+        record = super()._to_record(row)
+        record['item'] = self.items.name_for(record['item_id'])
+        record['seller_name'] = self.sellers.name_for(record['seller_id'])
+        return record
+    
+    def _prepare_new(self, data):
+        """Подготовка новой записи: магазин, дата и сумма"""
         # Добавляем магазин в данные
         data_with_shop = dict(data)
         if 'shop' not in data_with_shop:
@@ -51,7 +158,35 @@ class SaleModel(BaseModel):
         price = float(data_with_shop.get('price', 0))
         data_with_shop['total'] = quantity * price
         
-        return super().add(data_with_shop)
+        return self._resolve_names(data_with_shop)
+    
+    def pending_record(self, data):
+        """Новая запись в формате отображения до записи в БД (id - uuid будущей строки)"""
+        quantity = float(data.get('quantity', 0))
+        price = float(data.get('price', 0))
+        row_uuid = uuid.uuid4().hex
+        return {
+            'id': row_uuid,
+            'uuid': row_uuid,
+            'date': self.format_date_for_display(self.format_date_for_db(data.get('date'))),
+            'shop': data.get('shop', self.shop_name),
+            'seller_name': data.get('seller_name') or '',
+            'item': data.get('item') or '',
+            'item_id': None,
+            'quantity': quantity,
+            'price': price,
+            'total': quantity * price,
+            'deleted': 0,
+            'pending': True
+        }
+    
+    def add(self, data):
+        """Добавление записи с автоматическим расчетом суммы"""
+        return super().add(self._prepare_new(data))
+    
+    def add_many(self, rows):
+        """Добавление нескольких записей с расчетом суммы"""
+        return super().add_many([self._prepare_new(data) for data in rows])
     
     def update(self, id, data):
         """Обновление записи с пересчетом суммы"""
@@ -70,50 +205,84 @@ class SaleModel(BaseModel):
                 price = float(data_copy.get('price', current['price']))
                 data_copy['total'] = quantity * price
         
-        super().update(id, data_copy)
+        super().update(id, self._resolve_names(data_copy))
     
     def get_all(self, date_from=None, date_to=None):
         """Получение всех записей с возможностью фильтрации по дате"""
-        query = f"SELECT * FROM {self.table_name}"
-        params = []
-        
-        if date_from and date_to:
-            query += " WHERE date BETWEEN ? AND ?"
-            params = [date_from, date_to]
-        elif date_from:
-            query += " WHERE date >= ?"
-            params = [date_from]
-        elif date_to:
-            query += " WHERE date <= ?"
-            params = [date_to]
-        
-        query += " ORDER BY date ASC, id ASC"
+        conditions, params = self._period_conditions(date_from, date_to)
+        source, years = self._source(date_from, date_to)
+        query = f"SELECT * FROM {source}" + self._where(conditions) + " ORDER BY date ASC, id ASC"
         
-        rows = self._execute_query(query, params, fetchall=True)
+        rows = self._execute_query(query, params, fetchall=True, attach=years)
         
-        # Преобразуем даты в формат отображения
-        result = []
-        for row in rows:
-            row_dict = dict(row)
-            row_dict['date'] = self.format_date_for_display(row_dict['date'])
-            result.append(row_dict)
-        
-        return result
+        # Даты и названия в формате отображения
+        return [self._to_record(row) for row in rows]
     
     def get_total_sum(self, date_from=None, date_to=None):
         """Получение суммы всех продаж за период"""
-        query = f"SELECT SUM(total) as total FROM {self.table_name}"
-        params = []
-        
-        if date_from and date_to:
-            query += " WHERE date BETWEEN ? AND ?"
-            params = [date_from, date_to]
-        elif date_from:
-            query += " WHERE date >= ?"
-            params = [date_from]
-        elif date_to:
-            query += " WHERE date <= ?"
-            params = [date_to]
-        
-        result = self._execute_query(query, params, fetchone=True)
+        conditions, params = self._period_conditions(date_from, date_to)
+        source, years = self._source(date_from, date_to)
+        query = f"SELECT SUM(total) as total FROM {source}" + self._where(conditions)
+        
+        result = self._execute_query(query, params, fetchone=True, attach=years)
         return result['total'] if result and result['total'] else 0
+    
+    def get_daily_totals(self, date_from=None, date_to=None):
+        """Количество продаж и сумма по дням за период (одним сгруппированным запросом)"""
+        conditions, params = self._period_conditions(date_from, date_to)
+        source, years = self._source(date_from, date_to)
+        query = f"SELECT date, COUNT(*) as count, SUM(total) as total FROM {source}"
+        query += self._where(conditions) + " GROUP BY date ORDER BY date"
+        
+        rows = self._execute_query(query, params, fetchall=True, attach=years)
+        return [dict(row) for row in rows]
+    
+    def get_item_totals(self, date_from=None, date_to=None):
+        """Количество и сумма продаж по товарам (группировка по целому item_id)"""
+        conditions, params = self._period_conditions(date_from, date_to)
+        source, years = self._source(date_from, date_to)
+        query = f"SELECT item_id, SUM(quantity) as quantity, SUM(total) as total FROM {source}"
+        query += self._where(conditions) + " GROUP BY item_id"
+        
+        rows = self._execute_query(query, params, fetchall=True, attach=years)
+        return [dict(row) for row in rows]
+    
+    def sync_export_row(self, conn, row):
+        """Для синхронизации товар и продавец передаются названиями"""
+        data = super().sync_export_row(conn, row)
+        data['item'] = self.items.name_for(data.pop('item_id'), conn)
+        data['seller_name'] = self.sellers.name_for(data.pop('seller_id'), conn)
+        return data
+    
+    def sync_import_row(self, conn, data):
+        """Названия из пакета синхронизации -> id местных справочников"""
+        return self._resolve_names(super().sync_import_row(conn, data), conn)
+    
+    def track_partition_write(self, conn, old, new):
+        """Остатки склада и итоги продавцов для записи в раздел закрытого года"""
+        self.stock.track_sale(conn, old, new)
+        self.seller_stats.track_sale(conn, self.table_name, old, new)
+    
+    def rename_shop(self, new_name):
+        """Переименовать магазин в записях таблицы (изменения уходят в синхронизацию)"""
+        self.replace_value('shop', self.shop_name, new_name)
+        self.shop_name = new_name
+
+
+def get_shop_totals(models, date_from=None, date_to=None):
+    """Суммы продаж нескольких магазинов одним запросом: {магазин: сумма}"""
+    if not models:
+        return {}
+    
+    parts = []
+    params = []
+    years = set()
+    for index, model in enumerate(models):
+        conditions, part_params = model._period_conditions(date_from, date_to)
+        source, part_years = model._source(date_from, date_to)
+        parts.append(f"SELECT {index} as idx, SUM(total) as total FROM {source}" + model._where(conditions))
+        params.extend(part_params)
+        years.update(part_years)
+    
+    rows = models[0]._execute_query(" UNION ALL ".join(parts), params, fetchall=True, attach=sorted(years))
+    return {models[row['idx']].shop_name: row['total'] or 0 for row in rows}
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+"""
+Дневные итоги продавцов: число продаж, количество и выручка
+"""
+
+from models.base_model import BaseModel, attach_partitions
+from models.catalog_model import get_sellers
+
+
+class SellerStatsModel(BaseModel):
+    """Итоги продаж по (таблица продаж, день, продавец) в таблице seller_daily
+    
+    Строку дня меняют триггеры таблиц продаж - одна запись по первичному ключу
+    на каждую вставку, правку или удаление продажи, в том числе при импорте
+    и синхронизации. Поэтому итоги продавцов за месяц - это сумма не больше
+    чем 31 строки на продавца, сколько бы продаж ни было. Ключ - таблица,
+    а не название магазина: переименование магазина итоги не трогает.
+    """
+    
+    # Продажи без продавца хранятся под id 0
+    NO_SELLER = 0
+    
+    def __init__(self):
+        self.sellers = get_sellers()
+        super().__init__("seller_daily")
+    
+    def _create_table(self):
+        """Создание таблицы дневных итогов"""
+        self._execute_query("""
+        CREATE TABLE IF NOT EXISTS seller_daily (
+            sales_table TEXT NOT NULL,
+            date TEXT NOT NULL,
+            seller_id INTEGER NOT NULL,
+            sales INTEGER NOT NULL DEFAULT 0,
+            quantity REAL NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (sales_table, date, seller_id)
+        ) WITHOUT ROWID
+        """, commit=True)
+    
+    def _ensure_sync_schema(self):
+        """Итоги вычисляются из продаж на каждом компьютере и не синхронизируются"""
+    
+    def track_sales(self, model):
+        """Подключить таблицу продаж к дневным итогам (триггеры + уже накопленные продажи)
+        
+        Как и остатки склада: триггеры пересоздаются при каждом обновлении схемы
+        продаж, а история (вместе с разделами закрытых лет) переносится в итоги
+        только при первом подключении таблицы, в той же транзакции. Перенос года
+        в раздел идет со снятыми триггерами и итогов не меняет.
+        """
+        table = model.table_name
+        source, years = model._source()
+        conn = self._get_connection()
+        
+        try:
+            attach_partitions(conn, years)
+            conn.execute("BEGIN IMMEDIATE")
+            tracked = conn.execute(
+                "SELECT 1 FROM main.sqlite_master WHERE type = 'trigger' AND name = ?",
+                (f"{table}_sellers_insert",)
+            ).fetchone()
+            if not tracked:
+                conn.execute(f"""
+                INSERT INTO main.seller_daily (sales_table, date, seller_id, sales, quantity, revenue)
+                SELECT '{table}', date, COALESCE(seller_id, {self.NO_SELLER}), COUNT(*), SUM(quantity), SUM(total)
+                FROM {source} WHERE deleted = 0
+                GROUP BY date, COALESCE(seller_id, {self.NO_SELLER})
+                ON CONFLICT (sales_table, date, seller_id) DO UPDATE SET
+                    sales = sales + excluded.sales,
+                    quantity = quantity + excluded.quantity,
+                    revenue = revenue + excluded.revenue
+                """)
+            
+            add_new = f"""
+                INSERT INTO seller_daily (sales_table, date, seller_id, sales, quantity, revenue)
+                SELECT '{table}', NEW.date, COALESCE(NEW.seller_id, {self.NO_SELLER}), 1, NEW.quantity, NEW.total
+                WHERE NEW.deleted = 0
+                ON CONFLICT (sales_table, date, seller_id) DO UPDATE SET
+                    sales = sales + 1,
+                    quantity = quantity + excluded.quantity,
+                    revenue = revenue + excluded.revenue;
+            """
+            subtract_old = f"""
+                UPDATE seller_daily SET sales = sales - 1, quantity = quantity - OLD.quantity, revenue = revenue - OLD.total
+                WHERE OLD.deleted = 0 AND sales_table = '{table}' AND date = OLD.date
+                    AND seller_id = COALESCE(OLD.seller_id, {self.NO_SELLER});
+            """
+            
+            for suffix in ('insert', 'update', 'delete'):
+                conn.execute(f"DROP TRIGGER IF EXISTS main.{table}_sellers_{suffix}")
+            conn.execute(f"""
+            CREATE TRIGGER main.{table}_sellers_insert AFTER INSERT ON {table}
+            BEGIN
+                {add_new}
+            END
+            """)
+            conn.execute(f"""
+            CREATE TRIGGER main.{table}_sellers_update
+            AFTER UPDATE OF date, seller_id, quantity, total, deleted ON {table}
+            BEGIN
+                {subtract_old}
+                {add_new}
+            END
+            """)
+            conn.execute(f"""
+            CREATE TRIGGER main.{table}_sellers_delete AFTER DELETE ON {table}
+            BEGIN
+                {subtract_old}
+            END
+            """)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def track_sale(self, conn, table, old, new):
+        """Изменить итоги дня так же, как триггеры таблицы продаж (для записи мимо них)"""
+        if old is not None and not old['deleted']:
+            conn.execute(
+                "UPDATE main.seller_daily SET sales = sales - 1, quantity = quantity - ?, revenue = revenue - ? "
+                "WHERE sales_table = ? AND date = ? AND seller_id = ?",
+                (old['quantity'], old['total'], table, old['date'], old['seller_id'] or self.NO_SELLER)
+            )
+        if new is not None and not new['deleted']:
+            conn.execute(
+                "INSERT INTO main.seller_daily (sales_table, date, seller_id, sales, quantity, revenue) "
+                "VALUES (?, ?, ?, 1, ?, ?) "
+                "ON CONFLICT (sales_table, date, seller_id) DO UPDATE SET "
+                "sales = sales + 1, quantity = quantity + excluded.quantity, revenue = revenue + excluded.revenue",
+                (table, new['date'], new['seller_id'] or self.NO_SELLER, new['quantity'], new['total'])
+            )
+    
+    def get_totals(self, models, date_from, date_to):
+        """Итоги продавцов магазинов за период: [{'seller_id', 'seller_name', 'sales', 'quantity', 'revenue'}]
+        
+        Одна сгруппированная выборка по первичному ключу seller_daily,
+        по убыванию выручки.
+        """
+        if not models:
+            return []
+        
+        tables = [model.table_name for model in models]
+        rows = self._execute_query(
+            f"SELECT seller_id, SUM(sales) as sales, SUM(quantity) as quantity, SUM(revenue) as revenue "
+            f"FROM seller_daily WHERE sales_table IN ({', '.join('?' * len(tables))}) AND date BETWEEN ? AND ? "
+            f"GROUP BY seller_id HAVING SUM(sales) > 0 ORDER BY revenue DESC",
+            tables + [date_from, date_to],
+            fetchall=True
+        )
+        return [dict(row, seller_name=self.seller_name(row['seller_id'])) for row in rows]
+    
+    def seller_name(self, seller_id):
+        """Название продавца для отчета"""
+        if seller_id == self.NO_SELLER:
+            return "(без продавца)"
+        return self.sellers.name_for(seller_id)
+
+
+_seller_stats = None
+
+
+def get_seller_stats():
+    """Общая модель итогов продавцов процесса"""
+    global _seller_stats
+    if _seller_stats is None:
+        _seller_stats = SellerStatsModel()
+    return _seller_stats
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+"""
+Модель настроек программы: магазины и валюта
+"""
+
+import re
+from models.base_model import BaseModel
+from config import SHOPS, DEFAULT_CURRENCY, SELLER_COMMISSION_PERCENT
+
+
+class SettingsModel(BaseModel):
+    """Настройки в БД (локальны для компьютера и не синхронизируются)
+    
+    Таблица shops хранит имя магазина и неизменный суффикс таблицы продаж,
+    поэтому переименование магазина не трогает схему и журнал синхронизации.
+    """
+    
+    # 2: суффиксы из недопустимых в имени таблицы символов исправляются
+    SCHEMA_VERSION = 2
+    
+    def __init__(self):
+        super().__init__("settings")
+        self._values = None
+        self._shops = None
+    
+    def _create_table(self):
+        """Создание таблиц настроек и магазинов"""
+        self._execute_batch([
+            ("""
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+            """, ()),
+            ("""
+            CREATE TABLE IF NOT EXISTS shops (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL UNIQUE,
+                table_suffix TEXT NOT NULL UNIQUE,
+                position INTEGER NOT NULL DEFAULT 0
+            )
+            """, ())
+        ])
+        
+        # При первом запуске магазины берутся из config.SHOPS
+        if not self._execute_query("SELECT 1 FROM shops LIMIT 1", fetchone=True):
+            self._execute_batch([
+                ("INSERT OR IGNORE INTO shops (name, table_suffix, position) VALUES (?, ?, ?)",
+                 (name, self.table_suffix_for(name), position))
+                for position, name in enumerate(SHOPS)
+            ])
+        
+        # Магазин с суффиксом вроде "магазин-3" сохранялся, а его таблицу создать
+        # было нельзя, и программа больше не запускалась. Такой таблицы в БД нет,
+        # поэтому суффикс можно просто заменить
+        rows = self._execute_query("SELECT id, name, table_suffix FROM shops ORDER BY id", fetchall=True)
+        used = {row['table_suffix'] for row in rows}
+        for row in rows:
+            if not re.fullmatch(r'\w+', row['table_suffix']):
+                suffix = self._free_suffix(row['name'], used)
+                used.add(suffix)
+                self._execute_query("UPDATE shops SET table_suffix = ? WHERE id = ?", (suffix, row['id']), commit=True)
+    
+    def _ensure_sync_schema(self):
+        """Настройки не участвуют в синхронизации"""
+    
+    @staticmethod
+    def table_suffix_for(name):
+        """Суффикс таблицы продаж по имени магазина: буквы и цифры, остальное - подчеркивания"""
+        return re.sub(r'\W+', '_', name.lower()).strip('_') or 'shop'
+    
+    def _free_suffix(self, name, used):
+        """Суффикс для имени, которого нет среди used (занятый получает номер)"""
+        base = self.table_suffix_for(name)
+        suffix = base
+        number = 2
+        while suffix in used:
+            suffix = f"{base}_{number}"
+            number += 1
+        return suffix
+    
+    def get(self, key, default=None):
+        """Значение настройки"""
+        if self._values is None:
+            rows = self._execute_query("SELECT key, value FROM settings", fetchall=True)
+            self._values = {row['key']: row['value'] for row in rows}
+        return self._values.get(key, default)
+    
+    def set(self, key, value):
+        """Сохранить значение настройки"""
+        self._execute_query(
+            "INSERT INTO settings (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value),
+            commit=True
+        )
+        self._values = None
+    
+    @property
+    def currency(self):
+        """Обозначение валюты для сумм"""
+        return self.get('currency', DEFAULT_CURRENCY)
+    
+    @property
+    def commission_percent(self):
+        """Комиссия продавцов, % выручки"""
+        return float(self.get('commission_percent', SELLER_COMMISSION_PERCENT))
+    
+    def get_shops(self):
+        """Магазины по порядку: [{'name', 'table_suffix'}]"""
+        if self._shops is None:
+            rows = self._execute_query(
+                "SELECT name, table_suffix FROM shops ORDER BY position, id",
+                fetchall=True
+            )
+            self._shops = [dict(row) for row in rows]
+        return [dict(shop) for shop in self._shops]
+    
+    def get_shop_names(self):
+        """Имена магазинов по порядку"""
+        return [shop['name'] for shop in self.get_shops()]
+    
+    def add_shop(self, name):
+        """Добавить магазин; возвращает {'name', 'table_suffix'}"""
+        name = (name or '').strip()
+        if not name:
+            raise ValueError("Название магазина не может быть пустым")
+        if name in self.get_shop_names():
+            raise ValueError(f"Магазин {name} уже есть")
+        
+        from models.sale_model import SaleModel
+        
+        # Суффикс мог остаться занятым от переименованного магазина
+        suffix = self._free_suffix(name, {shop['table_suffix'] for shop in self.get_shops()})
+        
+        # Таблица продаж создается в той же транзакции: если SQLite ее не примет,
+        # строка магазина тоже откатится и не помешает следующему запуску
+        self._execute_batch([
+            ("INSERT INTO shops (name, table_suffix, position) "
+             "VALUES (?, ?, (SELECT COALESCE(MAX(position), -1) + 1 FROM shops))",
+             (name, suffix)),
+            (SaleModel._table_sql(f"sales_{suffix}"), ())
+        ])
+        self._shops = None
+        return {'name': name, 'table_suffix': suffix}
+    
+    def rename_shop(self, old_name, new_name):
+        """Переименовать магазин (таблица продаж остается прежней)"""
+        new_name = (new_name or '').strip()
+        if not new_name:
+            raise ValueError("Название магазина не может быть пустым")
+        if new_name in self.get_shop_names():
+            raise ValueError(f"Магазин {new_name} уже есть")
+        
+        self._execute_query("UPDATE shops SET name = ? WHERE name = ?", (new_name, old_name), commit=True)
+        self._shops = None
+
+
+_settings = None
+
+
+def get_settings():
+    """Общий экземпляр настроек процесса (создается при первом обращении)"""
+    global _settings
+    if _settings is None:
+        _settings = SettingsModel()
+    return _settings
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+
+"""
+Модель склада: приходы товара и текущие остатки по магазинам
+"""
+
+from models.base_model import BaseModel
+from models.catalog_model import get_items
+
+
+class StockModel(BaseModel):
+    """Приходы товара (stock_receipts) и остатки (stock_balance)
+    
+    Остаток хранится готовым числом на пару (магазин, товар) и меняется
+    триггерами на каждую вставку, правку и удаление прихода или продажи -
+    в том числе при импорте CSV и синхронизации. Поэтому текущий остаток
+    читается одной строкой по первичному ключу, без суммирования истории.
+    """
+    
+    def __init__(self):
+        self.items = get_items()
+        super().__init__("stock_receipts")
+    
+    def _create_table(self):
+        """Создание таблиц приходов и остатков"""
+        conn = self._get_connection()
+        
+        try:
+            conn.executescript("""
+            CREATE TABLE IF NOT EXISTS stock_receipts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date TEXT NOT NULL,
+                shop TEXT NOT NULL,
+                item_id INTEGER NOT NULL REFERENCES items(id),
+                quantity REAL NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_stock_receipts_date ON stock_receipts (date);
+            CREATE TABLE IF NOT EXISTS stock_balance (
+                shop TEXT NOT NULL,
+                item_id INTEGER NOT NULL,
+                quantity REAL NOT NULL DEFAULT 0,
+                received REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (shop, item_id)
+            );
+            CREATE TRIGGER IF NOT EXISTS stock_receipts_balance_insert AFTER INSERT ON stock_receipts
+            BEGIN
+                INSERT INTO stock_balance (shop, item_id, quantity, received)
+                VALUES (NEW.shop, NEW.item_id, NEW.quantity, NEW.quantity)
+                ON CONFLICT (shop, item_id) DO UPDATE SET
+                    quantity = quantity + excluded.quantity,
+                    received = received + excluded.received;
+            END;
+            CREATE TRIGGER IF NOT EXISTS stock_receipts_balance_update
+            AFTER UPDATE OF shop, item_id, quantity ON stock_receipts
+            BEGIN
+                UPDATE stock_balance SET quantity = quantity - OLD.quantity, received = received - OLD.quantity
+                WHERE shop = OLD.shop AND item_id = OLD.item_id;
+                INSERT INTO stock_balance (shop, item_id, quantity, received)
+                VALUES (NEW.shop, NEW.item_id, NEW.quantity, NEW.quantity)
+                ON CONFLICT (shop, item_id) DO UPDATE SET
+                    quantity = quantity + excluded.quantity,
+                    received = received + excluded.received;
+            END;
+            CREATE TRIGGER IF NOT EXISTS stock_receipts_balance_delete AFTER DELETE ON stock_receipts
+            BEGIN
+                UPDATE stock_balance SET quantity = quantity - OLD.quantity, received = received - OLD.quantity
+                WHERE shop = OLD.shop AND item_id = OLD.item_id;
+            END;
+            """)
+        finally:
+            conn.close()
+    
+    def track_sales_table(self, table_name):
+        """Подключить таблицу продаж к остаткам (триггеры + уже накопленные продажи)
+        
+        Триггеры пересоздаются при каждом обновлении схемы продаж, а история
+        переносится в остатки только при первом подключении таблицы. Все это
+        выполняется в одной транзакции, поэтому ни одна продажа не будет
+        учтена дважды или пропущена. Мягко удаленные продажи остаток не уменьшают.
+        """
+        conn = self._get_connection()
+        
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            tracked = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+                (f"{table_name}_stock_insert",)
+            ).fetchone()
+            if not tracked:
+                conn.execute(f"""
+                INSERT INTO stock_balance (shop, item_id, quantity)
+                SELECT shop, item_id, -SUM(quantity) FROM {table_name} WHERE shop IS NOT NULL AND deleted = 0
+                GROUP BY shop, item_id
+                ON CONFLICT (shop, item_id) DO UPDATE SET quantity = quantity + excluded.quantity
+                """)
+            
+            for suffix in ('insert', 'update', 'delete'):
+                conn.execute(f"DROP TRIGGER IF EXISTS {table_name}_stock_{suffix}")
+            conn.execute(f"""
+            CREATE TRIGGER {table_name}_stock_insert AFTER INSERT ON {table_name}
+            BEGIN
+                INSERT INTO stock_balance (shop, item_id, quantity)
+                SELECT NEW.shop, NEW.item_id, -NEW.quantity WHERE NEW.deleted = 0
+                ON CONFLICT (shop, item_id) DO UPDATE SET quantity = quantity + excluded.quantity;
+            END
+            """)
+            conn.execute(f"""
+            CREATE TRIGGER {table_name}_stock_update
+            AFTER UPDATE OF shop, item_id, quantity, deleted ON {table_name}
+            BEGIN
+                UPDATE stock_balance SET quantity = quantity + OLD.quantity
+                WHERE OLD.deleted = 0 AND shop = OLD.shop AND item_id = OLD.item_id;
+                INSERT INTO stock_balance (shop, item_id, quantity)
+                SELECT NEW.shop, NEW.item_id, -NEW.quantity WHERE NEW.deleted = 0
+                ON CONFLICT (shop, item_id) DO UPDATE SET quantity = quantity + excluded.quantity;
+            END
+            """)
+            conn.execute(f"""
+            CREATE TRIGGER {table_name}_stock_delete AFTER DELETE ON {table_name}
+            BEGIN
+                UPDATE stock_balance SET quantity = quantity + OLD.quantity
+                WHERE OLD.deleted = 0 AND shop = OLD.shop AND item_id = OLD.item_id;
+            END
+            """)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def track_sale(self, conn, old, new):
+        """Изменить остаток так же, как триггеры таблицы продаж (для записи мимо них)"""
+        if old is not None and not old['deleted'] and old['shop'] is not None:
+            conn.execute(
+                "UPDATE main.stock_balance SET quantity = quantity + ? WHERE shop = ? AND item_id = ?",
+                (old['quantity'], old['shop'], old['item_id'])
+            )
+        if new is not None and not new['deleted'] and new['shop'] is not None:
+            conn.execute(
+                "INSERT INTO main.stock_balance (shop, item_id, quantity) VALUES (?, ?, ?) "
+                "ON CONFLICT (shop, item_id) DO UPDATE SET quantity = quantity + excluded.quantity",
+                (new['shop'], new['item_id'], -new['quantity'])
+            )
+    
+    def _prepare_new(self, data):
+        """Подготовка прихода: дата и id товара"""
+        data_copy = dict(data)
+        if 'date' in data_copy:
+            data_copy['date'] = self.format_date_for_db(data_copy['date'])
+        if 'item' in data_copy:
+            data_copy['item_id'] = self.items.id_for(data_copy.pop('item'))
+        return data_copy
+    
+    def add(self, data):
+        """Добавление прихода товара"""
+        return super().add(self._prepare_new(data))
+    
+    def update(self, id, data):
+        """Обновление прихода товара"""
+        super().update(id, self._prepare_new(data))
+    
+    def get_all(self, date_from=None, date_to=None, shop=None):
+        """Приходы за период (с названиями товаров)"""
+        conditions, params = self._period_conditions(date_from, date_to, {'shop': shop} if shop else None)
+        query = "SELECT * FROM stock_receipts" + self._where(conditions) + " ORDER BY date, id"
+        
+        rows = self._execute_query(query, params, fetchall=True)
+        return [self._to_record(row) for row in rows]
+    
+    def _to_record(self, row):
+        """Строка прихода в формате отображения"""
+        record = super()._to_record(row)
+        record['item'] = self.items.name_for(record['item_id'])
+        return record
+    
+    def get_balance(self, shop, item_id):
+        """Текущий остаток товара в магазине (одна строка по первичному ключу)"""
+        row = self._execute_query(
+            "SELECT quantity FROM stock_balance WHERE shop = ? AND item_id = ?",
+            (shop, item_id),
+            fetchone=True
+        )
+        return row['quantity'] if row else 0
+    
+    def get_balances(self, shop):
+        """Остатки магазина: [{'item_id', 'item', 'quantity', 'received'}] по названию"""
+        rows = self._execute_query(
+            "SELECT item_id, quantity, received FROM stock_balance WHERE shop = ?",
+            (shop,),
+            fetchall=True
+        )
+        result = [dict(row, item=self.items.name_for(row['item_id'])) for row in rows]
+        return sorted(result, key=lambda row: row['item'])
+    
+    def get_low_stock(self, shop, threshold):
+        """id товаров магазина, которые приходовались и почти закончились"""
+        rows = self._execute_query(
+            "SELECT item_id FROM stock_balance WHERE shop = ? AND received > 0 AND quantity <= ?",
+            (shop, threshold),
+            fetchall=True
+        )
+        return {row['item_id'] for row in rows}
+    
+    def rename_shop(self, old_name, new_name):
+        """Переименовать магазин в приходах (остатки переносятся триггерами)"""
+        self.replace_value('shop', old_name, new_name)
+    
+    def sync_export_row(self, conn, row):
+        """Для синхронизации товар передается названием"""
+        data = super().sync_export_row(conn, row)
+        data['item'] = self.items.name_for(data.pop('item_id'), conn)
+        return data
+    
+    def sync_import_row(self, conn, data):
+        """Название товара из пакета -> id местного справочника"""
+        data = super().sync_import_row(conn, data)
+        if 'item' in data:
+            data['item_id'] = self.items.id_for(data.pop('item'), conn)
+        return data
+
+
+_stock = None
+
+
+def get_stock():
+    """Общая модель склада процесса"""
+    global _stock
+    if _stock is None:
+        _stock = StockModel()
+    return _stock
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+"""
+Модель пользователей программы и их ролей
+"""
+
+import hashlib
+import hmac
+import os
+from models.base_model import BaseModel
+from config import USER_PASSWORD_ITERATIONS
+
+
+# Роли пользователей
+ROLE_MANAGER = 'manager'
+ROLE_CASHIER = 'cashier'
+ROLE_TITLES = {
+    ROLE_MANAGER: "Управляющий",
+    ROLE_CASHIER: "Кассир"
+}
+
+
+class UserModel(BaseModel):
+    """Пользователи в БД (общие для всех касс, работающих с этим файлом, и не синхронизируются)
+    
+    Пароль хранится как PBKDF2-хэш со своей солью. Управляющий видит и правит
+    все; кассир работает только с продажами своего магазина (колонка shop).
+    """
+    
+    # 2: триггеры счетчика изменений users_version в sync_meta
+    SCHEMA_VERSION = 2
+    
+    def __init__(self):
+        super().__init__("users")
+    
+    def _create_table(self):
+        """Создание таблицы пользователей"""
+        self._execute_query("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            login TEXT NOT NULL UNIQUE,
+            name TEXT,
+            role TEXT NOT NULL,
+            shop TEXT,
+            salt TEXT NOT NULL,
+            password_hash TEXT NOT NULL
+        )
+        """, commit=True)
+        
+        # Любая запись в таблицу увеличивает счетчик: так кэш входа API узнает
+        # о смене пароля или роли, сделанной в окне или другой программой
+        self._execute_query("CREATE TABLE IF NOT EXISTS sync_meta (key TEXT PRIMARY KEY, value TEXT)", commit=True)
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            self._execute_query(f"""
+            CREATE TRIGGER IF NOT EXISTS users_version_{event.lower()} AFTER {event} ON users
+            BEGIN
+                INSERT INTO sync_meta (key, value) VALUES ('users_version', 1)
+                ON CONFLICT (key) DO UPDATE SET value = value + 1;
+            END
+            """, commit=True)
+    
+    def _ensure_sync_schema(self):
+        """Пользователи не участвуют в синхронизации"""
+    
+    @staticmethod
+    def _hash(password, salt):
+        """Хэш пароля с солью"""
+        return hashlib.pbkdf2_hmac(
+            'sha256', password.encode('utf-8'), bytes.fromhex(salt), USER_PASSWORD_ITERATIONS
+        ).hex()
+    
+    def has_users(self):
+        """Заведен ли хотя бы один пользователь (иначе вход не требуется)"""
+        return self._execute_query("SELECT 1 FROM users LIMIT 1", fetchone=True) is not None
+    
+    def version(self):
+        """Счетчик изменений пользователей (None - таблицу еще не меняли)"""
+        row = self._execute_query("SELECT value FROM sync_meta WHERE key = 'users_version'", fetchone=True)
+        return row['value'] if row else None
+    
+    def get_users(self):
+        """Пользователи по логину: [{'login', 'name', 'role', 'shop'}]"""
+        rows = self._execute_query("SELECT login, name, role, shop FROM users ORDER BY login", fetchall=True)
+        return [dict(row) for row in rows]
+    
+    def get_user(self, login):
+        """Пользователь по логину (None, если такого нет)"""
+        row = self._execute_query(
+            "SELECT login, name, role, shop FROM users WHERE login = ?", (login,), fetchone=True
+        )
+        return dict(row) if row else None
+    
+    def _count_managers(self):
+        """Число управляющих"""
+        return self._execute_query(
+            "SELECT COUNT(*) as count FROM users WHERE role = ?", (ROLE_MANAGER,), fetchone=True
+        )['count']
+    
+    def add_user(self, login, password, role, name=None, shop=None):
+        """Добавить пользователя; возвращает {'login', 'name', 'role', 'shop'}"""
+        login = (login or '').strip()
+        if not login:
+            raise ValueError("Логин не может быть пустым")
+        if not password:
+            raise ValueError("Пароль не может быть пустым")
+        if role not in ROLE_TITLES:
+            raise ValueError(f"Неизвестная роль: {role}")
+        if role == ROLE_CASHIER and not shop:
+            raise ValueError("Для кассира нужно указать магазин")
+        if role != ROLE_MANAGER and self._count_managers() == 0:
+            # Иначе после первого входа управлять пользователями будет некому
+            raise ValueError("Первым нужно завести управляющего")
+        if self.get_user(login) is not None:
+            raise ValueError(f"Пользователь {login} уже есть")
+        
+        salt = os.urandom(16).hex()
+        shop = shop if role == ROLE_CASHIER else None
+        self._execute_query(
+            "INSERT INTO users (login, name, role, shop, salt, password_hash) VALUES (?, ?, ?, ?, ?, ?)",
+            (login, name or login, role, shop, salt, self._hash(password, salt)),
+            commit=True
+        )
+        return self.get_user(login)
+    
+    def set_password(self, login, password):
+        """Сменить пароль пользователя"""
+        if not password:
+            raise ValueError("Пароль не может быть пустым")
+        
+        salt = os.urandom(16).hex()
+        self._execute_query(
+            "UPDATE users SET salt = ?, password_hash = ? WHERE login = ?",
+            (salt, self._hash(password, salt), login),
+            commit=True
+        )
+    
+    def delete_user(self, login):
+        """Удалить пользователя (последнего управляющего удалить нельзя)"""
+        user = self.get_user(login)
+        if user is None:
+            return
+        if user['role'] == ROLE_MANAGER and self._count_managers() == 1 and len(self.get_users()) > 1:
+            raise ValueError("Нельзя удалить последнего управляющего")
+        
+        self._execute_query("DELETE FROM users WHERE login = ?", (login,), commit=True)
+    
+    def rename_shop(self, old_name, new_name):
+        """Переименовать магазин у кассиров"""
+        self._execute_query("UPDATE users SET shop = ? WHERE shop = ?", (new_name, old_name), commit=True)
+    
+    def authenticate(self, login, password):
+        """Пользователь с этим логином и паролем (None, если не подошли)"""
+        row = self._execute_query(
+            "SELECT login, name, role, shop, salt, password_hash FROM users WHERE login = ?",
+            ((login or '').strip(),),
+            fetchone=True
+        )
+        if row is None or not hmac.compare_digest(self._hash(password or '', row['salt']), row['password_hash']):
+            return None
+        return {key: row[key] for key in ('login', 'name', 'role', 'shop')}
+
+
+_users = None
+
+
+def get_users():
+    """Общий экземпляр модели пользователей процесса (создается при первом обращении)"""
+    global _users
+    if _users is None:
+        _users = UserModel()
+    return _users
@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+
+"""
+Минимальный потоковый генератор PDF (без внешних зависимостей)
+"""
+
+import struct
+import zlib
+from pathlib import Path
+
+
+# Размер A4 в пунктах
+A4 = (595, 842)
+
+
+class TrueTypeFont:
+    """Метрики и таблица символов TrueType-шрифта для встраивания в PDF"""
+    
+    def __init__(self, path):
+        self.path = Path(path)
+        self.data = self.path.read_bytes()
+        self.name = ''.join(c for c in self.path.stem if c.isalnum()) or "Font"
+        
+        tables = {}
+        num_tables = struct.unpack_from(">H", self.data, 4)[0]
+        for i in range(num_tables):
+            tag, _, offset, length = struct.unpack_from(">4sLLL", self.data, 12 + 16 * i)
+            tables[tag.decode('latin-1')] = (offset, length)
+        
+        head = tables['head'][0]
+        self.units_per_em = struct.unpack_from(">H", self.data, head + 18)[0]
+        self.bbox = [self._scale(v) for v in struct.unpack_from(">hhhh", self.data, head + 36)]
+        
+        hhea = tables['hhea'][0]
+        ascent, descent = struct.unpack_from(">hh", self.data, hhea + 4)
+        self.ascent = self._scale(ascent)
+        self.descent = self._scale(descent)
+        num_metrics = struct.unpack_from(">H", self.data, hhea + 34)[0]
+        
+        hmtx = tables['hmtx'][0]
+        self.advances = [
+            struct.unpack_from(">H", self.data, hmtx + 4 * i)[0]
+            for i in range(num_metrics)
+        ]
+        
+        self.cmap = self._read_cmap(tables['cmap'][0])
+    
+    def _scale(self, value):
+        """Перевод единиц шрифта в тысячные доли кегля (единицы PDF)"""
+        return round(value * 1000 / self.units_per_em)
+    
+    def _read_cmap(self, cmap):
+        """Соответствие символ -> глиф из Unicode-подтаблицы (формат 12 или 4)"""
+        subtables = {}
+        count = struct.unpack_from(">H", self.data, cmap + 2)[0]
+        for i in range(count):
+            platform, encoding, offset = struct.unpack_from(">HHL", self.data, cmap + 4 + 8 * i)
+            subtables[(platform, encoding)] = cmap + offset
+        
+        for key in ((3, 10), (0, 4), (3, 1), (0, 3)):
+            offset = subtables.get(key)
+            if offset is None:
+                continue
+            fmt = struct.unpack_from(">H", self.data, offset)[0]
+            if fmt == 12:
+                return self._read_cmap_12(offset)
+            if fmt == 4:
+                return self._read_cmap_4(offset)
+        
+        raise ValueError(f"В шрифте {self.path.name} нет Unicode-таблицы символов")
+    
+    def _read_cmap_4(self, offset):
+        """Подтаблица формата 4 (сегменты в пределах BMP)"""
+        seg_count = struct.unpack_from(">H", self.data, offset + 6)[0] // 2
+        ends = struct.unpack_from(f">{seg_count}H", self.data, offset + 14)
+        starts_at = offset + 16 + 2 * seg_count
+        starts = struct.unpack_from(f">{seg_count}H", self.data, starts_at)
+        deltas = struct.unpack_from(f">{seg_count}h", self.data, starts_at + 2 * seg_count)
+        range_at = starts_at + 4 * seg_count
+        range_offsets = struct.unpack_from(f">{seg_count}H", self.data, range_at)
+        
+        result = {}
+        for i in range(seg_count):
+            for code in range(starts[i], ends[i] + 1):
+                if code == 0xFFFF:
+                    continue
+                if range_offsets[i] == 0:
+                    glyph = (code + deltas[i]) & 0xFFFF
+                else:
+                    at = range_at + 2 * i + range_offsets[i] + 2 * (code - starts[i])
+                    glyph = struct.unpack_from(">H", self.data, at)[0]
+                    if glyph:
+                        glyph = (glyph + deltas[i]) & 0xFFFF
+                if glyph:
+                    result[code] = glyph
+        return result
+    
+    def _read_cmap_12(self, offset):
+        """Подтаблица формата 12 (группы кодов)"""
+        groups = struct.unpack_from(">L", self.data, offset + 12)[0]
+        result = {}
+        for i in range(groups):
+            start, end, glyph = struct.unpack_from(">LLL", self.data, offset + 16 + 12 * i)
+            for code in range(start, end + 1):
+                result[code] = glyph + code - start
+        return result
+    
+    def glyph_width(self, glyph):
+        """Ширина глифа в единицах PDF"""
+        advance = self.advances[glyph] if glyph < len(self.advances) else self.advances[-1]
+        return self._scale(advance)
+
+
+class PdfWriter:
+    """Постраничная запись PDF прямо в файл
+    
+    Содержимое страницы сбрасывается на диск в end_page(), в памяти остаются
+    только смещения объектов, поэтому размер документа не ограничен памятью.
+    Если передан TrueType-шрифт, он встраивается (кодировка Identity-H) и
+    кириллица отображается; иначе используется Helvetica без кириллицы.
+    """
+    
+    def __init__(self, path, font_path=None, page_size=A4):
+        self.page_width, self.page_height = page_size
+        self.font = TrueTypeFont(font_path) if font_path else None
+        self.used_glyphs = {}  # глиф -> символ (для таблиц ширин и ToUnicode)
+        self._char_widths = {}
+        
+        self._file = open(path, 'wb')
+        self._offsets = {}
+        self._next_id = 1
+        self._page_ids = []
+        self._content = None
+        
+        self._catalog_id = self._reserve()
+        self._pages_id = self._reserve()
+        self._font_id = self._reserve()
+        
+        self._file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+    
+    def _reserve(self):
+        """Зарезервировать номер объекта"""
+        obj_id = self._next_id
+        self._next_id += 1
+        return obj_id
+    
+    def _write_object(self, obj_id, body):
+        """Записать объект (body - bytes без obj/endobj)"""
+        self._offsets[obj_id] = self._file.tell()
+        self._file.write(f"{obj_id} 0 obj\n".encode('latin-1'))
+        self._file.write(body)
+        self._file.write(b"\nendobj\n")
+    
+    def _write_stream(self, obj_id, data, extra=""):
+        """Записать сжатый поток"""
+        packed = zlib.compress(data)
+        header = f"<< /Length {len(packed)} /Filter /FlateDecode {extra}>>\nstream\n".encode('latin-1')
+        self._write_object(obj_id, header + packed + b"\nendstream")
+    
+    def _units(self, text):
+        """Ширина строки в тысячных долях кегля (ширины символов кэшируются)"""
+        widths = self._char_widths
+        units = 0
+        for char in text:
+            width = widths.get(char)
+            if width is None:
+                if self.font is None:
+                    width = 500
+                else:
+                    width = self.font.glyph_width(self.font.cmap.get(ord(char), 0))
+                widths[char] = width
+            units += width
+        return units
+    
+    def text_width(self, text, size):
+        """Ширина строки в пунктах"""
+        return self._units(text) * size / 1000
+    
+    def fit_text(self, text, size, width):
+        """Обрезать строку по ширине колонки"""
+        limit = width * 1000 / size
+        if self._units(text) <= limit:
+            return text
+        
+        limit -= self._units("...")
+        used = 0
+        for i, char in enumerate(text):
+            used += self._units(char)
+            if used > limit:
+                return text[:i] + "..."
+        return text
+    
+    def _encode(self, text):
+        """Строка PDF для оператора Tj"""
+        if self.font is None:
+            raw = text.encode('cp1252', errors='replace')
+            escaped = raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+            return b"(" + escaped + b")"
+        
+        glyphs = []
+        for char in text:
+            glyph = self.font.cmap.get(ord(char), 0)
+            self.used_glyphs.setdefault(glyph, char)
+            glyphs.append(f"{glyph:04X}")
+        return ("<" + "".join(glyphs) + ">").encode('latin-1')
+    
+    def begin_page(self):
+        """Начать новую страницу"""
+        if self._content is not None:
+            self.end_page()
+        self._content = []
+    
+    def text(self, x, y, text, size=10, align='left'):
+        """Вывести строку; y отсчитывается от верха страницы"""
+        if align != 'left':
+            width = self.text_width(text, size)
+            x -= width if align == 'right' else width / 2
+        
+        self._content.append(
+            f"BT /F1 {size} Tf {x:.2f} {self.page_height - y:.2f} Td ".encode('latin-1')
+            + self._encode(text) + b" Tj ET"
+        )
+    
+    def line(self, x1, y1, x2, y2, width=0.5):
+        """Отрезок; y отсчитывается от верха страницы"""
+        self._content.append(
+            f"{width} w {x1:.2f} {self.page_height - y1:.2f} m "
+            f"{x2:.2f} {self.page_height - y2:.2f} l S".encode('latin-1')
+        )
+    
+    def end_page(self):
+        """Сбросить текущую страницу в файл"""
+        if self._content is None:
+            return
+        
+        content_id = self._reserve()
+        self._write_stream(content_id, b"\n".join(self._content))
+        self._content = None
+        
+        page_id = self._reserve()
+        self._write_object(page_id, (
+            f"<< /Type /Page /Parent {self._pages_id} 0 R "
+            f"/MediaBox [0 0 {self.page_width} {self.page_height}] "
+            f"/Resources << /Font << /F1 {self._font_id} 0 R >> >> "
+            f"/Contents {content_id} 0 R >>"
+        ).encode('latin-1'))
+        self._page_ids.append(page_id)
+    
+    def _write_font(self):
+        """Шрифт: встроенный TrueType с ширинами только использованных глифов"""
+        if self.font is None:
+            self._write_object(self._font_id, (
+                b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"
+            ))
+            return
+        
+        font = self.font
+        cid_id, descriptor_id, file_id, unicode_id = (self._reserve() for _ in range(4))
+        
+        self._write_object(self._font_id, (
+            f"<< /Type /Font /Subtype /Type0 /BaseFont /{font.name} /Encoding /Identity-H "
+            f"/DescendantFonts [{cid_id} 0 R] /ToUnicode {unicode_id} 0 R >>"
+        ).encode('latin-1'))
+        
+        widths = " ".join(f"{glyph} [{font.glyph_width(glyph)}]" for glyph in sorted(self.used_glyphs))
+        self._write_object(cid_id, (
+            f"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /{font.name} "
+            f"/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+            f"/FontDescriptor {descriptor_id} 0 R /CIDToGIDMap /Identity /W [{widths}] >>"
+        ).encode('latin-1'))
+        
+        bbox = " ".join(str(v) for v in font.bbox)
+        self._write_object(descriptor_id, (
+            f"<< /Type /FontDescriptor /FontName /{font.name} /Flags 32 /FontBBox [{bbox}] "
+            f"/ItalicAngle 0 /Ascent {font.ascent} /Descent {font.descent} /CapHeight {font.ascent} "
+            f"/StemV 80 /FontFile2 {file_id} 0 R >>"
+        ).encode('latin-1'))
+        
+        self._write_stream(file_id, font.data, f"/Length1 {len(font.data)} ")
+        self._write_stream(unicode_id, self._to_unicode_cmap())
+    
+    def _to_unicode_cmap(self):
+        """CMap для копирования и поиска текста в просмотрщике"""
+        lines = [
+            "/CIDInit /ProcSet findresource begin 12 dict begin begincmap",
+            "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def",
+            "/CMapName /Adobe-Identity-UCS def /CMapType 2 def",
+            "1 begincodespacerange <0000> <FFFF> endcodespacerange"
+        ]
+        
+        items = sorted(self.used_glyphs.items())
+        for start in range(0, len(items), 100):
+            chunk = items[start:start + 100]
+            lines.append(f"{len(chunk)} beginbfchar")
+            for glyph, char in chunk:
+                code = char.encode('utf-16-be').hex().upper()
+                lines.append(f"<{glyph:04X}> <{code}>")
+            lines.append("endbfchar")
+        
+        lines.append("endcmap CMapName currentdict /CMap defineresource pop end end")
+        return "\n".join(lines).encode('latin-1')
+    
+    def close(self):
+        """Дописать шрифт, дерево страниц, таблицу xref и закрыть файл"""
+        self.end_page()
+        self._write_font()
+        
+        kids = " ".join(f"{page_id} 0 R" for page_id in self._page_ids)
+        self._write_object(self._pages_id, (
+            f"<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>"
+        ).encode('latin-1'))
+        self._write_object(self._catalog_id, (
+            f"<< /Type /Catalog /Pages {self._pages_id} 0 R >>"
+        ).encode('latin-1'))
+        
+        xref_offset = self._file.tell()
+        self._file.write(f"xref\n0 {self._next_id}\n0000000000 65535 f \n".encode('latin-1'))
+        for obj_id in range(1, self._next_id):
+            self._file.write(f"{self._offsets[obj_id]:010d} 00000 n \n".encode('latin-1'))
+        self._file.write((
+            f"trailer\n<< /Size {self._next_id} /Root {self._catalog_id} 0 R >>\n"
+            f"startxref\n{xref_offset}\n%%EOF\n"
+        ).encode('latin-1'))
+        self._file.close()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+"""
+Прибыль магазинов: свои расходы и доля общих по правилу распределения
+"""
+
+from config import PNL_ALLOCATION, PNL_FIXED_SHARES
+
+# Правила распределения общих расходов (для подписей)
+ALLOCATION_RULES = {
+    'revenue': "по выручке",
+    'fixed': "по заданным долям"
+}
+
+
+def allocation_weights(revenue, rule=PNL_ALLOCATION, shares=PNL_FIXED_SHARES):
+    """Доли магазинов в общих расходах: {магазин: доля}, сумма долей - 1"""
+    if rule == 'revenue':
+        weights = {shop: max(total, 0) for shop, total in revenue.items()}
+    elif rule == 'fixed':
+        weights = {shop: max(float(shares.get(shop, 0)), 0) for shop in revenue}
+    else:
+        raise ValueError(f"Неизвестное правило распределения расходов: {rule}")
+    
+    # Нет выручки или долей - поровну
+    total = sum(weights.values())
+    if total <= 0:
+        return {shop: 1 / len(revenue) for shop in revenue} if revenue else {}
+    return {shop: weight / total for shop, weight in weights.items()}
+
+
+def allocate_expenses(revenue, expenses, rule=PNL_ALLOCATION, shares=PNL_FIXED_SHARES):
+    """Прибыль магазинов за период
+    
+    revenue - {магазин: выручка}, expenses - {магазин расхода: сумма}. Расходы
+    магазина, которого нет в revenue (SHARED_EXPENSE_SHOP или старое название),
+    считаются общими и делятся по долям allocation_weights. Сумма прибыли
+    магазинов равна выручке минус все расходы.
+    
+    Возвращает {'shops': {магазин: {'revenue', 'direct', 'shared', 'profit'}},
+    'revenue', 'expenses', 'shared', 'profit'}.
+    """
+    shared = sum(total for shop, total in expenses.items() if shop not in revenue)
+    weights = allocation_weights(revenue, rule, shares)
+    
+    shops = {}
+    for shop, shop_revenue in revenue.items():
+        direct = expenses.get(shop, 0)
+        shop_shared = shared * weights[shop]
+        shops[shop] = {
+            'revenue': shop_revenue,
+            'direct': direct,
+            'shared': shop_shared,
+            'profit': shop_revenue - direct - shop_shared
+        }
+    
+    total_revenue = sum(revenue.values())
+    total_expenses = sum(expenses.values())
+    return {
+        'shops': shops,
+        'revenue': total_revenue,
+        'expenses': total_expenses,
+        'shared': shared,
+        'profit': total_revenue - total_expenses
+    }
+
+
+class PnlEngine:
+    """Прибыль магазинов за период одним сгруппированным запросом
+    
+    Выручка каждой таблицы продаж и расходы по магазинам читаются одним
+    UNION ALL (по частичным индексам даты), затем общие расходы распределяются
+    по правилу PNL_ALLOCATION.
+    """
+    
+    def __init__(self, sale_models, expense_model, rule=PNL_ALLOCATION, shares=PNL_FIXED_SHARES):
+        self.sale_models = list(sale_models)
+        self.expense_model = expense_model
+        self.rule = rule
+        self.shares = shares
+    
+    def compute(self, date_from=None, date_to=None):
+        """Прибыль магазинов за период (см. allocate_expenses)"""
+        parts = []
+        params = []
+        years = set()
+        
+        for index, model in enumerate(self.sale_models):
+            conditions, part_params = model._period_conditions(date_from, date_to)
+            source, part_years = model._source(date_from, date_to)
+            parts.append(
+                f"SELECT {index} as idx, NULL as shop, SUM(total) as total FROM {source}" + model._where(conditions)
+            )
+            params.extend(part_params)
+            years.update(part_years)
+        
+        model = self.expense_model
+        conditions, part_params = model._period_conditions(date_from, date_to)
+        source, part_years = model._source(date_from, date_to)
+        parts.append(
+            f"SELECT NULL as idx, shop, SUM(amount) as total FROM {source}" + model._where(conditions) + " GROUP BY shop"
+        )
+        params.extend(part_params)
+        years.update(part_years)
+        
+        rows = model._execute_query(" UNION ALL ".join(parts), params, fetchall=True, attach=sorted(years))
+        
+        revenue = {sale_model.shop_name: 0 for sale_model in self.sale_models}
+        expenses = {}
+        for row in rows:
+            if row['idx'] is not None:
+                revenue[self.sale_models[row['idx']].shop_name] = row['total'] or 0
+            else:
+                expenses[row['shop']] = row['total'] or 0
+        return allocate_expenses(revenue, expenses, self.rule, self.shares)
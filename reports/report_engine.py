@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+
+"""
+Расчет отчета по частям (магазин x месяц) в нескольких процессах
+"""
+
+import calendar
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from config import REPORT_WORKERS, REPORT_PARALLEL_MIN_PARTS
+
+
+def compute_part(task):
+    """Частичные итоги одной таблицы за один месяц (выполняется в процессе-обработчике)
+    
+    Функция не трогает модели и config: все, что нужно, приходит в задаче,
+    поэтому обработчик открывает свое соединение только для чтения к той же
+    БД, что и главный процесс (в том числе при cli.py --db).
+    """
+    conn = sqlite3.connect(f"{Path(task['db_path']).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        for path, alias in task['attach']:
+            conn.execute("ATTACH DATABASE ? AS ?", (f"{Path(path).resolve().as_uri()}?mode=ro", alias))
+        
+        live = " AND deleted = 0" if task['soft_delete'] else ""
+        where = f" WHERE date BETWEEN ? AND ?{live}"
+        period = (task['date_from'], task['date_to'])
+        
+        if task['kind'] == 'sales':
+            rows = conn.execute(
+                f"SELECT date, item_id, seller_id, COUNT(*), SUM(quantity), SUM(total) FROM {task['source']}"
+                + where + " GROUP BY date, item_id, seller_id ORDER BY date, item_id, seller_id",
+                period
+            ).fetchall()
+            
+            days, items, sellers = {}, {}, {}
+            count = total = 0
+            for day, item_id, seller_id, rows_count, quantity, amount in rows:
+                amount = amount or 0
+                days[day] = days.get(day, 0) + amount
+                item = items.setdefault(item_id, [0, 0])
+                item[0] += quantity or 0
+                item[1] += amount
+                seller = sellers.setdefault(seller_id, [0, 0])
+                seller[0] += rows_count
+                seller[1] += amount
+                count += rows_count
+                total += amount
+            return {'days': days, 'items': items, 'sellers': sellers, 'count': count, 'total': total}
+        
+        rows = conn.execute(
+            f"SELECT date, shop, COUNT(*), SUM(amount) FROM {task['source']}"
+            + where + " GROUP BY date, shop ORDER BY date, shop",
+            period
+        ).fetchall()
+        
+        days, shops = {}, {}
+        count = total = 0
+        for day, shop, rows_count, amount in rows:
+            amount = amount or 0
+            days[day] = days.get(day, 0) + amount
+            shops[shop] = shops.get(shop, 0) + amount
+            count += rows_count
+            total += amount
+        return {'days': days, 'shops': shops, 'count': count, 'total': total}
+    finally:
+        conn.close()
+
+
+def _month_ranges(date_from, date_to):
+    """Период, разбитый по календарным месяцам: [(начало, конец)]"""
+    ranges = []
+    year, month = int(date_from[:4]), int(date_from[5:7])
+    while True:
+        start = max(date_from, f"{year}-{month:02d}-01")
+        end = min(date_to, f"{year}-{month:02d}-{calendar.monthrange(year, month)[1]:02d}")
+        ranges.append((start, end))
+        if end >= date_to:
+            return ranges
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def _add_into(target, source):
+    """Прибавить словарь частичных сумм (числа или списки чисел) к итоговому"""
+    for key, value in source.items():
+        if isinstance(value, list):
+            current = target.setdefault(key, [0] * len(value))
+            for index, number in enumerate(value):
+                current[index] += number
+        else:
+            target[key] = target.get(key, 0) + value
+
+
+class ReportEngine:
+    """Итоги отчета за период: продажи по магазинам, дням, товарам и продавцам, расходы
+    
+    Период делится на задачи "таблица x месяц"; задачи считаются в пуле
+    процессов (каждый со своим соединением только для чтения), если их не
+    меньше REPORT_PARALLEL_MIN_PARTS, иначе - в этом же процессе той же
+    функцией. Частичные итоги складываются в порядке задач (магазины в
+    порядке настроек, месяцы по возрастанию), а не в порядке готовности,
+    поэтому результат не зависит от числа процессов до последнего знака.
+    
+    По умолчанию пул создается на каждый расчет; окно, которое строит отчет
+    много раз, держит один пул через open_pool()/close().
+    """
+    
+    def __init__(self, sale_models, expense_model, workers=None):
+        self.sale_models = list(sale_models)
+        self.expense_model = expense_model
+        self.workers = workers or REPORT_WORKERS or os.cpu_count() or 1
+        self._pool = None
+    
+    def open_pool(self):
+        """Держать пул процессов между расчетами (процессы запускаются при первом расчете)"""
+        if self._pool is None and self.workers > 1:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+    
+    def close(self):
+        """Остановить пул, открытый open_pool (незапущенные задачи отменяются)"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+    
+    def _tasks(self, date_from, date_to):
+        """Задачи расчета: (магазин или None для расходов, задача)"""
+        from models.base_model import partition_path
+        from config import DB_PATH
+        
+        tasks = []
+        models = [(model.shop_name, model, 'sales') for model in self.sale_models]
+        models.append((None, self.expense_model, 'expenses'))
+        for shop, model, kind in models:
+            for start, end in _month_ranges(date_from, date_to):
+                source, years = model._source(start, end)
+                tasks.append((shop, {
+                    'db_path': str(DB_PATH),
+                    'attach': [(str(partition_path(year)), f"p{year}") for year in years],
+                    'source': source,
+                    'kind': kind,
+                    'soft_delete': model.SOFT_DELETE,
+                    'date_from': start,
+                    'date_to': end
+                }))
+        return tasks
+    
+    def compute(self, date_from, date_to):
+        """Итоги за период
+        
+        {'sales': {магазин: {'days', 'items', 'sellers', 'count', 'total'}},
+         'expenses': {'days', 'shops', 'count', 'total'}}
+        """
+        tasks = self._tasks(date_from, date_to)
+        parts = [task for _, task in tasks]
+        
+        pool = self._pool
+        if pool is not None and len(parts) >= REPORT_PARALLEL_MIN_PARTS:
+            # map возвращает результаты в порядке задач
+            partials = list(pool.map(compute_part, parts))
+        elif self.workers > 1 and len(parts) >= REPORT_PARALLEL_MIN_PARTS:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(parts))) as pool:
+                # map возвращает результаты в порядке задач
+                partials = list(pool.map(compute_part, parts))
+        else:
+            partials = [compute_part(part) for part in parts]
+        
+        result = {
+            'sales': {
+                model.shop_name: {'days': {}, 'items': {}, 'sellers': {}, 'count': 0, 'total': 0}
+                for model in self.sale_models
+            },
+            'expenses': {'days': {}, 'shops': {}, 'count': 0, 'total': 0}
+        }
+        for (shop, _), partial in zip(tasks, partials):
+            target = result['sales'][shop] if shop is not None else result['expenses']
+            for key, value in partial.items():
+                if isinstance(value, dict):
+                    _add_into(target[key], value)
+                else:
+                    target[key] += value
+        return result
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+
+"""
+Печатные отчеты (PDF и HTML) за день, период или по магазину
+"""
+
+import html
+import os
+from datetime import datetime
+from pathlib import Path
+from config import REPORT_FONT_PATHS, REPORT_FETCH_SIZE, PNL_ALLOCATION
+from models.sale_model import SaleModel
+from models.expense_model import ExpenseModel
+from models.settings_model import get_settings
+from reports.pdf_writer import PdfWriter
+from reports.pnl_engine import PnlEngine, ALLOCATION_RULES
+
+
+# Колонки отчета: (поле, заголовок, ширина в пунктах, выравнивание, формат)
+SALES_REPORT_COLUMNS = [
+    ('date', "Дата", 60, 'left', str),
+    ('seller_name', "Продавец", 90, 'left', str),
+    ('item', "Товар", 175, 'left', str),
+    ('quantity', "Кол-во", 50, 'right', lambda v: f"{v:g}"),
+    ('price', "Цена", 65, 'right', lambda v: f"{v:.2f}"),
+    ('total', "Сумма", 75, 'right', lambda v: f"{v:.2f}")
+]
+
+EXPENSE_REPORT_COLUMNS = [
+    ('date', "Дата", 60, 'left', str),
+    ('shop', "Магазин", 70, 'left', str),
+    ('item', "Наименование", 170, 'left', str),
+    ('descr', "Описание", 140, 'left', str),
+    ('amount', "Сумма", 75, 'right', lambda v: f"{v:.2f}")
+]
+
+
+class ReportCancelled(Exception):
+    """Формирование отчета отменено пользователем"""
+
+
+def find_report_font():
+    """Первый доступный TrueType-шрифт с кириллицей (None, если не найден)"""
+    for path in REPORT_FONT_PATHS:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+class ReportRenderer:
+    """Формирование отчета с потоковым чтением строк из моделей
+    
+    Строки читаются страницами (BaseModel.iter_rows) и сразу пишутся в файл,
+    поэтому годовой подробный отчет не требует памяти под все записи.
+    """
+    
+    MARGIN = 40
+    LINE_HEIGHT = 13
+    FONT_SIZE = 9
+    
+    def __init__(self, date_from, date_to, shop=None):
+        self.date_from = date_from
+        self.date_to = date_to
+        self.shop = shop
+        
+        self.currency = get_settings().currency
+        models = {item['name']: SaleModel(item['name'], item['table_suffix']) for item in get_settings().get_shops()}
+        self.sections = [
+            {
+                'title': f"Продажи: {name}",
+                'model': model,
+                'filters': None,
+                'columns': SALES_REPORT_COLUMNS,
+                'total_key': 'total',
+                'sign': 1
+            }
+            for name, model in models.items() if shop is None or name == shop
+        ]
+        
+        # Доля магазина в общих расходах зависит от всех магазинов
+        expense_model = ExpenseModel()
+        self.pnl = PnlEngine(models.values(), expense_model)
+        self.sections.append({
+            'title': "Расходы" + (f": {shop}" if shop else ""),
+            'model': expense_model,
+            'filters': {'shop': shop} if shop else None,
+            'columns': EXPENSE_REPORT_COLUMNS,
+            'total_key': 'amount',
+            'sign': -1
+        })
+    
+    @property
+    def title(self):
+        """Заголовок отчета"""
+        date_from = datetime.strptime(self.date_from, "%Y-%m-%d").strftime("%d.%m.%Y")
+        date_to = datetime.strptime(self.date_to, "%Y-%m-%d").strftime("%d.%m.%Y")
+        title = f"Отчет за {date_from}" if date_from == date_to else f"Отчет за период {date_from} - {date_to}"
+        if self.shop:
+            title += f", магазин {self.shop}"
+        return title
+    
+    def count_rows(self):
+        """Всего строк в отчете (для индикатора прогресса)"""
+        return sum(
+            section['model'].count_rows(self.date_from, self.date_to, section['filters'])
+            for section in self.sections
+        )
+    
+    def _rows(self, section):
+        """Строки раздела из модели"""
+        return section['model'].iter_rows(self.date_from, self.date_to, section['filters'])
+    
+    def render(self, path, progress=None, cancel_event=None):
+        """Сформировать отчет; формат определяется расширением файла (.pdf или .html)"""
+        render = self.render_html if Path(path).suffix.lower() in ('.html', '.htm') else self.render_pdf
+        try:
+            render(path, progress, cancel_event)
+        except ReportCancelled:
+            # Недописанный файл не оставляем
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+    
+    def _tracker(self, progress, cancel_event):
+        """Функция учета обработанной строки: прогресс и проверка отмены"""
+        total = self.count_rows() if progress else 0
+        state = {'done': 0}
+        
+        if progress:
+            progress(0, total)
+        
+        def step():
+            state['done'] += 1
+            if state['done'] % REPORT_FETCH_SIZE == 0:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise ReportCancelled()
+                if progress:
+                    progress(state['done'], total)
+        
+        def finish():
+            if progress:
+                progress(state['done'], total)
+        
+        return step, finish
+    
+    def render_pdf(self, path, progress=None, cancel_event=None):
+        """Отчет в PDF: страницы A4 с повтором заголовков колонок"""
+        step, finish = self._tracker(progress, cancel_event)
+        font_path = find_report_font()
+        if font_path is None:
+            print("Шрифт с кириллицей не найден, PDF будет сформирован шрифтом Helvetica")
+        
+        with PdfWriter(path, font_path) as pdf:
+            bottom = pdf.page_height - self.MARGIN
+            state = {'page': 0, 'y': 0}
+            
+            def new_page():
+                pdf.begin_page()
+                state['page'] += 1
+                pdf.text(self.MARGIN, self.MARGIN, self.title, 12)
+                pdf.text(pdf.page_width - self.MARGIN, self.MARGIN, f"Стр. {state['page']}", self.FONT_SIZE, 'right')
+                pdf.line(self.MARGIN, self.MARGIN + 6, pdf.page_width - self.MARGIN, self.MARGIN + 6)
+                state['y'] = self.MARGIN + 24
+            
+            def draw_row(columns, values):
+                x = self.MARGIN
+                for (_, _, width, align, _), value in zip(columns, values):
+                    value = pdf.fit_text(value, self.FONT_SIZE, width - 4)
+                    if align == 'right':
+                        pdf.text(x + width - 2, state['y'], value, self.FONT_SIZE, 'right')
+                    else:
+                        pdf.text(x, state['y'], value, self.FONT_SIZE)
+                    x += width
+                state['y'] += self.LINE_HEIGHT
+            
+            def draw_header(columns):
+                draw_row(columns, [header for _, header, _, _, _ in columns])
+                right = self.MARGIN + sum(width for _, _, width, _, _ in columns)
+                pdf.line(self.MARGIN, state['y'] - 9, right, state['y'] - 9)
+            
+            new_page()
+            totals = []
+            for section in self.sections:
+                columns = section['columns']
+                
+                # Заголовок раздела не остается один внизу страницы
+                if state['y'] + 3 * self.LINE_HEIGHT > bottom:
+                    new_page()
+                pdf.text(self.MARGIN, state['y'], section['title'], 11)
+                state['y'] += self.LINE_HEIGHT + 4
+                draw_header(columns)
+                
+                section_total = 0
+                for record in self._rows(section):
+                    if state['y'] > bottom:
+                        new_page()
+                        draw_header(columns)
+                    draw_row(columns, [self._cell(record, key, fmt) for key, _, _, _, fmt in columns])
+                    section_total += record.get(section['total_key']) or 0
+                    step()
+                
+                if state['y'] > bottom:
+                    new_page()
+                pdf.text(self.MARGIN, state['y'], f"Итого: {section_total:.2f} {self.currency}", self.FONT_SIZE + 1)
+                state['y'] += 2 * self.LINE_HEIGHT
+                totals.append((section, section_total))
+            
+            if state['y'] + 4 * self.LINE_HEIGHT > bottom:
+                new_page()
+            for text in self._summary(totals):
+                pdf.text(self.MARGIN, state['y'], text, 11)
+                state['y'] += self.LINE_HEIGHT + 2
+        
+        finish()
+    
+    def render_html(self, path, progress=None, cancel_event=None):
+        """Отчет в HTML: строки пишутся в файл по мере чтения"""
+        step, finish = self._tracker(progress, cancel_event)
+        
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(
+                "<!DOCTYPE html>\n<html lang=\"ru\">\n<head>\n<meta charset=\"utf-8\">\n"
+                f"<title>{html.escape(self.title)}</title>\n"
+                "<style>\n"
+                "body { font-family: Arial, sans-serif; font-size: 10pt; }\n"
+                "table { border-collapse: collapse; width: 100%; margin-bottom: 1em; }\n"
+                "th, td { border: 1px solid #ccc; padding: 2px 4px; }\n"
+                "th { background: #e1e1e1; }\n"
+                "td.num { text-align: right; }\n"
+                "thead { display: table-header-group; }\n"
+                "tr { page-break-inside: avoid; }\n"
+                "</style>\n</head>\n<body>\n"
+                f"<h1>{html.escape(self.title)}</h1>\n"
+            )
+            
+            totals = []
+            for section in self.sections:
+                columns = section['columns']
+                f.write(f"<h2>{html.escape(section['title'])}</h2>\n<table>\n<thead><tr>")
+                f.write("".join(f"<th>{html.escape(header)}</th>" for _, header, _, _, _ in columns))
+                f.write("</tr></thead>\n<tbody>\n")
+                
+                section_total = 0
+                for record in self._rows(section):
+                    cells = []
+                    for key, _, _, align, fmt in columns:
+                        text = html.escape(self._cell(record, key, fmt))
+                        cells.append(f"<td class=\"num\">{text}</td>" if align == 'right' else f"<td>{text}</td>")
+                    f.write("<tr>" + "".join(cells) + "</tr>\n")
+                    section_total += record.get(section['total_key']) or 0
+                    step()
+                
+                f.write(
+                    f"</tbody>\n<tfoot><tr><th colspan=\"{len(columns)}\">"
+                    f"Итого: {section_total:.2f} {html.escape(self.currency)}</th></tr></tfoot>\n</table>\n"
+                )
+                totals.append((section, section_total))
+            
+            for text in self._summary(totals):
+                f.write(f"<p><b>{html.escape(text)}</b></p>\n")
+            f.write("</body>\n</html>\n")
+        
+        finish()
+    
+    @staticmethod
+    def _cell(record, key, fmt):
+        """Текст ячейки (пустая строка для NULL)"""
+        value = record.get(key)
+        return fmt(value) if value is not None else ""
+    
+    def _summary(self, totals):
+        """Итоговые строки: выручка, расходы, прибыль и прибыль магазинов с долей общих расходов"""
+        revenue = sum(total for section, total in totals if section['sign'] > 0)
+        expense = sum(total for section, total in totals if section['sign'] < 0)
+        lines = [
+            f"Выручка: {revenue:.2f} {self.currency}",
+            f"Расходы: {expense:.2f} {self.currency}",
+            f"Прибыль: {revenue - expense:.2f} {self.currency}"
+        ]
+        
+        pnl = self.pnl.compute(self.date_from, self.date_to)
+        if pnl['shared']:
+            lines.append(
+                f"Общие расходы: {pnl['shared']:.2f} {self.currency}, распределены {ALLOCATION_RULES[PNL_ALLOCATION]}"
+            )
+        for shop, row in pnl['shops'].items():
+            if self.shop is None or shop == self.shop:
+                lines.append(
+                    f"Прибыль {shop} с долей общих расходов ({row['shared']:.2f}): {row['profit']:.2f} {self.currency}"
+                )
+        return lines
@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+
+"""
+Синхронизация данных между компьютерами магазинов
+"""
+
+import json
+import time
+import zlib
+from config import SYNC_BATCH_SIZE, SYNC_JOURNAL_KEEP_DAYS
+from models.base_model import attach_partitions
+
+
+class SyncEngine:
+    """Обмен сжатыми пакетами изменений строк между узлами
+    
+    Каждая строка идентифицируется своим UUID, изменения берутся из журнала
+    changes (заполняется триггерами). Конфликты решаются по правилу
+    "последняя запись побеждает": сравниваются (updated_at, origin).
+    
+    Строка закрытого года ищется и в разделах (models/partitions.py):
+    изменение, пришедшее для нее, сравнивается с версией в разделе и
+    записывается прямо туда.
+    
+    Синхронизируются только таблицы переданных моделей (в окне - продажи
+    магазинов из настроек этого узла, расходы и приходы товара). Настройки,
+    пользователи и справочники не передаются: товары и продавцы создаются
+    по названиям из пакетов, продажи магазина, которого нет в настройках
+    узла, к нему не приходят, и его остатки склада (их ведут местные
+    триггеры) расходятся с остатками других узлов.
+    
+    Журнал changes после отправки обрезается (_prune_journal): записи до
+    курсора push_seq старше SYNC_JOURNAL_KEEP_DAYS удаляются. Столько же
+    живут отметки удалений - пакет, опоздавший больше чем на этот срок,
+    может вернуть удаленную строку.
+    """
+    
+    def __init__(self, models, transport, batch_size=SYNC_BATCH_SIZE):
+        self.models = {model.table_name: model for model in models}
+        self.transport = transport
+        self.batch_size = batch_size
+        
+        # Любая модель подходит для получения соединения и идентификатора узла
+        self._model = models[0]
+        self.node_id = self._model.node_id
+        self._partitions = {}
+    
+    def sync(self):
+        """Полный цикл: отправить свои изменения и применить чужие"""
+        sent = self.push()
+        received = self.pull()
+        return {'sent': sent, 'received': received}
+    
+    def push(self):
+        """Отправить локальные изменения пакетами; возвращает число изменений"""
+        conn = self._connect()
+        sent = 0
+        
+        try:
+            while True:
+                cursor = int(self._get_meta(conn, 'push_seq', 0))
+                rows = conn.execute(
+                    "SELECT seq, table_name, row_uuid, op, ts FROM changes "
+                    "WHERE origin = ? AND seq > ? ORDER BY seq LIMIT ?",
+                    (self.node_id, cursor, self.batch_size)
+                ).fetchall()
+                
+                if not rows:
+                    break
+                
+                changes = self._collect_changes(conn, rows)
+                seq_to = rows[-1]['seq']
+                
+                if changes:
+                    payload = {
+                        'node': self.node_id,
+                        'seq_from': cursor,
+                        'seq_to': seq_to,
+                        'changes': changes
+                    }
+                    self.transport.put_batch(self.node_id, seq_to, self._pack(payload))
+                    sent += len(changes)
+                
+                # Курсор сдвигается только после успешной отправки пакета,
+                # поэтому прерванная синхронизация продолжится с этого места
+                self._set_meta(conn, 'push_seq', seq_to)
+                conn.commit()
+            
+            self._prune_journal(conn)
+        finally:
+            conn.close()
+        
+        return sent
+    
+    def pull(self):
+        """Получить и применить чужие пакеты; возвращает число применённых изменений"""
+        received = 0
+        
+        for node in self.transport.list_nodes():
+            if node == self.node_id:
+                continue
+            
+            conn = self._connect()
+            try:
+                cursor = int(self._get_meta(conn, f'pull_seq:{node}', 0))
+                for seq_to in self.transport.list_batches(node, cursor):
+                    payload = self._unpack(self.transport.get_batch(node, seq_to))
+                    
+                    try:
+                        # Сравнение версий и запись - под одной блокировкой записи:
+                        # касса, пишущая в ту же БД, не вклинится между ними
+                        conn.execute("BEGIN IMMEDIATE")
+                        for change in payload['changes']:
+                            if self._apply_change(conn, change):
+                                received += 1
+                        # Курсор обновляется в той же транзакции, что и данные
+                        self._set_meta(conn, f'pull_seq:{node}', seq_to)
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+            finally:
+                conn.close()
+        
+        return received
+    
+    def _prune_journal(self, conn):
+        """Удалить из журнала changes отправленные и устаревшие записи
+        
+        Свои изменения до курсора push_seq уже переданы, чужие отсюда не
+        отправляются вовсе; наблюдатель изменений и снимок читают только
+        свежие записи. Граница удаленных записей сохраняется в sync_meta
+        (changes_pruned): снимок, отставший от нее, выгружается заново целиком.
+        """
+        cursor = int(self._get_meta(conn, 'push_seq', 0))
+        horizon = time.time() - SYNC_JOURNAL_KEEP_DAYS * 86400
+        bound = conn.execute(
+            "SELECT MAX(seq) FROM changes WHERE seq <= ? AND ts < ?", (cursor, horizon)
+        ).fetchone()[0]
+        if bound is None:
+            return
+        
+        conn.execute("DELETE FROM changes WHERE seq <= ? AND ts < ?", (bound, horizon))
+        self._set_meta(conn, 'changes_pruned', max(bound, int(self._get_meta(conn, 'changes_pruned', 0))))
+        conn.commit()
+    
+    def _connect(self):
+        """Соединение с рабочей БД и подключенными разделами закрытых лет"""
+        # Год мог перенести другой процесс - список разделов читается заново
+        self._model.reload_meta()
+        self._partitions = {name: model.partition_years() for name, model in self.models.items()}
+        
+        conn = self._model._get_connection()
+        try:
+            attach_partitions(conn, sorted({year for years in self._partitions.values() for year in years}))
+        except Exception:
+            conn.close()
+            raise
+        return conn
+    
+    def _find_row(self, conn, table_name, row_uuid, columns="*"):
+        """Строка по uuid в рабочей таблице или в разделах: (строка, таблица) или (None, None)"""
+        for source in [f"main.{table_name}"] + [f"p{year}.{table_name}" for year in self._partitions.get(table_name, ())]:
+            row = conn.execute(f"SELECT {columns} FROM {source} WHERE uuid = ?", (row_uuid,)).fetchone()
+            if row is not None:
+                return row, source
+        return None, None
+    
+    def _collect_changes(self, conn, rows):
+        """Свернуть записи журнала до последнего состояния каждой строки"""
+        latest = {}
+        for row in rows:
+            if row['table_name'] in self.models and row['row_uuid']:
+                latest[(row['table_name'], row['row_uuid'])] = row
+        
+        changes = []
+        for (table_name, row_uuid), row in latest.items():
+            if row['op'] == 'delete':
+                changes.append({
+                    'table': table_name,
+                    'uuid': row_uuid,
+                    'op': 'delete',
+                    'ts': row['ts'],
+                    'origin': self.node_id
+                })
+                continue
+            
+            # Измененную строку могли перенести в раздел до отправки
+            current, _ = self._find_row(conn, table_name, row_uuid)
+            
+            # Строку уже удалили или перезаписали изменением с другого узла
+            if current is None or current['origin'] != self.node_id:
+                continue
+            
+            # Мягко удаленная строка уходит на другие узлы обычным удалением;
+            # отмена удаления позже придет к ним как новая версия строки
+            if self.models[table_name].is_deleted(current):
+                changes.append({
+                    'table': table_name,
+                    'uuid': row_uuid,
+                    'op': 'delete',
+                    'ts': current['updated_at'],
+                    'origin': self.node_id
+                })
+                continue
+            
+            changes.append({
+                'table': table_name,
+                'uuid': row_uuid,
+                'op': 'upsert',
+                'ts': current['updated_at'],
+                'origin': self.node_id,
+                'data': self.models[table_name].sync_export_row(conn, current)
+            })
+        
+        return changes
+    
+    def _apply_change(self, conn, change):
+        """Применить одно изменение по правилу "последняя запись побеждает" """
+        model = self.models.get(change['table'])
+        if model is None:
+            return False
+        
+        table_name = model.table_name
+        incoming = (change['ts'], change['origin'])
+        
+        local, source = self._find_row(conn, table_name, change['uuid'], "id, updated_at, origin, date")
+        
+        if local is not None:
+            if incoming <= (local['updated_at'], local['origin'] or ''):
+                return False
+        else:
+            # Строку могли удалить локально позже, чем пришло изменение
+            tombstone = conn.execute(
+                "SELECT MAX(ts) AS ts FROM changes WHERE row_uuid = ? AND op = 'delete'",
+                (change['uuid'],)
+            ).fetchone()
+            if tombstone['ts'] is not None and change['ts'] <= tombstone['ts']:
+                return False
+        
+        if source is not None and source != f"main.{table_name}":
+            return self._apply_to_partition(conn, model, change, source, local)
+        
+        if change['op'] == 'delete':
+            if local is None:
+                return False
+            conn.execute(
+                f"UPDATE {table_name} SET origin = ?, updated_at = ? WHERE id = ?",
+                (change['origin'], change['ts'], local['id'])
+            )
+            conn.execute(f"DELETE FROM {table_name} WHERE id = ?", (local['id'],))
+            return True
+        
+        data = model.sync_import_row(conn, change['data'])
+        data['uuid'] = change['uuid']
+        data['origin'] = change['origin']
+        data['updated_at'] = change['ts']
+        
+        if local is None:
+            columns = ', '.join(data.keys())
+            placeholders = ', '.join(['?' for _ in data])
+            conn.execute(
+                f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})",
+                list(data.values())
+            )
+        else:
+            set_clause = ', '.join([f"{key}=?" for key in data.keys()])
+            conn.execute(
+                f"UPDATE {table_name} SET {set_clause} WHERE id = ?",
+                list(data.values()) + [local['id']]
+            )
+        
+        return True
+    
+    def _apply_to_partition(self, conn, model, change, source, local):
+        """Записать выигравшее изменение строки закрытого года прямо в ее раздел
+        
+        Триггеров у раздела нет: строка журнала changes (для наблюдателя
+        изменений и проверки удалений) пишется здесь с узлом-автором, поэтому
+        обратно не отправляется, а итоги, которые ведут триггеры рабочей
+        таблицы (остатки склада, итоги продавцов), меняет сама модель.
+        """
+        old = conn.execute(f"SELECT * FROM {source} WHERE id = ?", (local['id'],)).fetchone()
+        
+        if change['op'] == 'delete':
+            conn.execute(f"DELETE FROM {source} WHERE id = ?", (local['id'],))
+            model.track_partition_write(conn, old, None)
+            date = local['date']
+        else:
+            data = model.sync_import_row(conn, change['data'])
+            data['uuid'] = change['uuid']
+            data['origin'] = change['origin']
+            data['updated_at'] = change['ts']
+            date = data.get('date', local['date'])
+            
+            if not str(date).startswith(source[1:5]):
+                # Запись перенесли в другой год - она возвращается в рабочую таблицу
+                # (журнал и итоги новой версии ведут ее триггеры); закрытый год снова уберет ее в раздел
+                conn.execute(f"DELETE FROM {source} WHERE id = ?", (local['id'],))
+                model.track_partition_write(conn, old, None)
+                columns = ', '.join(data.keys())
+                placeholders = ', '.join(['?' for _ in data])
+                conn.execute(
+                    f"INSERT INTO main.{model.table_name} ({columns}) VALUES ({placeholders})",
+                    list(data.values())
+                )
+                return True
+            
+            set_clause = ', '.join([f"{key}=?" for key in data.keys()])
+            conn.execute(
+                f"UPDATE {source} SET {set_clause} WHERE id = ?",
+                list(data.values()) + [local['id']]
+            )
+            new = conn.execute(f"SELECT * FROM {source} WHERE id = ?", (local['id'],)).fetchone()
+            model.track_partition_write(conn, old, new)
+        
+        conn.execute(
+            "INSERT INTO main.changes (table_name, row_uuid, op, origin, ts, date, prev_date) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (model.table_name, change['uuid'], change['op'], change['origin'], change['ts'], date, local['date'])
+        )
+        return True
+    
+    @staticmethod
+    def _pack(payload):
+        """Сериализовать и сжать пакет"""
+        return zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), 9)
+    
+    @staticmethod
+    def _unpack(blob):
+        """Распаковать пакет"""
+        return json.loads(zlib.decompress(blob).decode('utf-8'))
+    
+    @staticmethod
+    def _get_meta(conn, key, default=None):
+        """Прочитать значение из служебной таблицы синхронизации"""
+        row = conn.execute("SELECT value FROM sync_meta WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else default
+    
+    @staticmethod
+    def _set_meta(conn, key, value):
+        """Записать значение в служебную таблицу синхронизации"""
+        conn.execute(
+            "INSERT OR REPLACE INTO sync_meta (key, value) VALUES (?, ?)",
+            (key, str(value))
+        )
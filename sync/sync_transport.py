@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+"""
+Транспорт для обмена пакетами синхронизации через общую папку
+"""
+
+import os
+from pathlib import Path
+
+
+class FileSystemTransport:
+    """Локальный "сервер" синхронизации: общая папка с пакетами от каждого узла
+    
+    Структура папки: <root>/<node_id>/<seq_to>.batch, где seq_to - номер
+    последнего изменения узла, вошедшего в пакет. Подходит для сетевой папки
+    между магазинами и для проверки синхронизации на одной машине.
+    """
+    
+    SUFFIX = ".batch"
+    
+    def __init__(self, root_dir):
+        self.root = Path(root_dir)
+        self.root.mkdir(parents=True, exist_ok=True)
+    
+    def put_batch(self, node_id, seq_to, payload):
+        """Сохранить пакет узла (атомарно, повторная отправка перезаписывает пакет)"""
+        node_dir = self.root / node_id
+        node_dir.mkdir(exist_ok=True)
+        
+        target = node_dir / f"{seq_to:012d}{self.SUFFIX}"
+        tmp = target.with_suffix(".tmp")
+        with open(tmp, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp, target)
+    
+    def list_nodes(self):
+        """Список узлов, отправлявших пакеты"""
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir())
+    
+    def list_batches(self, node_id, after_seq=0):
+        """Номера пакетов узла, более новых чем after_seq, по возрастанию"""
+        node_dir = self.root / node_id
+        if not node_dir.is_dir():
+            return []
+        
+        result = []
+        for path in node_dir.iterdir():
+            if path.suffix != self.SUFFIX:
+                continue
+            try:
+                seq_to = int(path.stem)
+            except ValueError:
+                continue
+            if seq_to > after_seq:
+                result.append(seq_to)
+        
+        return sorted(result)
+    
+    def get_batch(self, node_id, seq_to):
+        """Прочитать пакет узла"""
+        with open(self.root / node_id / f"{seq_to:012d}{self.SUFFIX}", 'rb') as f:
+            return f.read()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+"""
+Скрытое окно диагностики: статистика запросов к БД
+"""
+
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+from config import PROFILER_LOG_PATH, TABLE_FONT
+from models.query_profiler import profiler
+
+
+class DiagnosticsWindow(tk.Toplevel):
+    """Окно со статистикой профилировщика запросов"""
+    
+    REFRESH_MS = 1000
+    
+    def __init__(self, master):
+        super().__init__(master)
+        self.title("Диагностика запросов")
+        self.geometry("1000x550")
+        
+        self._create_widgets()
+        self._refresh()
+    
+    def _create_widgets(self):
+        """Создание виджетов"""
+        toolbar = ttk.Frame(self)
+        toolbar.pack(fill=tk.X, padx=5, pady=5)
+        
+        self.enabled_var = tk.BooleanVar(value=profiler.enabled)
+        ttk.Checkbutton(
+            toolbar,
+            text="Профилирование включено",
+            variable=self.enabled_var,
+            command=self._toggle
+        ).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(toolbar, text="Медленный запрос, мс:").pack(side=tk.LEFT, padx=(20, 2))
+        self.threshold_var = tk.StringVar(value=str(profiler.slow_threshold_ms))
+        threshold_entry = ttk.Entry(toolbar, textvariable=self.threshold_var, width=6)
+        threshold_entry.pack(side=tk.LEFT, padx=2)
+        threshold_entry.bind('<Return>', lambda e: self._toggle())
+        
+        ttk.Button(toolbar, text="Сбросить", command=self._reset).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(toolbar, text="Сохранить JSON", command=self._save).pack(side=tk.RIGHT, padx=5)
+        
+        panes = ttk.PanedWindow(self, orient=tk.VERTICAL)
+        panes.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        # Сводка по нормализованным запросам
+        columns = ('count', 'total', 'avg', 'max', 'rows', 'slow')
+        self.stats_tree = ttk.Treeview(panes, columns=columns, height=12)
+        self.stats_tree.heading('#0', text="Запрос")
+        self.stats_tree.column('#0', width=520)
+        for column, text in zip(columns, ("Вызовов", "Всего, мс", "Среднее, мс", "Макс, мс", "Строк", "Медленных")):
+            self.stats_tree.heading(column, text=text)
+            self.stats_tree.column(column, width=75, anchor='e')
+        panes.add(self.stats_tree, weight=3)
+        
+        # Последние медленные запросы с планом выполнения
+        self.slow_text = tk.Text(panes, height=8, font=TABLE_FONT, wrap=tk.NONE)
+        panes.add(self.slow_text, weight=2)
+    
+    def _toggle(self):
+        """Включить или выключить профилирование"""
+        try:
+            threshold = float(self.threshold_var.get())
+        except ValueError:
+            threshold = None
+        
+        if self.enabled_var.get():
+            profiler.enable(threshold)
+        else:
+            profiler.disable()
+    
+    def _reset(self):
+        """Очистить статистику"""
+        profiler.reset()
+        self._render()
+    
+    def _save(self):
+        """Сохранить статистику в JSON"""
+        path = filedialog.asksaveasfilename(
+            parent=self,
+            defaultextension=".json",
+            initialfile=PROFILER_LOG_PATH.name,
+            initialdir=str(PROFILER_LOG_PATH.parent),
+            filetypes=[("JSON", "*.json")]
+        )
+        if path:
+            profiler.dump_json(path)
+            messagebox.showinfo("Диагностика", f"Статистика сохранена:\n{path}", parent=self)
+    
+    def _refresh(self):
+        """Периодическое обновление, пока окно открыто"""
+        if not self.winfo_exists():
+            return
+        self._render()
+        self.after(self.REFRESH_MS, self._refresh)
+    
+    def _render(self):
+        """Отрисовать текущую статистику"""
+        data = profiler.snapshot()
+        
+        self.stats_tree.delete(*self.stats_tree.get_children())
+        for stat in data['queries']:
+            self.stats_tree.insert('', tk.END, text=stat['query'], values=(
+                stat['count'],
+                f"{stat['total_ms']:.1f}",
+                f"{stat['avg_ms']:.2f}",
+                f"{stat['max_ms']:.2f}",
+                stat['rows'],
+                stat['slow']
+            ))
+        
+        self.slow_text.delete('1.0', tk.END)
+        for item in reversed(data['slow']):
+            self.slow_text.insert(tk.END, f"[{item['time']}] {item['elapsed_ms']:.1f} мс, строк: {item['rows']}\n")
+            self.slow_text.insert(tk.END, f"  {item['query']}\n")
+            for step in item['plan'] or []:
+                self.slow_text.insert(tk.END, f"    {step}\n")
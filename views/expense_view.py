@@ -6,8 +6,12 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-from config import EXPENSE_COLUMNS, TABLE_FONT, HEADER_FONT, COLORS, SHOPS
-from views.widgets.date_selector import DateSelector
+from config import EXPENSE_COLUMNS, TABLE_FONT, HEADER_FONT, COLORS, READ_ONLY, SHARED_EXPENSE_SHOP
+from models.settings_model import get_settings
+from views.widgest.date_selector import DateSelector
+from views.widgest.calendar_heatmap import CalendarHeatmap
+from views.widgest.cell_editor import CellEditor
+from controllers.event_bus import RECORDS_CHANGED, TOTALS_CHANGED, ROW_ADDED, ROW_CHANGED, ROW_CONFIRMED
 from datetime import datetime
 
 
@@ -23,8 +27,24 @@ class ExpenseView(ttk.Frame):
         self.selected_row_widgets = []  # Виджеты выбранной строки
         self.total_expense = 0  # Сумма расходов
         
+        self.row_widgets = {}  # Виджеты строк по ID записи
+        self.row_numbers = {}  # Номер строки таблицы по ID записи
+        self.next_row = 0  # Номер для следующей добавляемой строки
+        self.calendar_visible = False  # Показан ли календарь активности
+        
         self._create_widgets()
+        
+        # Редактор ячеек на месте: двойной клик по ячейке или кнопка ✎
+        self.cell_editor = CellEditor(
+            self.table_frame,
+            [col for col, spec in EXPENSE_COLUMNS.items() if spec['editable']],
+            self._get_cell,
+            self._on_cell_commit,
+            neighbour=self._neighbour_record,
+            choices={'shop': lambda: list(self.shop_combo_add['values'])}
+        )
         self._bind_events()
+        self._subscribe_events()
         
         # Настраиваем веса для прокрутки при изменении размера
         self.grid_rowconfigure(0, weight=1)
@@ -39,6 +59,7 @@ class ExpenseView(ttk.Frame):
         # Верхняя панель с фильтром по дате
         filter_frame = ttk.Frame(main_container)
         filter_frame.pack(fill=tk.X, padx=5, pady=5)
+        self.filter_frame = filter_frame
         
         ttk.Label(filter_frame, text="Дата:").pack(side=tk.LEFT, padx=5)
         
@@ -51,26 +72,43 @@ class ExpenseView(ttk.Frame):
             command=self._set_today_filter
         ).pack(side=tk.LEFT, padx=5)
         
+        ttk.Button(
+            filter_frame,
+            text="Календарь",
+            command=self._toggle_calendar
+        ).pack(side=tk.LEFT, padx=5)
+        
+        # Календарь активности по дням (скрыт до нажатия кнопки)
+        self.calendar = CalendarHeatmap(
+            main_container,
+            on_pick=self._on_calendar_pick,
+            on_month_change=self._load_calendar_month,
+            color=COLORS['calendar_expense']
+        )
+        
         # Фильтр по магазину
         ttk.Label(filter_frame, text="Магазин:").pack(side=tk.LEFT, padx=(20, 5))
         
+        shops = get_settings().get_shop_names()
         self.shop_filter_var = tk.StringVar(value="Все")
-        shop_combo = ttk.Combobox(
+        self.shop_filter_combo = ttk.Combobox(
             filter_frame,
             textvariable=self.shop_filter_var,
-            values=["Все"] + SHOPS,
+            values=["Все"] + shops + [SHARED_EXPENSE_SHOP],
             state="readonly",
             width=15
         )
-        shop_combo.pack(side=tk.LEFT)
-        shop_combo.bind('<<ComboboxSelected>>', self._on_shop_filter_change)
+        self.shop_filter_combo.pack(side=tk.LEFT)
+        self.shop_filter_combo.bind('<<ComboboxSelected>>', self._on_shop_filter_change)
         
         # Разделитель
         ttk.Separator(main_container, orient='horizontal').pack(fill=tk.X, padx=5, pady=5)
         
         # Панель для добавления новой записи
+        # (архив только для чтения - панели нет)
         add_frame = ttk.LabelFrame(main_container, text="Добавить расход")
-        add_frame.pack(fill=tk.X, padx=5, pady=5)
+        if not READ_ONLY:
+            add_frame.pack(fill=tk.X, padx=5, pady=5)
         
         # Поля для ввода в одну строку
         fields_frame = ttk.Frame(add_frame)
@@ -78,16 +116,16 @@ class ExpenseView(ttk.Frame):
         
         # Магазин
         ttk.Label(fields_frame, text="Магазин:").pack(side=tk.LEFT, padx=2)
-        self.shop_var = tk.StringVar(value=SHOPS[0])
-        shop_combo_add = ttk.Combobox(
+        self.shop_var = tk.StringVar(value=shops[0] if shops else "")
+        self.shop_combo_add = ttk.Combobox(
             fields_frame,
             textvariable=self.shop_var,
-            values=SHOPS,
+            values=shops + [SHARED_EXPENSE_SHOP],
             state="readonly",
             width=10
         )
-        shop_combo_add.pack(side=tk.LEFT, padx=2)
-        shop_combo_add.bind('<Return>', self._add_record_event)
+        self.shop_combo_add.pack(side=tk.LEFT, padx=2)
+        self.shop_combo_add.bind('<Return>', self._add_record_event)
         
         # Наименование
         ttk.Label(fields_frame, text="Наименование:").pack(side=tk.LEFT, padx=2)
@@ -149,7 +187,7 @@ class ExpenseView(ttk.Frame):
         summary_frame = ttk.Frame(main_container)
         summary_frame.pack(fill=tk.X, padx=5, pady=5)
         
-        self.total_label = ttk.Label(summary_frame, text="Итого расходов: 0.00 сом", font=HEADER_FONT)
+        self.total_label = ttk.Label(summary_frame, text=f"Итого расходов: 0.00 {get_settings().currency}", font=HEADER_FONT)
         self.total_label.pack(side=tk.LEFT, padx=5)
     
     def _on_canvas_configure(self, event):
@@ -190,19 +228,86 @@ class ExpenseView(ttk.Frame):
     
     def _bind_events(self):
         """Привязка событий"""
-        self.bind('<Delete>', self._on_delete)
+        if not READ_ONLY:
+            self.bind('<Delete>', self._on_delete)
+    
+    def _subscribe_events(self):
+        """Подписка на события контроллера"""
+        events = self.controller.events
+        events.subscribe(RECORDS_CHANGED, lambda e: self.display_records(e.payload['records']), self.controller)
+        events.subscribe(TOTALS_CHANGED, lambda e: self.update_totals(e.payload['total']), self.controller)
+        events.subscribe(ROW_ADDED, self._on_rows_added, self.controller)
+        events.subscribe(ROW_CHANGED, self._on_rows_changed, self.controller)
+        events.subscribe(ROW_CONFIRMED, self._on_rows_confirmed, self.controller)
+        events.subscribe(TOTALS_CHANGED, lambda e: self._refresh_calendar(), self.controller)
+    
+    def _on_rows_added(self, event):
+        """Дорисовать добавленные строки без перестройки таблицы"""
+        for payload in event.payloads:
+            self.append_record(payload['record'])
+        self.after(100, self._scroll_to_bottom)
+    
+    def _on_rows_changed(self, event):
+        """Перерисовать измененные строки и убрать удаленные без перестройки таблицы"""
+        for payload in event.payloads:
+            if payload['record'] is None:
+                self.remove_record(payload['record_id'])
+            else:
+                self.repaint_record(payload['record'])
+    
+    def _on_rows_confirmed(self, event):
+        """Ожидающие строки записаны в БД - показать их обычными"""
+        for payload in event.payloads:
+            self.confirm_record(payload['pending_id'], payload['record'])
     
     def _set_today_filter(self):
         """Установить сегодняшнюю дату в фильтр"""
         self.filter_date.set_date(datetime.now())
         self._apply_date_filter()
     
+    def _toggle_calendar(self):
+        """Показать или скрыть календарь активности"""
+        if self.calendar_visible:
+            self.calendar.pack_forget()
+            self.calendar_visible = False
+            return
+        
+        self.calendar.pack(padx=5, pady=5, after=self.filter_frame)
+        self.calendar_visible = True
+        
+        selected_date = self.filter_date.get_date_obj() or datetime.now().date()
+        self.calendar.set_date(selected_date)
+        self._load_calendar_month(self.calendar.year, self.calendar.month)
+    
+    def _load_calendar_month(self, year, month):
+        """Раскрасить календарь одним сгруппированным запросом за месяц (с кэшем)"""
+        self.calendar.set_activity(self.controller.get_month_activity(year, month))
+    
+    def _refresh_calendar(self):
+        """Обновить календарь после изменения итогов (кэш сброшен только для измененного месяца)"""
+        if self.calendar_visible:
+            self._load_calendar_month(self.calendar.year, self.calendar.month)
+    
+    def _on_calendar_pick(self, day):
+        """Выбор дня в календаре"""
+        self.filter_date.set_date(day)
+        
+        # Итог дня из кэша месяца рисуется сразу, строки загружаются следом
+        if self.controller.show_cached_totals(day):
+            self.update_idletasks()
+        self.after(1, self._apply_date_filter)
+    
     def _apply_date_filter(self):
         """Применить фильтр по дате"""
         selected_date = self.filter_date.get_date_obj()
         if selected_date:
+            if self.calendar_visible:
+                self.calendar.set_date(selected_date)
             date_str = selected_date.strftime("%Y-%m-%d")
             self.controller.load_data(date_str, date_str, self.shop_filter_var.get())
+            
+            # Пока пользователь смотрит день, в фоне готовятся соседние
+            self.after_idle(self.controller.prefetch_neighbours)
     
     def _on_shop_filter_change(self, event):
         """Обработка изменения фильтра по магазину"""
@@ -251,67 +356,17 @@ class ExpenseView(ttk.Frame):
             if int(widget.grid_info().get('row', 0)) > 0:
                 widget.destroy()
         
-        self.records = records
+        self.records = list(records)
+        self.row_widgets = {}
+        self.row_numbers = {}
+        self.next_row = len(records)
         sorted_records = sorted(records, key=lambda x: x.get('date', ''))
         
         # Считаем общую сумму расходов
         self.total_expense = sum(float(r.get('amount', 0)) for r in records)
         
         for i, record in enumerate(sorted_records):
-            row = i + 1
-            columns = list(EXPENSE_COLUMNS.keys()) + ['actions']
-            
-            for col_index, col in enumerate(columns):
-                if col == 'actions':
-                    # Создаем фрейм с кнопками
-                    actions_frame = ttk.Frame(self.table_frame)
-                    actions_frame.grid(row=row, column=col_index, sticky='nsew', padx=1, pady=1)
-                    
-                    edit_btn = ttk.Button(
-                        actions_frame,
-                        text="✎",
-                        width=3,
-                        command=lambda r=record['id']: self._edit_record(r)
-                    )
-                    edit_btn.pack(side=tk.LEFT, padx=1)
-                    
-                    delete_btn = ttk.Button(
-                        actions_frame,
-                        text="✕",
-                        width=3,
-                        command=lambda r=record['id']: self._delete_record(r)
-                    )
-                    delete_btn.pack(side=tk.LEFT, padx=1)
-                    
-                    # Привязываем клик по фрейму для выбора строки
-                    actions_frame.bind('<Button-1>', lambda e, r=record['id'], row_idx=row: self._on_row_click(e, r, row_idx))
-                    edit_btn.bind('<Button-1>', lambda e, r=record['id']: self._on_row_click(e, r, row))
-                    delete_btn.bind('<Button-1>', lambda e, r=record['id']: self._on_row_click(e, r, row))
-                    
-                else:
-                    value = record.get(col, '')
-                    
-                    if col == 'amount':
-                        try:
-                            value = f"{float(value):.2f}"
-                        except:
-                            pass
-                    
-                    cell = tk.Label(
-                        self.table_frame,
-                        text=str(value),
-                        bg=COLORS['table_bg'] if i % 2 == 0 else COLORS['table_alternate'],
-                        font=TABLE_FONT,
-                        relief=tk.RIDGE,
-                        anchor='e' if col == 'amount' else 'w'
-                    )
-                    cell.grid(row=row, column=col_index, sticky='nsew')
-                    
-                    cell.bind('<Button-1>', lambda e, r=record['id'], row_idx=row: self._on_row_click(e, r, row_idx))
-            
-            # Настраиваем веса колонок
-            for col_index in range(len(columns)):
-                self.table_frame.columnconfigure(col_index, weight=1)
+            self._render_row(i, record)
         
         # Обновляем отображение итогов
         self.update_totals(self.total_expense)
@@ -319,10 +374,139 @@ class ExpenseView(ttk.Frame):
         if records:
             self.after(100, self._scroll_to_bottom)
     
+    def append_record(self, record):
+        """Добавить одну строку в конец таблицы"""
+        self.records.append(record)
+        self._render_row(self.next_row, record)
+        self.next_row += 1
+    
+    def repaint_record(self, record):
+        """Перерисовать одну строку (строки не было - например, после отмены удаления - добавить)"""
+        if record['id'] not in self.row_widgets:
+            self.append_record(record)
+            return
+        
+        for widget in self.row_widgets[record['id']]:
+            widget.destroy()
+        self.records = [record if r['id'] == record['id'] else r for r in self.records]
+        self._render_row(self.row_numbers[record['id']], record)
+    
+    def confirm_record(self, pending_id, record):
+        """Заменить ожидающую строку записью из БД на том же месте"""
+        if pending_id not in self.row_widgets:
+            return
+        if record['id'] in self.row_widgets:
+            # Строку уже дорисовало изменение записи - ожидающая больше не нужна
+            self.remove_record(pending_id)
+            return
+        
+        self.row_widgets[record['id']] = self.row_widgets.pop(pending_id)
+        self.row_numbers[record['id']] = self.row_numbers.pop(pending_id)
+        self.records = [dict(r, id=record['id']) if r['id'] == pending_id else r for r in self.records]
+        if self.selected_record_id == pending_id:
+            self.selected_record_id = record['id']
+        self.repaint_record(record)
+    
+    def remove_record(self, record_id):
+        """Убрать строку записи из таблицы"""
+        for widget in self.row_widgets.pop(record_id, []):
+            widget.destroy()
+        self.row_numbers.pop(record_id, None)
+        self.records = [r for r in self.records if r['id'] != record_id]
+        
+        if self.selected_record_id == record_id:
+            self.selected_record_id = None
+            self.selected_row_widgets = []
+    
+    def _render_row(self, i, record):
+        """Отрисовка одной строки таблицы"""
+        row = i + 1
+        widgets = []
+        # Записи закрытых лет лежат в разделах и только просматриваются
+        editable = not READ_ONLY and not self.controller.model.is_closed(record['date'])
+        columns = list(EXPENSE_COLUMNS.keys()) + ['actions']
+        
+        for col_index, col in enumerate(columns):
+            if col == 'actions':
+                # Создаем фрейм с кнопками
+                actions_frame = ttk.Frame(self.table_frame)
+                actions_frame.grid(row=row, column=col_index, sticky='nsew', padx=1, pady=1)
+                widgets.append(actions_frame)
+                
+                if not editable:
+                    continue
+                
+                edit_btn = ttk.Button(
+                    actions_frame,
+                    text="✎",
+                    width=3,
+                    command=lambda r=record['id']: self._edit_record(r)
+                )
+                edit_btn.pack(side=tk.LEFT, padx=1)
+                
+                delete_btn = ttk.Button(
+                    actions_frame,
+                    text="✕",
+                    width=3,
+                    command=lambda r=record['id']: self._delete_record(r)
+                )
+                delete_btn.pack(side=tk.LEFT, padx=1)
+                
+                # Привязываем клик по фрейму для выбора строки
+                actions_frame.bind('<Button-1>', lambda e, r=record['id'], row_idx=row: self._on_row_click(e, r, row_idx))
+                edit_btn.bind('<Button-1>', lambda e, r=record['id']: self._on_row_click(e, r, row))
+                delete_btn.bind('<Button-1>', lambda e, r=record['id']: self._on_row_click(e, r, row))
+                
+            else:
+                value = record.get(col, '')
+                
+                if col == 'amount':
+                    try:
+                        value = f"{float(value):.2f}"
+                    except:
+                        pass
+                
+                cell = tk.Label(
+                    self.table_frame,
+                    text=str(value),
+                    bg=COLORS['table_bg'] if i % 2 == 0 else COLORS['table_alternate'],
+                    fg=COLORS['pending'] if record.get('pending') else COLORS['fg'],
+                    font=TABLE_FONT,
+                    relief=tk.RIDGE,
+                    anchor='e' if col == 'amount' else 'w'
+                )
+                cell.grid(row=row, column=col_index, sticky='nsew')
+                widgets.append(cell)
+                
+                cell.bind('<Button-1>', lambda e, r=record['id'], row_idx=row: self._on_row_click(e, r, row_idx))
+                if EXPENSE_COLUMNS[col]['editable'] and editable:
+                    cell.bind('<Double-Button-1>', lambda e, r=record['id'], c=col: self.cell_editor.open(r, c))
+        
+        # Настраиваем веса колонок
+        for col_index in range(len(columns)):
+            self.table_frame.columnconfigure(col_index, weight=1)
+        
+        self.row_widgets[record['id']] = widgets
+        self.row_numbers[record['id']] = i
+    
     def update_totals(self, total_sum):
         """Обновление отображения итогов"""
         self.total_expense = total_sum
-        self.total_label.config(text=f"Итого расходов: {total_sum:.2f} сом")
+        self.total_label.config(text=f"Итого расходов: {total_sum:.2f} {get_settings().currency}")
+    
+    def set_shops(self, shops, renamed=None):
+        """Обновить списки магазинов (после добавления или переименования)"""
+        # Общие расходы делятся между магазинами в расчете прибыли
+        self.shop_filter_combo['values'] = ["Все"] + shops + [SHARED_EXPENSE_SHOP]
+        self.shop_combo_add['values'] = shops + [SHARED_EXPENSE_SHOP]
+        
+        # Выбранные значения следуют за переименованным магазином
+        if renamed:
+            old_name, new_name = renamed
+            if self.shop_filter_var.get() == old_name:
+                self.shop_filter_var.set(new_name)
+            if self.shop_var.get() == old_name:
+                self.shop_var.set(new_name)
     
     def get_total_expense(self):
         """Получить общую сумму расходов"""
@@ -354,96 +538,35 @@ class ExpenseView(ttk.Frame):
                     self.selected_row_widgets.append(widget)
     
     def _edit_record(self, record_id):
-        """Редактировать запись"""
-        self._start_row_edit(record_id)
+        """Редактировать запись в таблице, начиная с первой колонки"""
+        self.cell_editor.open(record_id)
     
     def _delete_record(self, record_id):
-        """Удалить запись"""
-        if messagebox.askyesno("Подтверждение", f"Удалить расход?"):
-            self.controller.delete_record(record_id)
-            self.selected_record_id = None
-            self.selected_row_widgets = []
+        """Удалить запись без подтверждения (Ctrl+Z - отменить)"""
+        self.controller.delete_record(record_id)
+        self.selected_record_id = None
+        self.selected_row_widgets = []
     
-    def _start_row_edit(self, record_id):
-        """Начать редактирование всей строки"""
-        record = None
-        for r in self.records:
-            if r['id'] == record_id:
-                record = r
-                break
-        
-        if not record:
-            return
-        
-        edit_window = tk.Toplevel(self)
-        edit_window.title(f"Редактирование расхода")
-        edit_window.geometry("400x200")
-        edit_window.resizable(False, False)
-        
-        fields = [
-            ('Дата', 'date', record.get('date', '')),
-            ('Магазин', 'shop', record.get('shop', '')),
-            ('Наименование', 'item', record.get('item', '')),
-            ('Сумма', 'amount', record.get('amount', ''))
-        ]
-        
-        entries = {}
-        for i, (label, field, value) in enumerate(fields):
-            ttk.Label(edit_window, text=label + ":").grid(row=i, column=0, padx=5, pady=5, sticky='w')
-            
-            if field == 'date':
-                entry = DateSelector(edit_window)
-                entry.set_date(value)
-                entry.grid(row=i, column=1, padx=5, pady=5, sticky='w')
-            elif field == 'shop':
-                entry = ttk.Combobox(
-                    edit_window,
-                    values=SHOPS,
-                    state="readonly",
-                    width=20
-                )
-                entry.set(value)
-                entry.grid(row=i, column=1, padx=5, pady=5, sticky='w')
-                entry.bind('<Return>', lambda e, f=field: self._save_edit_on_enter(e, edit_window, record_id, entries))
-            else:
-                entry = ttk.Entry(edit_window, width=25)
-                entry.insert(0, str(value))
-                entry.grid(row=i, column=1, padx=5, pady=5, sticky='w')
-                entry.bind('<Return>', lambda e, f=field: self._save_edit_on_enter(e, edit_window, record_id, entries))
-            
-            entries[field] = entry
-        
-        btn_frame = ttk.Frame(edit_window)
-        btn_frame.grid(row=len(fields), column=0, columnspan=2, pady=20)
-        
-        def save():
-            data = {}
-            for field, entry in entries.items():
-                if field == 'date':
-                    data[field] = entry.get_date()
-                else:
-                    data[field] = entry.get()
-            
-            self.controller.update_record(record_id, data)
-            edit_window.destroy()
-        
-        ttk.Button(btn_frame, text="Сохранить", command=save).pack(side=tk.LEFT, padx=5)
-        ttk.Button(btn_frame, text="Отмена", command=edit_window.destroy).pack(side=tk.LEFT, padx=5)
-        
-        edit_window.bind('<Return>', lambda e: save())
-        edit_window.bind('<Escape>', lambda e: edit_window.destroy())
+    def _get_cell(self, record_id, column):
+        """Label ячейки записи (None, если строки нет в таблице)"""
+        widgets = self.row_widgets.get(record_id)
+        if not widgets:
+            return None
+        return widgets[list(EXPENSE_COLUMNS.keys()).index(column)]
     
-    def _save_edit_on_enter(self, event, edit_window, record_id, entries):
-        """Сохранить при нажатии Enter в поле редактирования"""
-        data = {}
-        for field, entry in entries.items():
-            if field == 'date':
-                data[field] = entry.get_date()
-            else:
-                data[field] = entry.get()
-        
-        self.controller.update_record(record_id, data)
-        edit_window.destroy()
+    def _neighbour_record(self, record_id, step):
+        """id строки выше (step < 0) или ниже (step > 0) в таблице"""
+        current = self.row_numbers.get(record_id)
+        if current is None:
+            return None
+        
+        candidates = [(abs(n - current), r) for r, n in self.row_numbers.items() if (n - current) * step > 0]
+        return min(candidates)[1] if candidates else None
+    
+    def _on_cell_commit(self, record_id, column, value):
+        """Сохранить одну ячейку; перерисуются только строка и итог"""
+        if not self.controller.process_cell_edit(record_id, column, value):
+            self.bell()
     
     def _on_delete(self, event):
         """Обработка нажатия Delete"""
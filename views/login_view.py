@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+"""
+Окно входа пользователя
+"""
+
+import tkinter as tk
+from tkinter import ttk
+from models.user_model import get_users
+
+
+class LoginDialog(tk.Toplevel):
+    """Логин и пароль; после закрытия в user - вошедший пользователь или None (отмена)"""
+    
+    def __init__(self, master):
+        super().__init__(master)
+        self.title("Вход")
+        self.resizable(False, False)
+        self.user = None
+        
+        self._create_widgets()
+        self.protocol("WM_DELETE_WINDOW", self.destroy)
+        self.grab_set()
+        self.login_entry.focus_set()
+    
+    def _create_widgets(self):
+        """Создание виджетов"""
+        frame = ttk.Frame(self, padding=15)
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(frame, text="Логин:").grid(row=0, column=0, sticky='w', pady=3)
+        self.login_entry = ttk.Entry(frame, width=25)
+        self.login_entry.grid(row=0, column=1, pady=3)
+        
+        ttk.Label(frame, text="Пароль:").grid(row=1, column=0, sticky='w', pady=3)
+        self.password_entry = ttk.Entry(frame, width=25, show="*")
+        self.password_entry.grid(row=1, column=1, pady=3)
+        
+        self.error_label = ttk.Label(frame, foreground='red')
+        self.error_label.grid(row=2, column=0, columnspan=2)
+        
+        buttons = ttk.Frame(frame)
+        buttons.grid(row=3, column=0, columnspan=2, pady=(10, 0))
+        ttk.Button(buttons, text="Войти", command=self._submit).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="Отмена", command=self.destroy).pack(side=tk.LEFT, padx=5)
+        
+        for entry in (self.login_entry, self.password_entry):
+            entry.bind('<Return>', lambda e: self._submit())
+    
+    def _submit(self):
+        """Проверить логин и пароль"""
+        user = get_users().authenticate(self.login_entry.get(), self.password_entry.get())
+        if user is None:
+            self.error_label.config(text="Неверный логин или пароль")
+            self.password_entry.delete(0, tk.END)
+            return
+        
+        self.user = user
+        self.destroy()
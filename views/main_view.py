@@ -4,14 +4,33 @@
 Главное окно приложения с вкладками
 """
 
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
-from config import SHOPS
+from config import (
+    SYNC_DIR, PROFILER_LOG_PATH, DELETED_KEEP_HOURS, PURGE_INTERVAL_MS, SNAPSHOT_INTERVAL_MS,
+    PARTITION_INTERVAL_MS, READ_ONLY, COLORS, API_ENABLED
+)
+from models.settings_model import get_settings
+from models.sale_model import get_shop_totals
+from models.stock_model import get_stock
+from models.user_model import get_users
 from views.sales_view import SalesView
 from views.expense_view import ExpenseView
 from controllers.sales_controller import SalesController
 from controllers.expense_controller import ExpenseController
+from controllers.event_bus import EventBus, TOTALS_CHANGED, DATA_CHANGED
+from controllers.prefetcher import prefetcher
+from controllers.maintenance_scheduler import MaintenanceScheduler
+from controllers.change_watcher import ChangeWatcher
+from controllers.pnl_controller import PnlController
+from controllers.access import session
 
 
 class MainView:
@@ -19,18 +38,63 @@ class MainView:
     
     def __init__(self, root):
         self.root = root
+        self.settings = get_settings()
+        
+        # Шина событий: уведомления контроллеров доставляются один раз за цикл простоя Tk
+        self.events = EventBus(scheduler=self.root.after_idle)
+        self.events.subscribe(TOTALS_CHANGED, lambda e: self._update_global_totals())
+        
+        # Фоновое формирование печатного отчета
+        self.report_thread = None
+        self.report_queue = queue.Queue()
+        self.report_cancel = threading.Event()
+        
+        # Фоновое обновление колоночного снимка для аналитики
+        self.snapshot_thread = None
+        
+        # Фоновый перенос закрытых лет в разделы
+        self.partition_thread = None
+        
+        # HTTP API для ввода с телефонов (свой поток и цикл событий)
+        self.api_server = None
+        
+        # Наблюдение за записями других программ и окон (архив не меняется)
+        self.watcher = None
         
         # Создаем контроллеры
         self.sales_controllers = {}
-        self.expense_controller = ExpenseController(None)
+        self.expense_controller = ExpenseController(self.events)
+        self.expense_controller.writes.set_scheduler(self.root.after)
         
         # Создаем интерфейс
         self._create_menu()
         self._create_notebook()
         self._create_global_summary()
+        self._create_status_bar()
         
         # Загружаем начальные данные
         self._load_initial_data()
+        
+        # Первая очистка удаленных записей - через минуту, когда окно уже работает
+        # (архив не меняется - ни очистки, ни снимка)
+        if not READ_ONLY:
+            self.root.after(60 * 1000, self._purge_deleted)
+            self.root.after(SNAPSHOT_INTERVAL_MS, self._refresh_snapshot)
+            self.root.after(2 * 60 * 1000, self._close_years)
+            
+            # Обслуживание БД - порциями в паузах ввода; любое нажатие его откладывает
+            self.maintenance = MaintenanceScheduler(self.root.after, on_status=self._show_maintenance_status)
+            for sequence in ('<KeyPress>', '<ButtonPress>', '<MouseWheel>'):
+                self.root.bind_all(sequence, self.maintenance.notify_input, add='+')
+            self.maintenance.start()
+            
+            # Записи других касс и окон с этой БД - только в затронутые вкладки
+            self.watcher = ChangeWatcher(self.expense_controller.model, self.events)
+            self.events.subscribe(DATA_CHANGED, self._on_data_changed)
+            self.watcher.start(self.root.after)
+            
+            if API_ENABLED:
+                self._start_api()
     
     def _create_menu(self):
         """Создание меню"""
@@ -40,65 +104,119 @@ class MainView:
         # Меню "Файл"
         file_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Файл", menu=file_menu)
-        file_menu.add_command(label="Экспорт в Excel", command=self._export_to_excel)
-        file_menu.add_separator()
+        
+        # В архиве доступны только просмотр и отчеты
+        if READ_ONLY:
+            file_menu.add_command(label="Отчет за период", command=self._show_report)
+            file_menu.add_command(label="Печать отчета (PDF/HTML)", command=self._show_print_report)
+            file_menu.add_separator()
+            file_menu.add_command(label="Выход", command=self.on_closing)
+            help_menu = tk.Menu(menubar, tearoff=0)
+            menubar.add_cascade(label="Справка", menu=help_menu)
+            help_menu.add_command(label="О программе", command=self._show_about)
+            return
+        
+        # Кассиру - только ввод продаж своего магазина
+        if session.can_edit():
+            file_menu.add_command(label="Экспорт в Excel", command=self._export_to_excel)
+            file_menu.add_command(label="Синхронизация", command=self._sync)
+            file_menu.add_command(label="Отчет за период", command=self._show_report)
+            file_menu.add_command(label="Печать отчета (PDF/HTML)", command=self._show_print_report)
+            file_menu.add_command(label="Склад", command=self._show_stock)
+            file_menu.add_command(label="Настройки", command=self._show_settings)
+            file_menu.add_command(label="Пользователи", command=self._show_users)
+            file_menu.add_separator()
+            file_menu.add_command(label="Открыть архив...", command=self._open_archive)
+            file_menu.add_separator()
         file_menu.add_command(label="Выход", command=self.on_closing)
         
+        # Меню "Правка"
+        edit_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="Правка", menu=edit_menu)
+        edit_menu.add_command(label="Отменить", accelerator="Ctrl+Z", command=self._undo)
+        edit_menu.add_command(label="Повторить", accelerator="Ctrl+Y", command=self._redo)
+        
+        # Отмена и повтор действий активной вкладки (в том числе в русской раскладке)
+        for sequence in ('<Control-z>', '<Control-Cyrillic_ya>'):
+            self.root.bind_all(sequence, lambda e: self._undo())
+        for sequence in ('<Control-y>', '<Control-Cyrillic_en>'):
+            self.root.bind_all(sequence, lambda e: self._redo())
+        
         # Меню "Справка"
         help_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Справка", menu=help_menu)
         help_menu.add_command(label="О программе", command=self._show_about)
+        
+        # Скрытое окно диагностики запросов (нет в меню)
+        self.root.bind_all('<Control-Shift-D>', lambda e: self._show_diagnostics())
     
     def _create_notebook(self):
         """Создание вкладок"""
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        # Создаем вкладки для магазинов
+        # Вкладки магазинов создаются пустыми: таблица продаж строится
+        # при первом открытии, поэтому число магазинов не замедляет запуск
         self.shop_views = {}
-        for shop in SHOPS:
-            # Создаем контроллер для магазина
-            controller = SalesController(shop, None)
-            self.sales_controllers[shop] = controller
-            
-            # Создаем представление
-            view = SalesView(self.notebook, shop, controller)
-            self.notebook.add(view, text=shop)
-            
-            # Устанавливаем связь контроллер-представление
-            controller.view = view
-            self.shop_views[shop] = view
+        self.shop_tabs = {}  # вкладка -> магазин
+        # (кассир видит только вкладку своего магазина)
+        for shop in self.settings.get_shops():
+            if session.can_view_shop(shop['name']):
+                self._add_shop_tab(shop)
         
-        # Создаем вкладку расходов
+        # Создаем вкладку расходов (представление нужно и кассиру - от него
+        # зависят общие итоги, - но вкладка ему не показывается)
         self.expense_view = ExpenseView(self.notebook, self.expense_controller)
-        self.notebook.add(self.expense_view, text="Расходы")
-        
-        # Устанавливаем связь контроллер-представление для расходов
-        self.expense_controller.view = self.expense_view
+        if session.can_view_expenses():
+            self.notebook.add(self.expense_view, text="Расходы")
         
         # Привязываем событие переключения вкладок для обновления итогов
         self.notebook.bind('<<NotebookTabChanged>>', self._on_tab_changed)
     
+    def _add_shop_tab(self, shop):
+        """Контроллер и пустая вкладка магазина (перед вкладкой расходов)"""
+        controller = SalesController(shop['name'], self.events, shop['table_suffix'])
+        controller.writes.set_scheduler(self.root.after)
+        self.sales_controllers[shop['name']] = controller
+        
+        frame = ttk.Frame(self.notebook)
+        if getattr(self, 'expense_view', None) is not None:
+            self.notebook.insert(self.expense_view, frame, text=shop['name'])
+        else:
+            self.notebook.add(frame, text=shop['name'])
+        self.shop_tabs[str(frame)] = shop['name']
+        return controller
+    
+    def get_shop_view(self, shop):
+        """Представление магазина (создается при первом обращении)"""
+        view = self.shop_views.get(shop)
+        if view is None:
+            tab = next(tab for tab, name in self.shop_tabs.items() if name == shop)
+            controller = self.sales_controllers[shop]
+            
+            # Представление подписывается на события контроллера
+            view = SalesView(self.root.nametowidget(tab), shop, controller)
+            view.pack(fill=tk.BOTH, expand=True)
+            self.shop_views[shop] = view
+            controller.load_data(controller.current_date_from, controller.current_date_to)
+        return view
+    
     def _create_global_summary(self):
         """Создание общей панели итогов внизу окна"""
         summary_frame = ttk.LabelFrame(self.root, text="Общие итоги за выбранную дату")
         summary_frame.pack(fill=tk.X, padx=5, pady=5)
         
+        # Магазины - одной меткой с переносом строк при любом их числе
+        self.shops_total_label = ttk.Label(summary_frame, font=('Arial', 10, 'bold'), wraplength=950, justify=tk.LEFT)
+        self.shops_total_label.pack(fill=tk.X, padx=10, pady=(5, 0))
+        
         # Создаем фрейм для итогов
         totals_frame = ttk.Frame(summary_frame)
         totals_frame.pack(fill=tk.X, padx=10, pady=5)
         
-        # Магазин 1
-        self.shop1_total_label = ttk.Label(totals_frame, text=f"{SHOPS[0]}: 0.00 сом.", font=('Arial', 10, 'bold'))
-        self.shop1_total_label.pack(side=tk.LEFT, padx=10)
-        
-        # Магазин 2
-        self.shop2_total_label = ttk.Label(totals_frame, text=f"{SHOPS[1]}: 0.00 сом.", font=('Arial', 10, 'bold'))
-        self.shop2_total_label.pack(side=tk.LEFT, padx=10)
-        
         # Всего продажи
-        ttk.Label(totals_frame, text="Всего:", font=('Arial', 10, 'bold')).pack(side=tk.LEFT, padx=(20, 5))
-        self.total_sales_label = ttk.Label(totals_frame, text="0.00 сом.", font=('Arial', 10, 'bold'))
+        ttk.Label(totals_frame, text="Всего:", font=('Arial', 10, 'bold')).pack(side=tk.LEFT, padx=(0, 5))
+        self.total_sales_label = ttk.Label(totals_frame, font=('Arial', 10, 'bold'))
         self.total_sales_label.pack(side=tk.LEFT, padx=5)
         
         # Разделитель
@@ -106,7 +224,7 @@ class MainView:
         
         # Расходы
         ttk.Label(totals_frame, text="Расходы:", font=('Arial', 10, 'bold')).pack(side=tk.LEFT, padx=5)
-        self.expense_total_label = ttk.Label(totals_frame, text="0.00 руб.", font=('Arial', 10, 'bold'))
+        self.expense_total_label = ttk.Label(totals_frame, font=('Arial', 10, 'bold'))
         self.expense_total_label.pack(side=tk.LEFT, padx=5)
         
         # Разделитель
@@ -114,53 +232,457 @@ class MainView:
         
         # ИТОГО
         ttk.Label(totals_frame, text="ИТОГО:", font=('Arial', 10, 'bold')).pack(side=tk.LEFT, padx=5)
-        self.grand_total_label = ttk.Label(totals_frame, text="0.00 сом.", font=('Arial', 10, 'bold'))
+        self.grand_total_label = ttk.Label(totals_frame, font=('Arial', 10, 'bold'))
         self.grand_total_label.pack(side=tk.LEFT, padx=5)
+        
+        # Прогресс формирования отчета (показывается только во время работы)
+        self.report_frame = ttk.Frame(self.root)
+        self.report_label = ttk.Label(self.report_frame)
+        self.report_label.pack(side=tk.LEFT, padx=5)
+        self.report_progress = ttk.Progressbar(self.report_frame, length=250, mode='determinate')
+        self.report_progress.pack(side=tk.LEFT, padx=5)
+        ttk.Button(self.report_frame, text="Отмена", command=self.report_cancel.set).pack(side=tk.LEFT, padx=5)
+        
+        self._update_global_totals()
+    
+    def _create_status_bar(self):
+        """Строка состояния внизу окна (результаты обслуживания БД)"""
+        self.status_label = ttk.Label(self.root, anchor='w', foreground=COLORS['pending'])
+        self.status_label.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=(0, 3))
+    
+    def _show_maintenance_status(self, task, text):
+        """Показать последний результат каждой задачи обслуживания"""
+        self.status_label.config(text=f"Обслуживание БД: {self.maintenance.summary()}")
     
     def _on_tab_changed(self, event):
         """Обработка переключения вкладки - обновляем общие итоги"""
         self._update_global_totals()
+        
+        shop = self.shop_tabs.get(str(self.notebook.select()))
+        if shop is not None:
+            self.get_shop_view(shop)
+        controller = self._active_controller()
+        if controller is None:
+            return
+        
+        # Предзагрузка соседних дней только для активной вкладки
+        self.root.after_idle(controller.prefetch_neighbours)
+    
+    def _active_controller(self):
+        """Контроллер активной вкладки (None, если вкладка без записей)"""
+        tab = str(self.notebook.select())
+        shop = self.shop_tabs.get(tab)
+        if shop is not None:
+            return self.sales_controllers[shop]
+        if tab == str(self.expense_view):
+            return self.expense_controller
+        return None
+    
+    def _undo(self):
+        """Отменить последнее действие на активной вкладке"""
+        controller = self._active_controller()
+        if controller is not None:
+            controller.undo()
+    
+    def _redo(self):
+        """Повторить отмененное действие на активной вкладке"""
+        controller = self._active_controller()
+        if controller is not None:
+            controller.redo()
+    
+    def _flush_writes(self):
+        """Записать в БД строки, ожидающие отложенной записи, на всех вкладках"""
+        for controller in list(self.sales_controllers.values()) + [self.expense_controller]:
+            controller.flush_writes()
+    
+    def _purge_deleted(self):
+        """Окончательно убрать из БД записи, удаленные раньше DELETED_KEEP_HOURS назад"""
+        older_than = time.time() - DELETED_KEEP_HOURS * 3600
+        for controller in list(self.sales_controllers.values()) + [self.expense_controller]:
+            try:
+                controller.model.purge_deleted(older_than)
+            except Exception as e:
+                print(f"Ошибка очистки удаленных записей: {e}")
+        
+        self.root.after(PURGE_INTERVAL_MS, self._purge_deleted)
+    
+    def _refresh_snapshot(self):
+        """Дописать изменения в колоночный снимок в фоновом потоке (и запланировать следующий раз)"""
+        from analytics.snapshot import SnapshotExporter
+        
+        if self.snapshot_thread is None or not self.snapshot_thread.is_alive():
+            models = [c.model for c in self.sales_controllers.values()] + [self.expense_controller.model]
+            exporter = SnapshotExporter(models)
+            
+            def work():
+                try:
+                    exporter.refresh()
+                except Exception as e:
+                    print(f"Ошибка обновления снимка для аналитики: {e}")
+            
+            self.snapshot_thread = threading.Thread(target=work, name="snapshot", daemon=True)
+            self.snapshot_thread.start()
+        
+        self.root.after(SNAPSHOT_INTERVAL_MS, self._refresh_snapshot)
+    
+    def _close_years(self, reschedule=True):
+        """Перенести закрытые годы в файлы разделов в фоновом потоке (и запланировать следующую проверку)"""
+        from models.partitions import YearPartitioner
+        
+        if self.partition_thread is None or not self.partition_thread.is_alive():
+            models = [c.model for c in self.sales_controllers.values()] + [self.expense_controller.model]
+            partitioner = YearPartitioner(models)
+            
+            def work():
+                try:
+                    partitioner.close_years()
+                except Exception as e:
+                    print(f"Ошибка переноса закрытых лет: {e}")
+            
+            self.partition_thread = threading.Thread(target=work, name="partitions", daemon=True)
+            self.partition_thread.start()
+        
+        if reschedule:
+            self.root.after(PARTITION_INTERVAL_MS, self._close_years)
+    
+    def _on_data_changed(self, event):
+        """БД записала другая программа или окно: обновить затронутые строки и итоги"""
+        for payload in event.payloads:
+            tables = payload['tables']
+            
+            # Перенос закрытого года: записи те же, но читаются из раздела и
+            # становятся только для просмотра - перечитывается все
+            if any(change.get('partitioned') for change in tables.values()):
+                self._reload_data()
+                continue
+            
+            # Открытые вкладки дорисовывают строки, у остальных магазинов - только итоги
+            totals_only = []
+            for shop, controller in self.sales_controllers.items():
+                change = tables.get(controller.model.table_name)
+                if change is None:
+                    continue
+                if shop in self.shop_views:
+                    controller.apply_external_changes(change['dates'], change['rows'])
+                elif controller.invalidate_dates(change['dates']):
+                    totals_only.append(shop)
+            if totals_only:
+                self._load_shop_totals(
+                    self.expense_controller.current_date_from, self.expense_controller.current_date_to, totals_only
+                )
+                self._update_global_totals()
+            
+            change = tables.get(self.expense_controller.model.table_name)
+            if change is not None:
+                self.expense_controller.apply_external_changes(change['dates'], change['rows'])
+            
+            # Приход товара меняет остатки (продажи обновляют подсветку сами)
+            if get_stock().table_name in tables:
+                self._on_stock_changed()
+    
+    def _start_api(self):
+        """Запустить HTTP API; записанное через него окно видит при следующей загрузке данных"""
+        from api.api_server import ApiServer
+        
+        server = ApiServer()
+        if server.start():
+            self.api_server = server
     
     def _update_global_totals(self):
         """Обновление общих итогов"""
-        # Получаем суммы из каждой вкладки
-        shop1_total = self.shop_views[SHOPS[0]].get_total_sales()
-        shop2_total = self.shop_views[SHOPS[1]].get_total_sales()
-        total_sales = shop1_total + shop2_total
+        currency = self.settings.currency
+        
+        # Итоги магазинов хранят контроллеры (в том числе для еще не открытых вкладок)
+        shop_totals = [(shop, controller.last_total or 0) for shop, controller in self.sales_controllers.items()]
+        total_sales = sum(total for _, total in shop_totals)
         expense_total = self.expense_view.get_total_expense()
         grand_total = total_sales - expense_total
         
+        # Прибыль магазина - с его расходами и долей общих (кассир расходов не видит)
+        profit = self._shop_profit()
+        shop_texts = []
+        for shop, total in shop_totals:
+            text = f"{shop}: {total:.2f} {currency}"
+            if shop in profit:
+                text += f" (прибыль {profit[shop]['profit']:.2f})"
+            shop_texts.append(text)
+        
         # Обновляем метки
-        self.shop1_total_label.config(text=f"{SHOPS[0]}: {shop1_total:.2f} сом.")
-        self.shop2_total_label.config(text=f"{SHOPS[1]}: {shop2_total:.2f} сом.")
-        self.total_sales_label.config(text=f"{total_sales:.2f} сом.")
-        self.expense_total_label.config(text=f"{expense_total:.2f} сом.")
-        self.grand_total_label.config(text=f"{grand_total:.2f} сом.")
+        self.shops_total_label.config(text="    ".join(shop_texts))
+        self.total_sales_label.config(text=f"{total_sales:.2f} {currency}")
+        self.expense_total_label.config(text=f"{expense_total:.2f} {currency}")
+        self.grand_total_label.config(text=f"{grand_total:.2f} {currency}")
+    
+    def _shop_profit(self):
+        """Прибыль магазинов за дату общих итогов: {магазин: {'revenue', 'direct', 'shared', 'profit'}}"""
+        date_from = self.expense_controller.current_date_from
+        date_to = self.expense_controller.current_date_to
+        if not session.can_view_expenses() or not date_from:
+            return {}
+        
+        models = [controller.model for controller in self.sales_controllers.values()]
+        return PnlController(models, self.expense_controller.model).get(date_from, date_to)['shops']
     
     def _load_initial_data(self):
         """Загрузка начальных данных"""
         today = datetime.now().strftime("%Y-%m-%d")
         
-        # Загружаем данные за сегодня для всех магазинов
-        for shop, controller in self.sales_controllers.items():
-            controller.load_data(today, today)
+        # Итоги всех магазинов за сегодня - одним запросом,
+        # записи читаются только для открытых вкладок
+        self._load_shop_totals(today, today)
+        for shop in self.shop_views:
+            self.sales_controllers[shop].load_data(today, today)
+        
+        tab = str(self.notebook.select())
+        if tab in self.shop_tabs:
+            self.get_shop_view(self.shop_tabs[tab])
         
         # Загружаем расходы за сегодня
+        # (общие итоги обновятся по событию totals_changed после отрисовки)
         self.expense_controller.load_data(today, today)
+    
+    def _load_shop_totals(self, date_from, date_to, shops=None):
+        """Итоги магазинов без открытых вкладок одним запросом UNION ALL"""
+        controllers = [
+            controller for shop, controller in self.sales_controllers.items()
+            if (shops is None or shop in shops)
+        ]
+        totals = get_shop_totals([controller.model for controller in controllers], date_from, date_to)
+        for controller in controllers:
+            controller.current_date_from = date_from
+            controller.current_date_to = date_to
+            controller.last_total = totals.get(controller.shop_name, 0)
+    
+    def _sync(self):
+        """Синхронизация с другими компьютерами через общую папку"""
+        from sync.sync_engine import SyncEngine
+        from sync.sync_transport import FileSystemTransport
         
-        # Обновляем общие итоги
-        self._update_global_totals()
+        models = [c.model for c in self.sales_controllers.values()] + [self.expense_controller.model, get_stock()]
+        self._flush_writes()
+        
+        try:
+            result = SyncEngine(models, FileSystemTransport(SYNC_DIR)).sync()
+        except Exception as e:
+            messagebox.showerror("Синхронизация", f"Ошибка синхронизации: {e}")
+            return
+        
+        # Поздние записи закрытых лет дописываются в их разделы
+        self._close_years(reschedule=False)
+        self._reload_data()
+        
+        # Пришедшее синхронизацией уже показано перезагрузкой
+        if self.watcher is not None:
+            self.watcher.skip()
+        
+        messagebox.showinfo(
+            "Синхронизация",
+            f"Отправлено изменений: {result['sent']}\nПолучено изменений: {result['received']}"
+        )
+    
+    def _reload_data(self):
+        """Сбросить кэши и перечитать данные за выбранные даты
+        
+        Открытые вкладки перечитываются целиком, остальные магазины - только итоги.
+        """
+        prefetcher.cache.clear()
+        for controller in list(self.sales_controllers.values()) + [self.expense_controller]:
+            controller._month_cache.clear()
+        
+        for shop in self.shop_views:
+            controller = self.sales_controllers[shop]
+            controller.load_data(controller.current_date_from, controller.current_date_to)
+        self._load_shop_totals(
+            self.expense_controller.current_date_from,
+            self.expense_controller.current_date_to,
+            [shop for shop in self.sales_controllers if shop not in self.shop_views]
+        )
+        self.expense_controller.load_data(
+            self.expense_controller.current_date_from,
+            self.expense_controller.current_date_to
+        )
+    
+    def _open_archive(self):
+        """Открыть БД прошлых лет в отдельном окне только для чтения"""
+        path = filedialog.askopenfilename(
+            title="Открыть архив",
+            filetypes=[("База данных", "*.db"), ("Все файлы", "*.*")]
+        )
+        if not path:
+            return
+        
+        # Отдельный процесс: у архива свои модели и кэши, текущая БД не затрагивается
+        main_script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+        try:
+            subprocess.Popen([sys.executable, main_script, "--archive", path])
+        except OSError as e:
+            messagebox.showerror("Архив", f"Не удалось открыть архив: {e}")
     
     def _export_to_excel(self):
         """Экспорт данных в Excel"""
         messagebox.showinfo("Экспорт", "Функция экспорта будет доступна в следующей версии")
     
+    def _show_report(self):
+        """Открыть окно отчета с графиками"""
+        from views.report_view import ReportWindow
+        
+        ReportWindow(self.root)
+    
+    def _show_print_report(self):
+        """Открыть диалог печатного отчета"""
+        from views.print_report_view import PrintReportDialog
+        
+        if self.report_thread and self.report_thread.is_alive():
+            messagebox.showwarning("Отчет", "Отчет уже формируется")
+            return
+        PrintReportDialog(self.root, on_submit=self._start_report)
+    
+    def _start_report(self, date_from, date_to, shop, path):
+        """Запустить формирование отчета в фоновом потоке"""
+        from reports.report_renderer import ReportRenderer, ReportCancelled
+        
+        def work():
+            try:
+                ReportRenderer(date_from, date_to, shop).render(
+                    path,
+                    progress=lambda done, total: self.report_queue.put(('progress', done, total)),
+                    cancel_event=self.report_cancel
+                )
+                self.report_queue.put(('done', path))
+            except ReportCancelled:
+                self.report_queue.put(('cancelled',))
+            except Exception as e:
+                print(f"Ошибка формирования отчета: {e}")
+                self.report_queue.put(('error', str(e)))
+        
+        # Отчет читает БД в своем потоке - ожидающие строки пишутся заранее
+        self._flush_writes()
+        self.report_cancel.clear()
+        self.report_progress['value'] = 0
+        self.report_label.config(text="Формирование отчета...")
+        self.report_frame.pack(fill=tk.X, padx=5, pady=(0, 5))
+        
+        self.report_thread = threading.Thread(target=work, name="report", daemon=True)
+        self.report_thread.start()
+        self.root.after(100, self._poll_report)
+    
+    def _poll_report(self):
+        """Показать прогресс отчета (Tk обновляется только из главного потока)"""
+        finished = None
+        while True:
+            try:
+                message = self.report_queue.get_nowait()
+            except queue.Empty:
+                break
+            
+            if message[0] == 'progress':
+                _, done, total = message
+                self.report_progress['maximum'] = max(total, 1)
+                self.report_progress['value'] = done
+                self.report_label.config(text=f"Формирование отчета: {done} из {total} строк")
+            else:
+                finished = message
+        
+        if finished is None:
+            self.root.after(100, self._poll_report)
+            return
+        
+        self.report_frame.pack_forget()
+        if finished[0] == 'done':
+            messagebox.showinfo("Отчет", f"Отчет сохранен:\n{finished[1]}")
+        elif finished[0] == 'error':
+            messagebox.showerror("Отчет", f"Ошибка формирования отчета: {finished[1]}")
+    
+    def _show_stock(self):
+        """Открыть окно остатков и прихода товара"""
+        from views.stock_view import StockWindow
+        
+        StockWindow(self.root, on_stock_changed=self._on_stock_changed)
+    
+    def _on_stock_changed(self):
+        """Приход изменил остатки - обновить подсветку на открытых вкладках"""
+        for view in self.shop_views.values():
+            view.apply_stock_marks()
+    
+    def _show_settings(self):
+        """Открыть окно настроек магазинов и валюты"""
+        from views.settings_view import SettingsWindow
+        
+        SettingsWindow(
+            self.root,
+            on_shop_added=self._on_shop_added,
+            on_shop_renamed=self._on_shop_renamed,
+            on_currency_changed=self._on_currency_changed
+        )
+    
+    def _show_users(self):
+        """Открыть окно пользователей"""
+        from views.users_view import UsersWindow
+        
+        UsersWindow(self.root)
+    
+    def _on_shop_added(self, shop):
+        """Новый магазин: вкладка, списки магазинов и итоги"""
+        controller = self._add_shop_tab(shop)
+        controller.current_date_from = self.expense_controller.current_date_from
+        controller.current_date_to = self.expense_controller.current_date_to
+        controller.last_total = 0
+        
+        self.expense_view.set_shops(self.settings.get_shop_names())
+        self._update_global_totals()
+    
+    def _on_shop_renamed(self, old_name, new_name):
+        """Переименование магазина в записях, вкладке и списках"""
+        controller = self.sales_controllers[old_name]
+        controller.rename(new_name)
+        self.expense_controller.rename_shop(old_name, new_name)
+        get_users().rename_shop(old_name, new_name)
+        
+        # Порядок магазинов сохраняется
+        self.sales_controllers = {
+            (new_name if shop == old_name else shop): value
+            for shop, value in self.sales_controllers.items()
+        }
+        for tab, shop in self.shop_tabs.items():
+            if shop == old_name:
+                self.shop_tabs[tab] = new_name
+                self.notebook.tab(tab, text=new_name)
+        
+        view = self.shop_views.pop(old_name, None)
+        if view is not None:
+            view.set_shop_name(new_name)
+            self.shop_views[new_name] = view
+            controller.load_data(controller.current_date_from, controller.current_date_to)
+        
+        self.expense_view.set_shops(self.settings.get_shop_names(), (old_name, new_name))
+        self.expense_controller.load_data(
+            self.expense_controller.current_date_from,
+            self.expense_controller.current_date_to
+        )
+        self._update_global_totals()
+    
+    def _on_currency_changed(self):
+        """Перерисовать суммы с новой валютой"""
+        for view in self.shop_views.values():
+            view.update_totals(view.get_total_sales())
+        self.expense_view.update_totals(self.expense_view.get_total_expense())
+        self._update_global_totals()
+    
+    def _show_diagnostics(self):
+        """Открыть окно диагностики запросов"""
+        from views.diagnostics_view import DiagnosticsWindow
+        
+        if getattr(self, 'diagnostics_window', None) and self.diagnostics_window.winfo_exists():
+            self.diagnostics_window.lift()
+            return
+        self.diagnostics_window = DiagnosticsWindow(self.root)
+    
     def _show_about(self):
         """Показать информацию о программе"""
         about_text = """Учет продаж и расходов
 Версия 1.0
 
-Программа для учета продаж двух магазинов и расходов.
+Программа для учета продаж магазинов и расходов.
 
 Возможности:
 - Учет продаж по магазинам
@@ -176,4 +698,19 @@ class MainView:
     def on_closing(self):
         """Обработка закрытия окна"""
         if messagebox.askokcancel("Выход", "Вы действительно хотите выйти?"):
+            # Строки, ожидающие отложенной записи, сохраняются до выхода
+            self._flush_writes()
+            
+            # Статистика включенного профилировщика сохраняется в журнал
+            from models.query_profiler import profiler
+            if profiler.enabled:
+                profiler.dump_json(PROFILER_LOG_PATH)
+            
+            if self.api_server is not None:
+                self.api_server.stop()
+            
+            # Недописанный отчет удаляется при отмене
+            if self.report_thread and self.report_thread.is_alive():
+                self.report_cancel.set()
+                self.report_thread.join(timeout=2)
             self.root.quit()
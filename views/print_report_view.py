@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+"""
+Диалог параметров печатного отчета (PDF/HTML)
+"""
+
+import tkinter as tk
+from tkinter import ttk, filedialog
+from datetime import date
+from models.settings_model import get_settings
+from views.widgest.date_selector import DateSelector
+
+
+class PrintReportDialog(tk.Toplevel):
+    """Выбор периода, магазина и формата; формирование запускает MainView"""
+    
+    FORMATS = {"PDF": ".pdf", "HTML": ".html"}
+    
+    def __init__(self, master, on_submit):
+        super().__init__(master)
+        self.title("Печать отчета")
+        self.resizable(False, False)
+        self.transient(master)
+        
+        self.on_submit = on_submit
+        
+        self._create_widgets()
+        self.grab_set()
+    
+    def _create_widgets(self):
+        """Создание виджетов"""
+        frame = ttk.Frame(self, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(frame, text="С:").grid(row=0, column=0, sticky='w', pady=3)
+        self.date_from = DateSelector(frame, initial_date=date.today().replace(day=1))
+        self.date_from.grid(row=0, column=1, sticky='w', pady=3)
+        
+        ttk.Label(frame, text="По:").grid(row=1, column=0, sticky='w', pady=3)
+        self.date_to = DateSelector(frame)
+        self.date_to.grid(row=1, column=1, sticky='w', pady=3)
+        
+        ttk.Button(frame, text="Только сегодня", command=self._today).grid(row=2, column=1, sticky='w', pady=3)
+        
+        ttk.Label(frame, text="Магазин:").grid(row=3, column=0, sticky='w', pady=3)
+        self.shop_var = tk.StringVar(value="Все")
+        ttk.Combobox(
+            frame,
+            textvariable=self.shop_var,
+            values=["Все"] + get_settings().get_shop_names(),
+            state="readonly",
+            width=10
+        ).grid(row=3, column=1, sticky='w', pady=3)
+        
+        ttk.Label(frame, text="Формат:").grid(row=4, column=0, sticky='w', pady=3)
+        self.format_var = tk.StringVar(value="PDF")
+        formats = ttk.Frame(frame)
+        formats.grid(row=4, column=1, sticky='w', pady=3)
+        for name in self.FORMATS:
+            ttk.Radiobutton(formats, text=name, value=name, variable=self.format_var).pack(side=tk.LEFT, padx=(0, 10))
+        
+        buttons = ttk.Frame(frame)
+        buttons.grid(row=5, column=0, columnspan=2, pady=(10, 0))
+        ttk.Button(buttons, text="Сформировать", command=self._submit).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="Отмена", command=self.destroy).pack(side=tk.LEFT, padx=5)
+    
+    def _today(self):
+        """Отчет за один день"""
+        self.date_from.set_date(date.today())
+        self.date_to.set_date(date.today())
+    
+    def _submit(self):
+        """Выбрать файл и передать параметры отчета"""
+        start = self.date_from.get_date_obj()
+        end = self.date_to.get_date_obj()
+        if not start or not end:
+            return
+        if start > end:
+            start, end = end, start
+        
+        extension = self.FORMATS[self.format_var.get()]
+        path = filedialog.asksaveasfilename(
+            parent=self,
+            defaultextension=extension,
+            initialfile=f"report_{start:%Y%m%d}_{end:%Y%m%d}{extension}",
+            filetypes=[(self.format_var.get(), f"*{extension}")]
+        )
+        if not path:
+            return
+        
+        shop = self.shop_var.get()
+        self.destroy()
+        self.on_submit(
+            start.strftime("%Y-%m-%d"),
+            end.strftime("%Y-%m-%d"),
+            None if shop == "Все" else shop,
+            path
+        )
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+"""
+Окно отчета за период с графиками
+"""
+
+import queue
+import threading
+import tkinter as tk
+from tkinter import ttk
+from datetime import date, timedelta
+from config import COLORS, HEADER_FONT, PNL_ALLOCATION
+from controllers.report_controller import ReportController
+from reports.pnl_engine import ALLOCATION_RULES
+from models.settings_model import get_settings
+from views.widgest.date_selector import DateSelector
+from views.widgest.charts import LineChart, BarChart
+
+
+class ReportWindow(tk.Toplevel):
+    """Графики выручки, расходов и прибыли за период и сравнение магазинов
+    
+    Итоги считаются в фоновом потоке (пул процессов один на окно), графики
+    перерисовываются из главного потока по готовности результата.
+    """
+    
+    def __init__(self, master, controller=None):
+        super().__init__(master)
+        self.title("Отчет за период")
+        self.geometry("1000x650")
+        
+        self.controller = controller or ReportController()
+        self.controller.open_pool()
+        
+        self.build_queue = queue.Queue()
+        self.build_thread = None
+        self._requested = None  # период последнего нажатия "Построить"
+        self._poll_id = None
+        
+        self._create_widgets()
+        self._set_period(30)
+    
+    def destroy(self):
+        """Закрыть окно: опрос результата и пул процессов останавливаются"""
+        if self._poll_id is not None:
+            self.after_cancel(self._poll_id)
+            self._poll_id = None
+        self.controller.close()
+        super().destroy()
+    
+    def _create_widgets(self):
+        """Создание виджетов"""
+        toolbar = ttk.Frame(self)
+        toolbar.pack(fill=tk.X, padx=5, pady=5)
+        
+        ttk.Label(toolbar, text="С:").pack(side=tk.LEFT)
+        self.date_from = DateSelector(toolbar)
+        self.date_from.pack(side=tk.LEFT, padx=2)
+        
+        ttk.Label(toolbar, text="По:").pack(side=tk.LEFT, padx=(10, 0))
+        self.date_to = DateSelector(toolbar)
+        self.date_to.pack(side=tk.LEFT, padx=2)
+        
+        ttk.Button(toolbar, text="Построить", command=self._build).pack(side=tk.LEFT, padx=10)
+        
+        for text, days in (("Месяц", 30), ("Квартал", 91), ("Год", 365), ("3 года", 3 * 365)):
+            ttk.Button(toolbar, text=text, command=lambda d=days: self._set_period(d)).pack(side=tk.LEFT, padx=2)
+        
+        self.summary_label = ttk.Label(self, font=HEADER_FONT)
+        self.summary_label.pack(fill=tk.X, padx=10)
+        
+        panes = ttk.PanedWindow(self, orient=tk.VERTICAL)
+        panes.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        self.line_chart = LineChart(panes, x_format=lambda o: date.fromordinal(o).strftime("%d.%m.%y"))
+        panes.add(self.line_chart, weight=3)
+        
+        self.bar_chart = BarChart(panes, height=200)
+        panes.add(self.bar_chart, weight=1)
+    
+    def _set_period(self, days):
+        """Период из последних N дней"""
+        today = date.today()
+        self.date_from.set_date(today - timedelta(days=days - 1))
+        self.date_to.set_date(today)
+        self._build()
+    
+    def _build(self):
+        """Запустить расчет выбранного периода"""
+        start = self.date_from.get_date_obj()
+        end = self.date_to.get_date_obj()
+        if not start or not end:
+            return
+        if start > end:
+            start, end = end, start
+        
+        self._requested = (start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
+        
+        # Период, выбранный во время расчета, строится сразу после него
+        if self.build_thread is not None and self.build_thread.is_alive():
+            return
+        self._start_build(*self._requested)
+    
+    def _start_build(self, date_from, date_to):
+        """Посчитать итоги в фоновом потоке"""
+        def work():
+            try:
+                # Данные могли измениться с прошлого построения - итоги считаются заново
+                self.controller.compute(date_from, date_to)
+                result = (
+                    self.controller.get_series(date_from, date_to),
+                    self.controller.get_shop_profit(date_from, date_to)
+                )
+                self.build_queue.put(('done', (date_from, date_to), result))
+            except Exception as e:
+                print(f"Ошибка расчета отчета: {e}")
+                self.build_queue.put(('error', (date_from, date_to), str(e)))
+        
+        self.summary_label.config(text="Расчет...")
+        self.build_thread = threading.Thread(target=work, name="report-window", daemon=True)
+        self.build_thread.start()
+        self._poll_id = self.after(100, self._poll_build)
+    
+    def _poll_build(self):
+        """Дождаться итогов расчета (Tk обновляется только из главного потока)"""
+        try:
+            status, period, result = self.build_queue.get_nowait()
+        except queue.Empty:
+            self._poll_id = self.after(100, self._poll_build)
+            return
+        
+        self._poll_id = None
+        if period != self._requested:
+            self._start_build(*self._requested)
+        elif status == 'error':
+            self.summary_label.config(text=f"Ошибка расчета: {result}")
+        else:
+            self._draw(*result)
+    
+    def _draw(self, series, pnl):
+        """Перерисовать графики и итоги по рассчитанным данным"""
+        self.line_chart.set_data(
+            [day.toordinal() for day in series['days']],
+            [
+                ("Выручка", series['revenue'], COLORS['chart_revenue']),
+                ("Расходы", series['expense'], COLORS['chart_expense']),
+                ("Прибыль", series['profit'], COLORS['chart_profit'])
+            ]
+        )
+        
+        # Расходы магазина - свои и его доля общих
+        shops = list(pnl['shops'].items())
+        self.bar_chart.set_data(
+            [shop for shop, _ in shops],
+            [
+                ("Выручка", [row['revenue'] for _, row in shops], COLORS['chart_revenue']),
+                ("Расходы", [row['direct'] + row['shared'] for _, row in shops], COLORS['chart_expense']),
+                ("Прибыль", [row['profit'] for _, row in shops], COLORS['chart_profit'])
+            ]
+        )
+        
+        revenue = sum(series['revenue'])
+        expense = sum(series['expense'])
+        currency = get_settings().currency
+        self.summary_label.config(
+            text=f"Выручка: {revenue:.2f} {currency}   Расходы: {expense:.2f} {currency}   "
+                 f"Прибыль: {revenue - expense:.2f} {currency}   "
+                 f"Общие расходы: {pnl['shared']:.2f} {currency} ({ALLOCATION_RULES[PNL_ALLOCATION]})"
+        )
@@ -6,8 +6,13 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-from config import SALES_COLUMNS, TABLE_FONT, HEADER_FONT, COLORS
-from views.widgets.date_selector import DateSelector
+from config import SALES_COLUMNS, TABLE_FONT, HEADER_FONT, COLORS, LOW_STOCK_THRESHOLD, LEADERBOARD_SIZE, READ_ONLY
+from controllers.access import session
+from views.widgest.date_selector import DateSelector
+from models.settings_model import get_settings
+from views.widgest.calendar_heatmap import CalendarHeatmap
+from views.widgest.cell_editor import CellEditor
+from controllers.event_bus import RECORDS_CHANGED, TOTALS_CHANGED, ROW_ADDED, ROW_CHANGED, ROW_CONFIRMED
 from datetime import datetime
 
 
@@ -24,8 +29,27 @@ class SalesView(ttk.Frame):
         self.selected_row_widgets = []  # Виджеты выбранной строки
         self.total_sales = 0  # Сумма продаж
         
+        self.row_widgets = {}  # Виджеты строк по ID записи
+        self.row_numbers = {}  # Номер строки таблицы по ID записи
+        self.next_row = 0  # Номер для следующей добавляемой строки
+        self.calendar_visible = False  # Показан ли календарь активности
+        self.sellers_visible = False  # Показан ли рейтинг продавцов
+        self.seller_controller = None  # Создается при первом показе рейтинга
+        # Правка и удаление записей (архиву и кассиру - только просмотр и ввод)
+        self.editable = not READ_ONLY and session.can_edit()
+        
         self._create_widgets()
+        
+        # Редактор ячеек на месте: двойной клик по ячейке или кнопка ✎
+        self.cell_editor = CellEditor(
+            self.table_frame,
+            [col for col, spec in SALES_COLUMNS.items() if spec['editable']],
+            self._get_cell,
+            self._on_cell_commit,
+            neighbour=self._neighbour_record
+        )
         self._bind_events()
+        self._subscribe_events()
         
         # Настраиваем веса для прокрутки при изменении размера
         self.grid_rowconfigure(0, weight=1)
@@ -40,6 +64,7 @@ class SalesView(ttk.Frame):
         # Верхняя панель с фильтром по дате
         filter_frame = ttk.Frame(main_container)
         filter_frame.pack(fill=tk.X, padx=5, pady=5)
+        self.filter_frame = filter_frame
         
         ttk.Label(filter_frame, text="Дата:").pack(side=tk.LEFT, padx=5)
         
@@ -52,12 +77,49 @@ class SalesView(ttk.Frame):
             command=self._set_today_filter
         ).pack(side=tk.LEFT, padx=5)
         
+        ttk.Button(
+            filter_frame,
+            text="Календарь",
+            command=self._toggle_calendar
+        ).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Button(
+            filter_frame,
+            text="Продавцы",
+            command=self._toggle_sellers
+        ).pack(side=tk.LEFT, padx=5)
+        
+        # Календарь активности по дням (скрыт до нажатия кнопки)
+        self.calendar = CalendarHeatmap(
+            main_container,
+            on_pick=self._on_calendar_pick,
+            on_month_change=self._load_calendar_month,
+            color=COLORS['calendar_sales']
+        )
+        
+        # Рейтинг продавцов с начала месяца (скрыт до нажатия кнопки)
+        self.sellers_frame = ttk.LabelFrame(main_container, text="Продавцы с начала месяца")
+        columns = ('seller', 'sales', 'quantity', 'revenue', 'avg_ticket', 'commission')
+        self.sellers_tree = ttk.Treeview(
+            self.sellers_frame, columns=columns, show='headings', height=LEADERBOARD_SIZE
+        )
+        for column, text, width in zip(
+            columns,
+            ("Продавец", "Продаж", "Кол-во", "Выручка", "Ср. чек", "Комиссия"),
+            (180, 70, 80, 110, 100, 100)
+        ):
+            self.sellers_tree.heading(column, text=text)
+            self.sellers_tree.column(column, width=width, anchor='w' if column == 'seller' else 'e')
+        self.sellers_tree.pack(fill=tk.X, padx=5, pady=5)
+        
         # Разделитель
         ttk.Separator(main_container, orient='horizontal').pack(fill=tk.X, padx=5, pady=5)
         
         # Панель для добавления новой записи
+        # (архив только для чтения - панели нет)
         add_frame = ttk.LabelFrame(main_container, text="Добавить запись")
-        add_frame.pack(fill=tk.X, padx=5, pady=5)
+        if not READ_ONLY:
+            add_frame.pack(fill=tk.X, padx=5, pady=5)
         
         # Поля для ввода в одну строку
         fields_frame = ttk.Frame(add_frame)
@@ -74,6 +136,7 @@ class SalesView(ttk.Frame):
         self.item_entry = ttk.Entry(fields_frame, width=15)
         self.item_entry.pack(side=tk.LEFT, padx=2)
         self.item_entry.bind('<Return>', self._add_record_event)
+        self.item_entry.bind('<FocusOut>', lambda e: self._show_item_stock())
         
         # Количество
         ttk.Label(fields_frame, text="Кол-во:").pack(side=tk.LEFT, padx=2)
@@ -96,6 +159,10 @@ class SalesView(ttk.Frame):
         )
         self.add_button.pack(side=tk.LEFT, padx=5)
         
+        # Остаток введенного товара на складе магазина
+        self.stock_label = ttk.Label(fields_frame, text="")
+        self.stock_label.pack(side=tk.LEFT, padx=5)
+        
         # Разделитель
         ttk.Separator(main_container, orient='horizontal').pack(fill=tk.X, padx=5, pady=5)
         
@@ -136,7 +203,7 @@ class SalesView(ttk.Frame):
         summary_frame = ttk.Frame(main_container)
         summary_frame.pack(fill=tk.X, padx=5, pady=5)
         
-        self.total_label = ttk.Label(summary_frame, text=f"Итого {self.shop_name}: 0.00 сом", font=HEADER_FONT)
+        self.total_label = ttk.Label(summary_frame, text=f"Итого {self.shop_name}: 0.00 {get_settings().currency}", font=HEADER_FONT)
         self.total_label.pack(side=tk.LEFT, padx=5)
     
     def _on_canvas_configure(self, event):
@@ -177,19 +244,124 @@ class SalesView(ttk.Frame):
     
     def _bind_events(self):
         """Привязка событий"""
-        self.bind('<Delete>', self._on_delete)
+        if self.editable:
+            self.bind('<Delete>', self._on_delete)
+    
+    def _subscribe_events(self):
+        """Подписка на события контроллера"""
+        events = self.controller.events
+        events.subscribe(RECORDS_CHANGED, lambda e: self.display_records(e.payload['records']), self.controller)
+        events.subscribe(TOTALS_CHANGED, lambda e: self.update_totals(e.payload['total']), self.controller)
+        events.subscribe(ROW_ADDED, self._on_rows_added, self.controller)
+        events.subscribe(ROW_CHANGED, self._on_rows_changed, self.controller)
+        events.subscribe(ROW_CONFIRMED, self._on_rows_confirmed, self.controller)
+        events.subscribe(TOTALS_CHANGED, lambda e: self._refresh_calendar(), self.controller)
+        events.subscribe(TOTALS_CHANGED, lambda e: self._refresh_sellers(), self.controller)
+    
+    def _on_rows_added(self, event):
+        """Дорисовать добавленные строки без перестройки таблицы"""
+        for payload in event.payloads:
+            self.append_record(payload['record'])
+        
+        # Продажа уменьшила остаток - подсветка могла измениться
+        self.apply_stock_marks()
+        self.after(100, self._scroll_to_bottom)
+    
+    def _on_rows_changed(self, event):
+        """Перерисовать измененные строки и убрать удаленные без перестройки таблицы"""
+        for payload in event.payloads:
+            if payload['record'] is None:
+                self.remove_record(payload['record_id'])
+            else:
+                self.repaint_record(payload['record'])
+        
+        self.apply_stock_marks()
+    
+    def _on_rows_confirmed(self, event):
+        """Ожидающие строки записаны в БД - показать их обычными"""
+        for payload in event.payloads:
+            self.confirm_record(payload['pending_id'], payload['record'])
     
     def _set_today_filter(self):
         """Установить сегодняшнюю дату в фильтр"""
         self.filter_date.set_date(datetime.now())
         self._apply_date_filter()
     
+    def _toggle_calendar(self):
+        """Показать или скрыть календарь активности"""
+        if self.calendar_visible:
+            self.calendar.pack_forget()
+            self.calendar_visible = False
+            return
+        
+        self.calendar.pack(padx=5, pady=5, after=self.filter_frame)
+        self.calendar_visible = True
+        
+        selected_date = self.filter_date.get_date_obj() or datetime.now().date()
+        self.calendar.set_date(selected_date)
+        self._load_calendar_month(self.calendar.year, self.calendar.month)
+    
+    def _load_calendar_month(self, year, month):
+        """Раскрасить календарь одним сгруппированным запросом за месяц (с кэшем)"""
+        self.calendar.set_activity(self.controller.get_month_activity(year, month))
+    
+    def _refresh_calendar(self):
+        """Обновить календарь после изменения итогов (кэш сброшен только для измененного месяца)"""
+        if self.calendar_visible:
+            self._load_calendar_month(self.calendar.year, self.calendar.month)
+    
+    def _toggle_sellers(self):
+        """Показать или скрыть рейтинг продавцов"""
+        if self.sellers_visible:
+            self.sellers_frame.pack_forget()
+            self.sellers_visible = False
+            return
+        
+        if self.seller_controller is None:
+            from controllers.seller_controller import SellerController
+            self.seller_controller = SellerController([self.controller.model])
+        
+        self.sellers_frame.pack(fill=tk.X, padx=5, pady=5, after=self.filter_frame)
+        self.sellers_visible = True
+        self._refresh_sellers()
+    
+    def _refresh_sellers(self):
+        """Перечитать рейтинг за месяц выбранного дня (десятки строк дневных итогов, не продажи)"""
+        if not self.sellers_visible:
+            return
+        
+        selected_date = self.filter_date.get_date_obj() or datetime.now().date()
+        self.sellers_tree.delete(*self.sellers_tree.get_children())
+        for row in self.seller_controller.get_month_to_date(selected_date):
+            self.sellers_tree.insert('', tk.END, values=(
+                row['seller_name'],
+                row['sales'],
+                f"{row['quantity']:g}",
+                f"{row['revenue']:.2f}",
+                f"{row['avg_ticket']:.2f}",
+                f"{row['commission']:.2f}"
+            ))
+    
+    def _on_calendar_pick(self, day):
+        """Выбор дня в календаре"""
+        self.filter_date.set_date(day)
+        
+        # Итог дня из кэша месяца рисуется сразу, строки загружаются следом
+        if self.controller.show_cached_totals(day):
+            self.update_idletasks()
+        self.after(1, self._apply_date_filter)
+    
     def _apply_date_filter(self):
         """Применить фильтр по дате"""
         selected_date = self.filter_date.get_date_obj()
         if selected_date:
+            if self.calendar_visible:
+                self.calendar.set_date(selected_date)
             date_str = selected_date.strftime("%Y-%m-%d")
             self.controller.load_data(date_str, date_str)
+            
+            # Пока пользователь смотрит день, в фоне готовятся соседние
+            self.after_idle(self.controller.prefetch_neighbours)
     
     def _add_record_event(self, event=None):
         """Обработка нажатия Enter для добавления записи"""
@@ -222,6 +394,7 @@ class SalesView(ttk.Frame):
             data['price'] = '0'
         
         self.controller.add_record(data)
+        self._show_item_stock(data['item'])
         
         # Очищаем поля
         self.seller_entry.delete(0, tk.END)
@@ -241,78 +414,171 @@ class SalesView(ttk.Frame):
             if int(widget.grid_info().get('row', 0)) > 0:
                 widget.destroy()
         
-        self.records = records
+        self.records = list(records)
+        self.row_widgets = {}
+        self.row_numbers = {}
+        self.next_row = len(records)
         sorted_records = sorted(records, key=lambda x: x.get('date', ''))
         
         # Считаем общую сумму продаж
         self.total_sales = sum(float(r.get('total', 0)) for r in records)
         
         for i, record in enumerate(sorted_records):
-            row = i + 1
-            columns = list(SALES_COLUMNS.keys()) + ['actions']
-            
-            for col_index, col in enumerate(columns):
-                if col == 'actions':
-                    # Создаем фрейм с кнопками
-                    actions_frame = ttk.Frame(self.table_frame)
-                    actions_frame.grid(row=row, column=col_index, sticky='nsew', padx=1, pady=1)
-                    
-                    edit_btn = ttk.Button(
-                        actions_frame,
-                        text="✎",
-                        width=3,
-                        command=lambda r=record['id']: self._edit_record(r)
-                    )
-                    edit_btn.pack(side=tk.LEFT, padx=1)
-                    
-                    delete_btn = ttk.Button(
-                        actions_frame,
-                        text="✕",
-                        width=3,
-                        command=lambda r=record['id']: self._delete_record(r)
-                    )
-                    delete_btn.pack(side=tk.LEFT, padx=1)
-                    
-                    # Привязываем клик по фрейму для выбора строки
-                    actions_frame.bind('<Button-1>', lambda e, r=record['id'], row_idx=row: self._on_row_click(e, r, row_idx))
-                    edit_btn.bind('<Button-1>', lambda e, r=record['id']: self._on_row_click(e, r, row))
-                    delete_btn.bind('<Button-1>', lambda e, r=record['id']: self._on_row_click(e, r, row))
-                    
-                else:
-                    value = record.get(col, '')
-                    
-                    if col in ['quantity', 'price', 'total']:
-                        try:
-                            value = f"{float(value):.2f}"
-                        except:
-                            pass
-                    
-                    cell = tk.Label(
-                        self.table_frame,
-                        text=str(value),
-                        bg=COLORS['table_bg'] if i % 2 == 0 else COLORS['table_alternate'],
-                        font=TABLE_FONT,
-                        relief=tk.RIDGE,
-                        anchor='e' if col in ['quantity', 'price', 'total'] else 'w'
-                    )
-                    cell.grid(row=row, column=col_index, sticky='nsew')
-                    
-                    cell.bind('<Button-1>', lambda e, r=record['id'], row_idx=row: self._on_row_click(e, r, row_idx))
-            
-            # Настраиваем веса колонок
-            for col_index in range(len(columns)):
-                self.table_frame.columnconfigure(col_index, weight=1)
+            self._render_row(i, record)
         
         # Обновляем итог
         self.update_totals(self.total_sales)
+        self.apply_stock_marks()
         
         if records:
             self.after(100, self._scroll_to_bottom)
     
+    def append_record(self, record):
+        """Добавить одну строку в конец таблицы"""
+        self.records.append(record)
+        self._render_row(self.next_row, record)
+        self.next_row += 1
+    
+    def repaint_record(self, record):
+        """Перерисовать одну строку (строки не было - например, после отмены удаления - добавить)"""
+        if record['id'] not in self.row_widgets:
+            self.append_record(record)
+            return
+        
+        for widget in self.row_widgets[record['id']]:
+            widget.destroy()
+        self.records = [record if r['id'] == record['id'] else r for r in self.records]
+        self._render_row(self.row_numbers[record['id']], record)
+    
+    def confirm_record(self, pending_id, record):
+        """Заменить ожидающую строку записью из БД на том же месте"""
+        if pending_id not in self.row_widgets:
+            return
+        if record['id'] in self.row_widgets:
+            # Строку уже дорисовало изменение записи - ожидающая больше не нужна
+            self.remove_record(pending_id)
+            return
+        
+        self.row_widgets[record['id']] = self.row_widgets.pop(pending_id)
+        self.row_numbers[record['id']] = self.row_numbers.pop(pending_id)
+        self.records = [dict(r, id=record['id']) if r['id'] == pending_id else r for r in self.records]
+        if self.selected_record_id == pending_id:
+            self.selected_record_id = record['id']
+        self.repaint_record(record)
+    
+    def remove_record(self, record_id):
+        """Убрать строку записи из таблицы"""
+        for widget in self.row_widgets.pop(record_id, []):
+            widget.destroy()
+        self.row_numbers.pop(record_id, None)
+        self.records = [r for r in self.records if r['id'] != record_id]
+        
+        if self.selected_record_id == record_id:
+            self.selected_record_id = None
+            self.selected_row_widgets = []
+    
+    def _render_row(self, i, record):
+        """Отрисовка одной строки таблицы"""
+        row = i + 1
+        widgets = []
+        # Записи закрытых лет лежат в разделах и только просматриваются
+        editable = self.editable and not self.controller.model.is_closed(record['date'])
+        columns = list(SALES_COLUMNS.keys()) + ['actions']
+        
+        for col_index, col in enumerate(columns):
+            if col == 'actions':
+                # Создаем фрейм с кнопками
+                actions_frame = ttk.Frame(self.table_frame)
+                actions_frame.grid(row=row, column=col_index, sticky='nsew', padx=1, pady=1)
+                widgets.append(actions_frame)
+                
+                if not editable:
+                    continue
+                
+                edit_btn = ttk.Button(
+                    actions_frame,
+                    text="✎",
+                    width=3,
+                    command=lambda r=record['id']: self._edit_record(r)
+                )
+                edit_btn.pack(side=tk.LEFT, padx=1)
+                
+                delete_btn = ttk.Button(
+                    actions_frame,
+                    text="✕",
+                    width=3,
+                    command=lambda r=record['id']: self._delete_record(r)
+                )
+                delete_btn.pack(side=tk.LEFT, padx=1)
+                
+                # Привязываем клик по фрейму для выбора строки
+                actions_frame.bind('<Button-1>', lambda e, r=record['id'], row_idx=row: self._on_row_click(e, r, row_idx))
+                edit_btn.bind('<Button-1>', lambda e, r=record['id']: self._on_row_click(e, r, row))
+                delete_btn.bind('<Button-1>', lambda e, r=record['id']: self._on_row_click(e, r, row))
+                
+            else:
+                value = record.get(col, '')
+                
+                if col in ['quantity', 'price', 'total']:
+                    try:
+                        value = f"{float(value):.2f}"
+                    except:
+                        pass
+                
+                cell = tk.Label(
+                    self.table_frame,
+                    text=str(value),
+                    bg=COLORS['table_bg'] if i % 2 == 0 else COLORS['table_alternate'],
+                    fg=COLORS['pending'] if record.get('pending') else COLORS['fg'],
+                    font=TABLE_FONT,
+                    relief=tk.RIDGE,
+                    anchor='e' if col in ['quantity', 'price', 'total'] else 'w'
+                )
+                cell.grid(row=row, column=col_index, sticky='nsew')
+                widgets.append(cell)
+                
+                cell.bind('<Button-1>', lambda e, r=record['id'], row_idx=row: self._on_row_click(e, r, row_idx))
+                if SALES_COLUMNS[col]['editable'] and editable:
+                    cell.bind('<Double-Button-1>', lambda e, r=record['id'], c=col: self.cell_editor.open(r, c))
+        
+        # Настраиваем веса колонок
+        for col_index in range(len(columns)):
+            self.table_frame.columnconfigure(col_index, weight=1)
+        
+        self.row_widgets[record['id']] = widgets
+        self.row_numbers[record['id']] = i
+    
+    def apply_stock_marks(self):
+        """Выделить цветом товары, которые заканчиваются на складе"""
+        low_stock = self.controller.get_low_stock()
+        item_column = list(SALES_COLUMNS.keys()).index('item')
+        
+        for record in self.records:
+            widgets = self.row_widgets.get(record['id'])
+            if widgets and not record.get('pending'):
+                color = COLORS['low_stock'] if record.get('item_id') in low_stock else COLORS['fg']
+                widgets[item_column].config(fg=color)
+    
+    def _show_item_stock(self, item=None):
+        """Показать остаток товара (по умолчанию - из поля ввода)"""
+        item = (item if item is not None else self.item_entry.get()).strip()
+        stock = self.controller.get_item_stock(item) if item else None
+        if stock is None:
+            self.stock_label.config(text="", foreground=COLORS['fg'])
+            return
+        
+        color = COLORS['low_stock'] if stock <= LOW_STOCK_THRESHOLD else COLORS['fg']
+        self.stock_label.config(text=f"Остаток: {stock:g}", foreground=color)
+    
     def update_totals(self, total_sum):
         """Обновление отображения итогов"""
         self.total_sales = total_sum
-        self.total_label.config(text=f"Итого {self.shop_name}: {total_sum:.2f} сом")
+        self.total_label.config(text=f"Итого {self.shop_name}: {total_sum:.2f} {get_settings().currency}")
+    
+    def set_shop_name(self, shop_name):
+        """Новое имя магазина после переименования"""
+        self.shop_name = shop_name
+        self.update_totals(self.total_sales)
     
     def get_total_sales(self):
         """Получить общую сумму продаж"""
@@ -344,87 +610,35 @@ class SalesView(ttk.Frame):
                     self.selected_row_widgets.append(widget)
     
     def _edit_record(self, record_id):
-        """Редактировать запись"""
-        self._start_row_edit(record_id)
+        """Редактировать запись в таблице, начиная с первой колонки"""
+        self.cell_editor.open(record_id)
     
     def _delete_record(self, record_id):
-        """Удалить запись"""
-        if messagebox.askyesno("Подтверждение", f"Удалить запись?"):
-            self.controller.delete_record(record_id)
-            self.selected_record_id = None
-            self.selected_row_widgets = []
+        """Удалить запись без подтверждения (Ctrl+Z - отменить)"""
+        self.controller.delete_record(record_id)
+        self.selected_record_id = None
+        self.selected_row_widgets = []
     
-    def _start_row_edit(self, record_id):
-        """Начать редактирование всей строки"""
-        record = None
-        for r in self.records:
-            if r['id'] == record_id:
-                record = r
-                break
-        
-        if not record:
-            return
-        
-        edit_window = tk.Toplevel(self)
-        edit_window.title(f"Редактирование записи")
-        edit_window.geometry("400x250")
-        edit_window.resizable(False, False)
-        
-        fields = [
-            ('Дата', 'date', record.get('date', '')),
-            ('Продавец', 'seller_name', record.get('seller_name', '')),
-            ('Товар', 'item', record.get('item', '')),
-            ('Количество', 'quantity', record.get('quantity', '')),
-            ('Цена', 'price', record.get('price', ''))
-        ]
-        
-        entries = {}
-        for i, (label, field, value) in enumerate(fields):
-            ttk.Label(edit_window, text=label + ":").grid(row=i, column=0, padx=5, pady=5, sticky='w')
-            
-            if field == 'date':
-                entry = DateSelector(edit_window)
-                entry.set_date(value)
-                entry.grid(row=i, column=1, padx=5, pady=5, sticky='w')
-            else:
-                entry = ttk.Entry(edit_window, width=25)
-                entry.insert(0, str(value))
-                entry.grid(row=i, column=1, padx=5, pady=5, sticky='w')
-                entry.bind('<Return>', lambda e, f=field: self._save_edit_on_enter(e, edit_window, record_id, entries))
-            
-            entries[field] = entry
-        
-        btn_frame = ttk.Frame(edit_window)
-        btn_frame.grid(row=len(fields), column=0, columnspan=2, pady=20)
-        
-        def save():
-            data = {}
-            for field, entry in entries.items():
-                if field == 'date':
-                    data[field] = entry.get_date()
-                else:
-                    data[field] = entry.get()
-            
-            self.controller.update_record(record_id, data)
-            edit_window.destroy()
-        
-        ttk.Button(btn_frame, text="Сохранить", command=save).pack(side=tk.LEFT, padx=5)
-        ttk.Button(btn_frame, text="Отмена", command=edit_window.destroy).pack(side=tk.LEFT, padx=5)
-        
-        edit_window.bind('<Return>', lambda e: save())
-        edit_window.bind('<Escape>', lambda e: edit_window.destroy())
+    def _get_cell(self, record_id, column):
+        """Label ячейки записи (None, если строки нет в таблице)"""
+        widgets = self.row_widgets.get(record_id)
+        if not widgets:
+            return None
+        return widgets[list(SALES_COLUMNS.keys()).index(column)]
     
-    def _save_edit_on_enter(self, event, edit_window, record_id, entries):
-        """Сохранить при нажатии Enter в поле редактирования"""
-        data = {}
-        for field, entry in entries.items():
-            if field == 'date':
-                data[field] = entry.get_date()
-            else:
-                data[field] = entry.get()
-        
-        self.controller.update_record(record_id, data)
-        edit_window.destroy()
+    def _neighbour_record(self, record_id, step):
+        """id строки выше (step < 0) или ниже (step > 0) в таблице"""
+        current = self.row_numbers.get(record_id)
+        if current is None:
+            return None
+        
+        candidates = [(abs(n - current), r) for r, n in self.row_numbers.items() if (n - current) * step > 0]
+        return min(candidates)[1] if candidates else None
+    
+    def _on_cell_commit(self, record_id, column, value):
+        """Сохранить одну ячейку; перерисуются только строка и итог"""
+        if not self.controller.process_cell_edit(record_id, column, value):
+            self.bell()
     
     def _on_delete(self, event):
         """Обработка нажатия Delete"""
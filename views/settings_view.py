@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+"""
+Окно настроек: магазины, валюта и комиссия продавцов
+"""
+
+import tkinter as tk
+from tkinter import ttk, messagebox, simpledialog
+from models.settings_model import get_settings
+
+
+class SettingsWindow(tk.Toplevel):
+    """Добавление и переименование магазинов, выбор валюты"""
+    
+    def __init__(self, master, on_shop_added=None, on_shop_renamed=None, on_currency_changed=None):
+        super().__init__(master)
+        self.title("Настройки")
+        self.resizable(False, False)
+        self.transient(master)
+        
+        self.settings = get_settings()
+        self.on_shop_added = on_shop_added
+        self.on_shop_renamed = on_shop_renamed
+        self.on_currency_changed = on_currency_changed
+        
+        self._create_widgets()
+        self._fill_shops()
+    
+    def _create_widgets(self):
+        """Создание виджетов"""
+        frame = ttk.Frame(self, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Валюта
+        currency_frame = ttk.LabelFrame(frame, text="Валюта")
+        currency_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        self.currency_var = tk.StringVar(value=self.settings.currency)
+        ttk.Entry(currency_frame, textvariable=self.currency_var, width=10).pack(side=tk.LEFT, padx=5, pady=5)
+        ttk.Button(currency_frame, text="Сохранить", command=self._save_currency).pack(side=tk.LEFT, padx=5, pady=5)
+        
+        # Комиссия продавцов
+        commission_frame = ttk.LabelFrame(frame, text="Комиссия продавцов, % выручки")
+        commission_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        self.commission_var = tk.StringVar(value=f"{self.settings.commission_percent:g}")
+        ttk.Entry(commission_frame, textvariable=self.commission_var, width=10).pack(side=tk.LEFT, padx=5, pady=5)
+        ttk.Button(commission_frame, text="Сохранить", command=self._save_commission).pack(side=tk.LEFT, padx=5, pady=5)
+        
+        # Магазины
+        shops_frame = ttk.LabelFrame(frame, text="Магазины")
+        shops_frame.pack(fill=tk.BOTH, expand=True)
+        
+        self.shops_list = tk.Listbox(shops_frame, height=10, width=30, exportselection=False)
+        self.shops_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.shops_list.bind('<Double-Button-1>', lambda e: self._rename_shop())
+        
+        buttons = ttk.Frame(shops_frame)
+        buttons.pack(side=tk.LEFT, fill=tk.Y, padx=5, pady=5)
+        ttk.Button(buttons, text="Добавить...", command=self._add_shop).pack(fill=tk.X, pady=2)
+        ttk.Button(buttons, text="Переименовать...", command=self._rename_shop).pack(fill=tk.X, pady=2)
+        
+        ttk.Button(frame, text="Закрыть", command=self.destroy).pack(pady=(10, 0))
+    
+    def _fill_shops(self):
+        """Заполнить список магазинов"""
+        self.shops_list.delete(0, tk.END)
+        for name in self.settings.get_shop_names():
+            self.shops_list.insert(tk.END, name)
+    
+    def _save_currency(self):
+        """Сохранить валюту"""
+        currency = self.currency_var.get().strip()
+        if not currency:
+            messagebox.showerror("Настройки", "Укажите обозначение валюты", parent=self)
+            return
+        
+        self.settings.set('currency', currency)
+        if self.on_currency_changed:
+            self.on_currency_changed()
+    
+    def _save_commission(self):
+        """Сохранить комиссию продавцов (рейтинги учтут ее при следующем обновлении)"""
+        try:
+            percent = float(self.commission_var.get().strip().replace(',', '.'))
+        except ValueError:
+            percent = -1
+        if not 0 <= percent <= 100:
+            messagebox.showerror("Настройки", "Комиссия - число от 0 до 100", parent=self)
+            return
+        
+        self.settings.set('commission_percent', str(percent))
+    
+    def _add_shop(self):
+        """Добавить магазин"""
+        name = simpledialog.askstring("Новый магазин", "Название магазина:", parent=self)
+        if name is None:
+            return
+        
+        try:
+            shop = self.settings.add_shop(name)
+        except ValueError as e:
+            messagebox.showerror("Настройки", str(e), parent=self)
+            return
+        
+        self._fill_shops()
+        if self.on_shop_added:
+            self.on_shop_added(shop)
+    
+    def _rename_shop(self):
+        """Переименовать выбранный магазин"""
+        selection = self.shops_list.curselection()
+        if not selection:
+            messagebox.showwarning("Настройки", "Выберите магазин", parent=self)
+            return
+        
+        old_name = self.shops_list.get(selection[0])
+        new_name = simpledialog.askstring(
+            "Переименование", "Новое название:", initialvalue=old_name, parent=self
+        )
+        if new_name is None or new_name.strip() == old_name:
+            return
+        
+        try:
+            self.settings.rename_shop(old_name, new_name)
+        except ValueError as e:
+            messagebox.showerror("Настройки", str(e), parent=self)
+            return
+        
+        self._fill_shops()
+        if self.on_shop_renamed:
+            self.on_shop_renamed(old_name, new_name.strip())
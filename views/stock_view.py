@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+"""
+Окно склада: остатки магазина и приход товара
+"""
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+from config import COLORS
+from models.settings_model import get_settings
+from controllers.stock_controller import StockController
+from views.widgest.date_selector import DateSelector
+
+
+class StockWindow(tk.Toplevel):
+    """Остатки по магазину с подсветкой заканчивающихся товаров"""
+    
+    def __init__(self, master, on_stock_changed=None):
+        super().__init__(master)
+        self.title("Склад")
+        self.geometry("420x480")
+        self.transient(master)
+        
+        self.controller = StockController()
+        self.on_stock_changed = on_stock_changed
+        
+        self._create_widgets()
+        self._refresh()
+    
+    def _create_widgets(self):
+        """Создание виджетов"""
+        frame = ttk.Frame(self, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Магазин
+        shop_frame = ttk.Frame(frame)
+        shop_frame.pack(fill=tk.X)
+        ttk.Label(shop_frame, text="Магазин:").pack(side=tk.LEFT, padx=(0, 5))
+        shops = get_settings().get_shop_names()
+        self.shop_var = tk.StringVar(value=shops[0] if shops else "")
+        shop_combo = ttk.Combobox(shop_frame, textvariable=self.shop_var, values=shops, state="readonly", width=12)
+        shop_combo.pack(side=tk.LEFT)
+        shop_combo.bind('<<ComboboxSelected>>', lambda e: self._refresh())
+        
+        # Приход товара
+        receipt_frame = ttk.LabelFrame(frame, text="Приход товара")
+        receipt_frame.pack(fill=tk.X, pady=10)
+        
+        self.date_selector = DateSelector(receipt_frame)
+        self.date_selector.grid(row=0, column=0, columnspan=4, sticky='w', padx=5, pady=5)
+        
+        ttk.Label(receipt_frame, text="Товар:").grid(row=1, column=0, padx=5, pady=5)
+        self.item_entry = ttk.Entry(receipt_frame, width=18)
+        self.item_entry.grid(row=1, column=1, padx=2, pady=5)
+        self.item_entry.bind('<Return>', lambda e: self._add_receipt())
+        
+        ttk.Label(receipt_frame, text="Кол-во:").grid(row=1, column=2, padx=5, pady=5)
+        self.quantity_entry = ttk.Entry(receipt_frame, width=8)
+        self.quantity_entry.grid(row=1, column=3, padx=2, pady=5)
+        self.quantity_entry.bind('<Return>', lambda e: self._add_receipt())
+        
+        ttk.Button(receipt_frame, text="Добавить", command=self._add_receipt).grid(row=1, column=4, padx=5, pady=5)
+        
+        # Остатки
+        tree_frame = ttk.Frame(frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        
+        self.tree = ttk.Treeview(tree_frame, columns=('item', 'quantity'), show='headings')
+        self.tree.heading('item', text="Товар")
+        self.tree.heading('quantity', text="Остаток")
+        self.tree.column('item', width=250)
+        self.tree.column('quantity', width=100, anchor='e')
+        self.tree.tag_configure('low', foreground=COLORS['low_stock'])
+        
+        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        ttk.Button(frame, text="Закрыть", command=self.destroy).pack(pady=(10, 0))
+    
+    def _refresh(self):
+        """Перечитать остатки выбранного магазина"""
+        self.tree.delete(*self.tree.get_children())
+        for row in self.controller.get_balances(self.shop_var.get()):
+            self.tree.insert(
+                '', tk.END,
+                values=(row['item'], f"{row['quantity']:g}"),
+                tags=('low',) if row['low'] else ()
+            )
+    
+    def _add_receipt(self):
+        """Оприходовать товар"""
+        item = self.item_entry.get().strip()
+        if not item:
+            messagebox.showerror("Склад", "Поле 'Товар' обязательно для заполнения", parent=self)
+            return
+        
+        try:
+            quantity = float(self.quantity_entry.get().replace(',', '.'))
+        except ValueError:
+            messagebox.showerror("Склад", "Количество должно быть числом", parent=self)
+            return
+        
+        self.controller.add_receipt({
+            'date': self.date_selector.get_date(),
+            'shop': self.shop_var.get(),
+            'item': item,
+            'quantity': quantity
+        })
+        
+        self.item_entry.delete(0, tk.END)
+        self.quantity_entry.delete(0, tk.END)
+        self.item_entry.focus()
+        
+        self._refresh()
+        if self.on_stock_changed:
+            self.on_stock_changed()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+"""
+Окно пользователей: логины, роли и пароли
+"""
+
+import tkinter as tk
+from tkinter import ttk, messagebox, simpledialog
+from models.user_model import get_users, ROLE_TITLES, ROLE_CASHIER
+from models.settings_model import get_settings
+from controllers.access import session
+
+
+class UsersWindow(tk.Toplevel):
+    """Добавление и удаление пользователей, смена паролей (только для управляющего)"""
+    
+    def __init__(self, master):
+        super().__init__(master)
+        self.title("Пользователи")
+        self.resizable(False, False)
+        self.transient(master)
+        
+        self.users = get_users()
+        self._create_widgets()
+        self._fill_users()
+    
+    def _create_widgets(self):
+        """Создание виджетов"""
+        frame = ttk.Frame(self, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        list_frame = ttk.LabelFrame(frame, text="Пользователи")
+        list_frame.pack(fill=tk.BOTH, expand=True)
+        
+        self.users_tree = ttk.Treeview(
+            list_frame, columns=('login', 'name', 'role', 'shop'), show='headings', height=8, selectmode='browse'
+        )
+        for column, text, width in (('login', "Логин", 100), ('name', "Имя", 150), ('role', "Роль", 110), ('shop', "Магазин", 100)):
+            self.users_tree.heading(column, text=text)
+            self.users_tree.column(column, width=width)
+        self.users_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        buttons = ttk.Frame(list_frame)
+        buttons.pack(side=tk.LEFT, fill=tk.Y, padx=5, pady=5)
+        ttk.Button(buttons, text="Сменить пароль...", command=self._change_password).pack(fill=tk.X, pady=2)
+        ttk.Button(buttons, text="Удалить", command=self._delete_user).pack(fill=tk.X, pady=2)
+        
+        # Новый пользователь
+        add_frame = ttk.LabelFrame(frame, text="Новый пользователь")
+        add_frame.pack(fill=tk.X, pady=(10, 0))
+        
+        self.login_var = tk.StringVar()
+        self.name_var = tk.StringVar()
+        self.role_var = tk.StringVar(value=ROLE_TITLES[ROLE_CASHIER])
+        self.shop_var = tk.StringVar()
+        self.password_var = tk.StringVar()
+        
+        fields = (
+            ("Логин:", ttk.Entry(add_frame, textvariable=self.login_var, width=20)),
+            ("Имя:", ttk.Entry(add_frame, textvariable=self.name_var, width=20)),
+            ("Роль:", ttk.Combobox(add_frame, textvariable=self.role_var, values=list(ROLE_TITLES.values()), state='readonly', width=18)),
+            ("Магазин:", ttk.Combobox(add_frame, textvariable=self.shop_var, values=get_settings().get_shop_names(), state='readonly', width=18)),
+            ("Пароль:", ttk.Entry(add_frame, textvariable=self.password_var, show="*", width=20))
+        )
+        for row, (text, widget) in enumerate(fields):
+            ttk.Label(add_frame, text=text).grid(row=row, column=0, sticky='w', padx=5, pady=2)
+            widget.grid(row=row, column=1, sticky='w', padx=5, pady=2)
+        ttk.Button(add_frame, text="Добавить", command=self._add_user).grid(row=len(fields), column=1, sticky='w', padx=5, pady=5)
+        
+        ttk.Button(frame, text="Закрыть", command=self.destroy).pack(pady=(10, 0))
+    
+    def _fill_users(self):
+        """Заполнить список пользователей"""
+        self.users_tree.delete(*self.users_tree.get_children())
+        for user in self.users.get_users():
+            self.users_tree.insert('', tk.END, iid=user['login'], values=(
+                user['login'], user['name'], ROLE_TITLES.get(user['role'], user['role']), user['shop'] or ""
+            ))
+    
+    def _selected_login(self):
+        """Логин выбранного пользователя (None - никто не выбран)"""
+        selection = self.users_tree.selection()
+        if not selection:
+            messagebox.showwarning("Пользователи", "Выберите пользователя", parent=self)
+            return None
+        return selection[0]
+    
+    def _add_user(self):
+        """Добавить пользователя из полей формы"""
+        role = next(role for role, title in ROLE_TITLES.items() if title == self.role_var.get())
+        try:
+            self.users.add_user(
+                self.login_var.get(), self.password_var.get(), role,
+                name=self.name_var.get().strip() or None, shop=self.shop_var.get() or None
+            )
+        except ValueError as e:
+            messagebox.showerror("Пользователи", str(e), parent=self)
+            return
+        
+        for var in (self.login_var, self.name_var, self.password_var):
+            var.set("")
+        self._fill_users()
+    
+    def _change_password(self):
+        """Сменить пароль выбранного пользователя"""
+        login = self._selected_login()
+        if login is None:
+            return
+        
+        password = simpledialog.askstring("Пароль", f"Новый пароль для {login}:", show="*", parent=self)
+        if password is None:
+            return
+        try:
+            self.users.set_password(login, password)
+        except ValueError as e:
+            messagebox.showerror("Пользователи", str(e), parent=self)
+    
+    def _delete_user(self):
+        """Удалить выбранного пользователя"""
+        login = self._selected_login()
+        if login is None:
+            return
+        if session.user and session.user['login'] == login:
+            messagebox.showerror("Пользователи", "Нельзя удалить пользователя, под которым выполнен вход", parent=self)
+            return
+        if not messagebox.askyesno("Пользователи", f"Удалить пользователя {login}?", parent=self):
+            return
+        
+        try:
+            self.users.delete_user(login)
+        except ValueError as e:
+            messagebox.showerror("Пользователи", str(e), parent=self)
+            return
+        self._fill_users()
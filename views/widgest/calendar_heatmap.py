@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+"""
+Календарь месяца с подсветкой дней по активности (тепловая карта)
+"""
+
+import calendar
+import tkinter as tk
+from tkinter import ttk
+from datetime import date
+from config import COLORS, TABLE_FONT
+
+
+MONTH_NAMES = ["Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
+               "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь"]
+WEEKDAY_NAMES = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+
+
+class CalendarHeatmap(ttk.Frame):
+    """Календарь месяца: цвет дня показывает сумму за день, подсказка - число записей"""
+    
+    def __init__(self, master, on_pick=None, on_month_change=None, color='#2e7d32', *args, **kwargs):
+        super().__init__(master, *args, **kwargs)
+        
+        self.on_pick = on_pick
+        self.on_month_change = on_month_change
+        self.color = color
+        
+        today = date.today()
+        self.year = today.year
+        self.month = today.month
+        self.selected = today
+        self.activity = {}  # {date: {'count': ..., 'total': ...}}
+        
+        self._create_widgets()
+        self._render()
+    
+    def _create_widgets(self):
+        """Создание виджетов"""
+        header = ttk.Frame(self)
+        header.pack(fill=tk.X)
+        
+        ttk.Button(header, text="◀", width=3, command=lambda: self._shift_month(-1)).pack(side=tk.LEFT)
+        self.title_label = ttk.Label(header, anchor='center', font=TABLE_FONT)
+        self.title_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        ttk.Button(header, text="▶", width=3, command=lambda: self._shift_month(1)).pack(side=tk.LEFT)
+        
+        grid = ttk.Frame(self)
+        grid.pack()
+        
+        for col, name in enumerate(WEEKDAY_NAMES):
+            tk.Label(grid, text=name, font=TABLE_FONT, width=4).grid(row=0, column=col)
+        
+        # 6 недель x 7 дней - ячейки создаются один раз и только перекрашиваются
+        self.cells = []
+        for row in range(6):
+            for col in range(7):
+                cell = tk.Label(grid, font=TABLE_FONT, width=4, relief=tk.RIDGE, cursor='hand2')
+                cell.grid(row=row + 1, column=col, sticky='nsew', padx=1, pady=1)
+                cell.bind('<Button-1>', lambda e, index=len(self.cells): self._on_cell_click(index))
+                self.cells.append(cell)
+        
+        self.info_label = ttk.Label(self, font=TABLE_FONT)
+        self.info_label.pack(fill=tk.X)
+    
+    def _shift_month(self, delta):
+        """Перейти на соседний месяц"""
+        month_index = self.year * 12 + (self.month - 1) + delta
+        self.show_month(month_index // 12, month_index % 12 + 1)
+    
+    def show_month(self, year, month):
+        """Показать месяц и запросить данные активности"""
+        if (year, month) != (self.year, self.month):
+            self.year, self.month = year, month
+            self.activity = {}
+        self._render()
+        
+        if self.on_month_change:
+            self.on_month_change(year, month)
+    
+    def set_date(self, value):
+        """Выделить дату (при необходимости переключив месяц)"""
+        self.selected = value
+        if (value.year, value.month) != (self.year, self.month):
+            self.show_month(value.year, value.month)
+        else:
+            self._render()
+    
+    def set_activity(self, activity):
+        """Задать активность по дням месяца: {date: {'count', 'total'}}"""
+        self.activity = activity
+        self._render()
+    
+    def _days(self):
+        """Даты ячеек сетки (None для пустых ячеек)"""
+        first_weekday, days_in_month = calendar.monthrange(self.year, self.month)
+        days = [None] * first_weekday
+        days += [date(self.year, self.month, day) for day in range(1, days_in_month + 1)]
+        return days + [None] * (42 - len(days))
+    
+    def _render(self):
+        """Перекрасить ячейки по текущим данным"""
+        self.title_label.config(text=f"{MONTH_NAMES[self.month - 1]} {self.year}")
+        
+        peak = max((info['total'] or 0 for info in self.activity.values()), default=0)
+        month_total = sum(info['total'] or 0 for info in self.activity.values())
+        month_count = sum(info['count'] for info in self.activity.values())
+        
+        for cell, day in zip(self.cells, self._days()):
+            if day is None:
+                cell.config(text="", bg=COLORS['bg'], relief=tk.FLAT)
+                continue
+            
+            info = self.activity.get(day)
+            intensity = (info['total'] or 0) / peak if info and peak else 0
+            bg = self._blend(intensity)
+            fg = '#ffffff' if intensity > 0.6 else COLORS['fg']
+            if day == self.selected:
+                bg, fg = COLORS['select'], COLORS['fg']
+            
+            cell.config(
+                text=str(day.day),
+                bg=bg,
+                fg=fg,
+                relief=tk.SUNKEN if day == self.selected else tk.RIDGE
+            )
+        
+        self.info_label.config(text=f"За месяц: {month_total:.2f} ({month_count} зап.)")
+    
+    def _blend(self, intensity):
+        """Цвет между фоном таблицы и цветом активности"""
+        if intensity <= 0:
+            return COLORS['table_bg']
+        
+        # Минимальная яркость, чтобы день с данными отличался от пустого
+        intensity = 0.15 + 0.85 * intensity
+        base = [int(COLORS['table_bg'][i:i + 2], 16) for i in (1, 3, 5)]
+        target = [int(self.color[i:i + 2], 16) for i in (1, 3, 5)]
+        mixed = [round(b + (t - b) * intensity) for b, t in zip(base, target)]
+        return '#' + ''.join(f"{c:02x}" for c in mixed)
+    
+    def _on_cell_click(self, index):
+        """Выбор дня кликом"""
+        day = self._days()[index]
+        if day is None:
+            return
+        
+        self.selected = day
+        self._render()
+        
+        info = self.activity.get(day)
+        if info:
+            self.info_label.config(text=f"{day.strftime('%d.%m.%Y')}: {info['total'] or 0:.2f} ({info['count']} зап.)")
+        
+        if self.on_pick:
+            self.on_pick(day)
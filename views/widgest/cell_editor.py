@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+"""
+Редактирование ячеек таблицы на месте (поле ввода поверх ячейки)
+"""
+
+import tkinter as tk
+from tkinter import ttk
+from config import TABLE_FONT
+
+
+class CellEditor:
+    """Редактор ячеек таблицы из Label: одно поле ввода на таблицу
+    
+    Enter сохраняет и переходит к той же колонке следующей строки (удобно
+    править колонку цен подряд), Escape отменяет, Tab и Shift+Tab сохраняют
+    и переходят к соседней редактируемой колонке той же строки. Сохранение
+    передается в on_commit(record_id, колонка, значение), только если текст изменился.
+    """
+    
+    def __init__(self, table, columns, get_cell, on_commit, neighbour=None, choices=None):
+        self.table = table
+        self.columns = list(columns)  # Редактируемые колонки по порядку
+        self.get_cell = get_cell  # (record_id, колонка) -> Label или None
+        self.on_commit = on_commit
+        self.neighbour = neighbour  # (record_id, шаг) -> id соседней строки или None
+        self.choices = choices or {}  # колонка -> функция списка значений (Combobox)
+        
+        self.editor = None
+        self.record_id = None
+        self.column = None
+        self.original = None
+    
+    def open(self, record_id, column=None):
+        """Открыть редактор над ячейкой (по умолчанию - первая редактируемая колонка)"""
+        if self.editor is not None:
+            # Сначала сохраняем открытую ячейку - ее строка перерисуется в idle
+            self.commit()
+            self.table.after_idle(self.open, record_id, column)
+            return
+        
+        column = column or self.columns[0]
+        cell = self.get_cell(record_id, column)
+        if cell is None:
+            return
+        
+        self.record_id = record_id
+        self.column = column
+        self.original = cell.cget('text')
+        
+        if column in self.choices:
+            editor = ttk.Combobox(self.table, values=self.choices[column](), state="readonly", font=TABLE_FONT)
+            editor.set(self.original)
+            # Выпадающий список забирает фокус, поэтому сохраняем по выбору значения
+            editor.bind('<<ComboboxSelected>>', lambda e: self.commit())
+        else:
+            editor = tk.Entry(self.table, font=TABLE_FONT, justify=tk.RIGHT if cell.cget('anchor') == 'e' else tk.LEFT)
+            editor.insert(0, self.original)
+            editor.select_range(0, tk.END)
+            editor.bind('<FocusOut>', lambda e: self.commit())
+        
+        editor.place(in_=cell, x=0, y=0, relwidth=1, relheight=1)
+        editor.lift()
+        editor.focus_set()
+        
+        editor.bind('<Return>', lambda e: self.commit(step=1))
+        editor.bind('<KP_Enter>', lambda e: self.commit(step=1))
+        editor.bind('<Escape>', lambda e: self.close())
+        editor.bind('<Tab>', lambda e: self.commit(1) or "break")
+        editor.bind('<Shift-Tab>', lambda e: self.commit(-1) or "break")
+        editor.bind('<ISO_Left_Tab>', lambda e: self.commit(-1) or "break")
+        
+        # Строку перерисовали (отмена, синхронизация) - редактор больше не нужен
+        cell.bind('<Destroy>', lambda e: self.editor is editor and self.close(), add='+')
+        self.editor = editor
+    
+    def commit(self, move=0, step=0):
+        """Сохранить значение; move - переход по колонкам, step - по строкам"""
+        if self.editor is None:
+            return
+        
+        record_id, column = self.record_id, self.column
+        value = self.editor.get()
+        changed = value != self.original
+        self.close()
+        
+        if changed:
+            self.on_commit(record_id, column, value)
+        
+        if move:
+            column = self.columns[(self.columns.index(column) + move) % len(self.columns)]
+        if step:
+            record_id = self.neighbour(record_id, step) if self.neighbour else None
+        if record_id is not None and (move or step):
+            # Строка перерисовывается событием в idle - редактор открывается после нее
+            self.table.after_idle(self.open, record_id, column)
+    
+    def close(self):
+        """Убрать редактор без сохранения"""
+        editor, self.editor = self.editor, None
+        if editor is not None:
+            editor.destroy()
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+
+"""
+Графики на tk.Canvas: временные ряды и столбцы (без matplotlib)
+"""
+
+import math
+import tkinter as tk
+from config import COLORS, TABLE_FONT
+
+
+def downsample_minmax(xs, ys, buckets):
+    """Прореживание ряда: в каждой корзине остаются минимум и максимум
+    
+    Пики и провалы сохраняются, а точек остается не больше 2 * buckets,
+    поэтому многолетний ряд по дням рисуется так же быстро, как месячный.
+    """
+    count = len(xs)
+    if buckets <= 0 or count <= 2 * buckets:
+        return list(xs), list(ys)
+    
+    out_x, out_y = [], []
+    size = count / buckets
+    for bucket in range(buckets):
+        start = int(bucket * size)
+        end = min(int((bucket + 1) * size), count)
+        if start >= end:
+            continue
+        
+        low = high = start
+        for i in range(start + 1, end):
+            if ys[i] < ys[low]:
+                low = i
+            elif ys[i] > ys[high]:
+                high = i
+        
+        # Точки корзины добавляются в порядке следования по оси X
+        for i in sorted({low, high}):
+            out_x.append(xs[i])
+            out_y.append(ys[i])
+    
+    return out_x, out_y
+
+
+def nice_ticks(low, high, count=5):
+    """Круглые значения делений шкалы, покрывающие диапазон"""
+    if high <= low:
+        high = low + 1
+    
+    raw_step = (high - low) / count
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    step = next(m * magnitude for m in (1, 2, 2.5, 5, 10) if m * magnitude >= raw_step)
+    
+    first = math.floor(low / step)
+    last = math.ceil(high / step)
+    return [round(i * step, 10) for i in range(first, last + 1)]
+
+
+def format_amount(value):
+    """Короткая подпись суммы для шкалы"""
+    if abs(value) >= 1_000_000:
+        return f"{value / 1_000_000:g}М"
+    if abs(value) >= 1_000:
+        return f"{value / 1_000:g}к"
+    return f"{value:g}"
+
+
+class _ChartCanvas(tk.Canvas):
+    """Общая часть графиков: поля, шкала Y и отложенная перерисовка при изменении размера"""
+    
+    MARGIN_LEFT = 60
+    MARGIN_RIGHT = 15
+    MARGIN_TOP = 25
+    MARGIN_BOTTOM = 30
+    RESIZE_DELAY_MS = 30
+    
+    def __init__(self, master, **kwargs):
+        kwargs.setdefault('bg', COLORS['table_bg'])
+        kwargs.setdefault('highlightthickness', 0)
+        super().__init__(master, **kwargs)
+        
+        self.series = []
+        self._redraw_job = None
+        self.bind('<Configure>', self._schedule_redraw)
+    
+    def _schedule_redraw(self, event=None):
+        """Перерисовать один раз после серии событий изменения размера"""
+        if self._redraw_job is not None:
+            self.after_cancel(self._redraw_job)
+        self._redraw_job = self.after(self.RESIZE_DELAY_MS, self._redraw)
+    
+    def _redraw(self):
+        """Полная перерисовка"""
+        self._redraw_job = None
+        self.delete('all')
+        
+        width = self.winfo_width()
+        height = self.winfo_height()
+        if width < 50 or height < 50:
+            return
+        
+        self.plot = (
+            self.MARGIN_LEFT,
+            self.MARGIN_TOP,
+            width - self.MARGIN_RIGHT,
+            height - self.MARGIN_BOTTOM
+        )
+        self._draw()
+    
+    def _draw(self):
+        """Отрисовка содержимого (в наследниках)"""
+        raise NotImplementedError
+    
+    def _draw_y_axis(self, low, high):
+        """Шкала Y с сеткой; возвращает функцию перевода значения в координату"""
+        left, top, right, bottom = self.plot
+        ticks = nice_ticks(min(low, 0), max(high, 0))
+        low, high = ticks[0], ticks[-1]
+        if high == low:
+            high = low + 1
+        
+        def to_y(value):
+            return bottom - (value - low) / (high - low) * (bottom - top)
+        
+        for value in ticks:
+            y = to_y(value)
+            color = COLORS['fg'] if value == 0 else COLORS['chart_grid']
+            self.create_line(left, y, right, y, fill=color)
+            self.create_text(left - 5, y, text=format_amount(value), anchor='e', font=TABLE_FONT)
+        
+        return to_y
+    
+    def _draw_legend(self):
+        """Подписи рядов над графиком"""
+        x = self.MARGIN_LEFT
+        for label, _, color in self.series:
+            self.create_rectangle(x, 8, x + 10, 18, fill=color, outline=color)
+            item = self.create_text(x + 14, 13, text=label, anchor='w', font=TABLE_FONT)
+            x = self.bbox(item)[2] + 15
+    
+    def _draw_empty(self):
+        """Надпись вместо графика"""
+        left, top, right, bottom = self.plot
+        self.create_text((left + right) / 2, (top + bottom) / 2, text="Нет данных", font=TABLE_FONT)
+
+
+class LineChart(_ChartCanvas):
+    """Временные ряды с общей осью X (например, дни периода)"""
+    
+    def __init__(self, master, x_format=str, **kwargs):
+        super().__init__(master, **kwargs)
+        self.x_format = x_format
+        self.xs = []
+    
+    def set_data(self, xs, series):
+        """Задать ось X (числа по возрастанию) и ряды [(подпись, значения, цвет)]"""
+        self.xs = list(xs)
+        self.series = list(series)
+        self._schedule_redraw()
+    
+    def _draw(self):
+        """Отрисовка рядов по прореженным точкам"""
+        if len(self.xs) < 2 or not self.series:
+            self._draw_empty()
+            return
+        
+        left, top, right, bottom = self.plot
+        low = min(min(values) for _, values, _ in self.series)
+        high = max(max(values) for _, values, _ in self.series)
+        to_y = self._draw_y_axis(low, high)
+        
+        x_first, x_last = self.xs[0], self.xs[-1]
+        scale = (right - left) / (x_last - x_first)
+        
+        # Подписи оси X: несколько равномерно расставленных делений
+        for i in range(6):
+            value = x_first + (x_last - x_first) * i / 5
+            x = left + (value - x_first) * scale
+            self.create_line(x, bottom, x, bottom + 4, fill=COLORS['fg'])
+            self.create_text(x, bottom + 6, text=self.x_format(round(value)), anchor='n', font=TABLE_FONT)
+        
+        # На пиксель ширины - не больше одной корзины (две точки)
+        buckets = max(int(right - left), 1)
+        for label, values, color in self.series:
+            xs, ys = downsample_minmax(self.xs, values, buckets)
+            coords = []
+            for x, y in zip(xs, ys):
+                coords.append(left + (x - x_first) * scale)
+                coords.append(to_y(y))
+            # Один объект Canvas на ряд, а не отрезок на каждую точку
+            self.create_line(*coords, fill=color, width=1.5)
+        
+        self._draw_legend()
+
+
+class BarChart(_ChartCanvas):
+    """Сгруппированные столбцы по категориям (например, по магазинам)"""
+    
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.categories = []
+    
+    def set_data(self, categories, series):
+        """Задать категории и ряды [(подпись, значения, цвет)]"""
+        self.categories = list(categories)
+        self.series = list(series)
+        self._schedule_redraw()
+    
+    def _draw(self):
+        """Отрисовка столбцов"""
+        if not self.categories or not self.series:
+            self._draw_empty()
+            return
+        
+        left, top, right, bottom = self.plot
+        low = min(min(values) for _, values, _ in self.series)
+        high = max(max(values) for _, values, _ in self.series)
+        to_y = self._draw_y_axis(low, high)
+        
+        group_width = (right - left) / len(self.categories)
+        bar_width = group_width * 0.8 / len(self.series)
+        zero = to_y(0)
+        
+        for index, category in enumerate(self.categories):
+            group_left = left + group_width * index + group_width * 0.1
+            for number, (_, values, color) in enumerate(self.series):
+                x = group_left + bar_width * number
+                y = to_y(values[index])
+                self.create_rectangle(x, min(y, zero), x + bar_width - 2, max(y, zero), fill=color, outline='')
+            
+            self.create_text(
+                left + group_width * (index + 0.5), bottom + 6,
+                text=category, anchor='n', font=TABLE_FONT
+            )
+        
+        self._draw_legend()